@@ -1,4 +1,6 @@
-def get_camera_provider(name: str, video_path: str = None):
+def get_camera_provider(name: str, video_path: str = None, device: str = None, pixel_format: str = None,
+                        film: str = None, unthrottled: bool = False,
+                        replay_path: str = None, replay_speed: float = 1.0, replay_loop: bool = False):
     name = name.lower().strip()
     if name == 'ximea':
         from .ximea import XimeaAdapter
@@ -6,8 +8,14 @@ def get_camera_provider(name: str, video_path: str = None):
     elif name == 'pi':
         from .pi import PiCameraAdapter
         return PiCameraAdapter()
+    elif name == 'uvc':
+        from .uvc import UVCCameraAdapter
+        return UVCCameraAdapter(device=device or "/dev/video0", pixel_format=pixel_format)
+    elif name == 'replay':
+        from .replay import ReplayCameraProvider
+        return ReplayCameraProvider(replay_path, speed=replay_speed, loop=replay_loop)
     elif name == 'mock':
         from .mock import MockCameraProvider
-        return MockCameraProvider(video_path=video_path)
+        return MockCameraProvider(video_path=video_path, film=film, unthrottled=unthrottled)
     else:
         raise ValueError(f"Câmera não suportada: {name}")
@@ -1,4 +1,16 @@
+from .capabilities import CameraCapabilities
+from .frame import Frame
+
+
 class CameraProvider:
+    # True se get_frame() devolve views de buffers que o driver reutiliza (quem guarda o quadro precisa copiar)
+    reuses_buffers = False
+    # Conteúdo de Frame.data: None = imagem de gravação (BGR de 3 canais ou mosaico Bayer de 1 canal),
+    # "luma" = plano Y em escala de cinza só para a visão (a gravação usa Frame.main())
+    frame_format = None
+    # Unidade de set_gain(): "linear" (multiplicador), "db" ou "raw" (escala do driver, sem conversão)
+    gain_units = "linear"
+
     def start(self, res_w, res_h, fps, shutter_speed, gain, lens_position, offset_x=0, offset_y=0, **kwargs):
         raise NotImplementedError
 
@@ -8,6 +20,25 @@ class CameraProvider:
     def get_frame(self):
         raise NotImplementedError
 
+    def read_frame(self):
+        # Quadro com metadados do sensor (Frame). Provedores sem metadados herdam este embrulho do get_frame().
+        data = self.get_frame()
+        return Frame(data) if data is not None else None
+
+    def set_readout(self, width, height, offset_x, offset_y, decimation=1, fps=None):
+        # Troca a janela de leitura sem reiniciar o app (coordenadas do sensor em resolução cheia, como
+        # em start()). Devolve a geometria aceita pelo hardware {"width", "height", "offset_x",
+        # "offset_y", "decimation"}, ou None se o provedor não tem janela configurável.
+        return None
+
+    def capabilities(self):
+        # O que o provedor faz no hardware (CameraCapabilities); por padrão nada
+        return CameraCapabilities()
+
+    def max_fps(self):
+        # Maior FPS que o sensor aceita na janela de leitura atual, ou None se o provedor não sabe
+        return None
+
     def set_exposure(self, value):
         raise NotImplementedError
 
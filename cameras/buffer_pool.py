@@ -0,0 +1,114 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class Lease:
+    """
+    Empréstimo de um buffer do driver com contagem de referências.
+
+    Quem recebe o quadro começa com uma referência; cada consumidor extra que precisa segurar os
+    pixels (snapshot do painel, por exemplo) chama `retain()` e depois `release()`. O buffer só
+    volta para o driver (`_liberar()`) quando a última referência é solta. `retain()` devolve False
+    se o buffer já foi reciclado, e nesse caso o consumidor não pode mais ler os pixels.
+    """
+
+    __slots__ = ("_lock", "_refs")
+
+    def __init__(self, lock):
+        self._lock = lock
+        self._refs = 1
+
+    def retain(self):
+        with self._lock:
+            if self._refs <= 0: return False
+            self._refs += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            if self._refs <= 0: return
+            self._refs -= 1
+            if self._refs: return
+        self._liberar()
+
+    def _liberar(self):
+        pass
+
+
+class BufferLease(Lease):
+    """Empréstimo de um buffer do `BufferPool`."""
+
+    __slots__ = ("pool", "indice", "array")
+
+    def __init__(self, pool, indice, array):
+        super().__init__(pool._lock)
+        self.pool = pool
+        self.indice = indice
+        self.array = array
+
+    def _liberar(self):
+        self.pool._devolver(self)
+
+
+class BufferPool:
+    """
+    Conjunto fixo de buffers de quadro emprestados ao driver da câmera (SPEC-002).
+
+    Com a Ximea em `XI_BP_SAFE`, cada `get_image()` escreve num buffer do pool em vez do buffer
+    interno que o SDK reaproveita. O quadro que sobe pelo pipeline é uma view desse buffer, e ele
+    só é reciclado quando visão, painel e gravação soltaram o empréstimo: nenhuma cópia em Python
+    por quadro. Os livres são reusados em ordem FIFO, então um buffer recém-solto demora o máximo
+    possível para ser reescrito.
+
+    Se todos estiverem emprestados (consumidor travado segurando quadros), `acquire()` aloca um
+    buffer avulso, contado em `esgotamentos`, que é descartado ao ser solto: o pool não cresce.
+    """
+
+    def __init__(self, n_buffers, nbytes):
+        self.n_buffers = max(1, int(n_buffers))
+        self.nbytes = int(nbytes)
+        self._lock = threading.Lock()
+        self._buffers = [np.empty(self.nbytes, dtype=np.uint8) for _ in range(self.n_buffers)]
+        self._livres = deque(range(self.n_buffers))
+
+        self.emprestimos = 0
+        self.esgotamentos = 0
+        self.em_uso_max = 0
+
+    def acquire(self):
+        """Empresta um buffer livre (uma referência, do chamador)."""
+        with self._lock:
+            self.emprestimos += 1
+            if not self._livres:
+                self.esgotamentos += 1
+                return BufferLease(self, None, np.empty(self.nbytes, dtype=np.uint8))
+            indice = self._livres.popleft()
+            em_uso = self.n_buffers - len(self._livres)
+            if em_uso > self.em_uso_max:
+                self.em_uso_max = em_uso
+            return BufferLease(self, indice, self._buffers[indice])
+
+    def _devolver(self, lease):
+        # Última referência solta: o buffer volta ao fim da fila (avulsos são descartados)
+        if lease.indice is None: return
+        with self._lock:
+            self._livres.append(lease.indice)
+
+    def livres(self):
+        with self._lock:
+            return len(self._livres)
+
+    def stats(self):
+        with self._lock:
+            livres = len(self._livres)
+        return {
+            "buffers": self.n_buffers,
+            "bytes_por_buffer": self.nbytes,
+            "livres": livres,
+            "em_uso": self.n_buffers - livres,
+            "em_uso_max": self.em_uso_max,
+            "emprestimos": self.emprestimos,
+            "esgotamentos": self.esgotamentos,
+        }
@@ -0,0 +1,28 @@
+class CameraCapabilities:
+    """
+    O que o provedor faz no hardware (SPEC-002). O orquestrador (`core/color_pipeline.py`) empurra
+    para o sensor/ISP cada estágio de cor suportado e deixa o resto na LUT do software.
+
+      - `debayer`: o quadro de gravação já sai colorido (ISP), sem `cv2.cvtColor` no codificador;
+      - `white_balance` / `gamma` / `contrast` / `sharpness`: controles do ISP aplicados ao quadro colorido;
+      - `hardware_lut`: curva 1D única carregável no sensor (`load_hardware_lut`), aplicada antes do
+        debayer, então só serve quando os três canais da LUT são iguais;
+      - `roi` / `binning`: janela e decimação configuráveis por `set_readout`;
+      - `timestamps` / `sequence`: `Frame.timestamp` e `Frame.seq` vêm do sensor/driver.
+    """
+
+    __slots__ = ("debayer", "white_balance", "gamma", "contrast", "sharpness", "hardware_lut",
+                 "roi", "binning", "timestamps", "sequence")
+
+    def __init__(self, **campos):
+        for k in self.__slots__:
+            setattr(self, k, bool(campos.pop(k, False)))
+        if campos:
+            raise ValueError(f"Capacidades desconhecidas: {', '.join(sorted(campos))}")
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __repr__(self):
+        ativas = [k for k in self.__slots__ if getattr(self, k)]
+        return f"CameraCapabilities({', '.join(ativas) or 'nenhuma'})"
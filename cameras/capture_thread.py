@@ -0,0 +1,199 @@
+import threading
+import time
+from collections import deque
+
+
+class CaptureThread:
+    """
+    Camada de aquisição dedicada em volta de qualquer `CameraProvider` (SPEC-002).
+
+    Uma thread drena o sensor continuamente (`provider.read_frame()`) para um anel limitado de
+    `Frame`s (pixels + seq/timestamp/exposição/ganho do sensor, e `host_ts` em `time.monotonic()`
+    no momento da leitura). O estágio de visão consome do anel em ordem (`read()` / `get_frame()`),
+    então uma pausa na visão, nas filas ou no painel não atrasa mais a leitura do driver: com a
+    Ximea, isso evita que o `buffers_queue_size` encha e a USB descarte quadros.
+
+    Dois contadores separam as perdas:
+      - `overflow_anel`: o consumidor não acompanhou e a entrada mais antiga do anel foi descartada;
+      - `drops_sensor`: saltos no contador de quadros do próprio sensor (`Frame.seq`),
+        ou seja, quadros perdidos antes de chegarem ao host.
+
+    Quadros com `lease` (buffer emprestado de um `BufferPool`, ex.: Ximea em `XI_BP_SAFE`) entram
+    no anel sem cópia; o consumidor chama `Frame.release()` quando termina, e entradas descartadas
+    por overflow são soltas aqui. Provedores que devolvem views de buffers reutilizados pelo driver
+    sem empréstimo (`reuses_buffers = True`) têm o quadro copiado antes de entrar no anel; as cópias
+    e os bytes que deixaram de ser copiados graças ao pool são contados. Provedores sem contador
+    de sensor (`seq` None) recebem uma sequência local contínua.
+
+    Com um `tap` (`StreamTap`), cada quadro lido também é copiado cru para o arquivo de replay
+    antes de entrar no anel, ainda na thread de aquisição.
+
+    Reconfigurações do provedor (`executar`), como trocas da janela de leitura do sensor
+    (`set_readout`) ou a carga de uma LUT de hardware, também rodam nesta thread, entre duas
+    leituras: cada `Frame` sai marcado em `Frame.readout` com a janela que estava ativa quando foi lido.
+    Pedidos de threads diferentes (console, gamepad, visão) entram numa fila e rodam em ordem de chegada.
+    """
+
+    def __init__(self, provider, slots=8, tap=None):
+        self.provider = provider
+        self.slots = max(1, int(slots))
+        self.tap = tap
+        self.readout = None
+        self._pendentes = deque()
+        self._anel = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._rodando = False
+
+        self._seq_local = 0
+        self._ultimo_seq_sensor = None
+        self.capturados = 0
+        self.consumidos = 0
+        self.overflow_anel = 0
+        self.drops_sensor = 0
+        self.leituras_vazias = 0
+        self.ocupacao_max = 0
+        self.copias = 0
+        self.bytes_copiados = 0
+        self.bytes_economizados = 0
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive(): return self
+        self._rodando = True
+        self._thread = threading.Thread(target=self._loop, name="miniola-captura", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._rodando = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._cond:
+            while self._anel:
+                self._anel.popleft().release()
+
+    def _loop(self):
+        provider = self.provider
+        copiar = getattr(provider, "reuses_buffers", False)
+
+        while self._rodando:
+            while self._pendentes:
+                self._executar_troca(self._pendentes.popleft())
+            quadro = provider.read_frame()
+            if quadro is None or quadro.data is None:
+                self.leituras_vazias += 1
+                time.sleep(0.002)  # Câmera parada/desconectada: não gira em falso
+                continue
+            if copiar:
+                if quadro.lease is None:
+                    quadro.data = quadro.data.copy()
+                    self.copias += 1
+                    self.bytes_copiados += quadro.data.nbytes
+                else:
+                    self.bytes_economizados += quadro.data.nbytes
+
+            seq_sensor = quadro.seq
+            if seq_sensor is not None:
+                if self._ultimo_seq_sensor is not None and seq_sensor > self._ultimo_seq_sensor + 1:
+                    self.drops_sensor += seq_sensor - self._ultimo_seq_sensor - 1
+                self._ultimo_seq_sensor = seq_sensor
+            else:
+                quadro.seq = self._seq_local
+            self._seq_local += 1
+            if quadro.readout is None:
+                quadro.readout = self.readout  # Replay já traz a janela gravada
+            if self.tap is not None:
+                self.tap.write(quadro)
+
+            with self._cond:
+                if len(self._anel) >= self.slots:
+                    self._anel.popleft().release()
+                    self.overflow_anel += 1
+                self._anel.append(quadro)
+                self.capturados += 1
+                if len(self._anel) > self.ocupacao_max:
+                    self.ocupacao_max = len(self._anel)
+                self._cond.notify()
+
+    def _executar_troca(self, pedido):
+        funcao, pronto, resultado = pedido
+        try:
+            resultado.append(funcao())
+        except Exception as e:
+            print(f"[CAPTURA] Falha ao reconfigurar o provedor: {e}")
+        finally:
+            # Seq do sensor pode recomeçar depois de reconfigurar: não conta como drop
+            self._ultimo_seq_sensor = None
+            pronto.set()
+
+    def executar(self, funcao, timeout=5.0):
+        """
+        Roda `funcao()` (reconfiguração do provedor que para a aquisição) na thread de aquisição,
+        entre duas leituras, e devolve o resultado. None se não aconteceu dentro de `timeout`.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return funcao()
+        pronto, resultado = threading.Event(), []
+        pedido = (funcao, pronto, resultado)
+        self._pendentes.append(pedido)
+        if not pronto.wait(timeout):
+            # Não roda mais tarde, depois que o chamador já desistiu
+            try: self._pendentes.remove(pedido)
+            except ValueError: pronto.wait(timeout)  # Já saiu da fila: está rodando agora
+        if not resultado:
+            return None
+        return resultado[0]
+
+    def set_readout(self, aplicar, timeout=5.0):
+        """
+        Roda `aplicar()` (troca da janela de leitura) via `executar` e marca os quadros seguintes com a
+        janela que ela devolve. Devolve essa janela, ou None se a troca não aconteceu a tempo.
+        """
+        def trocar():
+            self.readout = aplicar()
+            return self.readout
+        return self.executar(trocar, timeout)
+
+    def read(self, timeout=1.0):
+        """Próximo `Frame` em ordem de chegada, ou None se o tempo esgotar. O chamador solta com `release()`."""
+        with self._cond:
+            if not self._anel:
+                self._cond.wait(timeout)
+                if not self._anel: return None
+            self.consumidos += 1
+            return self._anel.popleft()
+
+    def get_frame(self, timeout=1.0):
+        """Compatível com `CameraProvider.get_frame()`: só os pixels do próximo `Frame` (empréstimo já solto)."""
+        quadro = self.read(timeout)
+        if quadro is None: return None
+        quadro.release()
+        return quadro.data
+
+    def ocupacao(self):
+        with self._cond:
+            return len(self._anel)
+
+    def stats(self):
+        st = {
+            "slots": self.slots,
+            "ocupacao": self.ocupacao(),
+            "ocupacao_max": self.ocupacao_max,
+            "capturados": self.capturados,
+            "consumidos": self.consumidos,
+            "overflow_anel": self.overflow_anel,
+            "drops_sensor": self.drops_sensor,
+            "leituras_vazias": self.leituras_vazias,
+            "copias": self.copias,
+            "bytes_copiados": self.bytes_copiados,
+            "bytes_economizados": self.bytes_economizados,
+        }
+        pool = getattr(self.provider, "buffer_pool", None)
+        if pool is not None:
+            st["pool"] = pool.stats()
+        if self.tap is not None:
+            st["tap"] = self.tap.stats()
+        return st
@@ -0,0 +1,62 @@
+import time
+
+
+class Frame:
+    """
+    Quadro entregue por `CameraProvider.read_frame()`: os pixels mais os metadados do sensor (SPEC-002).
+
+      - `data`: ndarray do quadro (mesmo conteúdo que `get_frame()` devolveria);
+      - `seq`: contador de quadros do sensor (None se o hardware não expõe; a camada de aquisição numera);
+      - `timestamp`: instante de exposição no relógio do sensor, em segundos (None se indisponível);
+      - `exposure`: tempo de exposição efetivo em µs; `gain`: ganho efetivo (dB na Ximea, analógico no Pi);
+      - `host_ts`: `time.monotonic()` no momento em que o quadro chegou ao host;
+      - `lease`: empréstimo do buffer do driver quando `data` é uma view dele (None se o quadro é
+        dono da memória). Quem segura os pixels além do ciclo atual chama `retain()`/`release()`;
+      - `readout`: janela de leitura do sensor ativa quando o quadro foi lido (`cameras.readout.ReadoutWindow`,
+        marcada pela thread de captura; None = janela de partida).
+
+    Provedores com dois streams (Pi: lores YUV para a visão, main RGB para a gravação) entregam em
+    `data` a imagem da visão e o stream principal em `main()`, materializado só quando pedido
+    (quadros que disparam a captura). Nos demais, `main()` é o próprio `data`.
+    """
+
+    __slots__ = ("data", "seq", "timestamp", "exposure", "gain", "host_ts", "lease", "readout", "_main")
+
+    def __init__(self, data, seq=None, timestamp=None, exposure=None, gain=None, host_ts=None, lease=None, main=None):
+        self.data = data
+        self.seq = seq
+        self.timestamp = timestamp
+        self.exposure = exposure
+        self.gain = gain
+        self.host_ts = time.monotonic() if host_ts is None else host_ts
+        self.lease = lease
+        self.readout = None
+        self._main = main  # ndarray, callable que o produz, ou None (= data)
+
+    def main(self):
+        """Imagem do stream principal (gravação), nas mesmas coordenadas de `data`."""
+        if self._main is None: return self.data
+        if callable(self._main): self._main = self._main()
+        return self._main
+
+    def retain(self):
+        """Mais uma referência aos pixels. False se o buffer já voltou ao driver (não leia `data`)."""
+        return True if self.lease is None else self.lease.retain()
+
+    def release(self):
+        if self.lease is not None:
+            self.lease.release()
+
+    def metadata(self):
+        """Campos serializáveis gravados na telemetria da sessão (`miniola_tracking_*.jsonl`)."""
+        return {
+            "seq": None if self.seq is None else int(self.seq),
+            "ts_sensor": None if self.timestamp is None else float(self.timestamp),
+            "ts_host": float(self.host_ts),
+            "exposure": None if self.exposure is None else float(self.exposure),
+            "gain": None if self.gain is None else float(self.gain),
+        }
+
+    def __repr__(self):
+        shape = getattr(self.data, "shape", None)
+        return f"Frame(seq={self.seq}, timestamp={self.timestamp}, shape={shape})"
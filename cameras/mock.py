@@ -1,11 +1,71 @@
+import math
 import time
 import platform
 import numpy as np
 import cv2
 from .base import CameraProvider
+from .capabilities import CameraCapabilities
+from .frame import Frame
+
+
+class FilmStripSpec:
+    """
+    Película sintética do mock, com defeitos reproduzíveis por semente (SPEC-002).
+
+    Texto de `--mock-film`, pares `chave=valor` separados por vírgula:
+      pitch         passo nominal entre perfurações (px, padrão 200)
+      shrink        encolhimento da película (% do passo, padrão 0)
+      speed         avanço do filme por quadro do sensor (px inteiros, padrão 5)
+      weave         amplitude da oscilação lateral (px, padrão 0)
+      weave_period  período da oscilação lateral (em perfurações, padrão 8)
+      torn          probabilidade de cada perfuração estar rasgada até a borda (0..1)
+      missing       probabilidade de cada perfuração faltar (emenda/fita) (0..1)
+      drops         probabilidade, por quadro, de começar uma rajada de quadros perdidos (0..1)
+      burst         tamanho máximo da rajada (quadros, padrão 3)
+      perfs         perfurações na volta da tira antes de repetir (padrão 1 sem defeitos, 32 com)
+      seed          semente do gerador (padrão 0)
+    """
+
+    CAMPOS = {"pitch": float, "shrink": float, "speed": int, "weave": float, "weave_period": float,
+              "torn": float, "missing": float, "drops": float, "burst": int, "perfs": int, "seed": int}
+
+    def __init__(self, pitch=200.0, shrink=0.0, speed=5, weave=0.0, weave_period=8.0,
+                 torn=0.0, missing=0.0, drops=0.0, burst=3, perfs=None, seed=0):
+        self.pitch = float(pitch)
+        self.shrink = float(shrink)
+        self.speed = max(1, int(speed))
+        self.weave = float(weave)
+        self.weave_period = max(1.0, float(weave_period))
+        self.torn = float(torn)
+        self.missing = float(missing)
+        self.drops = float(drops)
+        self.burst = max(1, int(burst))
+        self.seed = int(seed)
+        # Sem defeitos o padrão se repete a cada perfuração: uma volta de um passo basta
+        defeitos = self.weave > 0 or self.torn > 0 or self.missing > 0
+        self.perfs = max(1, int(perfs)) if perfs else (32 if defeitos else 1)
+
+    @classmethod
+    def parse(cls, texto):
+        opcoes = {}
+        for par in (texto or "").split(","):
+            if not par.strip(): continue
+            chave, _, valor = par.partition("=")
+            chave = chave.strip()
+            if chave not in cls.CAMPOS:
+                raise ValueError(f"Chave desconhecida em --mock-film: {chave} (válidas: {', '.join(cls.CAMPOS)})")
+            opcoes[chave] = cls.CAMPOS[chave](valor.strip())
+        return cls(**opcoes)
+
+    def pitch_real(self):
+        return self.pitch * (1.0 - self.shrink / 100.0)
+
+    def as_dict(self):
+        return {chave: getattr(self, chave) for chave in self.CAMPOS}
+
 
 class MockCameraProvider(CameraProvider):
-    def __init__(self, video_path=None):
+    def __init__(self, video_path=None, film=None, unthrottled=False):
         arch = platform.machine().lower()
         if "arm" in arch or "aarch64" in arch:
             raise RuntimeError(f"O provedor mock não é suportado e está isolado de sistemas ARM64 ({arch}). Use-o apenas em x86_64.")
@@ -18,6 +78,8 @@ class MockCameraProvider(CameraProvider):
         self.fps = 120
         self.frame_time = 1.0 / self.fps
         self.last_frame_time = 0
+        self.unthrottled = unthrottled
+        self.film = film if isinstance(film, FilmStripSpec) else FilmStripSpec.parse(film)
         
         # Variáveis para simulação sintética
         self.perf_y = 0
@@ -25,11 +87,37 @@ class MockCameraProvider(CameraProvider):
         self.perf_width = 100
         self.perf_gap = 200 # Distância entre perfurações
         
+        # Metadados simulados do sensor (Frame)
+        self.seq = -1
+        self.exposure = None
+        self.gain = None
+        self.ts_sensor = 0.0
+
+        # Gabarito da simulação: avanço total da película (px) e quadros perdidos pelo "sensor"
+        self.film_px = 0
+        self.ultimo_film_px = 0
+        self.dropped_total = 0
+        self.drop_bursts = 0
+        self.offset0 = (0, 0)
+        self.janela = (0, 0, self.width, self.height, 1)
+        
     def start(self, res_w, res_h, fps, shutter_speed, gain, lens_position, offset_x=0, offset_y=0):
         self.width = res_w
         self.height = res_h
         self.fps = fps if fps > 0 else 120
         self.frame_time = 1.0 / self.fps
+        self.exposure = shutter_speed
+        self.gain = gain
+        self.seq = -1
+        self.ts_sensor = 0.0
+        # Sensor simulado = janela de partida; set_readout recorta/decima dentro dela
+        self.offset0 = (offset_x, offset_y)
+        self.janela = (0, 0, res_w, res_h, 1)
+        self.film_px = 0
+        self.ultimo_film_px = 0
+        self.dropped_total = 0
+        self.drop_bursts = 0
+        self._rng_drops = np.random.default_rng(self.film.seed + 1)
         
         if self.video_path:
             self.cap = cv2.VideoCapture(self.video_path)
@@ -37,35 +125,128 @@ class MockCameraProvider(CameraProvider):
                 print(f"[Mock] Falha ao abrir {self.video_path}, caindo para modo sintético.")
                 self.cap = None
 
-        # OTIMIZAÇÃO DE PERFORMANCE: Preparar fundo base para evitar recálculo de numpy/desenhos a 120 FPS
-        self.base_frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
-        self.base_frame[:] = (30, 30, 30)
         self.film_x_start = self.width // 4
         self.film_x_end = self.width * 3 // 4
-        cv2.rectangle(self.base_frame, (self.film_x_start, 0), (self.film_x_end, self.height), (10, 10, 10), -1)
-        
         self.perf_x_left = self.film_x_start + 20
         self.perf_x_right = self.film_x_end - self.perf_width - 20
         
         self.audio_slit_x = self.perf_x_left + self.perf_width + 40
         self.audio_slit_w = 40
-        
-        # Buffer de ruído estendido para permitir rolar a janela (Slice) ao invés de recalcular
-        self.base_noise = np.random.randint(50, 200, (self.height * 2, self.audio_slit_w, 3), dtype=np.uint8)
+
+        # OTIMIZAÇÃO DE PERFORMANCE: a volta inteira da película é renderizada uma vez só;
+        # cada quadro é uma janela (view, sem cópia) dessa tira
+        self.perf_gap = self.film.pitch_real()
+        self._renderizar_tira()
 
         self.is_running = True
         self.last_frame_time = time.time()
-        print(f"[Mock] Câmera iniciada a {self.width}x{self.height} @ {self.fps} FPS")
+        modo = " sem limite de FPS" if self.unthrottled else ""
+        print(f"[Mock] Câmera iniciada a {self.width}x{self.height} @ {self.fps} FPS{modo} "
+              f"(ciclo de {self.ciclo_quadros} quadros, tira de {self.tira_px} px)")
+
+    def _renderizar_tira(self):
+        """
+        Pré-calcula a tira de `perfs` perfurações (altura L) mais uma altura de quadro repetida no
+        fim, para que qualquer janela [y, y + altura) com y < L seja uma fatia contígua. O padrão
+        se repete a cada L / mdc(L, speed) quadros; sem defeitos L = passo (perf_gap / 5 quadros).
+        """
+        spec = self.film
+        rng = np.random.default_rng(spec.seed)
+        L = max(1, int(round(spec.perfs * spec.pitch_real())))
+        total = L + self.height
+
+        tira = np.empty((total, self.width, 3), dtype=np.uint8)
+        tira[:] = (30, 30, 30)
+        tira[:, self.film_x_start:self.film_x_end + 1] = (10, 10, 10)
+
+        # Estado de cada perfuração da volta (0 = íntegra, 1 = rasgada, 2 = ausente), por lado
+        estados = []
+        for _ in range(spec.perfs):
+            lados = []
+            for _ in range(2):
+                sorteio = rng.random()
+                lados.append(2 if sorteio < spec.missing else 1 if sorteio < spec.missing + spec.torn else 0)
+            estados.append(lados)
+        self.perf_estados = estados
+
+        passo = L / spec.perfs
+        k = -int(math.ceil(self.perf_height / passo))
+        while k * passo < total:
+            y = int(round(k * passo))
+            for lado, x in enumerate((self.perf_x_left, self.perf_x_right)):
+                estado = estados[k % spec.perfs][lado]
+                if estado == 2: continue
+                cv2.rectangle(tira, (x, y), (x + self.perf_width, y + self.perf_height), (255, 255, 255), -1)
+                if estado == 1:
+                    # Rasgo: o furo se abre até a borda da película no terço central
+                    borda = self.film_x_start if lado == 0 else self.film_x_end
+                    y0, y1 = y + self.perf_height // 3, y + 2 * self.perf_height // 3
+                    cv2.rectangle(tira, (min(borda, x), y0), (max(borda, x + self.perf_width), y1), (255, 255, 255), -1)
+            k += 1
+
+        # Fenda de áudio: ruído fixo na película (rola junto com ela), periódico na volta
+        ruido = rng.integers(50, 200, (L, self.audio_slit_w, 3), dtype=np.uint8)
+        linhas = np.arange(total) % L
+        tira[:, self.audio_slit_x:self.audio_slit_x + self.audio_slit_w] = ruido[linhas]
+
+        if spec.weave > 0:
+            # Oscilação lateral contínua ao longo da película, com número inteiro de ciclos na volta
+            ciclos = max(1, int(round(spec.perfs / spec.weave_period)))
+            dx = spec.weave * np.sin(2.0 * np.pi * ciclos * linhas / L).astype(np.float32)
+            map_x = np.arange(self.width, dtype=np.float32)[None, :] - dx[:, None]
+            map_y = np.repeat(np.arange(total, dtype=np.float32)[:, None], self.width, axis=1)
+            tira = cv2.remap(tira, map_x, map_y, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+        tira.flags.writeable = False  # Quadros são views compartilhadas: ninguém pode pintar nelas
+        self.tira = tira
+        self.tira_px = L
+        self.ciclo_quadros = L // math.gcd(L, spec.speed)
+
+    def _janela(self):
+        # O filme desce no quadro: a janela sobe na tira. Janela de leitura = fatia com passo (view)
+        inicio = (-self.film_px) % self.tira_px
+        self.perf_y = (self.film_px % self.perf_gap)
+        x, y, w, h, d = self.janela
+        return self.tira[inicio + y:inicio + y + h:d, x:x + w:d]
+
+    def set_readout(self, width, height, offset_x, offset_y, decimation=1, fps=None):
+        # Janela dentro do "sensor" simulado (a janela de partida), alinhada a pares como um Bayer
+        x = max(0, min(self.width - 2, (offset_x - self.offset0[0]) // 2 * 2))
+        y = max(0, min(self.height - 2, (offset_y - self.offset0[1]) // 2 * 2))
+        d = max(1, int(decimation))
+        w = min(self.width - x, int(width)) // d * d
+        h = min(self.height - y, int(height)) // d * d
+        self.janela = (x, y, w, h, d)
+        if fps: self.set_fps(fps)
+        return {"width": w, "height": h, "offset_x": self.offset0[0] + x, "offset_y": self.offset0[1] + y, "decimation": d}
+
+    def furos_y(self, film_px, primeiro, ultimo):
+        """
+        Gabarito: centro (y no quadro renderizado com o avanço `film_px`) das perfurações da esquerda
+        de índice `primeiro` a `ultimo - 1`, contadas ao longo da película (a perfuração j está na
+        linha round(j * passo) + film_px). Rasgadas contam; ausentes viram +inf.
+        """
+        passo = self.tira_px / self.film.perfs
+        centros = np.empty(ultimo - primeiro)
+        for i, j in enumerate(range(primeiro, ultimo)):
+            ausente = self.perf_estados[j % self.film.perfs][0] == 2
+            centros[i] = np.inf if ausente else round(j * passo) + self.perf_height / 2.0 + film_px
+        return centros
 
     def get_frame(self):
+        quadro = self.read_frame()
+        return None if quadro is None else quadro.data
+
+    def read_frame(self):
         if not self.is_running:
-            return np.zeros((self.height, self.width, 3), dtype=np.uint8)
+            return Frame(np.zeros((self.height, self.width, 3), dtype=np.uint8))
 
-        # Controle de tempo para manter o FPS
-        now = time.time()
-        elapsed = now - self.last_frame_time
-        if elapsed < self.frame_time:
-            time.sleep(self.frame_time - elapsed)
+        # Controle de tempo para manter o FPS (desligado no modo sem limite, para benchmarks/CI)
+        if not self.unthrottled:
+            now = time.time()
+            elapsed = now - self.last_frame_time
+            if elapsed < self.frame_time:
+                time.sleep(self.frame_time - elapsed)
         self.last_frame_time = time.time()
 
         if self.cap is not None:
@@ -78,30 +259,27 @@ class MockCameraProvider(CameraProvider):
                 # Opcional: redimensionar se necessário
                 if frame.shape[1] != self.width or frame.shape[0] != self.height:
                     frame = cv2.resize(frame, (self.width, self.height))
-                return frame
+                return self._frame(frame, 1)
 
-        # Modo sintético: usa o base_frame pré-alocado
-        frame = self.base_frame.copy()
-        
-        # Desenhar perfurações
-        y = self.perf_y - self.perf_height
-        while y < self.height:
-            if y + self.perf_height > 0:
-                cv2.rectangle(frame, (self.perf_x_left, int(y)), (self.perf_x_left + self.perf_width, int(y) + self.perf_height), (255, 255, 255), -1)
-                cv2.rectangle(frame, (self.perf_x_right, int(y)), (self.perf_x_right + self.perf_width, int(y) + self.perf_height), (255, 255, 255), -1)
-            y += self.perf_gap
-            
-        # Fenda de áudio: aplicar ruído copiando do buffer em vez de gerar na hora
-        noise_offset_y = np.random.randint(0, self.height)
-        frame[0:self.height, self.audio_slit_x:self.audio_slit_x+self.audio_slit_w] = self.base_noise[noise_offset_y:noise_offset_y+self.height, :]
-        
-        # Deslocar as perfurações para o próximo frame (simula avanço do filme)
-        # Velocidade: 5 pixels por frame
-        self.perf_y += 5
-        if self.perf_y > self.perf_gap:
-            self.perf_y -= self.perf_gap
-            
-        return frame
+        # Rajada de quadros perdidos: o filme andou e o contador do sensor pulou, mas nada chegou
+        saltos = 1
+        if self.film.drops > 0 and self._rng_drops.random() < self.film.drops:
+            perdidos = int(self._rng_drops.integers(1, self.film.burst + 1))
+            self.film_px += perdidos * self.film.speed
+            self.dropped_total += perdidos
+            self.drop_bursts += 1
+            saltos += perdidos
+
+        frame = self._janela()
+        self.ultimo_film_px = self.film_px
+        self.film_px += self.film.speed
+        return self._frame(frame, saltos)
+
+    def _frame(self, data, saltos):
+        # Sensor simulado: contador contínuo e relógio próprio, determinístico mesmo sem limite de FPS
+        self.seq += saltos
+        self.ts_sensor += saltos * self.frame_time
+        return Frame(data, seq=self.seq, timestamp=self.ts_sensor, exposure=self.exposure, gain=self.gain)
 
     def stop(self):
         self.is_running = False
@@ -110,10 +288,10 @@ class MockCameraProvider(CameraProvider):
         print("[Mock] Câmera parada")
 
     def set_exposure(self, value):
-        pass # No-op para mock
+        self.exposure = value # Só registrado nos metadados do Frame
 
     def set_gain(self, value):
-        pass # No-op
+        self.gain = value
 
     def set_fps(self, value):
         self.fps = value
@@ -127,7 +305,12 @@ class MockCameraProvider(CameraProvider):
         pass
 
     def capture_metadata(self):
-        return {"mock": True, "fps": self.fps, "perf_y": self.perf_y}
+        return {"mock": True, "fps": self.fps, "perf_y": self.perf_y, "unthrottled": self.unthrottled,
+                "film": self.film.as_dict(), "film_px": self.film_px,
+                "dropped_total": self.dropped_total, "drop_bursts": self.drop_bursts}
+
+    def capabilities(self):
+        return CameraCapabilities(debayer=True, roi=True, binning=True, timestamps=True, sequence=True)
 
-    def set_white_balance(self, kr, kb):
+    def set_white_balance(self, kr, kg, kb):
         pass
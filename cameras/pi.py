@@ -1,8 +1,42 @@
 from .base import CameraProvider
+from .buffer_pool import Lease
+from .capabilities import CameraCapabilities
+from .frame import Frame
+import threading
 import time
 
+
+class RequestLease(Lease):
+    """
+    Empréstimo de um `CompletedRequest` do Picamera2: os streams ficam mapeados (sem cópia) enquanto
+    houver donos, e o request só volta ao libcamera quando a última referência é solta.
+    """
+
+    __slots__ = ("request", "_mapas")
+
+    def __init__(self, request):
+        super().__init__(threading.Lock())
+        self.request = request
+        self._mapas = []
+
+    def mapear(self, stream):
+        from picamera2 import MappedArray # type: ignore
+        mapa = MappedArray(self.request, stream)
+        self._mapas.append(mapa)
+        return mapa.__enter__().array
+
+    def _liberar(self):
+        for mapa in reversed(self._mapas):
+            mapa.__exit__(None, None, None)
+        self._mapas = []
+        self.request.release()
+
+
 class PiCameraAdapter(CameraProvider):
+    FOV = (0, 0, 4608, 2592)  # Matriz ativa do IMX708 (ScalerCrop)
+
     def __init__(self):
+        self.dual_stream = False
         try:
             from picamera2 import Picamera2 # type: ignore
             self.picam2 = Picamera2()
@@ -10,26 +44,123 @@ class PiCameraAdapter(CameraProvider):
             self.picam2 = None
             print("[WARN] picamera2 não está instalado. Modo de câmera Raspberry Pi inativo.")
 
-    def start(self, res_w, res_h, fps, shutter_speed, gain, lens_position):
+    def start(self, res_w, res_h, fps, shutter_speed, gain, lens_position, offset_x=0, offset_y=0, pool_buffers=0, dual_stream=True, **kwargs):
         if not self.picam2: return
-        config = self.picam2.create_video_configuration(main={"size": (res_w, res_h), "format": "RGB888"})
-        self.picam2.configure(config)
+        # Janela de partida: o FOV inteiro escalado em res_w x res_h (set_readout recorta dentro dela)
+        self.res0 = (res_w, res_h)
+        self.offset0 = (offset_x, offset_y)
+        self.pool_buffers = pool_buffers
+        self.quer_dual_stream = dual_stream
+        self._configurar(res_w, res_h)
         self.picam2.set_controls({
             "ExposureTime": shutter_speed, 
             "AnalogueGain": gain, 
             "FrameRate": fps, 
             "LensPosition": lens_position,
-            "ScalerCrop": (0, 0, 4608, 2592) # Trava o FOV Total
+            "ScalerCrop": self.FOV # Trava o FOV Total
         })
         self.picam2.start()
+        self._ts0_ns = None
+
+    def _configurar(self, res_w, res_h):
+        self.res_w, self.res_h = res_w, res_h
+        config = None
+        if self.quer_dual_stream:
+            # STREAM DUPLO: o ISP entrega junto do main RGB um lores YUV420 do mesmo tamanho. A visão lê só
+            # o plano Y direto do buffer do request (sem capture_array nem conversão de cor na CPU) e o
+            # main RGB só é mapeado nos quadros que disparam a gravação. O lores fica no tamanho do main
+            # porque ROI, gatilho, pitch calibrado e a leitura do áudio óptico estão em pixels do sensor.
+            # Os requests ficam presos enquanto o quadro circula (anel + painel): buffer_count cobre isso.
+            try:
+                config = self.picam2.create_video_configuration(
+                    main={"size": (res_w, res_h), "format": "RGB888"},
+                    lores={"size": (res_w, res_h), "format": "YUV420"},
+                    buffer_count=max(6, int(self.pool_buffers)),
+                )
+                self.picam2.configure(config)
+            except Exception as e:
+                print(f"[WARN] Stream lores indisponível ({e}). Visão volta para o main RGB copiado.")
+                config = None
+        self.dual_stream = config is not None
+        self.frame_format = "luma" if self.dual_stream else None
+        if config is None:
+            config = self.picam2.create_video_configuration(main={"size": (res_w, res_h), "format": "RGB888"})
+            self.picam2.configure(config)
+
+    def set_readout(self, width, height, offset_x, offset_y, decimation=1, fps=None):
+        # O ISP escala o ScalerCrop no tamanho de saída: a janela vira um recorte proporcional do FOV
+        # e a decimação, uma saída menor (menos banda no ISP e na memória, sem perder o FOV escolhido)
+        if not self.picam2: return None
+        d = max(1, int(decimation))
+        x = max(0, offset_x - self.offset0[0]) // 2 * 2
+        y = max(0, offset_y - self.offset0[1]) // 2 * 2
+        w_saida = max(2, min(self.res0[0] - x, width) // d // 2 * 2)
+        h_saida = max(2, min(self.res0[1] - y, height) // d // 2 * 2)
+        fx, fy = self.FOV[2] / float(self.res0[0]), self.FOV[3] / float(self.res0[1])
+        recorte = (int(x * fx), int(y * fy), int(w_saida * d * fx), int(h_saida * d * fy))
+
+        self.picam2.stop()
+        try:
+            self._configurar(w_saida, h_saida)
+            controles = {"ScalerCrop": recorte}
+            if fps: controles["FrameRate"] = fps
+            self.picam2.set_controls(controles)
+        finally:
+            self.picam2.start()
+            self._ts0_ns = None
+        return {"width": w_saida * d, "height": h_saida * d, "offset_x": self.offset0[0] + x,
+                "offset_y": self.offset0[1] + y, "decimation": d}
 
     def stop(self):
         if self.picam2:
             self.picam2.stop()
 
     def get_frame(self):
+        # Sem dono para o request: devolve uma cópia do main RGB (contrato de get_frame)
+        quadro = self.read_frame()
+        if quadro is None: return None
+        img = quadro.main().copy() if self.dual_stream else quadro.data
+        quadro.release()
+        return img
+
+    def read_frame(self):
         if not self.picam2: return None
-        return self.picam2.capture_array()
+        # capture_request entrega pixels e metadados do MESMO quadro (capture_array + capture_metadata não garantem isso)
+        request = self.picam2.capture_request()
+        lease, principal = None, None
+        try:
+            md = request.get_metadata()
+            if self.dual_stream:
+                lease = RequestLease(request)
+                # YUV420 mapeado: (altura * 3/2, stride). As primeiras `altura` linhas são o plano Y.
+                arr = lease.mapear("lores")[:self.res_h, :self.res_w]
+                principal = lambda: lease.mapear("main")[:self.res_h, :self.res_w]
+            else:
+                arr = request.make_array("main")
+        except Exception:
+            if lease is not None: lease.release()
+            else: request.release()
+            raise
+        if lease is None:
+            request.release()
+        
+        ts_ns = md.get("SensorTimestamp")
+        duracao_us = md.get("FrameDuration")
+        seq = None
+        if ts_ns is not None and duracao_us:
+            # O libcamera não expõe o contador do sensor ao Python: derivamos do timestamp de início de
+            # exposição e da duração do quadro (estável em FrameRate fixo), o que revela quadros pulados.
+            if self._ts0_ns is None: self._ts0_ns = ts_ns
+            seq = int(round((ts_ns - self._ts0_ns) / (duracao_us * 1000.0)))
+        return Frame(
+            arr,
+            seq=seq,
+            timestamp=ts_ns * 1e-9 if ts_ns is not None else None,
+            exposure=md.get("ExposureTime"),
+            gain=md.get("AnalogueGain"),
+            lease=lease,
+            main=principal,
+        )
 
     def set_exposure(self, value):
         if self.picam2:
@@ -59,6 +190,27 @@ class PiCameraAdapter(CameraProvider):
             self.picam2.set_controls({"AfMode": 0, "AfRange": 0})
             return False
 
+    def capabilities(self):
+        # ISP do Pi: debayer, ganhos de cor, contraste e nitidez no main RGB; janela por ScalerCrop
+        return CameraCapabilities(debayer=True, white_balance=True, contrast=True, sharpness=True,
+                                  roi=True, binning=True, timestamps=True, sequence=True)
+
+    def set_white_balance(self, kr, kg, kb):
+        if self.picam2:
+            # ColourGains são (vermelho, azul) relativos ao verde; desliga o AWB
+            g = kg if kg > 0 else 1.0
+            self.picam2.set_controls({"AwbEnable": False, "ColourGains": (kr / g, kb / g)})
+
+    def set_contrast(self, value):
+        if self.picam2:
+            # Mesma curva da LUT do software: fator em volta do cinza médio (1.0 = neutro)
+            fator = (259 * (value + 255)) / (255 * (259 - value)) if value != 0 else 1.0
+            self.picam2.set_controls({"Contrast": fator})
+
+    def set_sharpness(self, value):
+        if self.picam2:
+            self.picam2.set_controls({"Sharpness": value})
+
     def capture_metadata(self):
         if not self.picam2: return {}
         return self.picam2.capture_metadata()
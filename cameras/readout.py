@@ -0,0 +1,48 @@
+class ReadoutWindow:
+    """
+    Janela de leitura do sensor em coordenadas base (SPEC-002).
+
+    As coordenadas base são as da janela de partida (`RES_W x RES_H` em `CAM_OFFSET_X/Y`): é nelas
+    que ROI, linha de gatilho, crop, pista de áudio e pitch calibrado são configurados. Uma janela
+    ocupa `width x height` px base a partir de (`x`, `y`) e, com `decimation` d, entrega quadros de
+    `width / d x height / d`. `para_quadro` e `para_base` convertem entre as duas escalas.
+    """
+
+    __slots__ = ("name", "x", "y", "width", "height", "decimation", "fps")
+
+    def __init__(self, name, x, y, width, height, decimation=1, fps=None):
+        self.name = name
+        self.x = int(x)
+        self.y = int(y)
+        self.width = int(width)
+        self.height = int(height)
+        self.decimation = max(1, int(decimation))
+        self.fps = fps
+
+    @property
+    def frame_size(self):
+        return self.width // self.decimation, self.height // self.decimation
+
+    def identidade(self):
+        """Quadros já em coordenadas base (janela de partida sem decimação)."""
+        return self.x == 0 and self.y == 0 and self.decimation == 1
+
+    def para_quadro(self, x, y):
+        d = self.decimation
+        return (x - self.x) / d, (y - self.y) / d
+
+    def para_base(self, x, y):
+        d = self.decimation
+        return x * d + self.x, y * d + self.y
+
+    def copia(self, **campos):
+        base = {k: getattr(self, k) for k in self.__slots__}
+        base.update(campos)
+        return ReadoutWindow(**base)
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __repr__(self):
+        w, h = self.frame_size
+        return f"ReadoutWindow({self.name}: {self.width}x{self.height}+{self.x}+{self.y} /{self.decimation} -> {w}x{h} @ {self.fps})"
@@ -0,0 +1,141 @@
+import time
+
+import cv2
+
+from .base import CameraProvider
+from .capabilities import CameraCapabilities
+from .frame import Frame
+from .stream_tap import StreamTapReader
+
+
+class ReplayCameraProvider(CameraProvider):
+    """
+    Serve de volta um tap gravado com `--tap` (`.mtap`), byte a byte, como se fosse o sensor (SPEC-002).
+
+    Cada quadro mantém seq, timestamp, exposição e ganho originais, então drops do sensor e buracos
+    de tempo reaparecem iguais em `drops_sensor` e no JSONL. Com `speed > 0` os quadros saem no
+    ritmo original (`host_ts` gravado) dividido por `speed`; com `speed = 0` saem o mais rápido
+    possível, para bancada. `frame_format` e o padrão Bayer vêm do cabeçalho do tap. Com `loop` a
+    gravação recomeça no fim (seq e timestamps continuam crescendo); sem ele `read_frame()` passa a
+    devolver None. Os quadros são views somente leitura do arquivo mapeado.
+
+    O tap grava `Frame.data`. Em provedores com `frame_format = "luma"` (stream duplo do Pi, UVC
+    GREY/YUYV) é só o plano Y da visão: o replay serve em `main()` esse luma em BGR (cinza), como o
+    UVC GREY ao vivo, para a gravação não tratá-lo como mosaico Bayer (debayer ou PNG RAW).
+    """
+
+    def __init__(self, path, speed=1.0, loop=False):
+        self.path = path
+        self.speed = float(speed)
+        self.loop = loop
+        self.reader = None
+        self.is_running = False
+        self.frame_format = None
+        self.bayer_code = None
+        self.exposure = None
+        self.gain = None
+
+        self.indice = 0
+        self.voltas = 0
+        self._t0 = 0.0
+        self._host0 = 0.0
+        self._avanco_seq = 0
+        self._avanco_ts = 0.0
+
+    def start(self, res_w, res_h, fps, shutter_speed, gain, lens_position, offset_x=0, offset_y=0):
+        self.reader = StreamTapReader(self.path)
+        meta = self.reader.meta
+        self.frame_format = meta.get("frame_format")
+        self.bayer_code = meta.get("bayer_code")
+        if len(self.reader) == 0:
+            print(f"[Replay] {self.path} não tem quadros.")
+        res = meta.get("res")
+        if res and tuple(res) != (res_w, res_h):
+            print(f"[Replay] Aviso: tap gravado a {res[0]}x{res[1]}, sessão pede {res_w}x{res_h}; os quadros saem como foram gravados.")
+        self.indice = 0
+        self.voltas = 0
+        self._avanco_seq = 0
+        self._avanco_ts = 0.0
+        self._reiniciar_relogio()
+        self.is_running = True
+        ritmo = "sem espera (o mais rápido possível)" if self.speed <= 0 else f"{self.speed:g}x o ritmo original"
+        print(f"[Replay] {len(self.reader)} quadros de {self.path} ({meta.get('camera', '?')}), {ritmo}")
+
+    def _reiniciar_relogio(self):
+        self._t0 = time.monotonic()
+        self._host0 = self.reader.host_ts(0) if len(self.reader) else 0.0
+
+    def _recomecar(self):
+        # Nova volta: seq/timestamps seguem do último quadro, um período adiante
+        primeiro, ultimo = self.reader.frame(0), self.reader.frame(len(self.reader) - 1)
+        if ultimo.seq is not None and primeiro.seq is not None:
+            self._avanco_seq += ultimo.seq - primeiro.seq + 1
+        if ultimo.timestamp is not None and primeiro.timestamp is not None:
+            periodo = (ultimo.timestamp - primeiro.timestamp) / max(1, len(self.reader) - 1)
+            self._avanco_ts += ultimo.timestamp - primeiro.timestamp + periodo
+        self.indice = 0
+        self.voltas += 1
+        self._reiniciar_relogio()
+
+    def read_frame(self):
+        if not self.is_running or self.reader is None or len(self.reader) == 0: return None
+        if self.indice >= len(self.reader):
+            if not self.loop: return None
+            self._recomecar()
+
+        if self.speed > 0:
+            host_ts = self.reader.host_ts(self.indice)
+            if host_ts is not None:
+                espera = self._t0 + (host_ts - self._host0) / self.speed - time.monotonic()
+                if espera > 0: time.sleep(espera)
+
+        gravado = self.reader.frame(self.indice)
+        self.indice += 1
+        self.exposure, self.gain = gravado.exposure, gravado.gain
+        quadro = Frame(gravado.data,
+                       seq=None if gravado.seq is None else gravado.seq + self._avanco_seq,
+                       timestamp=None if gravado.timestamp is None else gravado.timestamp + self._avanco_ts,
+                       exposure=gravado.exposure, gain=gravado.gain, main=self._principal(gravado.data))
+        quadro.readout = gravado.readout  # Janela de leitura em que o quadro foi gravado
+        return quadro
+
+    def _principal(self, dados):
+        if self.frame_format != "luma" or dados.ndim != 2: return None
+        return lambda: cv2.cvtColor(dados, cv2.COLOR_GRAY2BGR)
+
+    def get_frame(self):
+        quadro = self.read_frame()
+        return None if quadro is None else quadro.data
+
+    def stop(self):
+        self.is_running = False
+        if self.reader is not None:
+            self.reader.close()
+        print("[Replay] Reprodução parada")
+
+    # Controles do sensor não se aplicam a bytes gravados
+    def set_exposure(self, value):
+        pass
+
+    def set_gain(self, value):
+        pass
+
+    def set_fps(self, value):
+        pass
+
+    def set_focus(self, value):
+        pass
+
+    def autofocus_cycle(self):
+        pass
+
+    def set_white_balance(self, kr, kg, kb):
+        pass
+
+    def capabilities(self):
+        # Bytes gravados: só os metadados do sensor original vêm de "hardware"
+        return CameraCapabilities(timestamps=True, sequence=True)
+
+    def capture_metadata(self):
+        return {"replay": self.path, "frame": self.indice, "frames": len(self.reader) if self.reader else 0,
+                "loops": self.voltas, "speed": self.speed}
@@ -0,0 +1,190 @@
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+from .frame import Frame
+from .readout import ReadoutWindow
+
+
+# --- Layout do arquivo de tap (.mtap) ---
+# [cabeçalho][JSON de metadados][registro 0][registro 1]...
+#   cabeçalho: magic, versão, reservado, tamanho do JSON (alinhado a 8 bytes)
+#   registro : tag, seq, timestamp do sensor, host_ts, exposição, ganho, forma (h, w, canais),
+#              dtype ("u1", "u2"...), tamanho e janela de leitura (x, y, decimação; 0 = sem janela),
+#              seguido dos bytes crus do quadro (alinhados a 8)
+# Metadados ausentes viram NaN. O arquivo é append-only: um processo que cai deixa só uma cauda de
+# zeros (espaço pré-alocado), e o leitor para no primeiro registro sem tag.
+MAGIC_TAP = b"MTAP"
+MAGIC_REGISTRO_TAP = b"RAW1"
+VERSAO_TAP = 2
+EXTENSAO_TAP = ".mtap"
+
+_CABECALHO = struct.Struct("<4sHHI")
+_REGISTRO = struct.Struct("<4sqdddd3H2sIiiH6x")
+
+
+def _alinhar(n):
+    return (n + 7) & ~7
+
+
+def _float_ou_nan(valor):
+    return float("nan") if valor is None else float(valor)
+
+
+def _nan_ou_valor(valor):
+    return None if math.isnan(valor) else valor
+
+
+class StreamTap:
+    """
+    Gravador do que o sensor entregou de fato (SPEC-002): cada `Frame` que passa pela thread de
+    captura é copiado cru (mesmos bytes, sem codificação) com seq/timestamps/exposição/ganho para
+    um arquivo append-only mapeado em memória. A cópia é um único `np.copyto` para o mapa, que o
+    kernel escreve no disco por conta própria; o empréstimo do buffer do driver não é segurado.
+
+    O arquivo cresce em blocos de `bloco_mb` (reservados esparsos) e é truncado no tamanho exato
+    em `close()`. Acima de `max_mb` o tap para de gravar e conta os quadros em `descartados`, para
+    não encher o disco numa sessão longa. `ReplayCameraProvider` serve o arquivo de volta.
+    """
+
+    def __init__(self, path, meta=None, max_mb=4096, bloco_mb=256):
+        self.path = str(path)
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb else None
+        self.bloco = max(1, int(bloco_mb * 1024 * 1024))
+        self._lock = threading.Lock()
+
+        self.gravados = 0
+        self.descartados = 0
+        self.bytes_gravados = 0
+
+        json_meta = json.dumps(meta or {}, sort_keys=True).encode("utf-8")
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        self._capacidade = 0
+        self._mm = None
+        self._offset = 0
+        self._reservar(_CABECALHO.size + _alinhar(len(json_meta)))
+        self._mm[:_CABECALHO.size] = _CABECALHO.pack(MAGIC_TAP, VERSAO_TAP, 0, len(json_meta))
+        self._mm[_CABECALHO.size:_CABECALHO.size + len(json_meta)] = json_meta
+        self._offset = _CABECALHO.size + _alinhar(len(json_meta))
+
+    def _reservar(self, n):
+        if self._offset + n <= self._capacidade: return
+        capacidade = max(self._capacidade + self.bloco, self._offset + n)
+        if self._mm is not None:
+            self._mm.close()
+        os.ftruncate(self._fd, capacidade)
+        self._mm = mmap.mmap(self._fd, capacidade)
+        self._capacidade = capacidade
+
+    def write(self, quadro):
+        """Anexa um `Frame` (True) ou conta um descarte se o limite de tamanho foi atingido (False)."""
+        data = np.asarray(quadro.data)
+        h, w = data.shape[:2]
+        canais = data.shape[2] if data.ndim == 3 else 0
+        tamanho = _REGISTRO.size + _alinhar(data.nbytes)
+
+        with self._lock:
+            if self._mm is None: return False
+            if self.max_bytes is not None and self._offset + tamanho > self.max_bytes:
+                self.descartados += 1
+                return False
+            self._reservar(tamanho)
+            inicio = self._offset + _REGISTRO.size
+            destino = np.ndarray(data.shape, dtype=data.dtype, buffer=self._mm, offset=inicio)
+            np.copyto(destino, data)
+            del destino  # Sem exports pendentes o mapa pode ser trocado ao crescer
+            # Cabeçalho por último: um leitor nunca vê a tag antes dos bytes do quadro
+            dtype = f"{data.dtype.kind}{data.dtype.itemsize}".encode("ascii")
+            janela = quadro.readout
+            self._mm[self._offset:inicio] = _REGISTRO.pack(
+                MAGIC_REGISTRO_TAP, int(quadro.seq if quadro.seq is not None else -1),
+                _float_ou_nan(quadro.timestamp), _float_ou_nan(quadro.host_ts),
+                _float_ou_nan(quadro.exposure), _float_ou_nan(quadro.gain),
+                h, w, canais, dtype, data.nbytes,
+                janela.x if janela else 0, janela.y if janela else 0, janela.decimation if janela else 0)
+            self._offset += tamanho
+            self.gravados += 1
+            self.bytes_gravados += data.nbytes
+            return True
+
+    def close(self):
+        with self._lock:
+            if self._mm is None: return
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+            os.ftruncate(self._fd, self._offset)
+            os.close(self._fd)
+        print(f"[TAP] {self.gravados} quadros crus em {self.path} ({self.bytes_gravados / 1e6:.0f} MB, {self.descartados} descartados)")
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "gravados": self.gravados,
+            "descartados": self.descartados,
+            "bytes_gravados": self.bytes_gravados,
+        }
+
+
+class StreamTapReader:
+    """
+    Leitor de um `.mtap`: mapeia o arquivo somente leitura e indexa os registros varrendo as tags.
+    `frame(i)` devolve um `Frame` cujo `data` é uma view do mapa (sem cópia).
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._fp = open(self.path, "rb")
+        self._mm = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, versao, _, tamanho_json = _CABECALHO.unpack_from(self._mm, 0)
+        if magic != MAGIC_TAP or versao != VERSAO_TAP:
+            raise ValueError(f"{self.path} não é um tap de câmera (magic {magic!r}, versão {versao})")
+        self.meta = json.loads(bytes(self._mm[_CABECALHO.size:_CABECALHO.size + tamanho_json]) or b"{}")
+        self._registros = []
+        self._varrer(_CABECALHO.size + _alinhar(tamanho_json))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._registros)
+
+    def _varrer(self, offset):
+        fim = len(self._mm)
+        while offset + _REGISTRO.size <= fim:
+            campos = _REGISTRO.unpack_from(self._mm, offset)
+            if campos[0] != MAGIC_REGISTRO_TAP: break  # Cauda pré-alocada de um processo que caiu
+            nbytes = campos[10]
+            if offset + _REGISTRO.size + nbytes > fim: break
+            self._registros.append((offset + _REGISTRO.size,) + campos[1:])
+            offset += _REGISTRO.size + _alinhar(nbytes)
+
+    def host_ts(self, indice):
+        return _nan_ou_valor(self._registros[indice][3])
+
+    def frame(self, indice):
+        offset, seq, ts, host_ts, exposicao, ganho, h, w, canais, dtype, nbytes, jx, jy, dec = self._registros[indice]
+        forma = (h, w, canais) if canais else (h, w)
+        data = np.frombuffer(self._mm, dtype=np.dtype(dtype.decode("ascii")), count=nbytes // int(dtype[1:]), offset=offset).reshape(forma)
+        quadro = Frame(data, seq=None if seq < 0 else seq, timestamp=_nan_ou_valor(ts),
+                       exposure=_nan_ou_valor(exposicao), gain=_nan_ou_valor(ganho), host_ts=_nan_ou_valor(host_ts))
+        if dec:
+            quadro.readout = ReadoutWindow("tap", jx, jy, w * dec, h * dec, dec)
+        return quadro
+
+    def close(self):
+        if self._mm is None: return
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # Quadros ainda vivos (anel/painel) seguram o mapa; ele some com o último deles
+        self._mm = None
+        self._fp.close()
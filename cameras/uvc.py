@@ -0,0 +1,556 @@
+import ctypes
+import errno
+import fcntl
+import mmap
+import os
+import select
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .base import CameraProvider
+from .buffer_pool import Lease
+from .capabilities import CameraCapabilities
+from .frame import Frame
+
+
+# --- ABI do V4L2 (linux/videodev2.h) em ctypes puro: sem v4l2-python nem cv2.VideoCapture (que não expõe a fila mmap) ---
+
+def _ioc(direcao, nr, tamanho):
+    return (direcao << 30) | (tamanho << 16) | (ord('V') << 8) | nr
+
+_IOC_WRITE, _IOC_READ = 1, 2
+
+def _ior(nr, estrutura): return _ioc(_IOC_READ, nr, ctypes.sizeof(estrutura))
+def _iow(nr, estrutura): return _ioc(_IOC_WRITE, nr, ctypes.sizeof(estrutura))
+def _iowr(nr, estrutura): return _ioc(_IOC_READ | _IOC_WRITE, nr, ctypes.sizeof(estrutura))
+
+
+def fourcc(codigo):
+    a, b, c, d = codigo.encode('ascii')
+    return a | (b << 8) | (c << 16) | (d << 24)
+
+def fourcc_str(valor):
+    return bytes((valor >> s) & 0xFF for s in (0, 8, 16, 24)).decode('ascii', 'replace')
+
+
+class v4l2_capability(ctypes.Structure):
+    _fields_ = [
+        ("driver", ctypes.c_char * 16),
+        ("card", ctypes.c_char * 32),
+        ("bus_info", ctypes.c_char * 32),
+        ("version", ctypes.c_uint32),
+        ("capabilities", ctypes.c_uint32),
+        ("device_caps", ctypes.c_uint32),
+        ("reserved", ctypes.c_uint32 * 3),
+    ]
+
+class v4l2_pix_format(ctypes.Structure):
+    _fields_ = [
+        ("width", ctypes.c_uint32),
+        ("height", ctypes.c_uint32),
+        ("pixelformat", ctypes.c_uint32),
+        ("field", ctypes.c_uint32),
+        ("bytesperline", ctypes.c_uint32),
+        ("sizeimage", ctypes.c_uint32),
+        ("colorspace", ctypes.c_uint32),
+        ("priv", ctypes.c_uint32),
+        ("flags", ctypes.c_uint32),
+        ("ycbcr_enc", ctypes.c_uint32),
+        ("quantization", ctypes.c_uint32),
+        ("xfer_func", ctypes.c_uint32),
+    ]
+
+class _v4l2_format_union(ctypes.Union):
+    # O union do kernel contém v4l2_window (com ponteiros): o alinhamento é o de ponteiro
+    _fields_ = [("pix", v4l2_pix_format), ("raw_data", ctypes.c_uint8 * 200), ("_alinhamento", ctypes.c_void_p)]
+
+class v4l2_format(ctypes.Structure):
+    _fields_ = [("type", ctypes.c_uint32), ("fmt", _v4l2_format_union)]
+
+class v4l2_fmtdesc(ctypes.Structure):
+    _fields_ = [
+        ("index", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+        ("flags", ctypes.c_uint32),
+        ("description", ctypes.c_char * 32),
+        ("pixelformat", ctypes.c_uint32),
+        ("mbus_code", ctypes.c_uint32),
+        ("reserved", ctypes.c_uint32 * 3),
+    ]
+
+class v4l2_requestbuffers(ctypes.Structure):
+    _fields_ = [
+        ("count", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+        ("memory", ctypes.c_uint32),
+        ("capabilities", ctypes.c_uint32),
+        ("reserved", ctypes.c_uint32),
+    ]
+
+class timeval(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_usec", ctypes.c_long)]
+
+class v4l2_timecode(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_uint32),
+        ("flags", ctypes.c_uint32),
+        ("frames", ctypes.c_uint8),
+        ("seconds", ctypes.c_uint8),
+        ("minutes", ctypes.c_uint8),
+        ("hours", ctypes.c_uint8),
+        ("userbits", ctypes.c_uint8 * 4),
+    ]
+
+class _v4l2_buffer_m(ctypes.Union):
+    _fields_ = [("offset", ctypes.c_uint32), ("userptr", ctypes.c_ulong), ("planes", ctypes.c_void_p), ("fd", ctypes.c_int32)]
+
+class v4l2_buffer(ctypes.Structure):
+    _fields_ = [
+        ("index", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+        ("bytesused", ctypes.c_uint32),
+        ("flags", ctypes.c_uint32),
+        ("field", ctypes.c_uint32),
+        ("timestamp", timeval),
+        ("timecode", v4l2_timecode),
+        ("sequence", ctypes.c_uint32),
+        ("memory", ctypes.c_uint32),
+        ("m", _v4l2_buffer_m),
+        ("length", ctypes.c_uint32),
+        ("reserved2", ctypes.c_uint32),
+        ("request_fd", ctypes.c_int32),
+    ]
+
+class v4l2_fract(ctypes.Structure):
+    _fields_ = [("numerator", ctypes.c_uint32), ("denominator", ctypes.c_uint32)]
+
+class v4l2_captureparm(ctypes.Structure):
+    _fields_ = [
+        ("capability", ctypes.c_uint32),
+        ("capturemode", ctypes.c_uint32),
+        ("timeperframe", v4l2_fract),
+        ("extendedmode", ctypes.c_uint32),
+        ("readbuffers", ctypes.c_uint32),
+        ("reserved", ctypes.c_uint32 * 4),
+    ]
+
+class _v4l2_streamparm_union(ctypes.Union):
+    _fields_ = [("capture", v4l2_captureparm), ("raw_data", ctypes.c_uint8 * 200)]
+
+class v4l2_streamparm(ctypes.Structure):
+    _fields_ = [("type", ctypes.c_uint32), ("parm", _v4l2_streamparm_union)]
+
+class v4l2_control(ctypes.Structure):
+    _fields_ = [("id", ctypes.c_uint32), ("value", ctypes.c_int32)]
+
+class v4l2_frmsize_discrete(ctypes.Structure):
+    _fields_ = [("width", ctypes.c_uint32), ("height", ctypes.c_uint32)]
+
+class v4l2_frmsize_stepwise(ctypes.Structure):
+    _fields_ = [(n, ctypes.c_uint32) for n in ("min_width", "max_width", "step_width", "min_height", "max_height", "step_height")]
+
+class _v4l2_frmsize_union(ctypes.Union):
+    _fields_ = [("discrete", v4l2_frmsize_discrete), ("stepwise", v4l2_frmsize_stepwise)]
+
+class v4l2_frmsizeenum(ctypes.Structure):
+    _fields_ = [
+        ("index", ctypes.c_uint32),
+        ("pixel_format", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+        ("size", _v4l2_frmsize_union),
+        ("reserved", ctypes.c_uint32 * 2),
+    ]
+
+class v4l2_frmival_stepwise(ctypes.Structure):
+    _fields_ = [("min", v4l2_fract), ("max", v4l2_fract), ("step", v4l2_fract)]
+
+class _v4l2_frmival_union(ctypes.Union):
+    _fields_ = [("discrete", v4l2_fract), ("stepwise", v4l2_frmival_stepwise)]
+
+class v4l2_frmivalenum(ctypes.Structure):
+    _fields_ = [
+        ("index", ctypes.c_uint32),
+        ("pixel_format", ctypes.c_uint32),
+        ("width", ctypes.c_uint32),
+        ("height", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+        ("interval", _v4l2_frmival_union),
+        ("reserved", ctypes.c_uint32 * 2),
+    ]
+
+
+VIDIOC_QUERYCAP = _ior(0, v4l2_capability)
+VIDIOC_ENUM_FMT = _iowr(2, v4l2_fmtdesc)
+VIDIOC_G_FMT = _iowr(4, v4l2_format)
+VIDIOC_S_FMT = _iowr(5, v4l2_format)
+VIDIOC_REQBUFS = _iowr(8, v4l2_requestbuffers)
+VIDIOC_QUERYBUF = _iowr(9, v4l2_buffer)
+VIDIOC_QBUF = _iowr(15, v4l2_buffer)
+VIDIOC_DQBUF = _iowr(17, v4l2_buffer)
+VIDIOC_STREAMON = _iow(18, ctypes.c_int)
+VIDIOC_STREAMOFF = _iow(19, ctypes.c_int)
+VIDIOC_G_PARM = _iowr(21, v4l2_streamparm)
+VIDIOC_S_PARM = _iowr(22, v4l2_streamparm)
+VIDIOC_S_CTRL = _iowr(28, v4l2_control)
+VIDIOC_ENUM_FRAMESIZES = _iowr(74, v4l2_frmsizeenum)
+VIDIOC_ENUM_FRAMEINTERVALS = _iowr(75, v4l2_frmivalenum)
+
+V4L2_BUF_TYPE_VIDEO_CAPTURE = 1
+V4L2_MEMORY_MMAP = 1
+V4L2_FIELD_NONE = 1
+V4L2_CAP_VIDEO_CAPTURE = 0x00000001
+V4L2_CAP_STREAMING = 0x04000000
+V4L2_FRMSIZE_TYPE_DISCRETE = 1
+V4L2_FRMIVAL_TYPE_DISCRETE = 1
+V4L2_BUF_FLAG_TIMESTAMP_MASK = 0x0000e000
+V4L2_BUF_FLAG_TIMESTAMP_MONOTONIC = 0x00002000
+V4L2_BUF_FLAG_ERROR = 0x00000040
+
+_CID_USER = 0x00980900
+_CID_CAMERA = 0x009a0900
+V4L2_CID_CONTRAST = _CID_USER + 1
+V4L2_CID_GAMMA = _CID_USER + 16
+V4L2_CID_GAIN = _CID_USER + 19
+V4L2_CID_SHARPNESS = _CID_USER + 27
+V4L2_CID_EXPOSURE_AUTO = _CID_CAMERA + 1
+V4L2_CID_EXPOSURE_ABSOLUTE = _CID_CAMERA + 2   # Unidades de 100 µs
+V4L2_CID_FOCUS_ABSOLUTE = _CID_CAMERA + 10
+V4L2_CID_FOCUS_AUTO = _CID_CAMERA + 12
+V4L2_EXPOSURE_MANUAL = 1
+
+# Ordem de preferência: mosaico Bayer cru e escala de cinza entram no pipeline sem conversão, YUYV só
+# extrai o luma para a visão; MJPEG (decodificação JPEG na CPU a cada quadro) é o último recurso.
+FORMATOS_BAYER = ("RGGB", "GRBG", "GBRG", "BA81")
+PREFERENCIA_FORMATOS = FORMATOS_BAYER + ("GREY", "YUYV", "BGR3", "MJPG")
+BAYER_CV2 = {
+    # Nome V4L2 -> conversão OpenCV (a convenção do OpenCV lê o padrão a partir do 2º pixel)
+    "RGGB": cv2.COLOR_BayerBG2BGR,
+    "GRBG": cv2.COLOR_BayerGB2BGR,
+    "GBRG": cv2.COLOR_BayerGR2BGR,
+    "BA81": cv2.COLOR_BayerRG2BGR,
+}
+
+
+def _xioctl(fd, pedido, arg):
+    while True:
+        try:
+            return fcntl.ioctl(fd, pedido, arg)
+        except InterruptedError:
+            continue
+
+
+class V4L2BufferLease(Lease):
+    """Buffer mmap desenfileirado do driver: volta para a fila (QBUF) quando o último dono solta."""
+
+    __slots__ = ("provedor", "indice")
+
+    def __init__(self, provedor, indice):
+        super().__init__(threading.Lock())
+        self.provedor = provedor
+        self.indice = indice
+
+    def _liberar(self):
+        self.provedor._reenfileirar(self.indice)
+
+
+class UVCCameraAdapter(CameraProvider):
+    """
+    Câmeras UVC / V4L2 genéricas (webcams e câmeras industriais USB) sem SDK de fabricante (SPEC-002).
+
+    Streaming por buffers mmap do próprio driver, com profundidade de fila configurável: o quadro sobe
+    pelo pipeline como view do buffer (empréstimo `V4L2BufferLease`) e só volta para a fila do driver
+    quando visão, painel e gravação soltaram. `seq` e `timestamp` vêm do `v4l2_buffer` (contador do
+    driver e instante de captura em CLOCK_MONOTONIC), então drops na USB aparecem em `drops_sensor`.
+    """
+
+    gain_units = "raw"  # V4L2_CID_GAIN na escala de cada driver
+
+    def __init__(self, device="/dev/video0", pixel_format=None):
+        self.device = device
+        self.pixel_format = pixel_format
+        self.fd = None
+        self._buffers = []
+        self._mapas = []
+        self._transmitindo = False
+        self.formato = None
+        self.frame_format = None
+        self.bayer_code = None
+        self.decodificacoes_mjpeg = 0
+        self.exposure = None
+        self.gain = None
+        self._avisos = set()
+
+    # --- Descoberta ---
+    def _abrir(self):
+        if self.fd is not None: return True
+        try:
+            self.fd = os.open(self.device, os.O_RDWR | os.O_NONBLOCK)
+        except OSError as e:
+            print(f"[ERRO] Falha ao abrir {self.device}: {e}")
+            return False
+        cap = v4l2_capability()
+        _xioctl(self.fd, VIDIOC_QUERYCAP, cap)
+        caps = cap.device_caps or cap.capabilities
+        if not (caps & V4L2_CAP_VIDEO_CAPTURE) or not (caps & V4L2_CAP_STREAMING):
+            print(f"[ERRO] {self.device} ({cap.card.decode(errors='replace')}) não suporta captura por streaming.")
+            os.close(self.fd)
+            self.fd = None
+            return False
+        self.card = cap.card.decode(errors='replace')
+        return True
+
+    def formatos(self):
+        """FourCCs que o dispositivo entrega, na ordem do driver."""
+        lista = []
+        desc = v4l2_fmtdesc(type=V4L2_BUF_TYPE_VIDEO_CAPTURE)
+        while True:
+            try: _xioctl(self.fd, VIDIOC_ENUM_FMT, desc)
+            except OSError: break
+            lista.append(fourcc_str(desc.pixelformat))
+            desc.index += 1
+        return lista
+
+    def probe(self):
+        """Modos suportados: [{"format", "width", "height", "fps": [...]}] (tamanhos e intervalos discretos)."""
+        if not self._abrir(): return []
+        modos = []
+        for nome in self.formatos():
+            tamanho = v4l2_frmsizeenum(pixel_format=fourcc(nome))
+            while True:
+                try: _xioctl(self.fd, VIDIOC_ENUM_FRAMESIZES, tamanho)
+                except OSError: break
+                if tamanho.type != V4L2_FRMSIZE_TYPE_DISCRETE:
+                    sw = tamanho.size.stepwise
+                    modos.append({"format": nome, "width": sw.max_width, "height": sw.max_height, "fps": [], "stepwise": True})
+                    break
+                w, h = tamanho.size.discrete.width, tamanho.size.discrete.height
+                fps = []
+                intervalo = v4l2_frmivalenum(pixel_format=fourcc(nome), width=w, height=h)
+                while True:
+                    try: _xioctl(self.fd, VIDIOC_ENUM_FRAMEINTERVALS, intervalo)
+                    except OSError: break
+                    if intervalo.type == V4L2_FRMIVAL_TYPE_DISCRETE and intervalo.interval.discrete.numerator:
+                        d = intervalo.interval.discrete
+                        fps.append(round(d.denominator / d.numerator, 3))
+                    intervalo.index += 1
+                modos.append({"format": nome, "width": w, "height": h, "fps": sorted(fps, reverse=True)})
+                tamanho.index += 1
+        return modos
+
+    # --- Ciclo de vida ---
+    def start(self, res_w, res_h, fps, shutter_speed, gain, lens_position, offset_x=0, offset_y=0, pool_buffers=0, **kwargs):
+        if not self._abrir(): return
+        disponiveis = self.formatos()
+        if self.pixel_format:
+            candidatos = [self.pixel_format.upper()]
+        else:
+            candidatos = [f for f in PREFERENCIA_FORMATOS if f in disponiveis]
+        if not candidatos:
+            print(f"[ERRO] {self.device}: nenhum formato suportado entre {disponiveis}.")
+            return
+
+        fmt = None
+        for nome in candidatos:
+            tentativa = v4l2_format(type=V4L2_BUF_TYPE_VIDEO_CAPTURE)
+            tentativa.fmt.pix.width, tentativa.fmt.pix.height = res_w, res_h
+            tentativa.fmt.pix.pixelformat = fourcc(nome)
+            tentativa.fmt.pix.field = V4L2_FIELD_NONE
+            try: _xioctl(self.fd, VIDIOC_S_FMT, tentativa)
+            except OSError: continue
+            if fourcc_str(tentativa.fmt.pix.pixelformat) == nome:
+                fmt = tentativa.fmt.pix
+                break
+        if fmt is None:
+            print(f"[ERRO] {self.device}: o driver recusou os formatos {candidatos}.")
+            return
+
+        self.formato = fourcc_str(fmt.pixelformat)
+        self.width, self.height, self.bytesperline = fmt.width, fmt.height, fmt.bytesperline
+        # Conteúdo de Frame.data: luma para GREY/YUYV (a gravação usa Frame.main()), mosaico/BGR nos demais
+        self.frame_format = "luma" if self.formato in ("GREY", "YUYV") else None
+        self.bayer_code = BAYER_CV2.get(self.formato)
+        if self.formato == "MJPG":
+            print(f"[WARN] {self.device} só entrega MJPEG nesta configuração: cada quadro será decodificado na CPU.")
+        if (self.width, self.height) != (res_w, res_h):
+            print(f"[WARN] {self.device}: resolução ajustada pelo driver para {self.width}x{self.height}.")
+        if offset_x or offset_y:
+            print("[WARN] Offset de sensor não é suportado pelo provedor UVC; use ROI/crop no software.")
+
+        self.set_fps(fps)
+        self.set_exposure(shutter_speed)
+        self.set_gain(gain)
+
+        # Fila de buffers mmap: além dos quadros presos no anel/painel, o driver precisa de folga para não descartar
+        req = v4l2_requestbuffers(count=max(4, int(pool_buffers) or 8), type=V4L2_BUF_TYPE_VIDEO_CAPTURE, memory=V4L2_MEMORY_MMAP)
+        _xioctl(self.fd, VIDIOC_REQBUFS, req)
+        self._buffers, self._mapas = [], []
+        for i in range(req.count):
+            buf = v4l2_buffer(index=i, type=V4L2_BUF_TYPE_VIDEO_CAPTURE, memory=V4L2_MEMORY_MMAP)
+            _xioctl(self.fd, VIDIOC_QUERYBUF, buf)
+            mapa = mmap.mmap(self.fd, buf.length, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE, offset=buf.m.offset)
+            self._mapas.append(mapa)
+            self._buffers.append(np.frombuffer(mapa, dtype=np.uint8))
+            _xioctl(self.fd, VIDIOC_QBUF, buf)
+
+        _xioctl(self.fd, VIDIOC_STREAMON, ctypes.c_int(V4L2_BUF_TYPE_VIDEO_CAPTURE))
+        self._transmitindo = True
+        print(f"[SISTEMA] UVC {self.card} ({self.device}) a {self.width}x{self.height} {self.formato}, fila de {req.count} buffers mmap.")
+
+    def stop(self):
+        if self.fd is None: return
+        if self._transmitindo:
+            try: _xioctl(self.fd, VIDIOC_STREAMOFF, ctypes.c_int(V4L2_BUF_TYPE_VIDEO_CAPTURE))
+            except OSError: pass
+            self._transmitindo = False
+        self._buffers = []
+        for mapa in self._mapas:
+            try: mapa.close()
+            except BufferError: pass  # Ainda há views vivas (painel): o mmap fecha quando forem coletadas
+        self._mapas = []
+        os.close(self.fd)
+        self.fd = None
+
+    def _reenfileirar(self, indice):
+        if not self._transmitindo: return
+        buf = v4l2_buffer(index=indice, type=V4L2_BUF_TYPE_VIDEO_CAPTURE, memory=V4L2_MEMORY_MMAP)
+        try: _xioctl(self.fd, VIDIOC_QBUF, buf)
+        except OSError as e: print(f"[WARN] UVC: falha ao devolver o buffer {indice} ao driver: {e}")
+
+    # --- Quadros ---
+    def get_frame(self):
+        quadro = self.read_frame()
+        if quadro is None: return None
+        img = quadro.main()
+        if quadro.lease is not None:
+            img = img.copy()  # Sem dono para o empréstimo: o buffer volta já para a fila do driver
+            quadro.release()
+        return img
+
+    def read_frame(self, timeout=2.0):
+        if not self._transmitindo: return None
+        prontos, _, _ = select.select([self.fd], [], [], timeout)
+        if not prontos: return None
+        buf = v4l2_buffer(type=V4L2_BUF_TYPE_VIDEO_CAPTURE, memory=V4L2_MEMORY_MMAP)
+        try:
+            _xioctl(self.fd, VIDIOC_DQBUF, buf)
+        except OSError as e:
+            if e.errno == errno.EAGAIN: return None
+            if e.errno == errno.ENODEV:
+                print(f"[ERRO FATAL] {self.device} desconectou do barramento USB.")
+                self._transmitindo = False
+            return None
+        lease = V4L2BufferLease(self, buf.index)
+        if buf.flags & V4L2_BUF_FLAG_ERROR or buf.bytesused == 0:
+            lease.release()  # Quadro corrompido pelo driver: volta para a fila sem subir
+            return None
+
+        try:
+            dados, principal = self._decodificar(self._buffers[buf.index], buf.bytesused)
+        except Exception as e:
+            lease.release()
+            print(f"[WARN] UVC: quadro {buf.sequence} ilegível ({e}).")
+            return None
+        if self.formato == "MJPG":
+            lease.release()  # Decodificado para memória própria: o buffer do driver já pode voltar
+            lease = None
+
+        ts = buf.timestamp.tv_sec + buf.timestamp.tv_usec * 1e-6
+        monotonic = (buf.flags & V4L2_BUF_FLAG_TIMESTAMP_MASK) == V4L2_BUF_FLAG_TIMESTAMP_MONOTONIC
+        return Frame(
+            dados,
+            seq=buf.sequence,
+            timestamp=ts if monotonic else None,
+            exposure=self.exposure,
+            gain=self.gain,
+            lease=lease,
+            main=principal,
+        )
+
+    def _decodificar(self, bruto, nbytes):
+        h, w, passo = self.height, self.width, self.bytesperline
+        if self.formato == "MJPG":
+            img = cv2.imdecode(bruto[:nbytes], cv2.IMREAD_COLOR)
+            if img is None: raise ValueError("JPEG inválido")
+            self.decodificacoes_mjpeg += 1
+            return img, None
+        linhas = bruto[:h * passo].reshape(h, passo)
+        if self.formato in FORMATOS_BAYER:
+            return linhas[:, :w], None
+        if self.formato == "GREY":
+            luma = linhas[:, :w]
+            return luma, lambda: cv2.cvtColor(luma, cv2.COLOR_GRAY2BGR)
+        if self.formato == "YUYV":
+            yuyv = linhas[:, :w * 2].reshape(h, w, 2)
+            # Visão: só o plano Y (1 byte/px). BGR completo apenas nos quadros que gravam.
+            return cv2.extractChannel(yuyv, 0), lambda: cv2.cvtColor(yuyv, cv2.COLOR_YUV2BGR_YUYV)
+        if self.formato == "BGR3":
+            return linhas[:, :w * 3].reshape(h, w, 3), None
+        raise ValueError(f"formato {self.formato} não suportado")
+
+    # --- Controles UVC ---
+    def _controle(self, cid, valor, nome):
+        if self.fd is None: return False
+        try:
+            _xioctl(self.fd, VIDIOC_S_CTRL, v4l2_control(id=cid, value=int(valor)))
+            return True
+        except OSError as e:
+            if nome not in self._avisos:
+                self._avisos.add(nome)
+                print(f"[WARN] {self.device} não aceita o controle {nome}: {e}")
+            return False
+
+    def set_exposure(self, value):
+        self._controle(V4L2_CID_EXPOSURE_AUTO, V4L2_EXPOSURE_MANUAL, "exposure_auto")
+        if self._controle(V4L2_CID_EXPOSURE_ABSOLUTE, max(1, round(value / 100.0)), "exposure_absolute"):
+            self.exposure = value
+
+    def set_gain(self, value):
+        if self._controle(V4L2_CID_GAIN, value, "gain"):
+            self.gain = value
+
+    def set_fps(self, value):
+        if self.fd is None or not value: return
+        parm = v4l2_streamparm(type=V4L2_BUF_TYPE_VIDEO_CAPTURE)
+        parm.parm.capture.timeperframe.numerator = 1000
+        parm.parm.capture.timeperframe.denominator = int(round(value * 1000))
+        try:
+            _xioctl(self.fd, VIDIOC_S_PARM, parm)
+            t = parm.parm.capture.timeperframe
+            if t.numerator and abs(t.denominator / t.numerator - value) > 0.5:
+                print(f"[WARN] {self.device}: FPS ajustado pelo driver para {t.denominator / t.numerator:.2f}.")
+        except OSError as e:
+            print(f"[WARN] {self.device}: falha ao definir {value} FPS: {e}")
+
+    def set_focus(self, value):
+        self._controle(V4L2_CID_FOCUS_AUTO, 0, "focus_auto")
+        self._controle(V4L2_CID_FOCUS_ABSOLUTE, value, "focus_absolute")
+
+    def autofocus_cycle(self):
+        # Liga o AF contínuo do firmware UVC por um instante e trava de novo no manual
+        if not self._controle(V4L2_CID_FOCUS_AUTO, 1, "focus_auto"): return False
+        time.sleep(1.0)
+        return self._controle(V4L2_CID_FOCUS_AUTO, 0, "focus_auto")
+
+    def capture_metadata(self):
+        return {"device": self.device, "format": self.formato, "mjpeg_decodes": self.decodificacoes_mjpeg}
+
+    def capabilities(self):
+        # Formatos já coloridos (YUYV/BGR3/MJPG) passaram pelo ISP da câmera; gamma/contraste UVC têm
+        # escala por fabricante e ficam na LUT do software
+        colorido = self.formato is not None and self.bayer_code is None and self.formato != "GREY"
+        return CameraCapabilities(debayer=colorido, sharpness=True, timestamps=True, sequence=True)
+
+    def set_white_balance(self, kr, kg, kb):
+        pass  # Unidades de balanço UVC variam por fabricante: WB fica na LUT do software
+
+    def set_gamma(self, gamma_y, gamma_c):
+        self._controle(V4L2_CID_GAMMA, gamma_y * 100, "gamma")
+
+    def set_contrast(self, value):
+        self._controle(V4L2_CID_CONTRAST, value, "contrast")
+
+    def set_sharpness(self, value):
+        self._controle(V4L2_CID_SHARPNESS, value, "sharpness")
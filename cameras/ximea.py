@@ -1,15 +1,25 @@
+import numpy as np
+
 from .base import CameraProvider
+from .buffer_pool import BufferPool
+from .capabilities import CameraCapabilities
+from .frame import Frame
 
 class XimeaAdapter(CameraProvider):
+    # get_frame() devolve uma view do xiapi.Image reaproveitado a cada get_image()
+    reuses_buffers = True
+    gain_units = "db"
+
     def __init__(self):
         self.cam = None
+        self.buffer_pool = None
         try:
             from ximea import xiapi # type: ignore
             self.cam = xiapi.Camera()
         except ImportError:
             print("[WARN] ximea_api não está instalado. Modo de câmera Ximea inativo.")
 
-    def start(self, res_w, res_h, fps, shutter_speed, gain, lens_position, offset_x=0, offset_y=0, color_mode='raw'):
+    def start(self, res_w, res_h, fps, shutter_speed, gain, lens_position, offset_x=0, offset_y=0, color_mode='raw', pool_buffers=0):
         if not self.cam: return
         try:
             self.cam.open_device()
@@ -81,6 +91,20 @@ class XimeaAdapter(CameraProvider):
                     self.cam.set_acq_timing_mode('XI_ACQ_TIMING_MODE_FREE_RUN')
                 except: pass
 
+            # POOL DE BUFFERS (XI_BP_SAFE): o SDK escreve cada quadro num buffer nosso em vez do buffer
+            # interno que ele reaproveita. O quadro sobe pelo pipeline como view desse buffer e só é
+            # reciclado quando todos os consumidores soltaram o empréstimo (sem .copy() por quadro).
+            self.buffer_pool = None
+            if pool_buffers > 0:
+                try:
+                    self.cam.set_buffer_policy('XI_BP_SAFE')
+                    self.buffer_pool = BufferPool(pool_buffers, self.cam.get_imgpayloadsize())
+                    print(f"[XIMEA] Pool de {pool_buffers} buffers ({self.buffer_pool.nbytes / 1e6:.1f} MB cada) em XI_BP_SAFE.")
+                except Exception as e:
+                    print(f"[WARN] XI_BP_SAFE indisponível ({e}). Quadros serão copiados pela thread de captura.")
+                    try: self.cam.set_buffer_policy('XI_BP_UNSAFE')
+                    except: pass
+
             self.cam.start_acquisition()
             from ximea import xiapi
             self.img = xiapi.Image()
@@ -94,6 +118,50 @@ class XimeaAdapter(CameraProvider):
             print(f"[ERRO] Falha ao iniciar Ximea: {e}")
             self.cam = None
 
+    def set_readout(self, width, height, offset_x, offset_y, decimation=1, fps=None):
+        # Troca de janela com a aquisição parada: o SDK descarta a fila de quadros da janela antiga
+        if not self.cam: return None
+        cam = self.cam
+        cam.stop_acquisition()
+        try:
+            d = max(1, int(decimation))
+            if d > 1:
+                try:
+                    # Skipping no mosaico Bayer mantém o padrão de cor; width/offset passam a ser em px decimados
+                    cam.set_downsampling_type('XI_SKIPPING')
+                    cam.set_downsampling(f'XI_DWN_{d}x{d}')
+                except Exception as e:
+                    print(f"[WARN] Decimação {d}x{d} recusada pela Ximea ({e}). Janela sem decimação.")
+                    d = 1
+            if d == 1:
+                try: cam.set_downsampling('XI_DWN_1x1')
+                except: pass
+
+            def alinhar(valor, incremento):
+                return max(incremento, int(valor) // incremento * incremento)
+
+            # Offsets zerados antes de crescer a janela: o SDK valida offset + tamanho a cada set
+            cam.set_offsetX(0)
+            cam.set_offsetY(0)
+            cam.set_width(alinhar(width // d, cam.get_width_increment()))
+            cam.set_height(alinhar(height // d, cam.get_height_increment()))
+            cam.set_offsetX(int(offset_x // d) // cam.get_offsetX_increment() * cam.get_offsetX_increment())
+            cam.set_offsetY(int(offset_y // d) // cam.get_offsetY_increment() * cam.get_offsetY_increment())
+            if fps:
+                try: cam.set_framerate(fps)
+                except Exception as e: print(f"[WARN] FPS {fps} recusado na nova janela ({e}).")
+
+            # Payload mudou: pool novo (empréstimos antigos voltam ao pool antigo e são descartados)
+            if self.buffer_pool is not None:
+                self.buffer_pool = BufferPool(self.buffer_pool.n_buffers, cam.get_imgpayloadsize())
+            return {
+                "width": cam.get_width() * d, "height": cam.get_height() * d,
+                "offset_x": cam.get_offsetX() * d, "offset_y": cam.get_offsetY() * d, "decimation": d,
+            }
+        finally:
+            cam.start_acquisition()
+            if hasattr(self, 'last_nframe'): del self.last_nframe
+
     def stop(self):
         if self.cam:
             try:
@@ -102,8 +170,28 @@ class XimeaAdapter(CameraProvider):
             except: pass
 
     def get_frame(self):
+        quadro = self.read_frame()
+        if quadro is None: return None
+        # Sem dono para o empréstimo: o buffer volta ao pool e a view segue a semântica de reuses_buffers
+        quadro.release()
+        return quadro.data
+
+    def _view_do_buffer(self, lease):
+        # View (H, W) ou (H, W, 3) sobre o buffer do pool, respeitando o padding de linha do XI_IMG
+        img = self.img
+        bpp = 3 if getattr(self, 'color_mode', 'raw') == 'rgb' else 1
+        passo = img.width * bpp + img.padding_x
+        arr = lease.array[:img.height * passo].reshape(img.height, passo)[:, :img.width * bpp]
+        return arr.reshape(img.height, img.width, 3) if bpp == 3 else arr
+
+    def read_frame(self):
         if not self.cam: return None
+        lease = None
         try:
+            if self.buffer_pool is not None:
+                lease = self.buffer_pool.acquire()
+                self.img.bp = lease.array.ctypes.data
+                self.img.bp_size = lease.array.nbytes
             self.cam.get_image(self.img, timeout=2000)
             
             # Checagem de Hardware de Drop Frames (Baseado no contador do Sensor)
@@ -116,7 +204,10 @@ class XimeaAdapter(CameraProvider):
             
             # Retorna apenas uma VIEW do array em vez de clonar a memória (evita saturar o Garbage Collector do Python)
             # Como a Câmera Ximea reutiliza os buffers internos, isso reduzirá o tempo do loop principal.
-            arr = self.img.get_image_data_numpy()
+            if lease is not None:
+                arr = self._view_do_buffer(lease)
+            else:
+                arr = self.img.get_image_data_numpy()
             
             # Garantir que o array seja estritamente 2D para que o len(shape) == 2 do debayer funcione
             if len(arr.shape) == 3 and arr.shape[2] == 1:
@@ -125,9 +216,19 @@ class XimeaAdapter(CameraProvider):
                 if getattr(self, 'color_mode', 'raw') == 'raw':
                     arr = arr[:, :, 0]
                 # Se for RGB, mantemos arr.shape == (H, W, 3) intacto.
-                
-            return arr
+            
+            # Metadados do XI_IMG: contador e timestamp do sensor, exposição e ganho efetivos deste quadro
+            img = self.img
+            return Frame(
+                arr,
+                seq=current_nframe,
+                timestamp=img.tsSec + img.tsUSec * 1e-6,
+                exposure=getattr(img, 'exposure_time_us', None),
+                gain=getattr(img, 'gain_db', None),
+                lease=lease,
+            )
         except Exception as e:
+            if lease is not None: lease.release()
             err_str = str(e)
             import time
             time.sleep(0.1)
@@ -152,6 +253,19 @@ class XimeaAdapter(CameraProvider):
             try: self.cam.set_framerate(value)
             except: pass
 
+    def capabilities(self):
+        # ISP da Ximea (WB, gamma, sharpness) só atua na saída RGB; a LUT do sensor atua no RAW também
+        rgb = getattr(self, "color_mode", "raw") == 'rgb'
+        return CameraCapabilities(debayer=rgb, white_balance=rgb, gamma=rgb, sharpness=rgb,
+                                  hardware_lut=self.cam is not None, roi=True, binning=True,
+                                  timestamps=True, sequence=True)
+
+    def max_fps(self):
+        if self.cam:
+            try: return self.cam.get_framerate_maximum()
+            except: pass
+        return None
+
     def set_focus(self, value):
         # Lente C-Mount manual, não fazemos nada
         pass
@@ -203,10 +317,31 @@ class XimeaAdapter(CameraProvider):
                 print(f"[WARN] Câmera não suporta parâmetro de sharpness direto: {e}")
 
     def load_hardware_lut(self, lut_array):
-        # A Ximea suporta LUT Enable, LUT Index e LUT Value
+        # A Ximea suporta LUT Enable, LUT Index e LUT Value. lut_array None desliga a LUT do sensor.
         if not self.cam:
             return False
+        if lut_array is None:
+            try:
+                self.cam.stop_acquisition()
+                self.cam.set_param('LUTEnable', 0)
+                return True
+            except Exception as e:
+                print(f"[XIMEA] Falha ao desligar a LUT de hardware: {e}")
+                return False
+            finally:
+                try: self.cam.start_acquisition()
+                except: pass
             
+        # lut_array no OpenCV tem shape (1, 256, 3).
+        # Precisamos extrair uma curva 1D (usaremos o canal verde, índice 1)
+        if len(lut_array.shape) == 3:
+            curve = lut_array[0, :, 1]
+        else:
+            curve = lut_array
+        valores = self._curva_no_dominio_da_lut(curve)
+        if valores is None:
+            return False
+
         try:
             # O Erro 41 indica que não podemos alterar LUT_EN com a câmera rodando.
             # Pausamos a aquisição rapidamente, injetamos a curva, e voltamos a rodar.
@@ -216,18 +351,10 @@ class XimeaAdapter(CameraProvider):
                 pass
                 
             self.cam.set_param('LUTEnable', 0)
-            
-            # lut_array no OpenCV tem shape (1, 256, 3).
-            # Precisamos extrair uma curva 1D (usaremos o canal verde, índice 1)
-            if len(lut_array.shape) == 3:
-                curve = lut_array[0, :, 1]
-            else:
-                curve = lut_array
-                
-            for i in range(min(256, len(curve))):
+
+            for i, val in enumerate(valores):
                 self.cam.set_param('LUTIndex', i)
-                val = int(curve[i])
-                self.cam.set_param('LUTValue', val)
+                self.cam.set_param('LUTValue', int(val))
                 
             self.cam.set_param('LUTEnable', 1)
             
@@ -236,7 +363,7 @@ class XimeaAdapter(CameraProvider):
             except:
                 pass
                 
-            print(f"[XIMEA] LUT de Hardware Carregado com Sucesso!")
+            print(f"[XIMEA] LUT de Hardware Carregado com Sucesso! ({len(valores)} entradas)")
             return True
         except Exception as e:
             print(f"[XIMEA] Falha ao injetar LUT no Hardware. Usando LUT via Python/OpenCV. Erro: {e}")
@@ -245,3 +372,23 @@ class XimeaAdapter(CameraProvider):
             except:
                 pass
             return False
+
+    def _curva_no_dominio_da_lut(self, curve):
+        """
+        Reamostra a curva de 8 bits (256 entradas) para o domínio da LUT do sensor: o índice vai até
+        `LUTIndex:max` (profundidade do ADC, ex.: 4095 em 12 bits) e o valor até `LUTValue:max`.
+        Gravar só os índices 0..255 remapearia apenas os códigos mais escuros. None se o domínio não
+        puder ser lido: a curva fica no software.
+        """
+        try:
+            indice_max = int(self.cam.get_param('LUTIndex:max'))
+            valor_max = int(self.cam.get_param('LUTValue:max'))
+        except Exception as e:
+            print(f"[XIMEA] Domínio da LUT do sensor indisponível, curva fica no software: {e}")
+            return None
+        if indice_max <= 0 or valor_max <= 0:
+            print(f"[XIMEA] Domínio da LUT do sensor inválido ({indice_max}, {valor_max}), curva fica no software")
+            return None
+        entrada = np.arange(indice_max + 1) * (255.0 / indice_max)
+        saida = np.interp(entrada, np.arange(len(curve)) * (255.0 / max(1, len(curve) - 1)), np.asarray(curve, dtype=np.float64))
+        return np.clip(np.rint(saida * (valor_max / 255.0)), 0, valor_max).astype(np.int64)
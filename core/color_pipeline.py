@@ -0,0 +1,110 @@
+import numpy as np
+
+
+def build_color_lut(r, g, b, gy, gc, contrast):
+    """Constrói a tabela de pré-computação (LUT) do ISP para o OpenCV aplicar instantaneamente"""
+    lut = np.zeros((1, 256, 3), dtype=np.uint8)
+    f_c = (259 * (contrast + 255)) / (255 * (259 - contrast)) if contrast != 0 else 1.0
+    for i in range(256):
+        val = i / 255.0
+        # Gamma simples
+        g_val = val ** (1.0 / gy) if gy > 0 else val
+        # WB multipliers
+        b_val, g_val, r_val = g_val * b, g_val * g, g_val * r
+        # Re-scale e Contrast
+        b_idx = f_c * (b_val * 255 - 128) + 128
+        g_idx = f_c * (g_val * 255 - 128) + 128
+        r_idx = f_c * (r_val * 255 - 128) + 128
+        # Store in LUT (OpenCV usa BGR)
+        lut[0, i, 0] = np.clip(b_idx, 0, 255)
+        lut[0, i, 1] = np.clip(g_idx, 0, 255)
+        lut[0, i, 2] = np.clip(r_idx, 0, 255)
+    return lut
+
+
+def lut_identidade(lut):
+    return lut is None or bool(np.all(lut[0] == np.arange(256, dtype=np.uint8)[:, None]))
+
+
+class ColorPipeline:
+    """
+    Divide a cadeia de cor (debayer, WB, gamma, contraste) entre o hardware e o software conforme
+    `CameraProvider.capabilities()` (SPEC-002).
+
+      - quadro já colorido (`debayer`): cada estágio com controle no ISP vai para o sensor e só os
+        outros entram na LUT do software (com os estágios de hardware neutros);
+      - mosaico Bayer cru: a curva fica na LUT do software, aplicada depois do debayer. Só com
+        `curva_no_sensor=True` ela vai para a LUT do sensor (`hardware_lut`), e ainda assim só quando
+        os três canais são iguais (WB neutro). A LUT do sensor muda os pixels de `Frame.data`: o
+        limiar da visão, as amostras do áudio óptico e o arquivo RAW passariam a ver a curva, então
+        o chamador só a libera quando nenhum deles lê o quadro do sensor.
+
+    `aplicar()` devolve a LUT que o codificador e o painel ainda precisam aplicar, ou None quando o
+    software não tem nada a fazer (o codificador pula o `cv2.LUT`). `estagios` diz onde cada etapa
+    roda: "hardware", "software" ou "neutro" (parâmetro sem efeito, nenhum trabalho); `lut` é onde a
+    curva 1D resultante é aplicada.
+    """
+
+    def __init__(self, camera, executar=None, curva_no_sensor=False):
+        self.camera = camera
+        self.caps = camera.capabilities()
+        self.curva_no_sensor = bool(curva_no_sensor)
+        # Cargas de LUT param a aquisição: rodam na thread de captura (`CaptureThread.executar`)
+        self.executar = executar or (lambda funcao: funcao())
+        self.estagios = {}
+        self.lut_hardware = False
+        self._no_hardware = set()  # Controles de ISP já tocados: voltam a neutro pelo hardware
+
+    def _isp(self, estagio, neutro, empurrar):
+        if not getattr(self.caps, estagio):
+            return False
+        if not neutro or estagio in self._no_hardware:
+            empurrar()
+            self._no_hardware.add(estagio)
+        return True
+
+    def _carregar_lut_hardware(self, lut):
+        ok = self.executar(lambda: self.camera.load_hardware_lut(lut))
+        return bool(ok)
+
+    def aplicar(self, wb, gamma, contrast):
+        r, g, b = wb
+        gy, gc = gamma
+        neutro = {"white_balance": r == g == b == 1.0, "gamma": gy == 1.0 and gc == 1.0, "contrast": contrast == 0}
+        estagios = {"debayer": "hardware" if self.caps.debayer else "software"}
+        lut = None
+
+        if self.caps.debayer:
+            hw_wb = self._isp("white_balance", neutro["white_balance"], lambda: self.camera.set_white_balance(r, g, b))
+            hw_gamma = self._isp("gamma", neutro["gamma"], lambda: self.camera.set_gamma(gy, gc))
+            hw_contraste = self._isp("contrast", neutro["contrast"], lambda: self.camera.set_contrast(contrast))
+            estagios.update({"white_balance": hw_wb, "gamma": hw_gamma, "contrast": hw_contraste})
+            lut = build_color_lut(1.0 if hw_wb else r, 1.0 if hw_wb else g, 1.0 if hw_wb else b,
+                                  1.0 if hw_gamma else gy, 1.0 if hw_gamma else gc, 0.0 if hw_contraste else contrast)
+            lut = None if lut_identidade(lut) else lut
+        else:
+            lut = build_color_lut(r, g, b, gy, gc, contrast)
+            lut = None if lut_identidade(lut) else lut
+            curva_unica = lut is not None and bool(np.all(lut[0, :, 0] == lut[0, :, 1]) and np.all(lut[0, :, 1] == lut[0, :, 2]))
+            no_sensor = False
+            if self.caps.hardware_lut and self.curva_no_sensor and curva_unica:
+                no_sensor = self._carregar_lut_hardware(lut)
+            elif self.lut_hardware:
+                self._carregar_lut_hardware(None)  # A curva voltou para o software (ou ficou neutra)
+            self.lut_hardware = no_sensor
+            if no_sensor: lut = None
+            estagios.update({k: no_sensor for k in ("white_balance", "gamma", "contrast")})
+
+        for k in ("white_balance", "gamma", "contrast"):
+            estagios[k] = "neutro" if neutro[k] else ("hardware" if estagios[k] else "software")
+        estagios["lut"] = "hardware" if self.lut_hardware else ("software" if lut is not None else "neutro")
+        self.estagios = estagios
+        return lut
+
+    def stats(self):
+        return {
+            "capacidades": self.caps.as_dict(),
+            "estagios": dict(self.estagios),
+            "lut_hardware": self.lut_hardware,
+            "curva_no_sensor": self.curva_no_sensor,
+        }
@@ -0,0 +1,124 @@
+import math
+import time
+
+
+class VelocityRing:
+    """
+    Estimador de velocidade do encoder em janela deslizante sobre um anel de capacidade fixa.
+
+    Cada amostra `(t, pulsos)` entra em O(1) e a cauda da janela só anda para frente, então o custo
+    por amostra não cresce com a janela (antes: lista com `pop(0)`). Com o anel cheio a amostra mais
+    velha é sobrescrita e a janela encurta, nunca aloca.
+    """
+
+    def __init__(self, capacidade=64, janela_s=0.5, janela_min_s=0.1):
+        self.capacidade = capacidade
+        self.janela_s = janela_s
+        self.janela_min_s = janela_min_s
+        self._t = [0.0] * capacidade
+        self._p = [0] * capacidade
+        self.limpar()
+
+    def limpar(self):
+        self._cabeca = 0  # Próxima posição livre
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    def adicionar(self, t, pulsos):
+        i = self._cabeca
+        self._t[i] = t
+        self._p[i] = pulsos
+        self._cabeca = (i + 1) % self.capacidade
+        if self._n < self.capacidade:
+            self._n += 1
+        # Descarta da cauda o que saiu da janela (a amostra nova sempre fica)
+        while self._n > 1 and t - self._t[(self._cabeca - self._n) % self.capacidade] > self.janela_s:
+            self._n -= 1
+
+    def pulsos_por_s(self):
+        """Pulsos/s entre a amostra mais velha da janela e a mais nova; None com menos de `janela_min_s`."""
+        if self._n < 2:
+            return None
+        nova = (self._cabeca - 1) % self.capacidade
+        velha = (self._cabeca - self._n) % self.capacidade
+        dt = self._t[nova] - self._t[velha]
+        if dt < self.janela_min_s:
+            return None
+        return (self._p[nova] - self._p[velha]) / dt
+
+
+def alfa_ema(dt, tau):
+    """Peso da amostra nova numa EMA de constante de tempo `tau`, para qualquer intervalo `dt`."""
+    return 1.0 - math.exp(-dt / tau) if dt > 0 else 0.0
+
+
+class DeadlineScheduler:
+    """
+    Cadência fixa por prazo no relógio monotônico: cada tick tem um prazo absoluto e o próximo é
+    `prazo + período`, então o tempo gasto no corpo do loop não empurra a fase (antes:
+    `time.sleep(0.05)` depois do trabalho, com `time.time()` sujeito a saltos do relógio).
+
+    `esperar()` dorme até o prazo e devolve o `dt` real desde o tick anterior. Atraso (jitter) é
+    medido em todo tick; um tick que acorda depois do prazo seguinte é um estouro e os prazos
+    perdidos são pulados sem rajada de ticks atrasados.
+    """
+
+    def __init__(self, hz=50.0, relogio=time.monotonic, dormir=time.sleep):
+        self.relogio = relogio
+        self.dormir = dormir
+        self.definir_hz(hz)
+        self.reiniciar()
+
+    def definir_hz(self, hz):
+        self.hz = float(hz)
+        self.periodo = 1.0 / self.hz
+
+    def reiniciar(self):
+        agora = self.relogio()
+        self._prazo = agora + self.periodo
+        self._ultimo = agora
+        self.ticks = 0
+        self.estouros = 0
+        self.perdidos = 0
+        self.jitter_ultimo_ms = 0.0
+        self.jitter_max_ms = 0.0
+        self._jitter_soma_ms = 0.0
+        self.dt_max = 0.0
+
+    def esperar(self):
+        falta = self._prazo - self.relogio()
+        if falta > 0:
+            self.dormir(falta)
+        agora = self.relogio()
+        atraso = max(0.0, agora - self._prazo)
+        self.ticks += 1
+        self.jitter_ultimo_ms = atraso * 1000.0
+        self._jitter_soma_ms += self.jitter_ultimo_ms
+        if self.jitter_ultimo_ms > self.jitter_max_ms: self.jitter_max_ms = self.jitter_ultimo_ms
+
+        self._prazo += self.periodo
+        if agora >= self._prazo:
+            # Estouro: o corpo ou o escalonador do SO comeu o tick seguinte. Realinha na fase.
+            perdidos = int((agora - self._prazo) // self.periodo) + 1
+            self.estouros += 1
+            self.perdidos += perdidos
+            self._prazo += perdidos * self.periodo
+
+        dt = agora - self._ultimo
+        self._ultimo = agora
+        if dt > self.dt_max: self.dt_max = dt
+        return dt
+
+    def stats(self):
+        return {
+            "hz": self.hz,
+            "ticks": self.ticks,
+            "estouros": self.estouros,
+            "ticks_perdidos": self.perdidos,
+            "jitter_ms": round(self.jitter_ultimo_ms, 3),
+            "jitter_medio_ms": round(self._jitter_soma_ms / self.ticks, 3) if self.ticks else 0.0,
+            "jitter_max_ms": round(self.jitter_max_ms, 3),
+            "dt_max_ms": round(self.dt_max * 1000.0, 3),
+        }
@@ -0,0 +1,139 @@
+import cv2
+
+from core.segment_container import SegmentRecorder
+
+
+# --- Pool de codificadores da gravação (SPEC-004) ---
+# O sequenciador (`processo_escrita_disco`, no miniola.py) é o único consumidor da `fila_gravacao`:
+# aplica as mensagens de controle em ordem e monta os jobs com `montar_job`. Os codificadores
+# (`processo_codificador`, um processo por núcleo livre) pegam qualquer job da `fila_jobs`, então
+# tudo o que muda o resultado de um quadro viaja dentro do próprio job.
+
+
+def montar_job(item, anel, bayer, lut, segmento=None):
+    """
+    Job de codificação para uma mensagem de quadro da `fila_gravacao` (dict com slot do anel ou a
+    tupla legada `(img_bgr, filename)`), com o padrão Bayer e a LUT vigentes congelados nele.
+    Devolve None (e libera o slot) se a mensagem não tem pixels ou nome de arquivo. Com `segmento`
+    (sessão .mseg ativa) e `frame_index`, o quadro vai para o anexador em vez de virar arquivo.
+    """
+    # picamera2 com "RGB888" entrega BGR na memória (comportamento libcamera).
+    # O frame precisa ser convertido BGR→RGB antes de qualquer encoder que assuma RGB.
+    if isinstance(item, dict):
+        job = {
+            "slot": item.get("slot"),
+            "shape": item.get("shape"),
+            "dtype": item.get("dtype", "uint8"),
+            "img_bgr": item.get("img_bgr"),
+            "filename": item.get("filename"),
+        }
+    else:
+        try: img_bgr, filename = item
+        except Exception: return None
+        job = {"slot": None, "img_bgr": img_bgr, "filename": filename}
+
+    if (job["slot"] is None and job["img_bgr"] is None) or not job["filename"]:
+        if job["slot"] is not None: anel.release(job["slot"])
+        return None
+
+    job["bayer"] = bayer
+    job["lut"] = lut
+    job["raw"] = bool(item.get("raw")) if isinstance(item, dict) else False
+    if segmento is not None and isinstance(item, dict) and item.get("frame_index") is not None:
+        job["segmento"] = segmento
+        job["frame_index"] = item["frame_index"]
+    return job
+
+
+def processo_codificador(fila_jobs, anel, worker_id, fila_resultados=None):
+    """
+    Codificador do pool de gravação: faz apenas o trabalho pesado por quadro (debayer, LUT e JPEG).
+    O padrão Bayer e a LUT chegam DENTRO de cada job, congelados pelo sequenciador no instante em que
+    o quadro foi despachado. Assim, um `set_bayer`/`set_lut` nunca é aplicado fora de ordem,
+    independentemente de qual codificador pegar o quadro.
+
+    Jobs com `segmento` (sessão .mseg) são codificados em memória (`cv2.imencode`) e os bytes seguem
+    para `fila_resultados`, onde um único anexador escreve no segmento da sessão.
+    """
+    while True:
+        job = fila_jobs.get()
+        if job is None:
+            break
+
+        slot = job.get("slot")
+        segmento = job.get("segmento")
+        codec, dados = "jpg", None
+        try:
+            if slot is not None:
+                img_bgr = anel.view(slot, job.get("shape"), job.get("dtype", "uint8"))
+            else:
+                img_bgr = job.get("img_bgr")
+            if img_bgr is None: continue
+
+            if job.get("raw"):
+                # Modo RAW: grava o mosaico Bayer de 1 canal sem perdas. Compressão PNG nível 1
+                # (zlib rápido) sobre 1/3 dos bytes: sem debayer, sem LUT e sem JPEG ao vivo.
+                codec, params = "png", [int(cv2.IMWRITE_PNG_COMPRESSION), 1]
+            else:
+                # Debayer Assíncrono: O loop principal da câmera manda o RAW8 cru e não gasta tempo.
+                # São estes processos isolados (um por núcleo livre) que fazem o trabalho pesado de debayer.
+                if len(img_bgr.shape) == 2:
+                    img_bgr = cv2.cvtColor(img_bgr, job.get("bayer", cv2.COLOR_BayerBG2BGR))
+                # Só os estágios de cor que o sensor/ISP não fez (ColorPipeline); None = nada a aplicar
+                lut = job.get("lut")
+                if lut is not None:
+                    img_bgr = cv2.LUT(img_bgr, lut)
+                # JPEG com cores corretas usando libjpeg-turbo C++ nativo (cv2.imwrite/imencode):
+                # A velocidade de escrita cai de ~35ms para ~3ms por quadro, evitando que o buffer de memória do Python
+                # sature a controladora USB 3.0 e cause queda de pacotes (dropframes) na câmera Ximea.
+                codec, params = "jpg", [int(cv2.IMWRITE_JPEG_QUALITY), 95]
+
+            if segmento is not None:
+                ok, buf = cv2.imencode(f".{codec}", img_bgr, params)
+                if ok: dados = buf
+            else:
+                cv2.imwrite(job["filename"], img_bgr, params)
+        except Exception as e:
+            print(f"[GRAVAÇÃO] Codificador {worker_id} falhou em {job.get('filename')}: {e}")
+        finally:
+            # Libera o slot assim que os pixels deixam de ser necessários
+            if slot is not None: anel.release(slot)
+            # Todo job de segmento devolve um resultado (mesmo vazio) para o anexador fechar a sessão na contagem certa
+            if segmento is not None and fila_resultados is not None:
+                fila_resultados.put((segmento, job.get("frame_index"), codec, dados))
+
+def thread_anexador_segmentos(fila_resultados, frames_por_segmento, diretorio):
+    """
+    Único escritor dos segmentos .mseg (roda dentro do processo sequenciador). Os quadros chegam fora
+    de ordem do pool de codificadores; cada registro carrega o próprio frame_index, então basta anexar.
+    Uma sessão é fechada (rodapé com índice) quando o marcador `close` chega E todos os quadros
+    despachados para ela já foram recebidos.
+    """
+    gravadores, recebidos, esperados = {}, {}, {}
+    while True:
+        item = fila_resultados.get()
+        if item is None:
+            break
+        if item[0] == "close":
+            _, sid, total = item
+            esperados[sid] = total
+        else:
+            sid, frame_index, codec, dados = item
+            recebidos[sid] = recebidos.get(sid, 0) + 1
+            if dados is not None:
+                if sid not in gravadores:
+                    gravadores[sid] = SegmentRecorder(diretorio, sid, frames_por_segmento)
+                try:
+                    gravadores[sid].append(frame_index, dados, codec)
+                except Exception as e:
+                    print(f"[SEGMENTO] Falha ao anexar quadro {frame_index}: {e}")
+
+        if sid in esperados and recebidos.get(sid, 0) >= esperados[sid]:
+            gravador = gravadores.pop(sid, None)
+            if gravador is not None:
+                gravador.close()
+                print(f"[SEGMENTO] Sessão {sid} fechada: {gravador.total} quadros em segmentos .mseg")
+            esperados.pop(sid, None)
+            recebidos.pop(sid, None)
+
+    for gravador in gravadores.values(): gravador.close()
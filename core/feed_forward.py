@@ -0,0 +1,141 @@
+import math
+
+from core.control_loop import alfa_ema
+
+
+class FeedForwardModel:
+    """
+    Modelo do carretel de recolhimento para o feed-forward do PID (SPEC-010, seção 7.9).
+
+    O motor Y a `hz` passos/s puxa o filme a `k * hz` mm/s, com `k = 2 pi r / passos_por_volta` e `r`
+    o raio atual do carretel. O `r` é mantido de duas formas:
+      - previsão: cada milímetro enrolado soma uma espira de `espessura_mm`
+        (`r^2 += espessura * distância / pi`);
+      - aquisição: sem calibração o raio inicial é um palpite (o carretel pode já estar cheio) e o
+        motor nem chega a um regime com ele, então a razão acumulada filme / passos desde a partida,
+        com `passos_aquisicao` passos dados, vira o raio (não precisa de frequência parada). O encoder
+        chega atrasado em relação aos passos, então essa semente sai um pouco baixa na rampa e a
+        primeira razão em regime depois dela substitui o raio de uma vez;
+      - correção: depois disso a razão medida `mm/s / Hz` puxa `r` por uma EMA de constante `tau_s`
+        (descarta medidas a mais de `desvio_max` da previsão, típicas de patinação).
+    Com `rastrear=False` o raio só muda por `calibrar()` (feed-forward fixo). `calibrar()` ajusta `r`
+    pela varredura Hz -> mm/s. O padrão `k = 0.05` é o antigo `feed_forward = alvo * 20.0`.
+    """
+
+    def __init__(self, k=0.05, passos_por_volta=3200, espessura_mm=0.14, tau_s=5.0, rastrear=True,
+                 raio_min_mm=15.0, raio_max_mm=200.0, desvio_max=0.3, passos_aquisicao=1600):
+        self.passos_por_volta = passos_por_volta
+        self.espessura_mm = espessura_mm
+        self.tau_s = tau_s
+        self.rastrear = rastrear
+        self.raio_min_mm = raio_min_mm
+        self.raio_max_mm = raio_max_mm
+        self.desvio_max = desvio_max
+        self.passos_aquisicao = passos_aquisicao
+        self.raio_mm = self._raio_de(k)
+        self.calibrado = False
+        self.calibracao = None
+        self.k_medido = None
+        self.correcoes = 0
+        self.rejeitadas = 0
+        self.adquirido = False
+        self._refinar = False
+        self._mm_aquisicao = 0.0
+        self._passos_aquisicao = 0.0
+
+    def _raio_de(self, k):
+        return k * self.passos_por_volta / (2 * math.pi)
+
+    def reiniciar_aquisicao(self):
+        """Nova partida: sem calibração o carretel pode ter sido trocado, então o raio é readquirido."""
+        self.adquirido = self.calibrado
+        self._refinar = False
+        self._mm_aquisicao = 0.0
+        self._passos_aquisicao = 0.0
+
+    def adquirir(self, distancia_mm, passos, passos_sem_leitura=0.0):
+        """
+        Filme (encoder) e passos do Y de um tick; `passos_sem_leitura` são os passos dados depois da
+        leitura que trouxe `distancia_mm`. Devolve True quando fixa o raio (uma vez por partida).
+        """
+        if self.adquirido or not self.rastrear:
+            return False
+        self._mm_aquisicao += distancia_mm
+        self._passos_aquisicao += passos
+        passos_vistos = self._passos_aquisicao - passos_sem_leitura
+        if distancia_mm <= 0 or passos_vistos < self.passos_aquisicao:
+            return False
+        k = self._mm_aquisicao / passos_vistos
+        self.raio_mm = min(self.raio_max_mm, max(self.raio_min_mm, self._raio_de(k)))
+        self.adquirido = True
+        self._refinar = True
+        self.correcoes += 1
+        return True
+
+    def k(self):
+        """mm/s por Hz do motor Y com o raio atual."""
+        return 2 * math.pi * self.raio_mm / self.passos_por_volta
+
+    def hz_para(self, mm_s):
+        return mm_s / self.k()
+
+    def avancar(self, distancia_mm):
+        """Filme enrolado (positivo) ou desenrolado (negativo) no recolhimento."""
+        if not self.rastrear: return
+        r2 = self.raio_mm ** 2 + self.espessura_mm * distancia_mm / math.pi
+        self.raio_mm = min(self.raio_max_mm, max(self.raio_min_mm, math.sqrt(max(r2, 0.0))))
+
+    def observar(self, dt, hz, mm_s):
+        """Amostra em regime (frequência na placa estável); devolve True se corrigiu o raio."""
+        if not self.rastrear or hz <= 0 or mm_s <= 0:
+            return False
+        k_medido = mm_s / hz
+        self.k_medido = k_medido
+        if not self.adquirido:
+            return False  # Sem raio adquirido a previsão não serve de referência para rejeitar
+        if abs(k_medido / self.k() - 1.0) > self.desvio_max:
+            self.rejeitadas += 1
+            return False
+        alvo = min(self.raio_max_mm, max(self.raio_min_mm, self._raio_de(k_medido)))
+        if self._refinar:
+            self.raio_mm = alvo  # Primeira razão em regime depois da semente da aquisição
+            self._refinar = False
+        else:
+            self.raio_mm += alfa_ema(dt, self.tau_s) * (alvo - self.raio_mm)
+        self.correcoes += 1
+        return True
+
+    def calibrar(self, pontos):
+        """
+        Ajusta `k` por mínimos quadrados pela origem sobre `(hz, mm_s)` (o passo não tem zona morta).
+        Devolve o resultado com o desvio máximo de linearidade, ou None sem pontos válidos.
+        """
+        pontos = [(hz, v) for hz, v in pontos if hz > 0 and v > 0]
+        if not pontos:
+            return None
+        k = sum(hz * v for hz, v in pontos) / sum(hz * hz for hz, _ in pontos)
+        desvio = max(abs(v / (k * hz) - 1.0) for hz, v in pontos)
+        self.raio_mm = min(self.raio_max_mm, max(self.raio_min_mm, self._raio_de(k)))
+        self.calibrado = True
+        self.adquirido = True
+        self.calibracao = {
+            "k": round(k, 6),
+            "raio_mm": round(self.raio_mm, 3),
+            "desvio_linear_pct": round(100.0 * desvio, 2),
+            "pontos": [(hz, round(v, 2)) for hz, v in pontos],
+        }
+        return self.calibracao
+
+    def stats(self):
+        return {
+            "k": round(self.k(), 6),
+            "hz_por_mm_s": round(1.0 / self.k(), 3),
+            "raio_mm": round(self.raio_mm, 3),
+            "k_medido": round(self.k_medido, 6) if self.k_medido is not None else None,
+            "rastrear": self.rastrear,
+            "correcoes": self.correcoes,
+            "rejeitadas": self.rejeitadas,
+            "adquirido": self.adquirido,
+            "calibrado": self.calibrado,
+            "calibracao": self.calibracao,
+        }
@@ -0,0 +1,125 @@
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SharedFrameRing:
+    """
+    Anel de slots em memória compartilhada entre o loop do scanner e o processo de gravação.
+
+    Os slots têm tamanho fixo e são alocados UMA vez no início. O quadro é copiado uma única
+    vez para dentro do slot (`np.copyto`) e o processo de gravação lê diretamente dessa memória,
+    sem pickle nem pipe. Pela `fila_gravacao` trafega apenas o índice do slot e a telemetria.
+
+    A ocupação de cada slot fica num `mp.Array` compartilhado: o produtor reserva um slot livre e
+    escreve o quadro (`put_frame`), depois publica a mensagem; o consumidor devolve o slot
+    (`release`) assim que termina de usar os pixels.
+    """
+
+    def __init__(self, n_slots, slot_bytes):
+        self.n_slots = int(n_slots)
+        self.slot_bytes = int(slot_bytes)
+        self.shm = shared_memory.SharedMemory(create=True, size=self.n_slots * self.slot_bytes)
+        self._owner_pid = os.getpid()
+
+        # 0 = livre, 1 = ocupado. O lock do Array também protege os contadores de ocupação.
+        self._estado = mp.Array('b', self.n_slots)
+        self._proximo = 0
+
+        # Contadores de ocupação compartilhados entre os processos
+        self._ocupados = mp.Value('i', 0, lock=False)
+        self._pico = mp.Value('i', 0, lock=False)
+        self._descartes = mp.Value('i', 0)
+        self._escritos = mp.Value('q', 0)
+
+    # --- Serialização para o processo filho (spawn no Windows / macOS) ---
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['shm'] = self.shm.name
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.shm = shared_memory.SharedMemory(name=state['shm'])
+
+    def view(self, slot, shape, dtype=np.uint8):
+        """Retorna uma VIEW numpy do slot (sem cópia)."""
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        if nbytes > self.slot_bytes:
+            raise ValueError(f"Quadro de {nbytes} bytes não cabe no slot de {self.slot_bytes} bytes")
+        offset = int(slot) * self.slot_bytes
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+
+    def put_frame(self, frame):
+        """
+        Copia o quadro para um slot livre. Retorna o índice do slot ou None se o anel
+        estiver cheio (ou o quadro não couber no slot), contabilizando o descarte.
+        """
+        if frame.nbytes > self.slot_bytes:
+            with self._descartes.get_lock():
+                self._descartes.value += 1
+            return None
+        slot = self._reservar()
+        if slot is None:
+            with self._descartes.get_lock():
+                self._descartes.value += 1
+            return None
+
+        destino = self.view(slot, frame.shape, frame.dtype)
+        np.copyto(destino, frame)
+
+        with self._escritos.get_lock():
+            self._escritos.value += 1
+        return slot
+
+    def _reservar(self):
+        # Varredura circular a partir do último slot usado (n_slots é pequeno, ~30)
+        with self._estado.get_lock():
+            for i in range(self.n_slots):
+                slot = (self._proximo + i) % self.n_slots
+                if self._estado[slot] == 0:
+                    self._estado[slot] = 1
+                    self._proximo = (slot + 1) % self.n_slots
+                    self._ocupados.value += 1
+                    if self._ocupados.value > self._pico.value:
+                        self._pico.value = self._ocupados.value
+                    return slot
+        return None
+
+    def release(self, slot):
+        """Devolve o slot ao anel depois que o consumidor terminou de usar os pixels."""
+        with self._estado.get_lock():
+            if self._estado[int(slot)]:
+                self._estado[int(slot)] = 0
+                self._ocupados.value -= 1
+
+    def discard(self, slot):
+        """Devolve um slot que foi preenchido mas cuja mensagem não pôde ser enfileirada."""
+        self.release(slot)
+        with self._descartes.get_lock():
+            self._descartes.value += 1
+
+    def ocupados(self):
+        return self._ocupados.value
+
+    def stats(self):
+        return {
+            "slots": self.n_slots,
+            "slot_mb": round(self.slot_bytes / (1024 * 1024), 2),
+            "ocupados": self._ocupados.value,
+            "pico": self._pico.value,
+            "descartes": self._descartes.value,
+            "escritos": self._escritos.value,
+        }
+
+    def close(self):
+        self.shm.close()
+        # Apenas o processo que criou o segmento pode removê-lo do /dev/shm
+        if os.getpid() == self._owner_pid:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
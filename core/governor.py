@@ -0,0 +1,152 @@
+import math
+
+# 35mm: um fotograma = 4 perfurações (mesma conta do FilmTransportPID.start_pid)
+PERFS_POR_QUADRO = 4
+
+
+class CapturePlan:
+    """Ponto de operação calculado pelo `CaptureGovernor` (px em coordenadas base do sensor)."""
+
+    __slots__ = ("fps_cam", "exposicao_us", "ganho", "fps_motor", "velocidade_px_s", "avanco_px",
+                 "avanco_max_px", "blur_px", "limitante", "pitch_px")
+
+    def __init__(self, **campos):
+        for k in self.__slots__:
+            setattr(self, k, campos.get(k))
+
+    @property
+    def quadros_por_minuto(self):
+        return self.fps_motor * 60.0
+
+    def as_dict(self):
+        d = {k: getattr(self, k) for k in self.__slots__}
+        d["quadros_por_minuto"] = self.quadros_por_minuto
+        return {k: round(v, 3) if isinstance(v, float) else v for k, v in d.items()}
+
+    def __repr__(self):
+        return (f"CapturePlan({self.fps_motor:.2f} fps motor, câmera {self.fps_cam:.0f} fps / {self.exposicao_us:.0f} us, "
+                f"avanço {self.avanco_px:.1f}/{self.avanco_max_px:.1f} px, blur {self.blur_px:.2f} px, limite: {self.limitante})")
+
+
+class CaptureGovernor:
+    """
+    Governador dos parâmetros de captura: amarra velocidade do motor, FPS e exposição da câmera
+    ao pitch medido para que o gatilho de fase e o borrão de movimento fiquem dentro dos limites.
+
+    Com o filme a `v` px/s (base) e a câmera a `fps` quadros/s:
+      - amostragem: o filme anda `v / fps` px entre dois quadros, que precisa caber em
+        `amostragem * pitch` para o cruzamento de fase de cada furo ser visto (os motores disparam
+        pelo cruzamento, não pela janela `MARGEM_GATILHO`, que só colore o painel);
+      - borrão: durante a exposição o filme anda `v * exposição` px, limitado a `blur_max_px`;
+      - luz: a exposição só encurta até onde o ganho compensa (`ganho_extra_max` sobre a referência
+        do operador), e nunca passa da referência nem do período do quadro.
+
+    `envelope()` escolhe a maior velocidade que respeita os três limites, o motor (`fps_motor_max`) e o
+    sensor (`fps_cam_max`), com `folga` para o jitter do PID, e o menor FPS que ainda amostra essa
+    velocidade (menos carga na visão). `atualizar()` reaplica só quando o plano muda além da
+    `histerese`. Os valores do console (`mfps`, `fps`, `e`, `g`) viram tetos e referência.
+    """
+
+    def __init__(self, amostragem=0.3, blur_max_px=1.0, folga=0.9, fps_cam_max=120.0, fps_motor_max=24.0,
+                 ganho_extra_max=4.0, exposicao_min_us=20.0, histerese=0.05, unidade_ganho="linear"):
+        self.amostragem = amostragem
+        self.blur_max_px = blur_max_px
+        self.folga = folga
+        self.fps_cam_max = float(fps_cam_max)
+        self.fps_motor_max = float(fps_motor_max)
+        self.ganho_extra_max = max(1.0, float(ganho_extra_max))
+        self.exposicao_min_us = exposicao_min_us
+        self.histerese = histerese
+        # "linear" (Pi: AnalogueGain), "db" (Ximea) ou "raw" (UVC: escala do driver, sem compensação)
+        self.unidade_ganho = unidade_ganho
+
+        self.exposicao_ref_us = None
+        self.ganho_ref = None
+        self.plano = None
+        self.aplicacoes = 0
+        self.inviaveis = 0
+
+    def definir_referencia(self, exposicao_us, ganho):
+        """Brilho escolhido pelo operador: a exposição mais longa permitida e o ganho que a acompanha."""
+        self.exposicao_ref_us = float(exposicao_us)
+        self.ganho_ref = float(ganho)
+
+    def _ganho_para(self, fator):
+        # Ganho (unidade do provedor) que compensa a exposição `fator` vezes mais curta que a referência
+        if self.unidade_ganho == "db":
+            return self.ganho_ref + 20.0 * math.log10(fator)
+        if self.unidade_ganho == "linear":
+            return self.ganho_ref * fator
+        return self.ganho_ref
+
+    def envelope(self, pitch_px, pitch_nominal_px, fps_cam_max=None):
+        """
+        Plano de maior vazão para o pitch medido (`pitch_px`, px base por perfuração) e o nominal
+        (`pitch_nominal_px`, o que o motor converte em mm/s). Devolve None sem referência ou pitch.
+        """
+        if self.exposicao_ref_us is None or not pitch_px or pitch_px <= 0 or not pitch_nominal_px:
+            return None
+        fps_sensor = min(self.fps_cam_max, fps_cam_max) if fps_cam_max else self.fps_cam_max
+
+        avanco_max = self.amostragem * pitch_px
+        compensa = self.ganho_extra_max if self.unidade_ganho in ("linear", "db") else 1.0
+        exposicao_min = min(self.exposicao_ref_us, max(self.exposicao_min_us, self.exposicao_ref_us / compensa))
+
+        limites = {
+            "amostragem": fps_sensor * avanco_max,
+            "blur": self.blur_max_px * 1e6 / exposicao_min,
+            "motor": self.fps_motor_max * PERFS_POR_QUADRO * pitch_nominal_px,
+        }
+        limitante = min(limites, key=limites.get)
+        v = self.folga * limites[limitante]
+
+        fps_cam = min(fps_sensor, math.ceil(v / (self.folga * avanco_max)))
+        exposicao = min(self.exposicao_ref_us, self.folga * self.blur_max_px * 1e6 / v, 0.9 * 1e6 / fps_cam)
+        exposicao = max(exposicao_min, exposicao)
+        return CapturePlan(
+            fps_cam=float(fps_cam), exposicao_us=float(round(exposicao)),
+            ganho=self._ganho_para(self.exposicao_ref_us / exposicao),
+            fps_motor=v / (PERFS_POR_QUADRO * pitch_nominal_px), velocidade_px_s=v,
+            avanco_px=v / fps_cam, avanco_max_px=avanco_max, blur_px=v * exposicao / 1e6,
+            limitante=limitante, pitch_px=float(pitch_px),
+        )
+
+    def _mudou(self, plano):
+        if self.plano is None: return True
+        for k in ("fps_motor", "fps_cam", "exposicao_us"):
+            anterior = getattr(self.plano, k)
+            if abs(getattr(plano, k) - anterior) > self.histerese * max(abs(anterior), 1e-9):
+                return True
+        return False
+
+    def aplicar(self, plano, camera, motor=None):
+        """Leva o plano para a câmera e, se o PID estiver girando, para a meta do motor."""
+        camera.set_fps(plano.fps_cam)
+        camera.set_exposure(int(plano.exposicao_us))
+        camera.set_gain(plano.ganho)
+        if motor is not None:
+            motor.set_target_fps(plano.fps_motor)
+        self.plano = plano
+        self.aplicacoes += 1
+        print(f"[GOVERNADOR] {plano}")
+        return plano
+
+    def atualizar(self, camera, motor, pitch_px, pitch_nominal_px, fps_cam_max=None):
+        """Recalcula o envelope e aplica se ele mudou além da histerese. Devolve o plano em vigor."""
+        plano = self.envelope(pitch_px, pitch_nominal_px, fps_cam_max)
+        if plano is None:
+            self.inviaveis += 1
+            return self.plano
+        if self._mudou(plano):
+            return self.aplicar(plano, camera, motor)
+        return self.plano
+
+    def stats(self):
+        return {
+            "plano": self.plano.as_dict() if self.plano is not None else None,
+            "referencia": {"exposicao_us": self.exposicao_ref_us, "ganho": self.ganho_ref, "unidade": self.unidade_ganho},
+            "limites": {"amostragem": self.amostragem, "blur_max_px": self.blur_max_px, "fps_cam_max": self.fps_cam_max,
+                        "fps_motor_max": self.fps_motor_max, "ganho_extra_max": self.ganho_extra_max},
+            "aplicacoes": self.aplicacoes,
+            "inviaveis": self.inviaveis,
+        }
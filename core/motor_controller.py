@@ -3,6 +3,12 @@ import threading
 import time
 import logging
 
+from core.serial_link import SerialLink
+from core.control_loop import VelocityRing, DeadlineScheduler, alfa_ema
+from core.feed_forward import FeedForwardModel
+from core.serial_session import (SessionRecorder, TX, TICK, PHASE, SYNC, TARGET, START, STOP, ESTOP, FF,
+                                 empacotar_contadores, empacotar_valor, empacotar_partida, empacotar_modelo_ff)
+
 class FilmTransportPID:
     GAUGES = {
         '35mm': {'pitch': 4.75},
@@ -10,11 +16,19 @@ class FilmTransportPID:
         '8mm': {'pitch': 3.81},
         'super8': {'pitch': 4.23}
     }
+    # Rampa do firmware nos comandos manuais (F/R, inclusive o F de partida do PID): 40 Hz a cada 10 ms
+    RAMPA_FIRMWARE_HZ_S = 4000.0
+    # Tempo com a frequência da placa parada (±2%) antes de a razão mm/s por Hz valer como regime
+    REGIME_S = 0.6
 
-    def __init__(self, port='/dev/ttyACM0', baudrate=115200, gauge='35mm'):
+    def __init__(self, port='/dev/ttyACM0', baudrate=115200, gauge='35mm', pid_hz=50.0, relogio=time.monotonic, dormir=time.sleep, log_dir=None):
         self.port = port
+        # Relógio do PID e do encoder (o simulador da SKR Pico passa um relógio acelerado)
+        self.relogio = relogio
+        self.dormir = dormir
         self.baudrate = baudrate
         self.serial = None
+        self.link = None # Thread única de I/O serial (SerialLink)
         self.connected = False
         
         # Parâmetros Mecânicos e Estado
@@ -39,7 +53,18 @@ class FilmTransportPID:
         self.Kd = 0.0   # ZERO! A derivada com encoder via USB gera ruído brutal
         
         self.smoothed_adjustment = 0.0
-        self.encoder_history = [] # Janela deslizante para cálculo de velocidade
+        self.encoder_history = VelocityRing(janela_s=0.5) # Janela deslizante (anel) para cálculo de velocidade
+        # Constantes de tempo das EMAs (equivalem aos pesos 0.3 e 0.1 do loop antigo a 20 Hz), valem a qualquer taxa
+        self.tau_velocidade = 0.1402
+        self.tau_saida = 0.4745
+        self.agenda = DeadlineScheduler(pid_hz, relogio=relogio, dormir=dormir) # Cadência do PID por prazo no relógio monotônico
+        
+        # Feed-forward pelo raio do carretel de recolhimento (calibração + rastreio online)
+        self.ff = FeedForwardModel()
+        self.duracao_rampa = 3.0 # Rampa S de partida com o feed-forward padrão
+        self.duracao_rampa_calibrada = 1.5 # Com o feed-forward calibrado a meta pode subir mais rápido
+        self._duracao_rampa_atual = self.duracao_rampa
+        self._hz_placa = 0.0 # Frequência que a placa está aplicando (rampa do firmware)
         
         # PLL (Phase-Locked Loop)
         self.phase_error_mm = 0.0
@@ -47,7 +72,7 @@ class FilmTransportPID:
         
         self.error_sum = 0.0
         self.last_error = 0.0
-        self.last_pid_time = time.time()
+        self.last_pid_time = self.relogio()
         
         # Velocidade Base Inicial (Passos por segundo - Hz)
         self.base_speed_y = 1000 # Take-up puxa
@@ -56,10 +81,16 @@ class FilmTransportPID:
         self.is_running_pid = False
         self.thread = None
         self.lock = threading.Lock()
+        
+        # Log binário de cada execução do PID para replay (SPEC-010, seção 7.8)
+        self.diretorio_sessao = log_dir
+        self.sessao = None
+        self.imprimir_telemetria = True
 
     def connect(self):
         try:
             self.serial = serial.Serial(self.port, self.baudrate, timeout=0.1)
+            self.link = SerialLink(self.serial, relogio=self.relogio).start()
             self.connected = True
             logging.info(f"Conectado à SKR Pico em {self.port}")
             return True
@@ -70,16 +101,44 @@ class FilmTransportPID:
 
     def disconnect(self):
         self.stop()
+        self._fechar_sessao()
+        if self.link is not None:
+            self.link.stop() # Escreve o "S" que ainda estiver na fila
+            self.link = None
         if self.serial and self.serial.is_open:
             self.serial.close()
         self.connected = False
 
     def send_command(self, cmd: str):
-        if self.connected and self.serial.is_open:
-            try:
-                self.serial.write((cmd + '\n').encode('utf-8'))
-            except Exception as e:
-                logging.error(f"Erro de escrita serial: {e}")
+        # Só enfileira: quem escreve é a thread do SerialLink (não bloqueia o PID nem o gamepad)
+        if self.connected and self.link is not None:
+            self._registrar(TX, cmd.encode('utf-8'))
+            self.link.enviar(cmd)
+
+    def _registrar(self, tipo, dados=b""):
+        sessao = self.sessao
+        if sessao is not None:
+            sessao.registrar(tipo, self.relogio(), dados)
+
+    def _abrir_sessao(self):
+        self._fechar_sessao()
+        try:
+            self.sessao = SessionRecorder.no_diretorio(self.diretorio_sessao)
+        except OSError as e:
+            logging.error(f"Erro ao abrir o log de sessão do transporte: {e}")
+            return
+        self.link.gravador = self.sessao
+        logging.info(f"Gravando sessão do transporte em {self.sessao.caminho}")
+
+    def _fechar_sessao(self):
+        sessao, self.sessao = self.sessao, None
+        if sessao is None: return
+        if self.link is not None and self.link.gravador is sessao:
+            self.link.gravador = None
+        sessao.fechar()
+
+    def serial_stats(self):
+        return self.link.stats() if self.link is not None else None
 
     # --- CONTROLES MANUAIS (Acionamento independente do PID) ---
     def manual_forward(self, speed=2000):
@@ -117,6 +176,7 @@ class FilmTransportPID:
         """
         with self.lock:
             self.encoder_distance_accumulated = 0.0
+            self._registrar(SYNC)
 
     def get_accumulated_distance(self):
         """
@@ -134,17 +194,36 @@ class FilmTransportPID:
         if pixels_per_mm > 0:
             with self.lock:
                 self.phase_error_mm = error_px / pixels_per_mm
+                self._registrar(PHASE, empacotar_valor(self.phase_error_mm))
     # --- LOOP PID (Mola Matemática) ---
     def start_pid(self, target_fps=None):
         if not self.connected:
             return
         
+        # Usa o FPS passado (ex: da câmera) ou o default 18.0
+        _fps = target_fps if target_fps is not None else self.target_fps
+        if self.diretorio_sessao:
+            self._abrir_sessao()
+        with self.lock:
+            if self.sessao is not None:
+                with self.sessao.atomico():
+                    # O replay restaura o modelo antes de refazer a partida (rampa e integrador dependem dele)
+                    self.sessao.registrar(FF, self.relogio(), empacotar_modelo_ff(self.ff.raio_mm, self.ff.calibrado, self.ff.rastrear))
+                    self._preparar_pid(_fps)
+                    estado = self.link.estado
+                    self.sessao.registrar(START, self.pid_start_time, empacotar_partida(_fps, estado.leituras, estado.stalls, estado.pulsos))
+            else:
+                self._preparar_pid(_fps)
+        
+        self.thread = threading.Thread(target=self._pid_loop, daemon=True)
+        self.thread.start()
+
+    def _preparar_pid(self, _fps):
+        """Zera a malha para uma partida (também usado pelo replay de sessão)."""
         self.is_running_pid = True
         self.error_sum = 0.0
         self.last_error = 0.0
         
-        # Usa o FPS passado (ex: da câmera) ou o default 18.0
-        _fps = target_fps if target_fps is not None else self.target_fps
         # No 35mm, 1 Frame = 4 furos. Logo, a velocidade física (mm/s) tem que ser multiplicada por 4!
         self.target_mm_s = _fps * (self.pitch * 4) 
         
@@ -153,16 +232,80 @@ class FilmTransportPID:
         self.smoothed_adjustment = 0.0
         
         self.last_sent_speed = None # Gatilho para o primeiro comando F
-        self.last_encoder_time = time.time()
-        self.pid_start_time = time.time() # Para calcular a curva S de aceleração
-        self.last_encoder_pulses = 0
-        self.encoder_history = []
-        
-        self.thread = threading.Thread(target=self._pid_loop, daemon=True)
-        self.thread.start()
+        self.pid_start_time = self.relogio() # Para calcular a curva S de aceleração
+        self.last_encoder_time = self.pid_start_time
+        self.last_pid_time = self.pid_start_time
+        self.encoder_history.limpar()
+        # Só leituras/stalls que chegarem depois da partida contam
+        estado = self.link.estado
+        # O firmware nunca zera o encoder: a distância parte da última contagem publicada
+        self.last_encoder_pulses = estado.pulsos if estado.pulsos is not None else 0
+        self._leituras_vistas = estado.leituras
+        self._stalls_vistos = estado.stalls
+        # Feed-forward: rampa mais curta quando a razão Hz -> mm/s foi medida neste rolo
+        self._duracao_rampa_atual = self.duracao_rampa_calibrada if self.ff.calibrado else self.duracao_rampa
+        self.ff.reiniciar_aquisicao()
+        self._hz_placa = 0.0
+        self._hz_regime = 0.0
+        self._hz_regime_desde = self.pid_start_time
+
+    def set_target_fps(self, target_fps):
+        """Troca a meta com o PID girando (governador de captura), sem refazer a rampa de partida."""
+        with self.lock:
+            self.target_fps = target_fps
+            self.target_mm_s = target_fps * (self.pitch * 4)
+            self._registrar(TARGET, empacotar_valor(self.target_mm_s))
+
+    def calibrate_feed_forward(self, frequencias=(2000, 4000, 6000), assentamento_s=1.0, janela_s=1.5):
+        """
+        Varredura Hz -> mm/s do motor Y em malha aberta (SPEC-010, seção 7.9): em cada frequência espera
+        a rampa do firmware assentar e mede a velocidade pelo encoder numa janela. O ajuste vira o raio
+        inicial do feed-forward e libera a rampa de partida curta. Roda no leader, com o PID parado.
+        """
+        if not self.connected or self.link is None:
+            return None
+        if self.is_running_pid:
+            logging.warning("Calibração do feed-forward recusada: PID girando")
+            return None
+        pontos = []
+        pulsos_meio = None
+        for i, hz in enumerate(frequencias):
+            self.send_command(f"F {int(hz)}" if i == 0 else f"U {int(hz)}")
+            self.dormir(assentamento_s)
+            inicio = self.link.estado
+            self.dormir(janela_s)
+            fim = self.link.estado
+            if fim.t is None or inicio.t is None or fim.t <= inicio.t:
+                continue # Encoder mudo na janela: ponto descartado
+            mm = abs(fim.pulsos - inicio.pulsos) / self.encoder_ppr * self.roller_circumference
+            pontos.append((hz, mm / (fim.t - inicio.t)))
+            pulsos_meio = (inicio.pulsos + fim.pulsos) / 2.0
+        self.send_command("S")
+        self.dormir(assentamento_s)
+        resultado = self.ff.calibrar(pontos)
+        if resultado is not None and pulsos_meio is not None:
+            # O ajuste pesa mais a frequência mais alta: o carretel seguiu enrolando depois do meio dela
+            pulsos = self.link.estado.pulsos
+            self.ff.avancar(abs(pulsos - pulsos_meio) / self.encoder_ppr * self.roller_circumference)
+        if resultado is None:
+            logging.error("Calibração do feed-forward sem leituras do encoder")
+        elif resultado["desvio_linear_pct"] > 5.0:
+            logging.warning(f"Curva Hz -> mm/s fora da reta ({resultado['desvio_linear_pct']}%): patinação no rolo de tração?")
+        return resultado
+
+    def ff_stats(self):
+        return self.ff.stats()
+
+    def set_pid_rate(self, hz):
+        """Taxa do loop PID (Hz). Os filtros usam o dt real, então a dinâmica não muda com a taxa."""
+        self.agenda.definir_hz(hz)
+
+    def pid_stats(self):
+        return self.agenda.stats()
 
     def stop_pid(self):
         if self.is_running_pid:
+            self._registrar(STOP)
             self.is_running_pid = False
             if hasattr(self, 'thread') and self.thread is not None:
                 if threading.current_thread() != self.thread:
@@ -170,129 +313,165 @@ class FilmTransportPID:
             self.send_command("S")
 
     def _pid_loop(self):
-        while self.is_running_pid:
-            now = time.time()
-            dt = now - self.last_pid_time
-            if dt <= 0:
-                dt = 0.01
-                
-            with self.lock:
-                # Lê TODAS as mensagens pendentes da placa
-                latest_pulses = None
-                while self.serial.in_waiting > 0:
-                    try:
-                        line = self.serial.readline().decode('utf-8', errors='ignore').strip()
-                        if "!STALL!" in line:
-                            logging.critical(f"Emergência na placa SKR: {line}")
-                            self.is_running_pid = False
-                        elif line.startswith("E "):
-                            latest_pulses = int(line.split(" ")[1])
-                    except Exception as e:
-                        pass
-                
-                # Cálculo da Distância (Dead-Reckoning) a cada tick
-                if latest_pulses is not None:
-                    delta_p_tick = latest_pulses - self.last_encoder_pulses
-                    dist_tick = (delta_p_tick / self.encoder_ppr) * self.roller_circumference
-                    self.encoder_distance_accumulated += abs(dist_tick)
-                    
-                    self.last_encoder_pulses = latest_pulses
-                    self.last_encoder_time = now
-                    
-                    # Janela Deslizante de Velocidade (Anti-Jitter da USB do Windows)
-                    self.encoder_history.append((now, latest_pulses))
-                    # Mantém apenas os últimos 500ms de histórico para uma janela mais estável
-                    while len(self.encoder_history) > 1 and (now - self.encoder_history[0][0]) > 0.5:
-                        self.encoder_history.pop(0)
-                        
-                    if len(self.encoder_history) >= 2:
-                        old_time, old_pulses = self.encoder_history[0]
-                        window_dt = now - old_time
-                        if window_dt > 0.1: # Pelo menos 100ms para estabilidade
-                            delta_p_win = latest_pulses - old_pulses
-                            dist_win = (delta_p_win / self.encoder_ppr) * self.roller_circumference
-                            measured_mm_s = abs(dist_win / window_dt)
-                            # Suaviza a leitura de velocidade via EMA para mitigar o jitter da USB
-                            if self.current_mm_s == 0.0:
-                                self.current_mm_s = measured_mm_s
-                            else:
-                                self.current_mm_s = (self.current_mm_s * 0.7) + (measured_mm_s * 0.3)
-
-                # Se passou muito tempo sem pulso novo, o filme parou
-                if (time.time() - self.last_encoder_time) > 0.5:
-                    self.current_mm_s = 0.0
-                    self.encoder_history.clear()
-                
-                # --- Aceleração em Curva S (Smoothstep) ---
-                # Garante que o filme arranque suavemente e atinja a velocidade final sem trancos
-                tempo_decorrido = now - self.pid_start_time
-                duracao_rampa = 3.0 # 3 Segundos para atingir velocidade final
-                
-                if tempo_decorrido < duracao_rampa:
-                    t = tempo_decorrido / duracao_rampa
-                    s_curve = t * t * (3.0 - 2.0 * t) # Fórmula matemática do Smoothstep
-                    self.ramped_target = self.target_mm_s * s_curve
+        self.agenda.reiniciar()
+        sessao_da_execucao = self.sessao
+        try:
+            while self.is_running_pid:
+                now = self.relogio()
+                sessao = self.sessao
+                if sessao is None:
+                    # Último estado publicado pela thread serial (troca de referência, sem I/O aqui)
+                    estado = self.link.estado
+                    with self.lock:
+                        continuar = self._pid_tick(now, estado)
                 else:
-                    self.ramped_target = self.target_mm_s
-
-                # Injeta a compensação do PLL (Phase-Locked Loop) se a rampa já completou a maior parte
-                if tempo_decorrido > 1.0: # Dá 1 segundo pro motor estabilizar o arranque antes de plugar a fase
-                    phase_correction = self.Kp_phase * self.phase_error_mm
-                    # Limitar a correção de fase para não dar solavancos extremos
-                    phase_correction = max(-self.target_mm_s * 0.2, min(self.target_mm_s * 0.2, phase_correction))
-                    self.ramped_target += phase_correction
-                
-                error = self.ramped_target - self.current_mm_s
-                
-                self.error_sum += error * dt
-                # Limite anti-windup (Aumentado absurdamente para suportar altas velocidades se o FF errar)
-                self.error_sum = max(-15000, min(15000, self.error_sum))
-                
-                # FEED-FORWARD: Multiplicador ajustado para a velocidade real.
-                # ~9000 Hz gera ~456 mm/s num núcleo médio de carretel. Multiplicador ~ 20.0
-                feed_forward = self.ramped_target * 20.0
-                
-                # Equação PID baseada no erro de Velocidade Linear
-                raw_adjustment = feed_forward + (self.Kp * error) + (self.Ki * self.error_sum)
-                
-                # Filtro na saída ultra pesado (90% do valor anterior) para planificar a curva
-                self.smoothed_adjustment = (self.smoothed_adjustment * 0.9) + (raw_adjustment * 0.1)
-                
-                self.last_error = error
-                self.last_pid_time = now
-                # Calcula as novas velocidades
-                new_speed_y = int(self.smoothed_adjustment)
-                
-                # O limite máximo subiu para 15000 Hz, pois 24fps reais exigem quase 10000 Hz no motor
-                new_speed_y = max(100, min(15000, new_speed_y))
-                
-                # === SLIP DETECTION (E-STOP) ===
-                # Se a velocidade exigida for alta (>2000Hz) mas o encoder estiver marcando
-                # 0 de velocidade real por mais de 1.0 segundo contínuo, a fita arrebentou ou escorregou!
-                if new_speed_y > 2000 and self.current_mm_s < 5.0:
-                    if not hasattr(self, 'slip_timer'):
-                        self.slip_timer = now
-                    elif (now - self.slip_timer) > 1.0:
-                        print(f"\n[E-STOP] ALARME CRITICO! Filme arrebentou ou patinou no encoder! Parada de Emergência acionada!\n")
-                        self.send_command("S") # Manda comando absoluto de parada para a SKR
-                        self.stop()
-                        self.stop_pid()
-                        return # Aborta a thread do PID imediatamente
+                    # Com log: estado lido e tick gravado juntos, depois das linhas que o formaram
+                    with self.lock, sessao.atomico():
+                        estado = self.link.estado
+                        sessao.registrar(TICK, now, empacotar_contadores(estado.leituras, estado.stalls))
+                        continuar = self._pid_tick(now, estado)
+                if not continuar:
+                    return
+                self.agenda.esperar() # Próximo prazo do loop (50 Hz por padrão, --pid-hz)
+        finally:
+            if self.sessao is sessao_da_execucao:
+                self._fechar_sessao()
+
+    def _pid_tick(self, now, estado):
+        """Um passo da malha no instante `now` com o último `EncoderState` (chamado com `self.lock`)."""
+        dt = now - self.last_pid_time
+        if dt <= 0:
+            dt = 0.01
+            
+        # Modelo da rampa do firmware: onde a frequência do Y está de fato
+        if self.last_sent_speed is not None:
+            passo = self.RAMPA_FIRMWARE_HZ_S * dt
+            self._hz_placa = max(self._hz_placa - passo, min(self._hz_placa + passo, self.last_sent_speed))
+        if abs(self._hz_placa - self._hz_regime) > 0.02 * max(self._hz_regime, 1.0):
+            self._hz_regime = self._hz_placa
+            self._hz_regime_desde = now
+        
+        latest_pulses = None
+        mm_tick = 0.0
+        if estado.stalls != self._stalls_vistos:
+            self._stalls_vistos = estado.stalls
+            logging.critical(f"Emergência na placa SKR: {estado.ultima_linha_stall}")
+            self.is_running_pid = False
+        if estado.leituras != self._leituras_vistas:
+            self._leituras_vistas = estado.leituras
+            latest_pulses = estado.pulsos
+        
+        # Cálculo da Distância (Dead-Reckoning) a cada tick
+        if latest_pulses is not None:
+            delta_p_tick = latest_pulses - self.last_encoder_pulses
+            dist_tick = (delta_p_tick / self.encoder_ppr) * self.roller_circumference
+            self.encoder_distance_accumulated += abs(dist_tick)
+            self.ff.avancar(abs(dist_tick)) # Cada volta enrolada engrossa o carretel
+            mm_tick = abs(dist_tick)
+            
+            self.last_encoder_pulses = latest_pulses
+            # Horário de chegada da linha na thread serial (monotônico), não o do tick
+            dt_amostra = estado.t - self.last_encoder_time
+            self.last_encoder_time = estado.t
+            
+            # Janela Deslizante de Velocidade (Anti-Jitter da USB do Windows): últimos 500ms, pelo menos 100ms
+            self.encoder_history.adicionar(estado.t, latest_pulses)
+            pulsos_s = self.encoder_history.pulsos_por_s()
+            if pulsos_s is not None:
+                measured_mm_s = abs((pulsos_s / self.encoder_ppr) * self.roller_circumference)
+                # Em regime a razão medida corrige o raio do carretel (janela inteira com o Hz parado)
+                if now - self._hz_regime_desde > self.REGIME_S:
+                    self.ff.observar(dt_amostra, self._hz_placa, measured_mm_s)
+                # Suaviza a leitura de velocidade via EMA para mitigar o jitter da USB
+                if self.current_mm_s == 0.0:
+                    self.current_mm_s = measured_mm_s
                 else:
-                    self.slip_timer = now # Reseta o timer de segurança se tudo estiver normal
-                # O comando "F" bloqueava a placa por 5ms (UART para o driverX). 
-                # Agora usamos o comando "U" (Update) recém criado no C++ para setar o target de forma imediata!
-                # O primeiro comando DEVE ser F para o firmware C++ ativar o driver e is_moving=true
-                if self.last_sent_speed is None:
-                    cmd = f"F {new_speed_y}"
-                    self.send_command(cmd)
-                    self.last_sent_speed = new_speed_y
-                elif abs(new_speed_y - self.last_sent_speed) > 15:
-                    cmd = f"U {new_speed_y}"
-                    self.send_command(cmd)
-                    self.last_sent_speed = new_speed_y
-                    
-                    # Print de telemetria apenas quando houver atualização real para a placa
-                    print(f"[PID] Tgt: {self.ramped_target:.1f} | Cur: {self.current_mm_s:.1f} | Err: {error:.1f} | Spd_Y: {new_speed_y}")
+                    self.current_mm_s += alfa_ema(dt_amostra, self.tau_velocidade) * (measured_mm_s - self.current_mm_s)
+
+        # Sem calibração o raio de partida é um palpite: filme / passos desde a partida fixa o raio, e o
+        # integrador (que compensava o palpite) recomeça do zero
+        passos_sem_leitura = self._hz_placa * (now - estado.t) if latest_pulses is not None else 0.0
+        if self.ff.adquirir(mm_tick, self._hz_placa * dt, passos_sem_leitura):
+            self.error_sum = 0.0
+
+        # Se passou muito tempo sem pulso novo, o filme parou
+        if (now - self.last_encoder_time) > 0.5:
+            self.current_mm_s = 0.0
+            self.encoder_history.limpar()
+        
+        # --- Aceleração em Curva S (Smoothstep) ---
+        # Garante que o filme arranque suavemente e atinja a velocidade final sem trancos
+        tempo_decorrido = now - self.pid_start_time
+        duracao_rampa = self._duracao_rampa_atual # 3 Segundos (1.5 com feed-forward calibrado) para atingir velocidade final
+        
+        if tempo_decorrido < duracao_rampa:
+            t = tempo_decorrido / duracao_rampa
+            s_curve = t * t * (3.0 - 2.0 * t) # Fórmula matemática do Smoothstep
+            self.ramped_target = self.target_mm_s * s_curve
+        else:
+            self.ramped_target = self.target_mm_s
+
+        # Injeta a compensação do PLL (Phase-Locked Loop) se a rampa já completou a maior parte
+        if tempo_decorrido > 1.0: # Dá 1 segundo pro motor estabilizar o arranque antes de plugar a fase
+            phase_correction = self.Kp_phase * self.phase_error_mm
+            # Limitar a correção de fase para não dar solavancos extremos
+            phase_correction = max(-self.target_mm_s * 0.2, min(self.target_mm_s * 0.2, phase_correction))
+            self.ramped_target += phase_correction
+        
+        error = self.ramped_target - self.current_mm_s
+        
+        # Com o feed-forward calibrado o atraso da rampa do firmware não é erro de modelo: o integrador só
+        # acumula depois da rampa de partida (senão carrega o atraso e sobra sobressinal no fim dela)
+        if not (self.ff.calibrado and tempo_decorrido < duracao_rampa):
+            self.error_sum += error * dt
+        # Limite anti-windup (Aumentado absurdamente para suportar altas velocidades se o FF errar)
+        self.error_sum = max(-15000, min(15000, self.error_sum))
+        
+        # FEED-FORWARD: Hz que o carretel de recolhimento precisa no raio atual para a meta.
+        # Sem calibração começa em 20 Hz por mm/s (~9000 Hz geram ~456 mm/s num núcleo médio de carretel)
+        feed_forward = self.ff.hz_para(self.ramped_target)
+        
+        # Equação PID baseada no erro de Velocidade Linear
+        raw_adjustment = feed_forward + (self.Kp * error) + (self.Ki * self.error_sum)
+        
+        # Filtro na saída ultra pesado (90% do valor anterior a 20 Hz) para planificar a curva
+        self.smoothed_adjustment += alfa_ema(dt, self.tau_saida) * (raw_adjustment - self.smoothed_adjustment)
+        
+        self.last_error = error
+        self.last_pid_time = now
+        # Calcula as novas velocidades
+        new_speed_y = int(self.smoothed_adjustment)
+        
+        # O limite máximo subiu para 15000 Hz, pois 24fps reais exigem quase 10000 Hz no motor
+        new_speed_y = max(100, min(15000, new_speed_y))
+        
+        # === SLIP DETECTION (E-STOP) ===
+        # Se a velocidade exigida for alta (>2000Hz) mas o encoder estiver marcando
+        # 0 de velocidade real por mais de 1.0 segundo contínuo, a fita arrebentou ou escorregou!
+        if new_speed_y > 2000 and self.current_mm_s < 5.0:
+            if not hasattr(self, 'slip_timer'):
+                self.slip_timer = now
+            elif (now - self.slip_timer) > 1.0:
+                if self.imprimir_telemetria: print(f"\n[E-STOP] ALARME CRITICO! Filme arrebentou ou patinou no encoder! Parada de Emergência acionada!\n")
+                self._registrar(ESTOP)
+                self.send_command("S") # Manda comando absoluto de parada para a SKR
+                self.stop()
+                self.stop_pid()
+                return False # Aborta a thread do PID imediatamente
+        else:
+            self.slip_timer = now # Reseta o timer de segurança se tudo estiver normal
+        # O comando "F" bloqueava a placa por 5ms (UART para o driverX). 
+        # Agora usamos o comando "U" (Update) recém criado no C++ para setar o target de forma imediata!
+        # O primeiro comando DEVE ser F para o firmware C++ ativar o driver e is_moving=true
+        if self.last_sent_speed is None:
+            cmd = f"F {new_speed_y}"
+            self.send_command(cmd)
+            self.last_sent_speed = new_speed_y
+        elif abs(new_speed_y - self.last_sent_speed) > 15:
+            cmd = f"U {new_speed_y}"
+            self.send_command(cmd)
+            self.last_sent_speed = new_speed_y
             
-            time.sleep(0.05) # 20Hz update rate para os motores
+            # Print de telemetria apenas quando houver atualização real para a placa
+            if self.imprimir_telemetria: print(f"[PID] Tgt: {self.ramped_target:.1f} | Cur: {self.current_mm_s:.1f} | Err: {error:.1f} | Spd_Y: {new_speed_y}")
+        return True
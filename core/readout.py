@@ -0,0 +1,136 @@
+import time
+
+from cameras.readout import ReadoutWindow
+
+
+def _alinhar_para_baixo(v, passo):
+    return (int(v) // passo) * passo
+
+
+def _alinhar_para_cima(v, passo):
+    return -(-int(v) // passo) * passo
+
+
+def regiao_gravacao(fx, fy, frame_w, frame_h, crop_w, crop_h, margem):
+    """
+    Retângulo (x1, y1, x2, y2) gravado: o crop centrado em (fx, fy) expandido pela margem de overscan.
+    SPEC-002: origem em coordenadas pares para preservar a fase da malha Bayer.
+    """
+    x1 = _alinhar_para_baixo(max(0, int(fx - (crop_w // 2)) - margem), 2)
+    y1 = _alinhar_para_baixo(max(0, int(fy - (crop_h // 2)) - margem), 2)
+    x2 = min(frame_w, x1 + crop_w + 2 * margem)
+    y2 = min(frame_h, y1 + crop_h + 2 * margem)
+    return x1, y1, x2, y2
+
+
+class ReadoutProfiles:
+    """
+    Perfis de leitura do sensor por modo de operação, aplicados pelo provedor sem reiniciar o app.
+
+      - `base`: a janela de partida (ocioso);
+      - `record`: janela ajustada ao retângulo que contém ROI, pista de áudio e crop + overscan em
+        toda a janela de gatilho (`ajustar_gravacao`), sem decimação: menos banda, mesmos pixels;
+      - `playback`: janela base com decimação (PLL de projeção não precisa de resolução);
+      - `calibrate`: janela base sem decimação (a linha de pitch é desenhada no quadro inteiro).
+
+    A troca roda na thread de aquisição entre duas leituras (`CaptureThread.set_readout`), então todo
+    `Frame` lido depois dela carrega a nova janela em `Frame.readout` e os que já estão no anel
+    mantêm a antiga. O provedor devolve a geometria que o hardware aceitou (incrementos de
+    largura/offset); se ele não tem janela configurável (`set_readout` devolve None) só o FPS muda
+    e a janela continua a base.
+    """
+
+    def __init__(self, provider, base_w, base_h, offset_x=0, offset_y=0, captura=None,
+                 playback_decimation=2, alinhamento_x=16, alinhamento_y=2):
+        self.provider = provider
+        self.captura = captura
+        self.offset_x = int(offset_x)
+        self.offset_y = int(offset_y)
+        self.alinhamento_x = max(2, int(alinhamento_x))
+        self.alinhamento_y = max(2, int(alinhamento_y))
+        self.base = ReadoutWindow("base", 0, 0, base_w, base_h)
+        self.perfis = {
+            "base": self.base,
+            "record": self.base.copia(name="record"),
+            "playback": self.base.copia(name="playback", decimation=playback_decimation),
+            "calibrate": self.base.copia(name="calibrate"),
+        }
+        self.ativa = self.base
+        self.trocas = 0
+        self.falhas = 0
+        self.ms_ultima_troca = 0.0
+
+    def ajustar_gravacao(self, roi, audio_x, audio_w, linha_gatilho, margem_gatilho,
+                         offset_crop_x, offset_crop_y, crop_w, crop_h, overscan):
+        """
+        Perfil `record`: menor janela (alinhada, dentro da base) que contém a ROI, a pista de áudio e
+        o crop gravado (com overscan) para qualquer furo dentro da janela de gatilho.
+        """
+        rx, ry, rw, rh = roi
+        cx = rx + rw / 2.0 + offset_crop_x
+        cy_min = ry + linha_gatilho - margem_gatilho + offset_crop_y
+        cy_max = ry + linha_gatilho + margem_gatilho + offset_crop_y
+        x1 = min(rx, audio_x, cx - crop_w / 2.0 - overscan)
+        x2 = max(rx + rw, audio_x + audio_w, cx + crop_w / 2.0 + overscan)
+        y1 = min(ry, cy_min - crop_h / 2.0 - overscan)
+        y2 = max(ry + rh, cy_max + crop_h / 2.0 + overscan)
+
+        x1 = max(0, _alinhar_para_baixo(x1, self.alinhamento_x))
+        y1 = max(0, _alinhar_para_baixo(y1, self.alinhamento_y))
+        x2 = min(self.base.width, _alinhar_para_cima(x2, self.alinhamento_x))
+        y2 = min(self.base.height, _alinhar_para_cima(y2, self.alinhamento_y))
+        self.perfis["record"] = ReadoutWindow("record", x1, y1, x2 - x1, y2 - y1, 1, self.perfis["record"].fps)
+        return self.perfis["record"]
+
+    def definir(self, nome, **campos):
+        """Altera (ou cria) um perfil: x, y, width, height, decimation, fps."""
+        self.perfis[nome] = self.perfis.get(nome, self.base).copia(name=nome, **campos)
+        return self.perfis[nome]
+
+    def aplicar(self, nome, fps=None):
+        """Troca a leitura do sensor para o perfil `nome` e devolve a janela que o provedor aceitou."""
+        janela = self.perfis[nome]
+        if fps is not None:
+            janela = janela.copia(fps=fps)
+        t0 = time.perf_counter()
+
+        def trocar():
+            try:
+                real = self.provider.set_readout(janela.width, janela.height, self.offset_x + janela.x,
+                                                 self.offset_y + janela.y, janela.decimation, janela.fps)
+            except Exception as e:
+                print(f"[READOUT] Falha ao aplicar o perfil {nome}: {e}")
+                self.falhas += 1
+                real = None
+            if real is None:
+                # Provedor sem janela configurável: a leitura continua a base, só o FPS acompanha o modo
+                if janela.fps: self.provider.set_fps(janela.fps)
+                return self.base.copia(name=nome, fps=janela.fps)
+            return ReadoutWindow(nome, real["offset_x"] - self.offset_x, real["offset_y"] - self.offset_y,
+                                 real["width"], real["height"], real.get("decimation", 1), janela.fps)
+
+        aplicada = self.captura.set_readout(trocar) if self.captura is not None else trocar()
+        if aplicada is None:
+            print(f"[READOUT] Perfil {nome} não foi aplicado a tempo; a leitura continua em {self.ativa.name}.")
+            self.falhas += 1
+            return self.ativa
+        self.ativa = aplicada
+        self.trocas += 1
+        self.ms_ultima_troca = (time.perf_counter() - t0) * 1000.0
+        w, h = aplicada.frame_size
+        print(f"[READOUT] Perfil {nome}: {w}x{h} (janela {aplicada.width}x{aplicada.height} em +{aplicada.x}+{aplicada.y}, "
+              f"decimação {aplicada.decimation}) em {self.ms_ultima_troca:.0f} ms")
+        return aplicada
+
+    def stats(self):
+        w, h = self.ativa.frame_size
+        return {
+            "ativo": self.ativa.name,
+            "janela": self.ativa.as_dict(),
+            "quadro": [w, h],
+            "banda_relativa": round(w * h / float(self.base.width * self.base.height), 3),
+            "trocas": self.trocas,
+            "falhas": self.falhas,
+            "ms_ultima_troca": round(self.ms_ultima_troca, 1),
+            "perfis": {nome: p.as_dict() for nome, p in self.perfis.items()},
+        }
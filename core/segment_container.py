@@ -0,0 +1,317 @@
+import mmap
+import os
+import re
+import struct
+import threading
+
+import cv2
+import numpy as np
+
+
+# --- Layout do segmento (.mseg) ---
+# [cabeçalho][registro 0][registro 1]...[índice][rodapé]
+#   cabeçalho: magic, versão, reservado, codec ("jpg\0" / "png\0")
+#   registro : tag, frame_index, tamanho, seguido dos bytes codificados do quadro
+#   índice   : uma entrada (frame_index, offset do payload, tamanho) por registro
+#   rodapé   : offset do índice, número de entradas, magic do índice
+MAGIC_SEGMENTO = b"MSEG"
+MAGIC_REGISTRO = b"FRM1"
+MAGIC_INDICE = b"MIDX"
+VERSAO_SEGMENTO = 1
+EXTENSAO_SEGMENTO = ".mseg"
+
+_CABECALHO = struct.Struct("<4sHH4s")
+_REGISTRO = struct.Struct("<4sqI")
+_ENTRADA_INDICE = struct.Struct("<qQI")
+_RODAPE = struct.Struct("<QI4s")
+
+_PADRAO_NOME = re.compile(r"^miniola_seg_(?P<sid>.+)_(?P<n>\d{4})\.mseg$")
+
+
+def nome_segmento(session_id, numero):
+    return f"miniola_seg_{session_id}_{numero:04d}{EXTENSAO_SEGMENTO}"
+
+
+def _codec_bytes(codec):
+    return codec.lower().lstrip(".").encode("ascii")[:4].ljust(4, b"\0")
+
+
+class SegmentWriter:
+    """
+    Escreve UM segmento append-only. Cada quadro vira um registro autodescritivo
+    (tag + frame_index + tamanho) e o índice completo é gravado no rodapé em `close()`.
+    Se o processo cair antes do rodapé, o `SegmentReader` reconstrói o índice varrendo os registros.
+    """
+
+    def __init__(self, path, codec="jpg"):
+        self.path = str(path)
+        self.codec = codec.lower().lstrip(".")
+        self._fp = open(self.path, "wb")
+        self._fp.write(_CABECALHO.pack(MAGIC_SEGMENTO, VERSAO_SEGMENTO, 0, _codec_bytes(self.codec)))
+        self._offset = _CABECALHO.size
+        self._indice = []
+
+    def __len__(self):
+        return len(self._indice)
+
+    @property
+    def bytes_escritos(self):
+        return self._offset
+
+    def append(self, frame_index, data):
+        data = memoryview(data).cast("B")
+        self._fp.write(_REGISTRO.pack(MAGIC_REGISTRO, int(frame_index), data.nbytes))
+        self._fp.write(data)
+        # Flush por registro: leitores (dashboard, /status) enxergam o quadro assim que ele é anexado
+        self._fp.flush()
+        self._indice.append((int(frame_index), self._offset + _REGISTRO.size, data.nbytes))
+        self._offset += _REGISTRO.size + data.nbytes
+
+    def close(self):
+        if self._fp is None: return
+        offset_indice = self._offset
+        for entrada in self._indice:
+            self._fp.write(_ENTRADA_INDICE.pack(*entrada))
+        self._fp.write(_RODAPE.pack(offset_indice, len(self._indice), MAGIC_INDICE))
+        self._fp.close()
+        self._fp = None
+
+
+class SegmentRecorder:
+    """
+    Grava uma sessão como sequência de segmentos de até `frames_por_segmento` quadros,
+    rotacionando o arquivo automaticamente (`miniola_seg_{sid}_{n:04d}.mseg`).
+    """
+
+    def __init__(self, directory, session_id, frames_por_segmento=2000):
+        self.directory = str(directory)
+        self.session_id = session_id
+        self.frames_por_segmento = max(1, int(frames_por_segmento))
+        self.total = 0
+        self._numero = 0
+        self._atual = None
+
+    def append(self, frame_index, data, codec="jpg"):
+        if self._atual is not None and len(self._atual) >= self.frames_por_segmento:
+            self._atual.close()
+            self._atual = None
+        if self._atual is None:
+            path = os.path.join(self.directory, nome_segmento(self.session_id, self._numero))
+            self._atual = SegmentWriter(path, codec)
+            self._numero += 1
+        self._atual.append(frame_index, data)
+        self.total += 1
+
+    def close(self):
+        if self._atual is not None:
+            self._atual.close()
+            self._atual = None
+
+
+class SegmentReader:
+    """
+    Leitura de um segmento via mmap. Com rodapé válido o índice vem pronto (O(1) por quadro);
+    sem rodapé (segmento ainda aberto ou gravação interrompida) o índice é reconstruído varrendo
+    os cabeçalhos dos registros, de forma incremental a cada `refresh()`.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.codec = "jpg"
+        self.finalizado = False
+        self.indice = {}
+        self._mm = None
+        self._tamanho = 0
+        self._pos_varredura = _CABECALHO.size
+        self.refresh()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.indice)
+
+    def _mapear(self, tamanho):
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # Ainda há views do mapeamento antigo em uso; o GC libera quando soltarem
+        self._mm = None
+        self._tamanho = tamanho
+        if tamanho == 0: return
+        with open(self.path, "rb") as fp:
+            self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def refresh(self):
+        """Relê o segmento se ele cresceu desde a última leitura. Retorna True se houve mudança."""
+        if self.finalizado: return False
+        tamanho = os.path.getsize(self.path)
+        if tamanho == self._tamanho: return False
+        self._mapear(tamanho)
+        if tamanho < _CABECALHO.size: return True
+
+        magic, versao, _, codec = _CABECALHO.unpack_from(self._mm, 0)
+        if magic != MAGIC_SEGMENTO:
+            raise ValueError(f"{self.path} não é um segmento Miniola")
+        if versao > VERSAO_SEGMENTO:
+            raise ValueError(f"{self.path}: versão de segmento {versao} não suportada")
+        self.codec = codec.rstrip(b"\0").decode("ascii") or "jpg"
+
+        if not self._ler_rodape():
+            self._varrer_registros()
+        return True
+
+    def _ler_rodape(self):
+        if self._tamanho < _CABECALHO.size + _RODAPE.size: return False
+        offset_indice, n, magic = _RODAPE.unpack_from(self._mm, self._tamanho - _RODAPE.size)
+        if magic != MAGIC_INDICE: return False
+        if offset_indice + n * _ENTRADA_INDICE.size + _RODAPE.size != self._tamanho: return False
+
+        indice = {}
+        for i in range(n):
+            frame_index, offset, tamanho = _ENTRADA_INDICE.unpack_from(self._mm, offset_indice + i * _ENTRADA_INDICE.size)
+            indice[frame_index] = (offset, tamanho)
+        self.indice = indice
+        self.finalizado = True
+        return True
+
+    def _varrer_registros(self):
+        # Recuperação: segue a cadeia de registros e para no primeiro registro truncado ou inválido
+        pos = self._pos_varredura
+        while pos + _REGISTRO.size <= self._tamanho:
+            tag, frame_index, tamanho = _REGISTRO.unpack_from(self._mm, pos)
+            fim = pos + _REGISTRO.size + tamanho
+            if tag != MAGIC_REGISTRO or fim > self._tamanho: break
+            self.indice[frame_index] = (pos + _REGISTRO.size, tamanho)
+            pos = fim
+        self._pos_varredura = pos
+
+    def frame_indices(self):
+        return sorted(self.indice)
+
+    def read(self, frame_index):
+        """Bytes codificados do quadro (memoryview sobre o mmap, sem cópia)."""
+        offset, tamanho = self.indice[frame_index]
+        return memoryview(self._mm)[offset:offset + tamanho]
+
+    def decode(self, frame_index, flags=None):
+        buf = np.frombuffer(self.read(frame_index), dtype=np.uint8)
+        return cv2.imdecode(buf, cv2.IMREAD_COLOR if flags is None else flags)
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+class SegmentFrame:
+    """Referência leve para um quadro dentro de um `SegmentArchive` (substitui o Path por quadro)."""
+
+    __slots__ = ("archive", "index")
+
+    def __init__(self, archive, index):
+        self.archive = archive
+        self.index = index
+
+    @property
+    def name(self):
+        return f"miniola_{self.index:06d}.{self.archive.codec_of(self.index)}"
+
+    def read(self):
+        return self.archive.read(self.index)
+
+    def decode(self, flags=None):
+        return self.archive.decode(self.index, flags)
+
+    def __repr__(self):
+        return f"SegmentFrame({self.index})"
+
+
+class SegmentArchive:
+    """
+    Visão unificada de todos os segmentos de um diretório de captura: o índice de cada
+    segmento é lido uma vez (rodapé) e segmentos ainda abertos são atualizados incrementalmente.
+    Thread-safe para uso concorrente pelas rotas do painel web.
+    """
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self._leitores = {}
+        self._mapa = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def has_segments(directory):
+        try:
+            return any(n.endswith(EXTENSAO_SEGMENTO) for n in os.listdir(directory))
+        except FileNotFoundError:
+            return False
+
+    def refresh(self):
+        with self._lock:
+            try:
+                nomes = sorted(n for n in os.listdir(self.directory) if _PADRAO_NOME.match(n))
+            except FileNotFoundError:
+                nomes = []
+
+            mudou = False
+            for nome in list(self._leitores):
+                if nome not in nomes:
+                    self._leitores.pop(nome).close()
+                    mudou = True
+            for nome in nomes:
+                leitor = self._leitores.get(nome)
+                try:
+                    if leitor is None:
+                        self._leitores[nome] = SegmentReader(os.path.join(self.directory, nome))
+                        mudou = True
+                    elif leitor.refresh():
+                        mudou = True
+                except (OSError, ValueError) as e:
+                    print(f"[SEGMENTO] Ignorando {nome}: {e}")
+
+            if mudou:
+                # Em caso de índice repetido entre segmentos, vale o segmento mais novo
+                mapa = {}
+                for nome in nomes:
+                    leitor = self._leitores.get(nome)
+                    if leitor is None: continue
+                    for idx in leitor.indice:
+                        mapa[idx] = leitor
+                self._mapa = mapa
+        return self
+
+    def count(self):
+        return len(self._mapa)
+
+    def frame_indices(self):
+        return sorted(self._mapa)
+
+    def frames(self):
+        return [SegmentFrame(self, idx) for idx in self.frame_indices()]
+
+    def codec_of(self, frame_index):
+        return self._mapa[frame_index].codec
+
+    def read(self, frame_index):
+        return self._mapa[frame_index].read(frame_index)
+
+    def decode(self, frame_index, flags=None):
+        return self._mapa[frame_index].decode(frame_index, flags)
+
+    def close(self):
+        with self._lock:
+            for leitor in self._leitores.values():
+                leitor.close()
+            self._leitores.clear()
+            self._mapa = {}
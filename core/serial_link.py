@@ -0,0 +1,195 @@
+import threading
+import time
+import logging
+from collections import deque
+
+from core.serial_session import RX
+
+
+class EncoderState:
+    """
+    Último estado lido da SKR Pico. Imutável: a thread de I/O troca a referência inteira
+    (`SerialLink.estado`), então quem lê nunca vê um estado pela metade e não precisa de lock.
+    """
+
+    __slots__ = ("pulsos", "t", "leituras", "stalls", "ultima_linha_stall")
+
+    def __init__(self, pulsos=None, t=0.0, leituras=0, stalls=0, ultima_linha_stall=None):
+        self.pulsos = pulsos
+        self.t = t
+        self.leituras = leituras
+        self.stalls = stalls
+        self.ultima_linha_stall = ultima_linha_stall
+
+
+# Comandos de velocidade que um comando mais novo torna obsoletos antes de chegarem à placa
+_MOVIMENTO = ("F", "R", "U", "S")
+_SUBSTITUIVEIS = ("U", "Z", "L")
+
+
+class SerialLink:
+    """
+    Única thread que conversa com a porta serial da SKR Pico (SPEC-010).
+
+    Leitura: as linhas `E <pulsos>` (a cada 50 ms) e `!STALL!` viram um novo `EncoderState` em
+    `estado`, trocado por referência (sem lock para quem lê: o PID, o dead-reckoning da visão).
+    Escrita: `enviar()` só enfileira e volta na hora; a thread escreve na ordem de chegada. Um `U`
+    (atualização de velocidade) substitui o `U` ainda não enviado, e `F`/`R`/`S` descartam os `U`
+    pendentes; `Z` e `L` substituem o pendente da mesma letra. `F`, `R` e `S` nunca são descartados.
+    `stats()` traz profundidade da fila, coalescências e latência de escrita.
+    """
+
+    def __init__(self, porta, espera_s=0.005, relogio=time.monotonic):
+        self.porta = porta
+        self.relogio = relogio  # Horário de chegada no `EncoderState` (o do PID)
+        self.espera_s = espera_s
+        self.estado = EncoderState()
+        self._fila = deque()
+        self._lock_fila = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread = None
+        self._rodando = False
+        self._resto = b""
+        self.gravador = None  # SessionRecorder da sessão do PID (SPEC-010, seção 7.8)
+
+        self.enfileirados = 0
+        self.escritos = 0
+        self.coalescidos = 0
+        self.erros_escrita = 0
+        self.fila_max = 0
+        self.linhas = 0
+        self.linhas_ignoradas = 0
+        self.latencia_ultima_ms = 0.0
+        self.latencia_max_ms = 0.0
+        self._latencia_soma_ms = 0.0
+        self.espera_fila_max_ms = 0.0
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive(): return self
+        self._rodando = True
+        self._thread = threading.Thread(target=self._loop, name="miniola-serial", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        self._rodando = False
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._escrever_pendentes()  # Um "S" enfileirado no desligamento ainda chega à placa
+
+    def enviar(self, cmd):
+        """Enfileira `cmd` (sem bloquear) e devolve a profundidade da fila."""
+        letra = cmd.split(" ", 1)[0]
+        with self._lock_fila:
+            if letra in _SUBSTITUIVEIS:
+                # Só o pendente mais recente da mesma letra, e sem movimento depois dele (ordem preservada)
+                for i in range(len(self._fila) - 1, -1, -1):
+                    pendente = self._fila[i][0].split(" ", 1)[0]
+                    if pendente == letra:
+                        del self._fila[i]
+                        self.coalescidos += 1
+                        break
+                    if letra == "U" and pendente in _MOVIMENTO:
+                        break
+            elif letra in ("F", "R", "S"):
+                antes = len(self._fila)
+                self._fila = deque(c for c in self._fila if c[0].split(" ", 1)[0] != "U")
+                self.coalescidos += antes - len(self._fila)
+            self._fila.append((cmd, time.monotonic()))
+            self.enfileirados += 1
+            profundidade = len(self._fila)
+            if profundidade > self.fila_max: self.fila_max = profundidade
+        self._acordar.set()
+        return profundidade
+
+    def _loop(self):
+        while self._rodando:
+            self._escrever_pendentes()
+            try:
+                n = self.porta.in_waiting
+                if n:
+                    self._processar(self.porta.read(n))
+                    continue
+            except Exception as e:
+                logging.error(f"Erro de leitura serial: {e}")
+            self._acordar.wait(self.espera_s)
+            self._acordar.clear()
+
+    def _escrever_pendentes(self):
+        while True:
+            with self._lock_fila:
+                if not self._fila: return
+                cmd, t_fila = self._fila.popleft()
+            t0 = time.monotonic()
+            try:
+                self.porta.write((cmd + '\n').encode('utf-8'))
+                self.escritos += 1
+            except Exception as e:
+                self.erros_escrita += 1
+                logging.error(f"Erro de escrita serial: {e}")
+                continue
+            agora = time.monotonic()
+            latencia = (agora - t0) * 1000.0
+            self.latencia_ultima_ms = latencia
+            self._latencia_soma_ms += latencia
+            if latencia > self.latencia_max_ms: self.latencia_max_ms = latencia
+            espera = (t0 - t_fila) * 1000.0
+            if espera > self.espera_fila_max_ms: self.espera_fila_max_ms = espera
+
+    def _processar(self, dados):
+        t = self.relogio()
+        linhas = (self._resto + dados).split(b"\n")
+        self._resto = linhas.pop()
+        gravador = self.gravador
+        if gravador is None:
+            self._publicar(t, linhas)
+            return
+        # Linhas gravadas e estado publicado juntos: o tick que consumir o estado vem depois delas no log
+        with gravador.atomico():
+            for bruta in linhas:
+                linha = bruta.strip()
+                if linha: gravador.registrar(RX, t, linha)
+            self._publicar(t, linhas)
+
+    def _publicar(self, t, linhas):
+        estado = self.estado
+        pulsos, leituras, stalls, linha_stall = estado.pulsos, estado.leituras, estado.stalls, estado.ultima_linha_stall
+        for bruta in linhas:
+            linha = bruta.decode('utf-8', errors='ignore').strip()
+            if not linha: continue
+            self.linhas += 1
+            if "!STALL!" in linha:
+                stalls += 1
+                linha_stall = linha
+            elif linha.startswith("E "):
+                try:
+                    pulsos = int(linha.split(" ")[1])
+                    leituras += 1
+                except (IndexError, ValueError):
+                    self.linhas_ignoradas += 1
+            else:
+                self.linhas_ignoradas += 1
+        if leituras != estado.leituras or stalls != estado.stalls:
+            self.estado = EncoderState(pulsos, t, leituras, stalls, linha_stall)
+
+    def stats(self):
+        with self._lock_fila:
+            profundidade = len(self._fila)
+        return {
+            "fila": profundidade,
+            "fila_max": self.fila_max,
+            "enfileirados": self.enfileirados,
+            "escritos": self.escritos,
+            "coalescidos": self.coalescidos,
+            "erros_escrita": self.erros_escrita,
+            "latencia_escrita_ms": round(self.latencia_ultima_ms, 3),
+            "latencia_escrita_media_ms": round(self._latencia_soma_ms / self.escritos, 3) if self.escritos else 0.0,
+            "latencia_escrita_max_ms": round(self.latencia_max_ms, 3),
+            "espera_fila_max_ms": round(self.espera_fila_max_ms, 3),
+            "linhas": self.linhas,
+            "linhas_ignoradas": self.linhas_ignoradas,
+            "leituras_encoder": self.estado.leituras,
+            "stalls": self.estado.stalls,
+        }
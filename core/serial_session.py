@@ -0,0 +1,237 @@
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+MAGIC = b"MINIOLA-SKR\x01"
+_CABECALHO = struct.Struct("<dBH")  # t (relógio do PID), tipo, tamanho do payload
+_CONTADORES = struct.Struct("<II")
+_VALOR = struct.Struct("<d")
+_PARTIDA = struct.Struct("<dIIq")  # fps, leituras, stalls e pulsos já publicados na partida
+_MODELO_FF = struct.Struct("<dBB")  # raio do carretel (mm), calibrado, rastrear
+
+# Tipos de registro
+RX = 0      # linha recebida da placa (bytes, sem fim de linha)
+TX = 1      # comando enviado pelo controlador (bytes)
+TICK = 2    # tick do PID: leituras e stalls do EncoderState que ele consumiu
+PHASE = 3   # erro de fase do PLL (mm)
+SYNC = 4    # sincronia óptica (zera o dead-reckoning)
+TARGET = 5  # nova meta (mm/s) com o PID girando
+START = 6   # partida do PID (fps)
+STOP = 7    # parada do PID pelo operador
+ESTOP = 8   # E-STOP do detector de slip
+FF = 9      # modelo do feed-forward na partida (vem logo antes do START)
+
+NOMES = {RX: "rx", TX: "tx", TICK: "tick", PHASE: "phase", SYNC: "sync", TARGET: "target",
+         START: "start", STOP: "stop", ESTOP: "estop", FF: "ff"}
+
+
+def empacotar_contadores(leituras, stalls):
+    return _CONTADORES.pack(leituras & 0xFFFFFFFF, stalls & 0xFFFFFFFF)
+
+
+def empacotar_valor(valor):
+    return _VALOR.pack(float(valor))
+
+
+def empacotar_partida(fps, leituras, stalls, pulsos=None):
+    return _PARTIDA.pack(float(fps), leituras & 0xFFFFFFFF, stalls & 0xFFFFFFFF, pulsos or 0)
+
+
+def desempacotar_partida(dados):
+    return _PARTIDA.unpack(dados)
+
+
+def empacotar_modelo_ff(raio_mm, calibrado, rastrear):
+    return _MODELO_FF.pack(float(raio_mm), int(bool(calibrado)), int(bool(rastrear)))
+
+
+def desempacotar_modelo_ff(dados):
+    raio_mm, calibrado, rastrear = _MODELO_FF.unpack(dados)
+    return raio_mm, bool(calibrado), bool(rastrear)
+
+
+def desempacotar_contadores(dados):
+    return _CONTADORES.unpack(dados)
+
+
+def desempacotar_valor(dados):
+    return _VALOR.unpack(dados)[0]
+
+
+class SessionRecorder:
+    """
+    Log binário de uma sessão do transporte (SPEC-010, seção 7.8): cada linha recebida, comando
+    enviado e evento do PID vira um registro `<dBH` + payload, com o tempo do relógio do PID. Um tick
+    de 50 Hz custa 19 bytes; uma hora de PID (ticks, encoder a 20 Hz e comandos) fica perto de 7 MB.
+
+    `registrar()` é chamado da thread serial, do PID e da visão. `atomico()` segura o lock do log:
+    a thread serial grava as linhas e publica o `EncoderState` dentro dele, e o PID lê o estado e grava
+    o tick dentro dele, então cada `TICK` vem depois exatamente das linhas `RX` que ele consumiu.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = open(caminho, "wb", buffering=64 * 1024)
+        self._arquivo.write(MAGIC)
+        self._lock = threading.RLock()
+        self.registros = 0
+
+    def atomico(self):
+        return self._lock
+
+    @classmethod
+    def no_diretorio(cls, diretorio, prefixo="transporte"):
+        os.makedirs(diretorio, exist_ok=True)
+        nome = f"{prefixo}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.mslog"
+        return cls(os.path.join(diretorio, nome))
+
+    def registrar(self, tipo, t, dados=b""):
+        with self._lock:
+            if self._arquivo is None: return
+            self._arquivo.write(_CABECALHO.pack(t, tipo, len(dados)))
+            if dados: self._arquivo.write(dados)
+            self.registros += 1
+
+    def fechar(self):
+        with self._lock:
+            if self._arquivo is None: return
+            self._arquivo.close()
+            self._arquivo = None
+
+
+def ler_sessao(caminho):
+    """Gera `(t, tipo, dados)` de um log; um registro truncado no fim (queda de energia) é ignorado."""
+    with open(caminho, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{caminho} não é um log de sessão do transporte")
+        while True:
+            cabecalho = f.read(_CABECALHO.size)
+            if len(cabecalho) < _CABECALHO.size: return
+            t, tipo, n = _CABECALHO.unpack(cabecalho)
+            dados = f.read(n)
+            if len(dados) < n: return
+            yield t, tipo, dados
+
+
+class _RelogioReplay:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+class _ColetorComandos:
+    """Faz o papel do `SessionRecorder` no replay: guarda só o que o controlador mandou."""
+
+    def __init__(self):
+        self.comandos = []
+
+    def registrar(self, tipo, t, dados=b""):
+        if tipo == TX: self.comandos.append((t, dados.decode("utf-8")))
+        elif tipo == ESTOP: self.comandos.append((t, "!ESTOP"))
+
+    def fechar(self):
+        pass
+
+
+class _PortaNula:
+    def write(self, dados):
+        return len(dados)
+
+
+def _saida_do_pid(comandos):
+    """Comandos que a lei de controle decide (F/U e o E-STOP); o resto vem de fora do PID."""
+    return [(t, c) for t, c in comandos if c[:1] in ("F", "U") or c == "!ESTOP"]
+
+
+def replay_sessao(caminho, ajustes=None, motor=None):
+    """
+    Reexecuta o controle de uma sessão gravada sem hardware e sem esperar: as linhas `RX` passam pelo
+    mesmo parser do `SerialLink` no tempo gravado e cada `TICK` roda o `_pid_tick` no tempo gravado.
+    Modelo do feed-forward, fase, sincronia, meta, partida e parada entram na ordem do arquivo. Com o mesmo código a saída do
+    PID (`F`/`U` e o E-STOP) é idêntica à gravada; `ajustes` (ex.: `{"Ki": 2.0}`) muda atributos do
+    controlador para medir uma lei de controle nova contra o rolo real.
+    """
+    from core.motor_controller import FilmTransportPID
+    from core.serial_link import SerialLink, EncoderState
+
+    relogio = _RelogioReplay()
+    if motor is None:
+        motor = FilmTransportPID(relogio=relogio)
+    else:
+        motor.relogio = relogio
+    for nome, valor in (ajustes or {}).items():
+        if not hasattr(motor, nome):
+            raise ValueError(f"FilmTransportPID não tem o atributo {nome}")
+        setattr(motor, nome, valor)
+    motor.imprimir_telemetria = False
+    link = motor.link = SerialLink(_PortaNula(), relogio=relogio)  # Só o parser; a fila é descartada
+    motor.connected = True
+    coletor = motor.sessao = _ColetorComandos()
+
+    gravados = []
+    ticks, inconsistentes, inicio_real, t_primeiro, t_ultimo = 0, 0, time.perf_counter(), None, None
+    for t, tipo, dados in ler_sessao(caminho):
+        if t_primeiro is None: t_primeiro = t
+        t_ultimo = t
+        relogio.t = t
+        if tipo == RX:
+            link._processar(dados + b"\n")
+        elif tipo == TX:
+            gravados.append((t, dados.decode("utf-8")))
+        elif tipo == ESTOP:
+            gravados.append((t, "!ESTOP"))
+        elif tipo == TICK:
+            if desempacotar_contadores(dados) != (link.estado.leituras, link.estado.stalls):
+                inconsistentes += 1
+            if motor.is_running_pid:
+                with motor.lock:
+                    motor._pid_tick(t, link.estado)
+                ticks += 1
+            link._fila.clear()
+        elif tipo == FF:
+            motor.ff.raio_mm, motor.ff.calibrado, motor.ff.rastrear = desempacotar_modelo_ff(dados)
+        elif tipo == START:
+            fps, leituras, stalls, pulsos = desempacotar_partida(dados)
+            # O log começa com a placa já falando: contadores e posição do encoder partem de onde o PID partiu
+            estado = link.estado
+            link.estado = EncoderState(pulsos, estado.t, leituras, stalls, estado.ultima_linha_stall)
+            motor._preparar_pid(fps)
+        elif tipo == STOP:
+            motor.is_running_pid = False
+        elif tipo == PHASE:
+            motor.phase_error_mm = desempacotar_valor(dados)
+        elif tipo == SYNC:
+            motor.encoder_distance_accumulated = 0.0
+        elif tipo == TARGET:
+            motor.target_mm_s = desempacotar_valor(dados)
+
+    esperado, obtido = _saida_do_pid(gravados), _saida_do_pid(coletor.comandos)
+    primeira = next((i for i, (a, b) in enumerate(zip(esperado, obtido)) if a[1] != b[1]), None)
+    if primeira is None and len(esperado) != len(obtido):
+        primeira = min(len(esperado), len(obtido))
+    diferencas_hz = [abs(int(a[1][2:]) - int(b[1][2:])) for a, b in zip(esperado, obtido)
+                     if a[1][:1] in ("F", "U") and b[1][:1] in ("F", "U")]
+    duracao = (t_ultimo - t_primeiro) if t_primeiro is not None else 0.0
+    real = time.perf_counter() - inicio_real
+    return {
+        "ticks": ticks,
+        "ticks_inconsistentes": inconsistentes,
+        "comandos_gravados": len(esperado),
+        "comandos_replay": len(obtido),
+        "identico": primeira is None,
+        "primeira_divergencia": None if primeira is None else {
+            "indice": primeira,
+            "gravado": esperado[primeira] if primeira < len(esperado) else None,
+            "replay": obtido[primeira] if primeira < len(obtido) else None,
+        },
+        "diferenca_max_hz": max(diferencas_hz) if diferencas_hz else 0,
+        "estop_gravado": any(c == "!ESTOP" for _, c in esperado),
+        "estop_replay": any(c == "!ESTOP" for _, c in obtido),
+        "duracao_s": round(duracao, 3),
+        "aceleracao": round(duracao / real, 1) if real > 0 else None,
+        "comandos": obtido,
+    }
@@ -0,0 +1,295 @@
+import math
+import os
+import select
+import threading
+import time
+
+
+class ScaledClock:
+    """
+    Relógio monotônico acelerado: `escala` segundos simulados por segundo real. Compartilhado pelo
+    simulador e pelo `FilmTransportPID` (`relogio`/`dormir`), o PID inteiro roda mais rápido que o
+    tempo real sem mudar nenhuma constante.
+    """
+
+    def __init__(self, escala=1.0):
+        self.escala = float(escala)
+        self._t0 = time.monotonic()
+
+    def __call__(self):
+        return (time.monotonic() - self._t0) * self.escala
+
+    def dormir(self, s):
+        time.sleep(s / self.escala)
+
+
+class SimTransportSpec:
+    """
+    Bancada simulada do `--motor-sim`, pares `chave=valor` separados por vírgula (como `--mock-film`):
+      core        raio do núcleo do carretel de recolhimento (mm, padrão 25)
+      thickness   espessura da película (mm, padrão 0.14)
+      length      comprimento do rolo (m, padrão 300)
+      wound       película já enrolada no recolhimento na partida (m, padrão 0)
+      slip        fração do avanço que o rolete do encoder não vê (0..1, padrão 0)
+      slip_at     instante simulado em que o `slip` passa a valer (s, padrão 0)
+      stall_at    instante simulado de um `!STALL!` (s, padrão nunca)
+      scale       velocidade do relógio simulado (padrão 1 = tempo real)
+    """
+
+    CAMPOS = {"core": float, "thickness": float, "length": float, "wound": float,
+              "slip": float, "slip_at": float, "stall_at": float, "scale": float}
+
+    def __init__(self, core=25.0, thickness=0.14, length=300.0, wound=0.0, slip=0.0, slip_at=0.0,
+                 stall_at=None, scale=1.0):
+        self.core = float(core)
+        self.thickness = float(thickness)
+        self.length = float(length)
+        self.wound = float(wound)
+        self.slip = min(1.0, max(0.0, float(slip)))
+        self.slip_at = float(slip_at)
+        self.stall_at = float(stall_at) if stall_at is not None else None
+        self.scale = max(0.01, float(scale))
+
+    @classmethod
+    def parse(cls, texto):
+        opcoes = {}
+        for par in (texto or "").split(","):
+            if not par.strip(): continue
+            chave, _, valor = par.partition("=")
+            chave = chave.strip()
+            if chave not in cls.CAMPOS:
+                raise ValueError(f"Chave desconhecida em --motor-sim: {chave} (válidas: {', '.join(cls.CAMPOS)})")
+            opcoes[chave] = cls.CAMPOS[chave](valor.strip())
+        return cls(**opcoes)
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.CAMPOS}
+
+
+class TransportModel:
+    """
+    Modelo físico do firmware da SKR Pico (`firmware/src/main.cpp`) e do caminho do filme, sem I/O.
+
+    - Comandos como no firmware: `F`/`R` (manual, rampa de 40 Hz a cada 10 ms), `V`/`T` (rampa de
+      10 kHz a cada 10 ms), `U` (só troca a meta do Y), `S`, `Z`, `L`. Um stall trava tudo e cala o
+      `E` até o próximo `F`/`R`/`V`/`T`, como o `safety_stop_triggered`.
+    - Motor Y (recolhimento) a `hz` passos/s, 3200 passos por volta (200 x 16 micropassos): o filme
+      anda `2 pi r` por volta, com `r` crescendo com a película enrolada
+      (`r^2 = nucleo^2 + espessura * enrolado / pi`). `R` rebobina pelo carretel de alimentação.
+    - Encoder no rolete de 26.6 mm, 2400 pulsos por volta, contagem inteira; `slip` é a fração do
+      avanço que o rolete não vê (filme patinando ou arrebentado).
+    """
+
+    PASSO_RAMPA_S = 0.010
+
+    def __init__(self, spec=None, rolete_mm=26.6, ppr=2400, passos_por_volta=3200):
+        self.spec = spec or SimTransportSpec()
+        self.rolete_mm = rolete_mm
+        self.ppr = ppr
+        self.passos_por_volta = passos_por_volta
+        self.comprimento_mm = self.spec.length * 1000.0
+        self.enrolado_mm = min(self.comprimento_mm, self.spec.wound * 1000.0)
+        self.slip = 0.0
+        self.encoder_mm = 0.0
+        self.t = 0.0
+        self._rampa = 0.0
+
+        self.alvo = {"X": 0, "Y": 0, "Z": 0}
+        self.atual = {"X": 0, "Y": 0, "Z": 0}
+        self.manual = False
+        self.parada_seguranca = False
+        self.foco_passos = 0.0
+        self.led = 0
+        self.comandos = 0
+
+    def raio_recolhimento(self):
+        return math.sqrt(self.spec.core ** 2 + self.spec.thickness * self.enrolado_mm / math.pi)
+
+    def raio_alimentacao(self):
+        resto = self.comprimento_mm - self.enrolado_mm
+        return math.sqrt(self.spec.core ** 2 + self.spec.thickness * resto / math.pi)
+
+    def pulsos(self):
+        return int(math.floor(self.encoder_mm / (math.pi * self.rolete_mm) * self.ppr))
+
+    def velocidade_filme(self):
+        """Velocidade da película (mm/s) com as velocidades atuais dos motores."""
+        if self.atual["Y"]:
+            return self.atual["Y"] / self.passos_por_volta * 2 * math.pi * self.raio_recolhimento()
+        if self.atual["X"] < 0:
+            return self.atual["X"] / self.passos_por_volta * 2 * math.pi * self.raio_alimentacao()
+        return 0.0
+
+    def comando(self, linha):
+        """Aplica uma linha do host e devolve as linhas que o firmware responderia."""
+        cmd = linha.strip()
+        if not cmd: return []
+        self.comandos += 1
+        letra = cmd[0].upper()
+        partes = cmd.split()
+        valor = lambda i, padrao: int(partes[i]) if len(partes) > i else padrao
+        try:
+            if letra == "V" and len(partes) >= 3:
+                self.alvo["X"], self.alvo["Y"] = valor(1, 0), valor(2, 0)
+                self.manual, self.parada_seguranca = False, False
+            elif letra == "T":
+                self.alvo["Y"], self.alvo["X"] = valor(1, 2000), -50
+                self.manual, self.parada_seguranca = False, False
+            elif letra == "F":
+                self.alvo["Y"], self.alvo["X"] = valor(1, 2000), 0
+                self.manual, self.parada_seguranca = True, False
+            elif letra == "R":
+                self.alvo["X"], self.alvo["Y"] = -valor(1, 2000), 0
+                self.manual, self.parada_seguranca = True, False
+            elif letra == "U":
+                self.alvo["Y"] = valor(1, 2000)
+            elif letra == "Z":
+                self.alvo["Z"] = valor(1, 0)
+            elif letra == "L":
+                self.led = max(0, min(255, valor(1, 0)))
+            elif cmd in ("S", "s"):
+                self.alvo = {"X": 0, "Y": 0, "Z": 0}
+                return ["Manobra: Parada Iniciada"]
+        except ValueError:
+            pass  # O firmware usa toInt(): lixo vira 0, aqui só ignora
+        return []
+
+    def injetar_stall(self, sg=0):
+        self.parada_seguranca = True
+        self.alvo = {"X": 0, "Y": 0, "Z": 0}
+        self.atual = {"X": 0, "Y": 0, "Z": 0}
+        return f"!STALL! EMERGENCIA Y. SG={sg}"
+
+    def passo(self, dt):
+        """Avança `dt` segundos simulados (rampa do firmware a cada 10 ms, integração do filme)."""
+        if self.parada_seguranca:
+            self.t += dt
+            return
+        while dt > 1e-12:
+            h = min(dt, self.PASSO_RAMPA_S - self._rampa)
+            v = self.velocidade_filme()
+            avanco = max(-self.enrolado_mm, min(self.comprimento_mm - self.enrolado_mm, v * h))
+            self.enrolado_mm += avanco
+            self.encoder_mm += avanco * (1.0 - self.slip)
+            self.foco_passos += self.atual["Z"] * h
+            self.t += h
+            dt -= h
+            self._rampa += h
+            if self._rampa >= self.PASSO_RAMPA_S - 1e-12:
+                self._rampa = 0.0
+                passo_acel = 40 if self.manual else 10000
+                for eixo in ("X", "Y", "Z"):
+                    atual, alvo = self.atual[eixo], self.alvo[eixo]
+                    if atual < alvo: self.atual[eixo] = min(atual + passo_acel, alvo)
+                    elif atual > alvo: self.atual[eixo] = max(atual - passo_acel, alvo)
+
+    def stats(self):
+        return {
+            "t": round(self.t, 3),
+            "hz_y": self.atual["Y"],
+            "hz_x": self.atual["X"],
+            "velocidade_mm_s": round(self.velocidade_filme(), 3),
+            "raio_recolhimento_mm": round(self.raio_recolhimento(), 3),
+            "enrolado_m": round(self.enrolado_mm / 1000.0, 3),
+            "pulsos": self.pulsos(),
+            "slip": self.slip,
+            "parada_seguranca": self.parada_seguranca,
+            "led": self.led,
+            "comandos": self.comandos,
+        }
+
+
+class SkrPicoSimulator:
+    """
+    SKR Pico de mentira num pseudo-terminal: `porta` (ex.: `/dev/pts/5`) abre com o `serial.Serial`
+    do `FilmTransportPID` como a placa real. A thread lê os comandos, avança o `TransportModel` no
+    relógio (`ScaledClock`), manda `E <pulsos>` a cada 50 ms simulados e injeta o slip/stall agendados
+    no `SimTransportSpec`. Linhas que o host não consome são descartadas (a USB também perde).
+    """
+
+    PERIODO_ENCODER_S = 0.050
+
+    def __init__(self, spec=None, relogio=None):
+        self.spec = spec or SimTransportSpec()
+        self.modelo = TransportModel(self.spec)
+        self.relogio = relogio or ScaledClock(self.spec.scale)
+        self.porta = None
+        self._mestre = None
+        self._escravo = None
+        self._thread = None
+        self._rodando = False
+        self._buffer = b""
+        self._stall_feito = False
+        self.linhas_enviadas = 0
+        self.linhas_descartadas = 0
+
+    def start(self):
+        if os.name != "posix":
+            raise RuntimeError("O simulador da SKR Pico usa pseudo-terminal (os.openpty) e só roda em Linux/macOS")
+        import tty  # termios: só existe em POSIX
+        self._mestre, self._escravo = os.openpty()
+        tty.setraw(self._escravo)  # Sem eco e sem tradução de fim de linha
+        os.set_blocking(self._mestre, False)
+        self.porta = os.ttyname(self._escravo)
+        self._t0 = self.relogio()
+        self._rodando = True
+        self._thread = threading.Thread(target=self._loop, name="miniola-skr-sim", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._rodando = False
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        for fd in (self._mestre, self._escravo):
+            if fd is not None: os.close(fd)
+        self._mestre = self._escravo = None
+
+    def _escrever(self, linha):
+        try:
+            os.write(self._mestre, (linha + "\r\n").encode("utf-8"))  # Serial.println
+            self.linhas_enviadas += 1
+        except (BlockingIOError, OSError):
+            self.linhas_descartadas += 1
+
+    def _ler_comandos(self, espera_s):
+        pronto, _, _ = select.select([self._mestre], [], [], espera_s)
+        if not pronto: return
+        try:
+            self._buffer += os.read(self._mestre, 4096)
+        except (BlockingIOError, OSError):
+            return
+        *linhas, self._buffer = self._buffer.split(b"\n")
+        for linha in linhas:
+            for resposta in self.modelo.comando(linha.decode("utf-8", errors="ignore")):
+                self._escrever(resposta)
+
+    def _loop(self):
+        modelo = self.modelo
+        ultimo = self.relogio()
+        proximo_e = ultimo + self.PERIODO_ENCODER_S
+        while self._rodando:
+            espera = min(self.PERIODO_ENCODER_S, max(0.0, proximo_e - self.relogio()))
+            self._ler_comandos(min(0.010, espera) / getattr(self.relogio, "escala", 1.0))
+            agora = self.relogio()
+            modelo.passo(agora - ultimo)
+            ultimo = agora
+
+            t_sim = agora - self._t0
+            if modelo.slip == 0.0 and self.spec.slip and t_sim >= self.spec.slip_at:
+                modelo.slip = self.spec.slip
+            if self.spec.stall_at is not None and not self._stall_feito and t_sim >= self.spec.stall_at:
+                self._stall_feito = True
+                self._escrever(modelo.injetar_stall())
+
+            if agora >= proximo_e:
+                # Como o `loop()` do firmware: com a parada de segurança ativa não há relatório
+                if not modelo.parada_seguranca:
+                    self._escrever(f"E {modelo.pulsos()}")
+                proximo_e += self.PERIODO_ENCODER_S
+                if proximo_e <= agora: proximo_e = agora + self.PERIODO_ENCODER_S  # Sem rajada depois de um atraso
+
+    def stats(self):
+        return dict(self.modelo.stats(), porta=self.porta, linhas_enviadas=self.linhas_enviadas,
+                    linhas_descartadas=self.linhas_descartadas)
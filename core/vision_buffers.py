@@ -0,0 +1,51 @@
+import numpy as np
+
+
+class VisionBuffers:
+    """
+    Buffers alocados UMA vez para `ScannerVision.process_frame_into` (SPEC-001).
+
+    O motor C++ escreve no lugar: um registro estruturado com as saídas escalares, um array
+    fixo de rects de perfuração [x, y, w, h, acionou], um buffer de áudio reutilizável cujo
+    comprimento válido vem em `audio_len` e, apenas nos quadros que vão para o painel, o
+    preview binário reduzido. O preview alterna entre dois buffers para que o dashboard
+    nunca leia um array que o próximo quadro está sobrescrevendo.
+    """
+
+    def __init__(self, result_dtype, max_rects=32, max_audio=8192):
+        self.resultado = np.zeros(1, dtype=result_dtype)
+        self.rects = np.zeros((max_rects, 5), dtype=np.int32)
+        self.audio = np.zeros(max_audio, dtype=np.float32)
+        self._binarios = [None, None]
+        self._vez = 0
+
+    def binario_para(self, roi_w, roi_h, frame_shape=None, roi_x=0, roi_y=0):
+        """
+        Próximo buffer de preview com o shape que o motor produz para a ROI (fx = fy = 0.5). Com
+        `frame_shape`, a ROI é recortada no quadro como nos dois motores: uma ROI que passa da borda
+        gera um preview menor, e um buffer no tamanho da ROI cheia não seria escrito.
+        """
+        if frame_shape is not None:
+            rows, cols = frame_shape[:2]
+            roi_w = max(0, min(roi_w, cols - max(0, roi_x)))
+            roi_h = max(0, min(roi_h, rows - max(0, roi_y)))
+        shape = (int(round(roi_h * 0.5)), int(round(roi_w * 0.5)))
+        self._vez ^= 1
+        buf = self._binarios[self._vez]
+        if buf is None or buf.shape != shape:
+            buf = np.zeros(shape, dtype=np.uint8)
+            self._binarios[self._vez] = buf
+        return buf
+
+    def debug_visual(self, n_rects):
+        """Converte os rects no formato de lista de dicts esperado pelo dashboard."""
+        itens = []
+        for x, y, w, h, acionou in self.rects[:min(n_rects, len(self.rects))].tolist():
+            itens.append({'rect': (x, y, w, h), 'color': (0, 0, 255) if acionou else (0, 255, 0)})
+        return itens
+
+    def audio_chunk(self, audio_len):
+        """Cópia das amostras válidas (o buffer é reutilizado no próximo quadro)."""
+        if audio_len <= 0:
+            return None
+        return self.audio[:audio_len].copy()
@@ -0,0 +1,363 @@
+import math
+import threading
+
+import cv2
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# Mesmos campos do registro estruturado do motor C++ (`miniola_cv.result_dtype()`), para que
+# `VisionBuffers` e o `logica_scanner` tratem os dois motores da mesma forma.
+RESULT_DTYPE = np.dtype([
+    ("valido", np.bool_),
+    ("capturar", np.bool_),
+    ("perfuracao_na_linha", np.bool_),
+    ("achou_furo", np.bool_),
+    ("contador_perfs_ciclo", np.int32),
+    ("cx_a", np.int64),
+    ("cy_a", np.int64),
+    ("encolhimento_atual_pct", np.float64),
+    ("ultimo_pitch_medio", np.float64),
+    ("pitch_instantaneo", np.float64),
+    ("n_rects", np.int32),
+    ("audio_len", np.int32),
+    ("audio_descartado", np.int32),
+    ("binary_h", np.int32),
+    ("binary_w", np.int32),
+    ("varredura_incremental", np.bool_),
+    ("linhas_varridas", np.int32),
+])
+
+AUDIO_TAIL = 20        # Tamanho da "impressão digital" da autocorrelação
+AUDIO_MARGEM_BUSCA = 15
+
+
+def result_dtype():
+    return RESULT_DTYPE
+
+
+def _round_cpp(x):
+    # std::round: meio arredonda para longe do zero (o round() do Python arredonda para o par)
+    return math.copysign(math.floor(abs(x) + 0.5), x)
+
+
+class ScannerVisionNumpy:
+    """
+    Motor de visão em NumPy puro, com a mesma interface e o mesmo algoritmo do `ScannerVision`
+    C++ (SPEC-001): projeção 1D por linha, momentos sub-pixel por furo, gatilho de fase circular
+    (PLL) e line-scanner de áudio com costura por SAD.
+
+    Sem laço Python por linha ou por furo: os furos saem das transições da projeção e os
+    momentos de todos eles de somas acumuladas. Os buffers intermediários são alocados uma vez
+    por shape de ROI e reutilizados via `out=`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shape = None
+
+        self.contador_perfs_ciclo = 0
+        self.perfuracao_na_linha = False
+        self.buffer_pitches = []
+        self.ultimo_pitch_medio = -1.0
+        self.ultimo_pitch_instantaneo = -1.0
+        self.encolhimento_atual_pct = 0.0
+        self.last_perf_y = -1.0
+        self.gatilho_fase_armado = False
+        self.last_erro_fase = 0.0
+        self.audio_tail = None
+
+    def reset_ciclo(self):
+        with self._lock:
+            self.contador_perfs_ciclo = 0
+            self.last_perf_y = -1.0
+            self.gatilho_fase_armado = False
+            self.last_erro_fase = 0.0
+            self.audio_tail = None
+
+    # --- Buffers ---
+
+    def _preparar(self, h, w):
+        if self._shape == (h, w): return
+        self._shape = (h, w)
+        self._gray = np.empty((h, w), dtype=np.uint8)
+        self._mask = np.empty((h, w), dtype=np.bool_)
+        self._contagem = np.empty(h, dtype=np.int64)
+        self._soma_x = np.empty(h, dtype=np.int64)
+        self._soma_y = np.empty(h, dtype=np.int64)
+        self._claro = np.zeros(h + 2, dtype=np.int8)  # Sentinelas escuras nas duas pontas
+        self._borda = np.empty(h + 1, dtype=np.int8)
+        self._acum = np.empty((3, h + 1), dtype=np.int64)  # Somas acumuladas de m00, m10, m01
+        self._xs = np.arange(w, dtype=np.int64)
+        self._ys = np.arange(h, dtype=np.int64)
+        bh, bw = int(np.rint(h * 0.5)), int(np.rint(w * 0.5))
+        self._mask_small = np.empty((bh, bw), dtype=np.bool_)
+        self._binario = np.empty((bh, bw), dtype=np.uint8)
+
+    # --- API ---
+
+    def process_frame(self, input_array, roi_x, roi_y, roi_w, roi_h,
+                      thresh_val, linha_gatilho_y, margem_gatilho, pitch_padrao,
+                      audio_enabled=False, audio_x=0, audio_w=0, audio_slit_y=0):
+        """API legada em dict (mesmas chaves do motor C++)."""
+        registro = np.zeros(1, dtype=RESULT_DTYPE)
+        rects = np.zeros((64, 5), dtype=np.int32)
+        audio = np.zeros(8192, dtype=np.float32)
+        with self._lock:
+            furos = self._processar(registro, input_array, roi_x, roi_y, roi_w, roi_h,
+                                    thresh_val, linha_gatilho_y, margem_gatilho, pitch_padrao,
+                                    audio_enabled, audio_x, audio_w, audio_slit_y, True, None)
+            binario = self._binario.copy() if furos is not None else None
+            audio_chunk = self._ultimo_audio  # Lido sob o lock: outra thread pode sobrescrevê-lo
+        rec = registro[0]
+        if not rec["valido"]:
+            return {"capturar": False}
+
+        n = int(rec["n_rects"])
+        self._escrever_rects(rects, furos)
+        debug_visual = [{'rect': (x, y, w, h), 'color': (0, 0, 255) if acionou else (0, 255, 0)}
+                        for x, y, w, h, acionou in rects[:min(n, len(rects))].tolist()]
+        return {
+            "capturar": bool(rec["capturar"]),
+            "cx_a": int(rec["cx_a"]),
+            "cy_a": int(rec["cy_a"]),
+            "debug_visual": debug_visual,
+            "binary_small": binario,
+            "perfuracao_na_linha": bool(rec["perfuracao_na_linha"]),
+            "contador_perfs_ciclo": int(rec["contador_perfs_ciclo"]),
+            "encolhimento_atual_pct": float(rec["encolhimento_atual_pct"]),
+            "ultimo_pitch_medio": float(rec["ultimo_pitch_medio"]),
+            "pitch_instantaneo": float(rec["pitch_instantaneo"]),
+            "achou_furo": bool(rec["achou_furo"]),
+            "varredura_incremental": False,
+            "linhas_varridas": int(rec["linhas_varridas"]),
+            "audio_chunk": audio_chunk,
+        }
+
+    def process_frame_into(self, input_array, roi_x, roi_y, roi_w, roi_h,
+                           thresh_val, linha_gatilho_y, margem_gatilho, pitch_padrao,
+                           audio_enabled, audio_x, audio_w, audio_slit_y,
+                           resultado, rects=None, audio=None, binario=None):
+        """Mesmo contrato do `process_frame_into` C++: escreve nos buffers do chamador (`VisionBuffers`)."""
+        if len(resultado) < 1:
+            raise ValueError("resultado deve ter ao menos 1 registro")
+        if rects is not None and (rects.dtype != np.int32 or rects.ndim != 2 or rects.shape[1] != 5):
+            raise TypeError("rects: esperado array int32 (N, 5)")
+        if audio is not None and audio.dtype != np.float32:
+            raise TypeError("audio: esperado array float32")
+        if binario is not None and binario.dtype != np.uint8:
+            raise TypeError("binario: esperado array uint8")
+
+        rec = resultado[0]
+        with self._lock:
+            furos = self._processar(resultado, input_array, roi_x, roi_y, roi_w, roi_h,
+                                    thresh_val, linha_gatilho_y, margem_gatilho, pitch_padrao,
+                                    audio_enabled, audio_x, audio_w, audio_slit_y,
+                                    binario is not None, binario)
+            if furos is not None and rects is not None:
+                self._escrever_rects(rects, furos)
+
+            amostras = self._ultimo_audio
+            n_audio = 0
+            if amostras is not None and audio is not None:
+                n_audio = min(len(audio), amostras.size)
+                audio[:n_audio] = amostras[:n_audio]
+            rec["audio_len"] = n_audio
+            rec["audio_descartado"] = (amostras.size if amostras is not None else 0) - n_audio
+
+    # --- Núcleo ---
+
+    @staticmethod
+    def _escrever_rects(rects, furos):
+        starts, alturas, acionou, roi_x, roi_y, largura = furos
+        n = min(len(rects), starts.size)
+        rects[:n, 0] = roi_x
+        rects[:n, 1] = starts[:n] + roi_y
+        rects[:n, 2] = largura
+        rects[:n, 3] = alturas[:n]
+        rects[:n, 4] = acionou[:n]
+
+    def _processar(self, resultado, frame, roi_x, roi_y, roi_w, roi_h,
+                   thresh_val, linha_gatilho_y, margem_gatilho, pitch_padrao,
+                   audio_enabled, audio_x, audio_w, audio_slit_y, gerar_preview, destino_binario):
+        resultado[:1] = 0
+        rec = resultado[0]
+        rec["cx_a"] = -1
+        rec["cy_a"] = -1
+        self._ultimo_audio = None
+
+        if frame.ndim != 2 and not (frame.ndim == 3 and frame.shape[2] == 3):
+            return None
+        rows, cols = frame.shape[:2]
+        rx, ry = max(0, roi_x), max(0, roi_y)
+        rw = max(0, min(roi_w, cols - rx))
+        rh = max(0, min(roi_h, rows - ry))
+        if rw <= 0 or rh <= 0:
+            return None
+
+        self._preparar(rh, rw)
+        roi = frame[ry:ry + rh, rx:rx + rw]
+        if frame.ndim == 3:
+            cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY, dst=self._gray)
+            gray = self._gray
+        else:
+            gray = roi
+
+        # Preview do painel: nearest com fx = fy = 0.5 equivale a pegar as linhas/colunas pares
+        bh, bw = self._mask_small.shape
+        rec["binary_h"], rec["binary_w"] = bh, bw
+        if gerar_preview:
+            destino = destino_binario if destino_binario is not None else self._binario
+            if destino.shape == (bh, bw):
+                np.greater(gray[:2 * bh:2, :2 * bw:2], thresh_val, out=self._mask_small)
+                np.multiply(self._mask_small, 255, out=destino, casting="unsafe")
+
+        # 1. Binarização (THRESH_BINARY: > thresh) e 2. projeção por linha
+        mask = self._mask
+        np.greater(gray, thresh_val, out=mask)
+        np.sum(mask, axis=1, out=self._contagem)
+        np.dot(mask, self._xs, out=self._soma_x)
+        np.multiply(self._contagem, self._ys, out=self._soma_y)
+
+        min_width_px = max(2, rw // 10)
+        claro = self._claro[1:-1]
+        np.greater_equal(self._contagem, min_width_px, out=claro, casting="unsafe")
+        claro[-1] = 0  # Força fechamento do furo que encosta no rodapé da ROI
+        np.subtract(self._claro[1:], self._claro[:-1], out=self._borda)
+        starts = np.flatnonzero(self._borda == 1)
+        ends = np.flatnonzero(self._borda == -1)  # Exclusivo
+        alturas = ends - starts
+        validos = (alturas >= 10) & (alturas <= max(150, rh // 2))
+        starts, ends, alturas = starts[validos], ends[validos], alturas[validos]
+
+        # 3. Momentos sub-pixel de todos os furos de uma vez: somas acumuladas por linha
+        acum = self._acum
+        acum[:, 0] = 0
+        np.cumsum(self._contagem, out=acum[0, 1:])
+        np.cumsum(self._soma_x, out=acum[1, 1:])
+        np.cumsum(self._soma_y, out=acum[2, 1:])
+        momentos = acum[:, ends] - acum[:, starts]
+        m00 = momentos[0].astype(np.float64)
+        cx_roi = momentos[1] / m00
+        cy_roi = momentos[2] / m00
+        cx_g = cx_roi + rx
+        cy_g = cy_roi + ry
+
+        limite_superior = linha_gatilho_y - margem_gatilho
+        limite_inferior = linha_gatilho_y + margem_gatilho
+        acionou = (cy_roi >= limite_superior) & (cy_roi <= limite_inferior)
+
+        # Já em ordem crescente de Y (as transições saem da projeção de cima para baixo)
+        furos = (starts, alturas, acionou, rx, ry, rw)
+        rec["n_rects"] = starts.size
+        rec["linhas_varridas"] = rh
+
+        self._ultimo_audio = self._audio(frame, cy_g, audio_enabled, audio_x, audio_w, audio_slit_y,
+                                         pitch_padrao, rows, cols)
+        self._fase(rec, cx_g, cy_g, linha_gatilho_y, ry, pitch_padrao)
+        rec["valido"] = True
+        return furos
+
+    def _audio(self, frame, cy_g, audio_enabled, audio_x, audio_w, audio_slit_y, pitch_padrao, rows, cols):
+        real_pitch = self.ultimo_pitch_medio if self.ultimo_pitch_medio > 0 else pitch_padrao
+        if not audio_enabled or cy_g.size == 0 or real_pitch <= 0:
+            return None
+
+        curr_perf_y = float(cy_g[0])
+        if self.last_perf_y < 0:
+            self.last_perf_y = curr_perf_y
+            return None
+
+        raw_dy = self.last_perf_y - curr_perf_y
+        while raw_dy < -(real_pitch * 0.5): raw_dy += real_pitch
+        while raw_dy > (real_pitch * 0.5): raw_dy -= real_pitch
+        estimated_dy = max(0, int(_round_cpp(abs(raw_dy))))
+
+        amostras = None
+        if estimated_dy > 0:
+            safe_x = max(0, min(audio_x, cols - 1))
+            safe_w = max(1, min(audio_w, cols - safe_x))
+            base_y = min(audio_slit_y + 150, rows - 1)
+            extra = AUDIO_TAIL if self.audio_tail is None else AUDIO_TAIL + AUDIO_MARGEM_BUSCA
+            safe_y = max(0, base_y - (estimated_dy + extra))
+            read_h = base_y - safe_y
+
+            if read_h >= AUDIO_TAIL:
+                fatia = frame[safe_y:safe_y + read_h, safe_x:safe_x + safe_w]
+                if frame.ndim == 3:
+                    fatia = cv2.cvtColor(fatia, cv2.COLOR_RGB2GRAY)
+                media = fatia.mean(axis=1)
+                chunk = ((255.0 - media) / 255.0).astype(np.float32) * np.float32(2.0) - np.float32(1.0)
+
+                inicio = 0
+                if self.audio_tail is not None and chunk.size >= AUDIO_TAIL + AUDIO_MARGEM_BUSCA:
+                    # SAD do molde antigo contra todas as posições de uma vez
+                    max_search = min(AUDIO_MARGEM_BUSCA * 2, chunk.size - AUDIO_TAIL)
+                    janelas = sliding_window_view(chunk, AUDIO_TAIL)[:max_search + 1]
+                    sad = np.abs(janelas - self.audio_tail).sum(axis=1, dtype=np.float64)
+                    inicio = int(np.argmin(sad)) + AUDIO_TAIL
+
+                amostras = chunk[inicio:]
+                self.audio_tail = chunk[-AUDIO_TAIL:].copy()
+
+        self.last_perf_y = curr_perf_y
+        return amostras
+
+    def _fase(self, rec, cx_g, cy_g, linha_gatilho_y, roi_y, pitch_padrao):
+        # Fase circular média dos furos visíveis (mesma PLL do motor C++)
+        if cy_g.size == 0:
+            self.perfuracao_na_linha = False
+            self._publicar(rec, False)
+            return
+
+        angulos = cy_g * (2.0 * math.pi / pitch_padrao)
+        angulo_medio = math.atan2(float(np.sin(angulos).sum()), float(np.cos(angulos).sum()))
+        if angulo_medio < 0: angulo_medio += 2.0 * math.pi
+        fase_filme = (angulo_medio / (2.0 * math.pi)) * pitch_padrao
+
+        fase_gatilho = math.fmod(float(linha_gatilho_y + roi_y), pitch_padrao)
+        erro_fase = fase_gatilho - fase_filme
+        while erro_fase < -(pitch_padrao * 0.5): erro_fase += pitch_padrao
+        while erro_fase >= (pitch_padrao * 0.5): erro_fase -= pitch_padrao
+
+        if erro_fase > pitch_padrao * 0.15:
+            self.gatilho_fase_armado = True
+
+        if self.gatilho_fase_armado and self.last_erro_fase > 0 and erro_fase <= 0:
+            self.gatilho_fase_armado = False
+            self.perfuracao_na_linha = True
+            self.contador_perfs_ciclo += 1
+
+            if self.contador_perfs_ciclo >= 4:
+                qtd = min(4, cy_g.size)
+                # O acumulador inteiro do C++ trunca cada parcela: soma dos pisos
+                rec["cx_a"] = int(np.floor(cx_g[:qtd]).sum()) // max(1, qtd)
+
+                if qtd > 1:
+                    pitch_instantaneo = float(np.diff(cy_g[:qtd]).sum()) / (qtd - 1)
+                    self.ultimo_pitch_instantaneo = pitch_instantaneo
+                    if pitch_instantaneo > 0:
+                        self.buffer_pitches.append(pitch_instantaneo)
+                        if len(self.buffer_pitches) >= 10:
+                            self.ultimo_pitch_medio = sum(self.buffer_pitches) / len(self.buffer_pitches)
+                            calc_pct = (1.0 - (self.ultimo_pitch_medio / pitch_padrao)) * 100.0
+                            self.encolhimento_atual_pct = max(-5.0, min(10.0, calc_pct))
+                            self.buffer_pitches.clear()
+
+                # Âncora vertical sub-pixel: o crop acompanha quanto o furo passou da linha de gatilho
+                rec["cy_a"] = int(_round_cpp((linha_gatilho_y + roi_y) - erro_fase))
+                rec["capturar"] = True
+                self.contador_perfs_ciclo = 0
+        else:
+            self.perfuracao_na_linha = False
+
+        self.last_erro_fase = erro_fase
+        self._publicar(rec, True)
+
+    def _publicar(self, rec, achou_furo):
+        rec["perfuracao_na_linha"] = self.perfuracao_na_linha
+        rec["contador_perfs_ciclo"] = self.contador_perfs_ciclo
+        rec["encolhimento_atual_pct"] = self.encolhimento_atual_pct
+        rec["ultimo_pitch_medio"] = self.ultimo_pitch_medio
+        rec["pitch_instantaneo"] = self.ultimo_pitch_instantaneo
+        rec["achou_furo"] = achou_furo
@@ -18,8 +18,18 @@ except ImportError:
 from flask import Flask, Response, request, render_template, send_from_directory, jsonify  # type: ignore
 import argparse
 from cameras import get_camera_provider 
+from cameras.capture_thread import CaptureThread
+from cameras.stream_tap import StreamTap
+from core.readout import ReadoutProfiles, regiao_gravacao
+from core.governor import CaptureGovernor
+from core.color_pipeline import ColorPipeline
 from core.motor_controller import FilmTransportPID
 from core.joystick import GamepadController
+from core.frame_ring import SharedFrameRing
+from core.encoder_pool import processo_codificador, thread_anexador_segmentos, montar_job
+from core.vision_buffers import VisionBuffers
+from core.vision_numpy import ScannerVisionNumpy, result_dtype as result_dtype_numpy
+scanner_py = ScannerVisionNumpy()
 import cv2 
 import numpy as np 
 import threading 
@@ -48,31 +58,121 @@ if not os.path.exists(CAPTURE_PATH): os.makedirs(CAPTURE_PATH)
 
 # Parser de Argumentos
 parser = argparse.ArgumentParser(description="Miniola - Digitalizador e Metrologia de Películas")
-parser.add_argument('--camera', type=str, default='ximea', choices=['pi', 'ximea', 'uvc', 'mock'], help='Provedor de câmera a utilizar')
+parser.add_argument('--camera', type=str, default='ximea', choices=['pi', 'ximea', 'uvc', 'mock', 'replay'], help='Provedor de câmera a utilizar')
 parser.add_argument('--ximea-mode', type=str, default='raw', choices=['raw', 'rgb'], help='Modo de cor interno para Ximea (ISP ligado = rgb)')
+parser.add_argument('--ring-slots', type=int, default=24, help='Slots do anel de memória compartilhada entre o scanner e a gravação')
+parser.add_argument('--rec-format', type=str, default='jpeg', choices=['jpeg', 'raw'], help='jpeg = debayer+LUT+JPEG ao vivo | raw = RAW8 Bayer sem perdas (PNG rápido), cor aplicada no process.py')
+parser.add_argument('--rec-container', type=str, default='segments', choices=['segments', 'files'], help='segments = quadros anexados em segmentos .mseg com índice | files = um arquivo por quadro (legado)')
+parser.add_argument('--seg-frames', type=int, default=2000, help='Quadros por segmento .mseg antes de rotacionar o arquivo')
+parser.add_argument('--rec-margin', type=int, default=48, help='Margem de overscan (px) gravada em volta do crop rastreado, folga para a estabilização no process.py')
+parser.add_argument('--writers', type=int, default=max(1, min(4, (os.cpu_count() or 2) - 2)), help='Processos codificadores paralelos (debayer + LUT + JPEG)')
+parser.add_argument('--cap-slots', type=int, default=16, help='Entradas do anel de aquisição (thread dedicada drenando o sensor) antes de descartar o quadro mais antigo')
+parser.add_argument('--cap-pool', type=int, default=None, help='Buffers emprestados ao driver: Ximea em XI_BP_SAFE (padrão: cap-slots + 6; 0 desliga e volta à cópia por quadro) / requests do Picamera2 no stream duplo / fila mmap do V4L2 (padrão: 10)')
+parser.add_argument('--uvc-device', type=str, default='/dev/video0', help='Dispositivo V4L2 do provedor uvc')
+parser.add_argument('--uvc-format', type=str, default=None, help='FourCC V4L2 forçado (ex.: GRBG, GREY, YUYV). Padrão: Bayer > GREY > YUYV > BGR3 > MJPG')
+parser.add_argument('--uvc-probe', action='store_true', help='Lista formatos, resoluções e FPS do dispositivo UVC e sai')
+parser.add_argument('--pi-stream', choices=['dual', 'main'], default='dual', help='Pi: visão no plano Y do stream lores e gravação no main RGB (dual), ou tudo no main RGB copiado (main)')
+parser.add_argument('--mock-film', type=str, default=None, help="Mock: película sintética com defeitos reproduzíveis, ex.: 'pitch=200,shrink=3,weave=2,torn=0.02,missing=0.01,drops=0.005,burst=3,seed=7'")
+parser.add_argument('--mock-unthrottled', action='store_true', help='Mock: entrega quadros sem esperar o FPS (bancada/CI acima do tempo real)')
+parser.add_argument('--tap', type=str, default=None, help='Grava os quadros crus entregues pelo sensor (com seq/timestamps) neste arquivo .mtap, para reproduzir depois com --camera replay')
+parser.add_argument('--tap-max-mb', type=int, default=4096, help='Tamanho máximo do arquivo de --tap; acima disso os quadros deixam de ser gravados (contados em descartados)')
+parser.add_argument('--replay-file', type=str, default=None, help='Arquivo .mtap servido pelo provedor replay')
+parser.add_argument('--replay-speed', type=float, default=1.0, help='Replay: fração do ritmo original (1 = tempo real gravado, 0 = o mais rápido possível)')
+parser.add_argument('--replay-loop', action='store_true', help='Replay: recomeça a gravação ao chegar no fim')
+parser.add_argument('--readout', type=str, default='auto', choices=['auto', 'off'], help='Perfis de leitura do sensor por modo: janela ajustada à ROI/crop/áudio na gravação e decimação no playback (auto) ou janela fixa de partida (off)')
+parser.add_argument('--playback-decimation', type=int, default=2, help='Decimação (binning/skipping) do sensor no perfil de playback')
+parser.add_argument('--governor', type=str, default='off', choices=['on', 'off'], help='Governador de captura: na gravação troca FPS/exposição/ganho da câmera e a meta do motor pelo envelope do pitch medido (amostragem do cruzamento de fase e borrão garantidos). Desligado: REC roda no mfps/fps/e/g do operador')
+parser.add_argument('--gov-sampling', type=float, default=0.3, help='Governador: avanço máximo do filme entre dois quadros da câmera, em fração do pitch')
+parser.add_argument('--gov-blur-px', type=float, default=1.0, help='Governador: borrão de movimento máximo durante a exposição (px)')
+parser.add_argument('--gov-gain-max', type=float, default=4.0, help='Governador: ganho extra máximo (multiplicador) para compensar exposições mais curtas que a do operador')
+parser.add_argument('--motor-port', type=str, default='/dev/ttyACM0', help='Porta serial da SKR Pico')
+parser.add_argument('--motor-sim', type=str, nargs='?', const='', default=None, help="SKR Pico simulada num pseudo-terminal (sem placa), ex.: 'core=25,thickness=0.14,slip=0.5,slip_at=30,stall_at=90'")
+parser.add_argument('--motor-log', type=str, default=None, help='Diretório para o log binário de cada execução do PID do transporte (replay com scripts/replay_transport.py)')
+parser.add_argument('--ff-track', type=str, default='on', choices=['on', 'off'], help='Feed-forward do transporte: rastreia o raio do carretel de recolhimento online (on) ou usa o fator fixo (off)')
+parser.add_argument('--pid-hz', type=float, default=50.0, help='Taxa do loop PID do transporte (Hz), cadenciada por prazo no relógio monotônico')
+parser.add_argument('--cv-tracking', type=str, default='on', choices=['on', 'off'], help='Motor C++: varre só faixas em volta das perfurações previstas pela fase (on) ou a ROI inteira em todo quadro (off)')
+parser.add_argument('--cv-full-scan', type=int, default=30, help='Motor C++: força uma varredura completa da ROI a cada N quadros no modo de rastreamento')
 args = parser.parse_args()
+if args.camera == 'replay' and not args.replay_file:
+    parser.error("--camera replay exige --replay-file")
+
+if scanner_cv is not None and hasattr(scanner_cv, "set_tracking"):
+    scanner_cv.set_tracking(args.cv_tracking == 'on', args.cv_full_scan)
 
 CAMERA_MODE = args.camera
 
 # Controle de Motores (SKR Pico)
-motor = FilmTransportPID()
+simulador_motor = None
+if args.motor_sim is not None:
+    from core.skr_simulator import SkrPicoSimulator, SimTransportSpec  # Pseudo-terminal: só POSIX
+    simulador_motor = SkrPicoSimulator(SimTransportSpec.parse(args.motor_sim)).start()
+    print(f"[MOTOR] SKR Pico simulada em {simulador_motor.porta}: {simulador_motor.spec.as_dict()}")
+    motor = FilmTransportPID(port=simulador_motor.porta, pid_hz=args.pid_hz, log_dir=args.motor_log,
+                             relogio=simulador_motor.relogio, dormir=simulador_motor.relogio.dormir)
+else:
+    motor = FilmTransportPID(port=args.motor_port, pid_hz=args.pid_hz, log_dir=args.motor_log)
+motor.ff.rastrear = args.ff_track == 'on'
 motor.connect()
 
+# (fps_motor, fps_cam, exposição, ganho) do console durante um REC governado: os globais espelham o plano
+OPERADOR_REC = None
+
+def lembrar_operador(fps=None, exposicao=None, ganho=None):
+    """
+    Valor digitado no console (fps/e/g). Durante um REC governado ele vira o novo valor do operador,
+    restaurado no REC OFF; em qualquer caso é a referência (teto de FPS e brilho) do governador.
+    """
+    global OPERADOR_REC
+    if OPERADOR_REC is not None:
+        m, f, e, g = OPERADOR_REC
+        OPERADOR_REC = (m, f if fps is None else fps, e if exposicao is None else exposicao, g if ganho is None else ganho)
+        _, f, e, g = OPERADOR_REC
+    else:
+        f, e, g = fps_cam, shutter_speed, gain
+    governador.definir_referencia(e, g)
+    governador.fps_cam_max = float(f)
+
+def restaurar_operador():
+    """REC OFF depois de um REC governado: câmera e console voltam aos valores do operador."""
+    global OPERADOR_REC, fps_cam, shutter_speed, gain
+    if OPERADOR_REC is None: return
+    _, fps_cam, shutter_speed, gain = OPERADOR_REC
+    OPERADOR_REC = None
+    camera.set_fps(fps_cam)
+    camera.set_exposure(shutter_speed)
+    camera.set_gain(gain)
+    print(f"\n[GOVERNADOR] Valores do console restaurados: fps {fps_cam:g}, e {shutter_speed:g}, g {gain:g}")
+
 def toggle_rec():
     global GRAVANDO, fila_gravacao, ultimo_pitch_medio, PITCH_PADRAO_PX, AUDIO_CAPTURE_ENABLED, FPS_PROJECAO, fps_motor
+    global OPERADOR_REC
     if not GRAVANDO:
-        motor.start_pid(target_fps=fps_motor)
+        operador = (fps_motor, fps_cam, shutter_speed, gain)
+        plano = governar_captura() if GOVERNADOR_ATIVO else None
+        if plano is not None:
+            OPERADOR_REC = operador
+            # O governador substitui os valores do console: o operador precisa ver a troca antes de gravar
+            print(f"\n[GOVERNADOR] REC no envelope: motor {plano.fps_motor:.2f} fps (mfps {operador[0]:g}), "
+                  f"câmera {plano.fps_cam:.0f} fps (fps {operador[1]:g}), exposição {plano.exposicao_us:.0f} us (e {operador[2]:g}), "
+                  f"ganho {plano.ganho:.2f} (g {operador[3]:g}) | limite: {plano.limitante}. 'gov 0' grava nos valores do console.")
+        motor.start_pid(target_fps=plano.fps_motor if plano is not None else fps_motor)
         sid = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
         try:
             p_val = ultimo_pitch_medio if ultimo_pitch_medio > 0 else PITCH_PADRAO_PX
             fila_gravacao.put({
                 "type": "rec_start", "session_id": sid,
                 "audio_enabled": AUDIO_CAPTURE_ENABLED, "fps_projecao": FPS_PROJECAO,
-                "pitch_padrao": p_val
+                "pitch_padrao": p_val, "rec_format": args.rec_format, "color_params": parametros_cor()
             }, block=True, timeout=2)
         except Exception as e: 
             print(f"[ERRO] Falha ao iniciar REC: {e}")
+            restaurar_operador()
             return
+        if readout is not None:
+            # Janela do sensor ajustada à geometria atual: ROI, pista de áudio e crop + overscan
+            readout.ajustar_gravacao((ROI_X, ROI_Y, ROI_W, ROI_H), ROI_X + ROI_W + AUDIO_X_OFFSET, AUDIO_READ_W,
+                                     LINHA_GATILHO_Y, MARGEM_GATILHO, OFFSET_X, OFFSET_Y_CROP, CROP_W, CROP_H, MARGEM_OVERSCAN)
+            readout.aplicar("record", fps_cam)
         GRAVANDO = True
         print(f"\n[SISTEMA] REC ON | Sessão: {sid}\n>> ", end="", flush=True)
     else:
@@ -81,6 +181,8 @@ def toggle_rec():
         motor.stop()
         try: fila_gravacao.put({"type": "rec_stop"}, block=True, timeout=2)
         except Exception as e: print(f"[WARN] REC OFF sem confirmação: {e}")
+        restaurar_operador()
+        if readout is not None: readout.aplicar("base", fps_cam)
         print("\n[SISTEMA] REC OFF\n>> ", end="", flush=True)
 
 gamepad = GamepadController(motor, on_rec_toggle=toggle_rec)
@@ -105,38 +207,82 @@ WB_R, WB_G, WB_B = 1.0, 1.0, 1.0
 GAMMA_Y, GAMMA_C = 1.0, 1.0
 CONTRAST = 0.0
 
-def build_color_lut(r, g, b, gy, gc, contrast):
-    """Constrói a tabela de pré-computação (LUT) do ISP para o OpenCV aplicar instantaneamente"""
-    lut = np.zeros((1, 256, 3), dtype=np.uint8)
-    f_c = (259 * (contrast + 255)) / (255 * (259 - contrast)) if contrast != 0 else 1.0
-    for i in range(256):
-        val = i / 255.0
-        # Gamma simples
-        g_val = val ** (1.0 / gy) if gy > 0 else val
-        # WB multipliers
-        b_val, g_val, r_val = g_val * b, g_val * g, g_val * r
-        # Re-scale e Contrast
-        b_idx = f_c * (b_val * 255 - 128) + 128
-        g_idx = f_c * (g_val * 255 - 128) + 128
-        r_idx = f_c * (r_val * 255 - 128) + 128
-        # Store in LUT (OpenCV usa BGR)
-        lut[0, i, 0] = np.clip(b_idx, 0, 255)
-        lut[0, i, 1] = np.clip(g_idx, 0, 255)
-        lut[0, i, 2] = np.clip(r_idx, 0, 255)
-    return lut
-
-PIPELINE_LUT = build_color_lut(WB_R, WB_G, WB_B, GAMMA_Y, GAMMA_C, CONTRAST)
+# LUT que o software ainda aplica (None = nada a fazer); definida pelo ColorPipeline depois da câmera
+PIPELINE_LUT = None
+
+def parametros_cor():
+    """Parâmetros que originaram a PIPELINE_LUT (registrados no sidecar da sessão RAW)."""
+    return {"wb": [WB_R, WB_G, WB_B], "gamma": [GAMMA_Y, GAMMA_C], "contrast": CONTRAST,
+            "estagios": dict(pipeline_cor.estagios)}
 
 print(f"[SISTEMA] Inicializando provedor de câmera: {args.camera.upper()}")
-camera = get_camera_provider(args.camera)
+camera = get_camera_provider(args.camera, device=args.uvc_device, pixel_format=args.uvc_format,
+                             film=args.mock_film, unthrottled=args.mock_unthrottled,
+                             replay_path=args.replay_file, replay_speed=args.replay_speed, replay_loop=args.replay_loop)
+if args.camera == 'uvc' and args.uvc_probe:
+    for modo in camera.probe():
+        fps = ", ".join(f"{f:g}" for f in modo["fps"]) or "?"
+        print(f"  {modo['format']}  {modo['width']}x{modo['height']}  FPS: {fps}")
+    sys.exit(0)
 if args.camera == 'ximea':
-    camera.start(RES_W, RES_H, fps_cam, shutter_speed, gain, foco_atual, CAM_OFFSET_X, CAM_OFFSET_Y, color_mode=args.ximea_mode)
+    # Pool: anel de aquisição + quadro da visão + snapshots do painel (vivo e crop) + folga
+    pool_buffers = args.cap_pool if args.cap_pool is not None else args.cap_slots + 6
+    camera.start(RES_W, RES_H, fps_cam, shutter_speed, gain, foco_atual, CAM_OFFSET_X, CAM_OFFSET_Y, color_mode=args.ximea_mode, pool_buffers=pool_buffers)
+elif args.camera == 'uvc':
+    # Fila mmap do driver: buffers presos pelo anel/painel + folga para o driver não descartar
+    pool_buffers = args.cap_pool if args.cap_pool is not None else 10
+    camera.start(RES_W, RES_H, fps_cam, shutter_speed, gain, foco_atual, CAM_OFFSET_X, CAM_OFFSET_Y, pool_buffers=pool_buffers)
+elif args.camera == 'pi':
+    # Requests presos pelo anel/painel: além disso o libcamera pula quadros (visível em drops_sensor)
+    pool_buffers = args.cap_pool if args.cap_pool is not None else 10
+    camera.start(RES_W, RES_H, fps_cam, shutter_speed, gain, foco_atual, CAM_OFFSET_X, CAM_OFFSET_Y, pool_buffers=pool_buffers, dual_stream=args.pi_stream == 'dual')
 else:
     camera.start(RES_W, RES_H, fps_cam, shutter_speed, gain, foco_atual, CAM_OFFSET_X, CAM_OFFSET_Y)
+# Formato de Frame.data ("luma" no stream duplo do Pi): o painel não pode tratá-lo como mosaico Bayer
+FRAME_FORMAT = getattr(camera, "frame_format", None)
 
 # Padrão Bayer Padrão (Pode ser alterado dinamicamente via painel)
 # Mudando para RG2BGR porque o crop no sensor altera o alinhamento da matriz Bayer, causando a imagem rosa!
 BAYER_MODE = cv2.COLOR_BayerBG2BGR
+# Provedores que conhecem o padrão do sensor (UVC com FourCC Bayer) já entregam a conversão certa
+if getattr(camera, "bayer_code", None) is not None:
+    BAYER_MODE = camera.bayer_code
+BAYER_NOMES = {
+    cv2.COLOR_BayerBG2BGR: "BayerBG2BGR", cv2.COLOR_BayerGB2BGR: "BayerGB2BGR",
+    cv2.COLOR_BayerRG2BGR: "BayerRG2BGR", cv2.COLOR_BayerGR2BGR: "BayerGR2BGR",
+}
+
+# Tap: bytes crus do sensor + metadados para reproduzir a sessão offline (--camera replay)
+tap_sensor = None
+if args.tap:
+    tap_sensor = StreamTap(args.tap, max_mb=args.tap_max_mb, meta={
+        "camera": args.camera, "frame_format": FRAME_FORMAT, "bayer_code": BAYER_MODE,
+        "res": [RES_W, RES_H], "offset": [CAM_OFFSET_X, CAM_OFFSET_Y], "fps": fps_cam,
+    })
+    print(f"[TAP] Gravando quadros crus em {args.tap} (até {args.tap_max_mb} MB)")
+
+# Thread de aquisição: drena o sensor sem depender do ritmo da visão (SPEC-002)
+captura = CaptureThread(camera, slots=args.cap_slots, tap=tap_sensor)
+
+# Cadeia de cor negociada com o provedor: o que o sensor/ISP faz sai da LUT do software (SPEC-002)
+# A LUT do sensor mudaria o Frame.data que a visão (limiar) e o áudio óptico leem, e a gravação RAW
+# guardaria a curva no mosaico: a curva fica no software, onde só o codificador e o painel a aplicam
+pipeline_cor = ColorPipeline(camera, executar=captura.executar, curva_no_sensor=False)
+PIPELINE_LUT = pipeline_cor.aplicar((WB_R, WB_G, WB_B), (GAMMA_Y, GAMMA_C), CONTRAST)
+print(f"[COR] Capacidades do provedor: {pipeline_cor.caps} | Estágios: {pipeline_cor.estagios}")
+
+# Perfis de leitura do sensor por modo (SPEC-002): trocados pela thread de captura, sem reiniciar o app
+readout = None
+if args.readout == 'auto':
+    readout = ReadoutProfiles(camera, RES_W, RES_H, CAM_OFFSET_X, CAM_OFFSET_Y, captura=captura,
+                              playback_decimation=args.playback_decimation)
+
+# Governador de captura: os valores do console (fps, mfps, e, g) viram tetos e referência de brilho
+governador = CaptureGovernor(amostragem=args.gov_sampling, blur_max_px=args.gov_blur_px, fps_cam_max=fps_cam,
+                             fps_motor_max=fps_motor, ganho_extra_max=args.gov_gain_max,
+                             unidade_ganho=getattr(camera, "gain_units", "linear"))
+governador.definir_referencia(shutter_speed, gain)
+GOVERNADOR_ATIVO = args.governor == 'on'
 
 # --- GEOMETRIA DO ROI E ESTADO ---
 GRAVANDO = False
@@ -156,6 +302,9 @@ PITCH_PADRAO_PX = 195.0  # CALIBRE AQUI: Quantos pixels tem o pitch de um filme
 OFFSET_X = 470 
 OFFSET_Y_CROP = 0 # Deslocamento Y relativo à âncora (linha de gatilho)
 CROP_W, CROP_H = 918, 612 
+# Overscan gravado em volta do crop: cobre o deslocamento da perfuração dentro da janela de gatilho,
+# o weave suavizado e o stretch de rolling shutter aplicados no render. Sempre par (malha Bayer).
+MARGEM_OVERSCAN = max(0, args.rec_margin) // 2 * 2
 
 # --- EXTRAÇÃO DE ÁUDIO ÓTICO (CAPTURA AO VIVO) ---
 AUDIO_X_OFFSET = 50      # Distância da borda direita da ROI perfuração até a pista de som
@@ -170,13 +319,20 @@ perfuracao_na_linha = False
 ultimo_frame_bruto = None
 ultimo_frame_binario = None
 ultimo_crop_preview = np.zeros((CROP_H, CROP_W, 3), dtype=np.uint8)
+# Snapshots do painel: Frame com o empréstimo do buffer retido até o próximo snapshot (SPEC-002)
+painel_quadro = None
+painel_crop = (None, ultimo_crop_preview)
 lista_contornos_debug = []
 fps_real_proc = 0.0
 tempo_ms_ciclo = 0.0
 encolhimento_atual_pct = 0.0
 
 # --- FILA DE MULTIPROCESSAMENTO ---
+# A fila carrega apenas mensagens de controle (índice do slot + telemetria).
+# Os pixels viajam pelo anel de memória compartilhada, sem pickle.
 fila_gravacao = mp.Queue(maxsize=30) 
+CANAIS_SENSOR = 1 if (args.camera == 'ximea' and args.ximea_mode == 'raw') else 3
+anel_gravacao = SharedFrameRing(max(2, args.ring_slots), RES_W * RES_H * CANAIS_SENSOR)
 ultimo_pitch_medio = 0.0
 
 def abrir_sessao_audio_optico(session_id: str, fps_projecao: float, pitch: float):
@@ -248,15 +404,70 @@ def fechar_sessao_audio_optico(sessao, motivo: str):
     except Exception as e:
         print(f"[AUDIO] Falha ao salvar metadados da sessão: {e}")
 
-def processo_escrita_disco(fila_in):
-    print("[SISTEMA] Processo de gravação (Núcleo Isolado) iniciado.")
+def abrir_sessao_raw(session_id: str, bayer_mode, lut, color_params):
+    """
+    Sidecar da gravação RAW: registra UMA vez por sessão o padrão Bayer e a LUT (tabela e parâmetros).
+    O debayer e a cor são aplicados depois, em paralelo, no estágio de render do process.py.
+    """
+    sessao = {
+        "version": 1,
+        "session_id": session_id,
+        "started_at_utc": datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+        "rec_format": "raw",
+        "frame_codec": "png",
+        "bayer": BAYER_NOMES.get(bayer_mode, str(bayer_mode)),
+        "lut": lut.reshape(256, 3).tolist() if lut is not None else None,
+        "color_params": color_params,
+        # Mudanças de cor feitas DURANTE a sessão valem a partir do quadro indicado
+        "changes": [],
+        "meta_path": os.path.join(CAPTURE_PATH, f"miniola_session_{session_id}.json"),
+    }
+    salvar_sessao_raw(sessao)
+    print(f"[RAW] Sessão RAW iniciada: {os.path.basename(sessao['meta_path'])} | Bayer {sessao['bayer']}")
+    return sessao
+
+def salvar_sessao_raw(sessao):
+    if not sessao: return
+    meta = {k: v for k, v in sessao.items() if k != "meta_path"}
+    try:
+        with open(sessao["meta_path"], "w", encoding="utf-8") as fp:
+            json.dump(meta, fp)
+    except Exception as e:
+        print(f"[RAW] Falha ao salvar sidecar da sessão: {e}")
+
+def processo_escrita_disco(fila_in, fila_jobs, anel, n_codificadores, fila_resultados=None):
+    """
+    Sequenciador da gravação: único consumidor da `fila_gravacao`. Aplica as mensagens de controle
+    na ordem em que chegaram, escreve sozinho o JSONL de tracking e o sidecar de áudio (preservando
+    a ordem por quadro) e despacha a codificação dos quadros para o pool `processo_codificador`.
+    """
+    print(f"[SISTEMA] Processo de gravação (Núcleo Isolado) iniciado com {n_codificadores} codificador(es).")
     sessao_audio = None
+    sessao_raw = None
     arquivo_tracking = None
+    proximo_frame = 0
+
+    # Sessão de segmentos ativa (sid) e quantos quadros foram despachados para ela
+    sid_segmentos, despachados = None, 0
+    anexador = None
+    if fila_resultados is not None:
+        anexador = threading.Thread(target=thread_anexador_segmentos, args=(fila_resultados, args.seg_frames, CAPTURE_PATH), daemon=True)
+        anexador.start()
+
+    def fechar_segmentos():
+        nonlocal sid_segmentos, despachados
+        if sid_segmentos is not None and fila_resultados is not None:
+            fila_resultados.put(("close", sid_segmentos, despachados))
+        sid_segmentos, despachados = None, 0
+
     while True:
         item = fila_in.get()
         if item is None:
             fechar_sessao_audio_optico(sessao_audio, "shutdown")
+            salvar_sessao_raw(sessao_raw)
+            fechar_segmentos()
             if arquivo_tracking: arquivo_tracking.close()
+            for _ in range(n_codificadores): fila_jobs.put(None)
             break
 
         msg_type = item.get("type", "frame") if isinstance(item, dict) else "frame"
@@ -264,10 +475,20 @@ def processo_escrita_disco(fila_in):
         if msg_type == "set_bayer":
             global BAYER_MODE
             BAYER_MODE = item.get("mode")
+            if sessao_raw is not None:
+                sessao_raw["changes"].append({"from_frame": proximo_frame, "bayer": BAYER_NOMES.get(BAYER_MODE, str(BAYER_MODE))})
+                salvar_sessao_raw(sessao_raw)
             continue
         elif msg_type == "set_lut":
             global PIPELINE_LUT
             PIPELINE_LUT = item.get("lut")
+            if sessao_raw is not None:
+                sessao_raw["changes"].append({
+                    "from_frame": proximo_frame,
+                    "lut": PIPELINE_LUT.reshape(256, 3).tolist() if PIPELINE_LUT is not None else None,
+                    "color_params": item.get("params"),
+                })
+                salvar_sessao_raw(sessao_raw)
             continue
 
         if msg_type == "audio_chunk":
@@ -291,6 +512,15 @@ def processo_escrita_disco(fila_in):
             # Abre arquivo de telemetria para a nova sessão
             if arquivo_tracking: arquivo_tracking.close()
             sid = item.get("session_id") or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+            salvar_sessao_raw(sessao_raw)
+            sessao_raw = None
+            fechar_segmentos()
+            if fila_resultados is not None:
+                sid_segmentos = sid
+            if item.get("rec_format") == "raw":
+                sessao_raw = abrir_sessao_raw(sid, BAYER_MODE, PIPELINE_LUT, item.get("color_params"))
+
             tracking_path = os.path.join(CAPTURE_PATH, f"miniola_tracking_{sid}.jsonl")
             arquivo_tracking = open(tracking_path, "w", encoding="utf-8")
             print(f"[TRACKING] Arquivo de telemetria criado: {os.path.basename(tracking_path)}")
@@ -299,33 +529,23 @@ def processo_escrita_disco(fila_in):
         if msg_type == "rec_stop":
             fechar_sessao_audio_optico(sessao_audio, "manual_stop")
             sessao_audio = None
+            salvar_sessao_raw(sessao_raw)
+            sessao_raw = None
+            fechar_segmentos()
             if arquivo_tracking:
                 arquivo_tracking.close()
                 arquivo_tracking = None
             continue
 
-        # picamera2 com "RGB888" entrega BGR na memória (comportamento libcamera).
-        # O frame precisa ser convertido BGR→RGB antes de qualquer encoder que assuma RGB.
-        if isinstance(item, dict):
-            img_bgr = item.get("img_bgr")
-            filename = item.get("filename")
-        else:
-            try: img_bgr, filename = item
-            except Exception: continue
-
-        if img_bgr is None or not filename: continue
-
-        # Debayer Assíncrono: O loop principal da câmera manda o RAW8 cru e não gasta tempo.
-        # É este processo isolado (que roda em outro núcleo do processador) que faz o trabalho pesado de debayer.
-        if len(img_bgr.shape) == 2:
-            img_bgr = cv2.cvtColor(img_bgr, BAYER_MODE)
-            if PIPELINE_LUT is not None:
-                img_bgr = cv2.LUT(img_bgr, PIPELINE_LUT)
-
-        # Salva como JPEG com cores corretas usando libjpeg-turbo C++ nativo (cv2.imwrite):
-        # A velocidade de escrita cai de ~35ms para ~3ms por quadro, evitando que o buffer de memória do Python
-        # sature a controladora USB 3.0 e cause queda de pacotes (dropframes) na câmera Ximea.
-        cv2.imwrite(filename, img_bgr, [int(cv2.IMWRITE_JPEG_QUALITY), 95])
+        # Congela o estado de cor vigente neste ponto da sequência de mensagens
+        job = montar_job(item, anel, BAYER_MODE, PIPELINE_LUT, sid_segmentos)
+        if job is None:
+            continue
+        if "segmento" in job:
+            despachados += 1
+        fila_jobs.put(job)
+        if isinstance(item, dict) and item.get("frame_index") is not None:
+            proximo_frame = int(item["frame_index"]) + 1
 
         # Gravar as coordenadas matemáticas de registro deste fotograma
         if arquivo_tracking and "cy" in item:
@@ -337,44 +557,75 @@ def processo_escrita_disco(fila_in):
                 "oy": item.get("oy"),
                 "cw": item.get("cw"),
                 "ch": item.get("ch"),
-                "pitch_inst": item.get("pitch_inst", -1.0)
+                "rx": item.get("rx", 0),
+                "ry": item.get("ry", 0),
+                "pitch_inst": item.get("pitch_inst", -1.0),
+                # Metadados do sensor (SPEC-002): o process.py separa dropframe de filme rasgado por eles
+                **(item.get("meta") or {}),
             })
             arquivo_tracking.write(log_linha + "\n")
 
-def processar_captura(frame, cx_global, cy_global, n_frame, pitch_inst=-1.0):
-    global OFFSET_X, OFFSET_Y_CROP, CROP_W, CROP_H, ultimo_crop_preview, GRAVANDO
+def fixar_no_painel(anterior, quadro):
+    """Retém o buffer do quadro para o painel e solta o snapshot anterior (o driver só recicla sem donos)."""
+    if quadro is not None: quadro.retain()
+    if anterior is not None: anterior.release()
+    return quadro
+
+def processar_captura(quadro, cx_global, cy_global, n_frame, pitch_inst=-1.0, meta=None):
+    global OFFSET_X, OFFSET_Y_CROP, CROP_W, CROP_H, ultimo_crop_preview, painel_crop, GRAVANDO
     
-    fx, fy = cx_global + OFFSET_X, cy_global + OFFSET_Y_CROP
-    x1, y1 = max(0, int(fx - (CROP_W // 2))), max(0, int(fy - (CROP_H // 2)))
+    # Stream principal (gravação): no Pi com stream duplo só é mapeado aqui, nos quadros que disparam
+    frame = quadro.main()
+    # Janela de leitura (SPEC-002): (cx, cy) chegam em px do quadro; crop e offsets estão em px base
+    janela = quadro.readout
+    d, jx, jy = (janela.decimation, janela.x, janela.y) if janela is not None else (1, 0, 0)
+    crop_w, crop_h, margem = CROP_W // d // 2 * 2, CROP_H // d // 2 * 2, MARGEM_OVERSCAN // d // 2 * 2
+    fx, fy = cx_global + OFFSET_X / d, cy_global + OFFSET_Y_CROP / d
     # SPEC-002: Alinhamento da malha Bayer! Força o crop em coordenadas pares para evitar inversão (Zebra verde/roxa)
-    x1 = (x1 // 2) * 2
-    y1 = (y1 // 2) * 2
-    x2, y2 = min(frame.shape[1], x1 + CROP_W), min(frame.shape[0], y1 + CROP_H)
+    x1, y1, x2, y2 = regiao_gravacao(fx, fy, frame.shape[1], frame.shape[0], crop_w, crop_h, 0)
     
     crop = frame[y1:y2, x1:x2]
     
     if crop.size > 0:
         ultimo_crop_preview = crop
+        painel_crop = (fixar_no_painel(painel_crop[0], quadro), crop)
         if GRAVANDO:
-            filename = f"{CAPTURE_PATH}/miniola_{n_frame:06d}.jpg"
+            # Modo RAW: o mosaico Bayer de 1 canal é gravado sem perdas e o debayer fica para o process.py
+            gravar_raw = args.rec_format == "raw" and len(frame.shape) == 2
+            filename = f"{CAPTURE_PATH}/miniola_{n_frame:06d}.{'png' if gravar_raw else 'jpg'}"
+            # Cópia única apenas do crop + margem de overscan para o anel de memória compartilhada.
+            # A origem (rx, ry) vai para o JSONL para o process.py ancorar em coordenadas do sensor.
+            rx1, ry1, rx2, ry2 = regiao_gravacao(fx, fy, frame.shape[1], frame.shape[0], crop_w, crop_h, margem)
+            regiao = frame[ry1:ry2, rx1:rx2]
+            slot = anel_gravacao.put_frame(regiao)
+            if slot is None:
+                print(f"[WARN] Anel de gravação cheio, frame {n_frame} descartado ({anel_gravacao.ocupados()}/{anel_gravacao.n_slots} slots ocupados)")
+                return
             try:
                 fila_gravacao.put(
                     {
                         "type": "frame",
-                        "img_bgr": frame.copy(),  # Envia o frame INTEIRO (overscan) para o disco
+                        "slot": slot,
+                        "shape": regiao.shape,
+                        "dtype": regiao.dtype.str,
                         "filename": filename,
+                        "raw": gravar_raw,
                         "frame_index": n_frame,
-                        "cx": float(cx_global),
-                        "cy": float(cy_global),
+                        "cx": float(cx_global * d + jx),
+                        "cy": float(cy_global * d + jy),
                         "ox": int(OFFSET_X),
                         "oy": int(OFFSET_Y_CROP),
                         "cw": int(CROP_W),
                         "ch": int(CROP_H),
-                        "pitch_inst": float(pitch_inst)
+                        "rx": int(rx1 + jx),
+                        "ry": int(ry1 + jy),
+                        "pitch_inst": float(pitch_inst),
+                        "meta": meta,
                     },
                     block=False,
                 )
             except Exception as e:
+                anel_gravacao.discard(slot)
                 print(f"[WARN] Fila de gravação cheia, frame {n_frame} descartado: {e}")
 
 def disparar_processamento():
@@ -401,11 +652,28 @@ def disparar_processamento():
     PROCESSANDO_VIDEO = False
     print("[SISTEMA] Scanner acordado de volta à vida.")
 
+def governar_captura():
+    """Aplica o envelope do governador para o pitch medido agora e espelha o plano nos valores do console."""
+    global fps_cam, shutter_speed, gain
+    pitch = ultimo_pitch_medio if ultimo_pitch_medio > 0 else PITCH_PADRAO_PX
+    plano = governador.atualizar(camera, motor, pitch, PITCH_PADRAO_PX, camera.max_fps())
+    if plano is not None:
+        fps_cam, shutter_speed, gain = plano.fps_cam, int(plano.exposicao_us), plano.ganho
+    return plano
+
+def thread_governador():
+    # Pitch medido muda com o encolhimento e o tracking: reavalia o envelope durante a gravação
+    while True:
+        time.sleep(1.0)
+        if not (GOVERNADOR_ATIVO and GRAVANDO) or PROCESSANDO_VIDEO: continue
+        try: governar_captura()
+        except Exception as e: print(f"[GOVERNADOR] Falha ao reaplicar o envelope: {e}")
+
 def painel_controle():
     global frame_count, GRAVANDO, PLAYBACK_MODE, LINHA_GATILHO_Y, MARGEM_GATILHO, ROI_X, CROP_H, CROP_W, ROI_Y, ROI_W, ROI_H, THRESH_VAL
-    global foco_atual, passo_foco, shutter_speed, gain, fps_cam, OFFSET_X, contador_perfs_ciclo, CALIBRANDO
+    global foco_atual, passo_foco, shutter_speed, gain, fps_cam, OFFSET_X, MARGEM_OVERSCAN, contador_perfs_ciclo, CALIBRANDO
     global ultimo_pitch_medio, PITCH_PADRAO_PX, CV_ENGINE, FPS_PROJECAO, AUDIO_X_OFFSET, AUDIO_READ_W, fps_motor
-    global BAYER_MODE, WB_R, WB_G, WB_B, GAMMA_Y, GAMMA_C, CONTRAST, PIPELINE_LUT
+    global BAYER_MODE, WB_R, WB_G, WB_B, GAMMA_Y, GAMMA_C, CONTRAST, PIPELINE_LUT, GOVERNADOR_ATIVO
     
     def print_menu():
         print("\n" + "═"*60)
@@ -413,14 +681,14 @@ def painel_controle():
         print("═"*60)
         print(" [SISTEMA]   rec (Gravar) | play [fps] (Playback PLL) | stop (Para) | r (Zerar)")
         print("             proc (Encodar MP4) | rout (Limpar Vídeos)")
-        print(" [IMAGEM]    e [val] (Shutter) | g [val] (Gain) | fps [val] (FPS Cam)")
-        print(" [COR]       wb [R] [G] [B] | gamma [Y] [C] | contrast [val] | sharp [val] | bayer [0-3]")
+        print(" [IMAGEM]    e [val] (Shutter) | g [val] (Gain) | fps [val] (FPS Cam) | ro [perfil] (Leitura do Sensor)")
+        print(" [COR]       wb [R] [G] [B] | gamma [Y] [C] | contrast [val] | sharp [val] | bayer [0-3] | isp (Hardware x Software)")
         print(" [FOCO]      k/l (Foco Lente -/+) | af (Auto Foco) | zm [vel] (Foco Z Mecânico) | zs (Stop Z)")
-        print(" [TRACKING]  ly (Linha) | mg (Margem) | t [val] (Limiar/Thresh)")
+        print(" [TRACKING]  ly (Linha) | mg (Margem) | t [val] (Limiar/Thresh) | trk [0/1] (Varredura Incremental)")
         print(" [GEOMETRIA] w/a/s/d (Move ROI) | rx/ry/rw/rh [val] (Modifica ROI)")
-        print(" [CROP]      ch [val] (Alt) | cw [val] (Larg) | ox [val] (Offset X)")
+        print(" [CROP]      ch [val] (Alt) | cw [val] (Larg) | ox [val] (Offset X) | om [val] (Margem Overscan)")
         print(" [METROLOGIA]cal (Calibrar) | setcal [val] (Cal. Dinâmica)")
-        print(" [MOTOR]     mf [vel] (Avanço) | mb [vel] (Reverso) | ms (Parar) | mfps [val] | motor (C++/Py)")
+        print(" [MOTOR]     mf [vel] (Avanço) | mb [vel] (Reverso) | ms (Parar) | mfps [val] | phz [val] (Taxa PID) | mcal [hz] (Calibra FF) | motor (C++/Py) | gov [0/1] (Governador)")
         print(" [ÁUDIO]     ax [val] (Offset X) | aw [val] (Largura) | pfps [val] (FPS Proj.)")
         print(" [LUZ]       led [0-255] (Brilho do Painel)")
         print(" [OUTROS]    h (Menu) | off (Desligar)")
@@ -447,11 +715,24 @@ def painel_controle():
                     print("[MOTOR] Módulo C++ não está compilado. Impossível alternar.")
                 elif CV_ENGINE == "C++ [Pybind11]":
                     CV_ENGINE = "Python [Nativo]"
+                    scanner_py.reset_ciclo()
                     print(f"[MOTOR] Motor alternado para: {CV_ENGINE}")
                 else:
                     CV_ENGINE = "C++ [Pybind11]"
                     scanner_cv.reset_ciclo()
                     print(f"[MOTOR] Motor alternado para: {CV_ENGINE}")
+            elif cmd == 'trk':
+                if scanner_cv is None or not hasattr(scanner_cv, "set_tracking"):
+                    print("[TRACKING] Varredura incremental exige o motor C++.")
+                else:
+                    if len(entrada) > 1:
+                        scanner_cv.set_tracking(bool(int(val)), args.cv_full_scan)
+                        scanner_cv.reset_tracking_stats()
+                    st = scanner_cv.get_tracking_stats()
+                    print(f"[TRACKING] Incremental: {'ON' if st['habilitado'] else 'OFF'} | {st['incrementais']}/{st['quadros']} quadros "
+                          f"| fallback {st['taxa_fallback'] * 100:.1f}% (sem fase {st['fallback_sem_fase']}, confiança {st['fallback_confianca']}) "
+                          f"| completa {st['ms_varredura_completa']:.3f} ms vs faixas {st['ms_varredura_incremental']:.3f} ms "
+                          f"| economia {st['economia_ms_por_quadro']:.3f} ms/quadro")
             elif cmd == 'bayer':
                 if len(entrada) >= 2:
                     modo = int(entrada[1])
@@ -464,12 +745,8 @@ def painel_controle():
             elif cmd == 'wb':
                 if len(entrada) >= 4:
                     WB_R, WB_G, WB_B = float(entrada[1]), float(entrada[2]), float(entrada[3])
-                    if args.camera == 'ximea' and args.ximea_mode == 'rgb':
-                        camera.set_white_balance(WB_R, WB_G, WB_B)
-                        PIPELINE_LUT = None
-                    else:
-                        PIPELINE_LUT = build_color_lut(WB_R, WB_G, WB_B, GAMMA_Y, GAMMA_C, CONTRAST)
-                    fila_gravacao.put({"type": "set_lut", "lut": PIPELINE_LUT})
+                    PIPELINE_LUT = pipeline_cor.aplicar((WB_R, WB_G, WB_B), (GAMMA_Y, GAMMA_C), CONTRAST)
+                    fila_gravacao.put({"type": "set_lut", "lut": PIPELINE_LUT, "params": parametros_cor()})
                     print(f"[ISP] White Balance atualizado para R:{WB_R} G:{WB_G} B:{WB_B}")
                 else:
                     print("[ERRO] Uso: wb [R] [G] [B]. Exemplo: wb 1.5 1.0 1.5")
@@ -481,24 +758,20 @@ def painel_controle():
                 else:
                     print("[ERRO] Uso: gamma [Y] [C]. Exemplo: gamma 1.0 1.0")
                     continue
-                if args.camera == 'ximea' and args.ximea_mode == 'rgb':
-                    camera.set_gamma(GAMMA_Y, GAMMA_C)
-                    PIPELINE_LUT = None
-                else:
-                    PIPELINE_LUT = build_color_lut(WB_R, WB_G, WB_B, GAMMA_Y, GAMMA_C, CONTRAST)
-                fila_gravacao.put({"type": "set_lut", "lut": PIPELINE_LUT})
+                PIPELINE_LUT = pipeline_cor.aplicar((WB_R, WB_G, WB_B), (GAMMA_Y, GAMMA_C), CONTRAST)
+                fila_gravacao.put({"type": "set_lut", "lut": PIPELINE_LUT, "params": parametros_cor()})
                 print(f"[ISP] Gamma atualizado para Y:{GAMMA_Y} C:{GAMMA_C}")
             elif cmd == 'contrast':
                 CONTRAST = val
-                if args.camera == 'ximea' and args.ximea_mode == 'rgb':
-                    camera.set_contrast(CONTRAST)
-                    PIPELINE_LUT = None
-                else:
-                    PIPELINE_LUT = build_color_lut(WB_R, WB_G, WB_B, GAMMA_Y, GAMMA_C, CONTRAST)
-                fila_gravacao.put({"type": "set_lut", "lut": PIPELINE_LUT})
+                PIPELINE_LUT = pipeline_cor.aplicar((WB_R, WB_G, WB_B), (GAMMA_Y, GAMMA_C), CONTRAST)
+                fila_gravacao.put({"type": "set_lut", "lut": PIPELINE_LUT, "params": parametros_cor()})
                 print(f"[ISP] Contraste atualizado para {CONTRAST}")
             elif cmd == 'sharp':
-                camera.set_sharpness(val)
+                if pipeline_cor.caps.sharpness: camera.set_sharpness(val)
+                else: print("[ISP] Nitidez não suportada pelo hardware deste provedor.")
+            elif cmd == 'isp':
+                print(f"[ISP] {pipeline_cor.caps}")
+                for estagio, onde in pipeline_cor.estagios.items(): print(f"  {estagio:14s} {onde}")
             elif cmd == 'w': ROI_Y = max(0, ROI_Y - 5)
             elif cmd == 's': ROI_Y = min(RES_H - ROI_H, ROI_Y + 5)
             elif cmd == 'a': ROI_X = max(0, ROI_X - 5)
@@ -516,6 +789,9 @@ def painel_controle():
                 MARGEM_GATILHO = int(val)
                 print(f"[GATILHO] Margem ajustada para: +-{MARGEM_GATILHO}px")
             elif cmd == 'ox': OFFSET_X = int(val)
+            elif cmd == 'om':
+                MARGEM_OVERSCAN = max(0, int(val)) // 2 * 2
+                print(f"[CROP] Margem de overscan gravada: {MARGEM_OVERSCAN}px em volta do crop")
             elif cmd == 'ax': AUDIO_X_OFFSET = int(val)
             elif cmd == 'aw': AUDIO_READ_W = int(val)
             elif cmd == 'l':
@@ -542,8 +818,10 @@ def painel_controle():
                     print(f"[ÓPTICA] Erro no Autofoco nativo: {e}")
             elif cmd == 'e': 
                 shutter_speed = int(val); camera.set_exposure(shutter_speed)
+                lembrar_operador(exposicao=shutter_speed)
             elif cmd == 'cal':
                 CALIBRANDO = True
+                if readout is not None: readout.aplicar("calibrate", fps_cam)
                 print("[SISTEMA] MODO DE CALIBRAÇÃO ATIVADO!")
                 print("Vá para o navegador, clique no Live View e arraste para desenhar a linha do Pitch.")
             elif cmd == 'off':
@@ -559,11 +837,37 @@ def painel_controle():
                     print(f"-> Filme Referência utilizado: {encolhimento_referencia}% de encolhimento.")
                     print(f"-> Novo Padrão (0%): {PITCH_PADRAO_PX:.2f}px")
                 else: print("[ERRO] Deixe o filme de referência rodar e estabilizar no dashboard antes de calibrar.")
-            elif cmd == 'g': gain = val; camera.set_gain(gain)
-            elif cmd == 'fps': fps_cam = int(val); camera.set_fps(fps_cam)
+            elif cmd == 'g': gain = val; camera.set_gain(gain); lembrar_operador(ganho=gain)
+            elif cmd == 'fps': fps_cam = int(val); camera.set_fps(fps_cam); lembrar_operador(fps=fps_cam)
+            elif cmd == 'gov':
+                if len(entrada) > 1: GOVERNADOR_ATIVO = entrada[1] in ('1', 'on')
+                pitch = ultimo_pitch_medio if ultimo_pitch_medio > 0 else PITCH_PADRAO_PX
+                plano = governador.envelope(pitch, PITCH_PADRAO_PX, camera.max_fps())
+                print(f"[GOVERNADOR] {'ATIVO' if GOVERNADOR_ATIVO else 'DESLIGADO'} | envelope para pitch {pitch:.1f}px: {plano}")
+            elif cmd == 'ro':
+                if readout is None: print("[READOUT] Perfis desligados (--readout off).")
+                elif len(entrada) > 1: readout.aplicar(entrada[1], fps_cam)
+                else:
+                    st = readout.stats()
+                    print(f"[READOUT] Ativo: {st['ativo']} {st['quadro'][0]}x{st['quadro'][1]} ({st['banda_relativa']*100:.0f}% da banda base)")
+                    for nome, p in st["perfis"].items():
+                        print(f"  {nome:10s} {p['width']}x{p['height']} +{p['x']}+{p['y']} decimação {p['decimation']}")
             elif cmd == 'mfps': 
                 fps_motor = float(val)
+                governador.fps_motor_max = fps_motor
                 print(f"[MOTOR] Velocidade Alvo de Captura definida para {fps_motor} fps.")
+            elif cmd == 'phz':
+                if val > 0: motor.set_pid_rate(val)
+                st = motor.pid_stats()
+                print(f"[MOTOR] PID a {st['hz']:.0f} Hz | jitter médio {st['jitter_medio_ms']:.2f} ms (máx {st['jitter_max_ms']:.2f}) | estouros {st['estouros']}")
+            elif cmd == 'mcal':
+                if GRAVANDO: print("[MOTOR] Calibração do feed-forward só fora do REC (roda o Y em malha aberta).")
+                else:
+                    hz_max = int(val) if val > 0 else 6000
+                    print(f"[MOTOR] Calibrando feed-forward até {hz_max} Hz (use o leader)...")
+                    cal = motor.calibrate_feed_forward(frequencias=(hz_max // 3, 2 * hz_max // 3, hz_max))
+                    if cal is None: print("[MOTOR] Calibração falhou (placa desconectada, PID girando ou encoder mudo).")
+                    else: print(f"[MOTOR] Carretel {cal['raio_mm']} mm | {1.0 / cal['k']:.2f} Hz por mm/s | desvio da reta {cal['desvio_linear_pct']}% | pontos {cal['pontos']}")
             elif cmd == 't': THRESH_VAL = int(val)
             elif cmd == 'mf': 
                 spd = int(val) if val > 0 else 2000
@@ -581,7 +885,8 @@ def painel_controle():
                 PLAYBACK_MODE = True
                 GRAVANDO = False
                 target_fps = float(val) if val > 0 else 24.0
-                camera.set_fps(target_fps)
+                if readout is not None: readout.aplicar("playback", target_fps)
+                else: camera.set_fps(target_fps)
                 motor.start_pid(target_fps=target_fps)
                 print(f"[PLAYBACK] Iniciado a {target_fps} fps (Free Run da Câmera + PLL do Motor)")
             elif cmd == 'stop':
@@ -589,6 +894,7 @@ def painel_controle():
                 GRAVANDO = False
                 motor.stop_pid()
                 motor.stop()
+                if readout is not None: readout.aplicar("base", fps_cam)
                 print("[SISTEMA] Parada (Stop)")
             elif cmd == 'rec':
                 PLAYBACK_MODE = False
@@ -599,6 +905,7 @@ def painel_controle():
             elif cmd == 'rc': 
                 contador_perfs_ciclo = 0
                 if CV_ENGINE == "C++ [Pybind11]" and scanner_cv is not None: scanner_cv.reset_ciclo()
+                else: scanner_py.reset_ciclo()
                 print("[SISTEMA] Fase realinhada! Ciclo forçado para 0/4.")
             elif cmd == 'rout': 
                 print("[SISTEMA] Queimando os acetatos da prateleira (Limpeza de Filmes Renderizados)...")
@@ -619,20 +926,20 @@ def painel_controle():
         except Exception as e: print(f"Erro: {e}")
 
 def logica_scanner():
-    cap_array = camera.get_frame
-    cv_cvt = cv2.cvtColor
-    cv_resize = cv2.resize
-    cv_thresh = cv2.threshold
-    cv_find = cv2.findContours
+    ler_quadro = captura.read
     get_time = time.perf_counter
     
-    global frame_count, ultimo_frame_bruto, ultimo_frame_binario, lista_contornos_debug
+    global frame_count, ultimo_frame_bruto, ultimo_frame_binario, lista_contornos_debug, painel_quadro
     global contador_perfs_ciclo, perfuracao_na_linha, fps_real_proc, tempo_ms_ciclo
     global encolhimento_atual_pct, PITCH_PADRAO_PX, ultimo_pitch_medio, AUDIO_X_OFFSET
 
-    ESCALA_CV = 0.5 
     skip_ui = 0
-    buffer_pitches = []  
+    # API sem alocação do motor C++ (binários antigos só têm process_frame)
+    buffers_cv = None
+    if scanner_cv is not None and hasattr(scanner_cv, "process_frame_into"):
+        buffers_cv = VisionBuffers(miniola_cv.result_dtype())
+    # Motor NumPy (mesmo algoritmo de projeção + PLL) quando o C++ não está compilado ou foi desligado
+    buffers_py = VisionBuffers(result_dtype_numpy())
     buffer_tempos = []
 
     while True:
@@ -641,119 +948,93 @@ def logica_scanner():
             continue
             
         t_inicio = get_time()
-        frame_raw = cap_array()
-        if frame_raw is None: continue
+        quadro = ler_quadro()
+        if quadro is None: continue
+        frame_raw = quadro.data
         
         lx, ly, lw, lh = ROI_X, ROI_Y, ROI_W, ROI_H
         
         if CV_ENGINE == "C++ [Pybind11]":
-            slit_y = ROI_Y + (ROI_H // 2)
-            audio_x = ROI_X + ROI_W + AUDIO_X_OFFSET
+            motor_cv, buffers = scanner_cv, buffers_cv
+        else:
+            motor_cv, buffers = scanner_py, buffers_py
+        
+        slit_y = ROI_Y + (ROI_H // 2)
+        audio_x = ROI_X + ROI_W + AUDIO_X_OFFSET
+        linha, margem, pitch_padrao, audio_w = LINHA_GATILHO_Y, MARGEM_GATILHO, PITCH_PADRAO_PX, AUDIO_READ_W
+
+        # Janela de leitura do sensor (SPEC-002): a geometria está em px base, a visão roda em px do quadro
+        janela = quadro.readout
+        na_janela = janela is not None and not janela.identidade()
+        d = janela.decimation if na_janela else 1
+        if na_janela:
+            lx, ly = (lx - janela.x) // d, (ly - janela.y) // d
+            lw, lh = max(1, lw // d), max(1, lh // d)
+            slit_y, audio_x = (slit_y - janela.y) // d, (audio_x - janela.x) // d
+            linha, margem, pitch_padrao, audio_w = linha // d, max(1, margem // d), pitch_padrao / d, max(1, audio_w // d)
 
-            ret = scanner_cv.process_frame(
+        if buffers is not None:
+            # Preview e rects de debug só nos quadros que vão de fato para o painel
+            quadro_de_painel = skip_ui + 1 >= 3
+            binary_small = buffers.binario_para(lw, lh, frame_raw.shape, lx, ly) if quadro_de_painel else None
+            motor_cv.process_frame_into(
                 frame_raw, lx, ly, lw, lh,
-                THRESH_VAL, LINHA_GATILHO_Y, MARGEM_GATILHO, PITCH_PADRAO_PX,
-                (GRAVANDO and AUDIO_CAPTURE_ENABLED), audio_x, AUDIO_READ_W, slit_y
+                THRESH_VAL, linha, margem, pitch_padrao,
+                (GRAVANDO and AUDIO_CAPTURE_ENABLED), audio_x, audio_w, slit_y,
+                buffers.resultado,
+                buffers.rects if quadro_de_painel else None,
+                buffers.audio,
+                binary_small,
+            )
+            ret = buffers.resultado[0]
+            audio_chunk = buffers.audio_chunk(int(ret["audio_len"]))
+            debug_visual = buffers.debug_visual(int(ret["n_rects"])) if quadro_de_painel else []
+        else:
+            ret = motor_cv.process_frame(
+                frame_raw, lx, ly, lw, lh,
+                THRESH_VAL, linha, margem, pitch_padrao,
+                (GRAVANDO and AUDIO_CAPTURE_ENABLED), audio_x, audio_w, slit_y
             )
             binary_small = ret["binary_small"]
-            
             audio_chunk = ret.get("audio_chunk")
-            if audio_chunk is not None and audio_chunk.size > 0:
-                try: fila_gravacao.put({"type": "audio_chunk", "data": audio_chunk}, block=False)
-                except Exception as e: print(f"[WARN] Fila cheia, chunk de áudio descartado: {e}")
-
-            debug_visual = []
-            if "debug_visual" in ret:
-                for item in ret["debug_visual"]:
-                    debug_visual.append({'rect': item['rect'], 'color': item['color']})
-            
-            perfuracao_na_linha = ret["perfuracao_na_linha"]
-            contador_perfs_ciclo = ret["contador_perfs_ciclo"]
-            encolhimento_atual_pct = ret["encolhimento_atual_pct"]
-            
-            if ret.get("ultimo_pitch_medio", 0) > 0:
-                ultimo_pitch_medio = ret["ultimo_pitch_medio"]
-            furo_detectado_agora = ret["achou_furo"]
-
-            if ret["capturar"]:
-                if PLAYBACK_MODE:
-                    erro_y_px = ret["cy_a"] - (LINHA_GATILHO_Y + ly)
-                    motor.update_phase_error(erro_y_px, PITCH_PADRAO_PX)
-                    processar_captura(frame_raw, ret["cx_a"], ret["cy_a"], frame_count, ret.get("pitch_instantaneo", -1.0))
-                else:
-                    motor.sync_optical_phase()
-                    p_inst = ret.get("pitch_instantaneo", -1.0)
-                    processar_captura(frame_raw, ret["cx_a"], ret["cy_a"], frame_count, p_inst)
-                    frame_count += 1
-        else:
-            roi_color = frame_raw[ly:ly+lh, lx:lx+lw]
-            if len(roi_color.shape) == 3:
-                roi_gray = cv_cvt(roi_color, cv2.COLOR_BGR2GRAY)
+            debug_visual = ret.get("debug_visual", [])
+        if na_janela:
+            # O painel desenha sobre a janela base
+            debug_visual = [dict(item, rect=(item['rect'][0] * d + janela.x, item['rect'][1] * d + janela.y,
+                                             item['rect'][2] * d, item['rect'][3] * d)) for item in debug_visual]
+        
+        if audio_chunk is not None and audio_chunk.size > 0:
+            try: fila_gravacao.put({"type": "audio_chunk", "data": audio_chunk}, block=False)
+            except Exception as e: print(f"[WARN] Fila cheia, chunk de áudio descartado: {e}")
+        
+        perfuracao_na_linha = bool(ret["perfuracao_na_linha"])
+        contador_perfs_ciclo = int(ret["contador_perfs_ciclo"])
+        encolhimento_atual_pct = float(ret["encolhimento_atual_pct"])
+        
+        if ret["ultimo_pitch_medio"] > 0:
+            ultimo_pitch_medio = float(ret["ultimo_pitch_medio"]) * d
+        furo_detectado_agora = bool(ret["achou_furo"])
+
+        meta = None
+        if ret["capturar"] or GRAVANDO:
+            # Contadores cumulativos: diferenças entre linhas do JSONL localizam as perdas
+            meta = quadro.metadata()
+            meta["drops_sensor"] = captura.drops_sensor
+            meta["overflow"] = captura.overflow_anel
+            if na_janela:
+                meta["readout"] = [janela.x, janela.y, d]
+
+        if ret["capturar"]:
+            if PLAYBACK_MODE:
+                # Erro de fase em px base: o PLL não enxerga a decimação do playback
+                erro_y_px = (int(ret["cy_a"]) - (linha + ly)) * d
+                motor.update_phase_error(erro_y_px, PITCH_PADRAO_PX)
+                processar_captura(quadro, int(ret["cx_a"]), int(ret["cy_a"]), frame_count, float(ret["pitch_instantaneo"]) * d, meta)
             else:
-                roi_gray = roi_color
-                
-            roi_small = cv_resize(roi_gray, (0, 0), fx=ESCALA_CV, fy=ESCALA_CV) 
-            _, binary_small = cv_thresh(roi_small, THRESH_VAL, 255, cv2.THRESH_BINARY)  
-            
-            debug_visual = []
-            furo_detectado_agora = False
-            contours, _ = cv_find(binary_small, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-            
-            limite_superior = LINHA_GATILHO_Y - MARGEM_GATILHO
-            limite_inferior = LINHA_GATILHO_Y + MARGEM_GATILHO
-            
-            furos_validos = []
-            for cnt in contours:
-                x_s, y_s, w_s, h_s = cv2.boundingRect(cnt)
-                area_aprox = (w_s * h_s) * 4 
-                if 200 < area_aprox < 10000 and 0.2 < (w_s / h_s) < 2.5:
-                    cy_roi = (y_s * 2) + ((h_s * 2) // 2)
-                    cx_global = (x_s * 2) + (w_s * 2 // 2) + lx
-                    cy_global = cy_roi + ly
-                    acionou = limite_superior <= cy_roi <= limite_inferior
-                    cor = (0, 0, 255) if acionou else (0, 255, 0)
-                    furos_validos.append({'cy_roi': cy_roi, 'cx_g': cx_global, 'cy_g': cy_global, 'acionou': acionou})
-                    debug_visual.append({'rect': (x_s*2+lx, y_s*2+ly, w_s*2, h_s*2), 'color': cor})
-
-            furos_validos.sort(key=lambda p: p['cy_roi'])
-            if furos_validos and furos_validos[0]['acionou']:
-                furo_detectado_agora = True
-                if not perfuracao_na_linha:
-                    contador_perfs_ciclo += 1
-                    perfuracao_na_linha = True
-                    if contador_perfs_ciclo >= 4:
-                        qtd = min(4, len(furos_validos))
-                        pts = furos_validos[0:qtd]
-                        cx_a = int(sum(p['cx_g'] for p in pts) / qtd)
-                        if qtd > 1:
-                            soma_pitch = 0
-                            for i in range(1, qtd): soma_pitch += (pts[i]['cy_g'] - pts[i-1]['cy_g'])
-                            pitch_instantaneo = soma_pitch / (qtd - 1)
-                            if pitch_instantaneo > 0:
-                                buffer_pitches.append(pitch_instantaneo)
-                                if len(buffer_pitches) >= 10:
-                                    pitch_medio = sum(buffer_pitches) / len(buffer_pitches)
-                                    ultimo_pitch_medio = pitch_medio 
-                                    calc_pct = (1.0 - (pitch_medio / PITCH_PADRAO_PX)) * 100.0
-                                    encolhimento_atual_pct = max(-5.0, min(10.0, calc_pct))
-                                    buffer_pitches.clear()    
-                            soma_centros_y = 0
-                            for i in range(qtd):
-                                multiplicador = 1.5 - i 
-                                soma_centros_y += (pts[i]['cy_g'] + (multiplicador * pitch_instantaneo))
-                            cy_a = int(soma_centros_y / qtd)
-                        else: cy_a = int(pts[0]['cy_g'] + 150) 
-                        
-                        if PLAYBACK_MODE:
-                            erro_y_px = cy_a - (LINHA_GATILHO_Y + ly)
-                            motor.update_phase_error(erro_y_px, PITCH_PADRAO_PX)
-                            processar_captura(frame_raw, cx_a, cy_a, frame_count)
-                        else:
-                            motor.sync_optical_phase()
-                            processar_captura(frame_raw, cx_a, cy_a, frame_count)
-                            frame_count += 1
-                            
-                        contador_perfs_ciclo = 0
+                motor.sync_optical_phase()
+                p_inst = float(ret["pitch_instantaneo"]) * d
+                processar_captura(quadro, int(ret["cx_a"]), int(ret["cy_a"]), frame_count, p_inst, meta)
+                frame_count += 1
 
         if not furo_detectado_agora: perfuracao_na_linha = False
         
@@ -767,19 +1048,19 @@ def logica_scanner():
             motor.sync_optical_phase() # Zera o acumulador para o próximo quadro
             #print(f"[ALERTA] Interpolação Forçada (Furo Perdido)! Dist: {distancia_acumulada:.1f}mm")
             
-            cy_teorico = int(LINHA_GATILHO_Y + ly)
+            cy_teorico = int(linha + ly)
             cx_teorico = int(lx + (lw // 2))
             
-            processar_captura(frame_raw, cx_teorico, cy_teorico, frame_count, ultimo_pitch_medio)
+            processar_captura(quadro, cx_teorico, cy_teorico, frame_count, ultimo_pitch_medio, meta)
             frame_count += 1
-            if CV_ENGINE == "C++ [Pybind11]":
-                scanner_cv.reset_ciclo()
+            motor_cv.reset_ciclo()
         # ----------------------------------------------------------
 
         skip_ui += 1
         if skip_ui >= 3:
-            ultimo_frame_bruto = frame_raw 
-            ultimo_frame_binario = binary_small
+            painel_quadro = fixar_no_painel(painel_quadro, quadro)
+            ultimo_frame_bruto = frame_raw
+            if binary_small is not None: ultimo_frame_binario = binary_small
             lista_contornos_debug = debug_visual
             skip_ui = 0
         
@@ -789,14 +1070,29 @@ def logica_scanner():
         if len(buffer_tempos) > 30: buffer_tempos.pop(0)
         tempo_ms_ciclo = sum(buffer_tempos) / len(buffer_tempos)
         fps_real_proc = 1000.0 / tempo_ms_ciclo if tempo_ms_ciclo > 0 else 0
+        # Visão e gravação terminaram com os pixels: devolve o buffer (painel segura o seu com retain)
+        quadro.release()
 
 if __name__ == '__main__':
     from core.state import state
     from web.app import create_app
     
-    mp.Process(target=processo_escrita_disco, args=(fila_gravacao,), daemon=True).start()
+    import atexit
+    atexit.register(anel_gravacao.close)
+    if tap_sensor is not None:
+        atexit.register(tap_sensor.close)  # Depois de captura.stop (atexit roda em ordem inversa)
+    n_codificadores = max(1, args.writers)
+    fila_jobs = mp.Queue(maxsize=anel_gravacao.n_slots)
+    # Segmentos .mseg: os codificadores devolvem os bytes para um único anexador no sequenciador
+    fila_resultados = mp.Queue(maxsize=anel_gravacao.n_slots * 2) if args.rec_container == 'segments' else None
+    for wid in range(n_codificadores):
+        mp.Process(target=processo_codificador, args=(fila_jobs, anel_gravacao, wid, fila_resultados), daemon=True).start()
+    mp.Process(target=processo_escrita_disco, args=(fila_gravacao, fila_jobs, anel_gravacao, n_codificadores, fila_resultados), daemon=True).start()
+    captura.start()
+    atexit.register(captura.stop)
     threading.Thread(target=logica_scanner, daemon=True).start()
     threading.Thread(target=painel_controle, daemon=True).start()
+    threading.Thread(target=thread_governador, daemon=True).start()
     
     app_web = create_app(state)
     app_web.run(host='0.0.0.0', port=5000, threaded=True)
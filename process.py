@@ -1,5 +1,6 @@
 import argparse
 import json
+import os
 import re
 import shlex
 import shutil
@@ -9,12 +10,15 @@ import wave
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Iterable
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 
 from PIL import Image
 import cv2
 import numpy as np
 
+from core.segment_container import SegmentArchive, SegmentFrame
+
 try:
     import scipy.signal as sp_signal
     from scipy.interpolate import CubicSpline
@@ -34,6 +38,7 @@ except ImportError:
 
 SUPPORTED_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp")
 AUDIO_SIDECAR_GLOB = "miniola_audio_*.json"
+SESSION_META_GLOB = "miniola_session_*.json"
 
 # No filme 35mm, a trilha ótica está fisicamente 21 fotogramas à frente
 # da janela de projeção. Para sincronizar áudio e vídeo é necessário
@@ -41,7 +46,25 @@ AUDIO_SIDECAR_GLOB = "miniola_audio_*.json"
 FILM_35MM_AUDIO_ADVANCE_FRAMES = 21
 
 
-def read_frame_as_grayscale(path: Path) -> np.ndarray | None:
+# Um quadro é um arquivo solto (Path) ou uma referência dentro de um segmento .mseg (SegmentFrame)
+Frame = Path | SegmentFrame
+
+
+def frame_index_of(frame: Frame) -> int | None:
+    if isinstance(frame, SegmentFrame):
+        return frame.index
+    return extract_last_number(frame)
+
+
+def imread_frame(frame: Frame, flags: int = cv2.IMREAD_COLOR) -> np.ndarray | None:
+    if isinstance(frame, SegmentFrame):
+        return frame.decode(flags)
+    return cv2.imread(str(frame), flags)
+
+
+def read_frame_as_grayscale(path: Frame) -> np.ndarray | None:
+    if isinstance(path, SegmentFrame):
+        return path.decode(cv2.IMREAD_GRAYSCALE)
     try:
         frame = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
         return frame
@@ -79,8 +102,80 @@ def load_tracking_data(input_dir: Path) -> dict[int, dict]:
         return None
 
 
+def load_session_meta(input_dir: Path) -> dict | None:
+    """Lê o sidecar de sessão mais recente (gravação RAW: padrão Bayer + LUT registrados uma vez)."""
+    meta_files = sorted(input_dir.glob(SESSION_META_GLOB), key=lambda p: p.stat().st_mtime, reverse=True)
+    for meta_path in meta_files:
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        meta["meta_path"] = str(meta_path)
+        return meta
+    return None
+
+
+def _bayer_code(name: str | None) -> int:
+    code = getattr(cv2, f"COLOR_{name}", None) if name else None
+    return code if code is not None else cv2.COLOR_BayerBG2BGR
+
+
+def _lut_from_list(values) -> np.ndarray | None:
+    if values is None:
+        return None
+    return np.asarray(values, dtype=np.uint8).reshape(1, 256, 3)
+
+
+def build_color_timeline(session_meta: dict | None) -> list[tuple[int, int, np.ndarray | None]]:
+    """
+    Converte o sidecar RAW numa linha do tempo [(frame_inicial, bayer, lut)], ordenada.
+    As mudanças feitas pelo operador durante a sessão valem a partir do quadro registrado.
+    """
+    if not session_meta:
+        return []
+    bayer = _bayer_code(session_meta.get("bayer"))
+    lut = _lut_from_list(session_meta.get("lut"))
+    timeline = [(-1, bayer, lut)]
+    for change in sorted(session_meta.get("changes", []), key=lambda c: c.get("from_frame", 0)):
+        if "bayer" in change:
+            bayer = _bayer_code(change["bayer"])
+        if "lut" in change:
+            lut = _lut_from_list(change["lut"])
+        timeline.append((int(change.get("from_frame", 0)), bayer, lut))
+    return timeline
+
+
+def color_state_for_frame(timeline: list, frame_index: int) -> tuple[int, np.ndarray | None]:
+    state = timeline[0]
+    for entry in timeline:
+        if entry[0] > frame_index:
+            break
+        state = entry
+    return state[1], state[2]
+
+
+def develop_raw_frame(raw: np.ndarray, bayer_code: int, lut: np.ndarray | None) -> np.ndarray:
+    """Revelação adiada do RAW8: debayer para BGR e aplicação da LUT de cor da sessão."""
+    bgr = cv2.cvtColor(raw, bayer_code)
+    if lut is not None:
+        bgr = cv2.LUT(bgr, lut)
+    return bgr
+
+
+def read_frame_for_render(path: Frame, timeline: list) -> np.ndarray | None:
+    """Lê um quadro para o render: JPEG colorido direto, ou mosaico Bayer revelado se a sessão for RAW."""
+    if not timeline:
+        return imread_frame(path)
+    img = imread_frame(path, cv2.IMREAD_UNCHANGED)
+    if img is None or img.ndim == 3:
+        return img
+    idx = frame_index_of(path)
+    bayer_code, lut = color_state_for_frame(timeline, idx if idx is not None else 0)
+    return develop_raw_frame(img, bayer_code, lut)
+
+
 def extract_audio_from_frames(
-    frames: list[Path],
+    frames: list[Frame],
     roi: tuple[int, int, int, int],
     audio_mode: str,
     sample_rate: int,
@@ -294,14 +389,22 @@ def extract_last_number(path: Path) -> int | None:
     return int(matches[-1])
 
 
-def list_frames(input_dir: Path) -> list[Path]:
+def list_frames(input_dir: Path) -> list[Frame]:
+    """
+    Lista os quadros da captura. Se houver segmentos .mseg, o índice dos rodapés substitui
+    a varredura do diretório (um quadro por arquivo fica como formato legado).
+    """
+    if SegmentArchive.has_segments(input_dir):
+        archive = SegmentArchive(input_dir).refresh()
+        print(f"[INFO] Segmentos .mseg detectados: {archive.count()} quadros indexados.")
+        return archive.frames()
     frames = [p for p in input_dir.iterdir() if p.suffix.lower() in SUPPORTED_EXTENSIONS and p.is_file()]
     return sorted(frames, key=natural_sort_key)
 
 
-def detect_missing_indices(frames: Iterable[Path]) -> list[int]:
+def detect_missing_indices(frames: Iterable[Frame]) -> list[int]:
     """Retorna lista de índices numéricos absolutos ausentes na sequência (não paths de arquivo)."""
-    numeric_indices = [extract_last_number(frame) for frame in frames]
+    numeric_indices = [frame_index_of(frame) for frame in frames]
     numeric_indices = [idx for idx in numeric_indices if idx is not None]
     if len(numeric_indices) < 2:
         return []
@@ -312,6 +415,53 @@ def detect_missing_indices(frames: Iterable[Path]) -> list[int]:
     return missing
 
 
+def analyze_frame_timing(tracking_data: dict[int, dict], gap_factor: float = 1.5) -> dict | None:
+    """
+    Perdas e buracos de tempo a partir dos metadados do sensor gravados no JSONL (SPEC-002).
+
+    Diferente de `detect_missing_indices`, que só enxerga buracos na numeração dos arquivos, aqui
+    os contadores cumulativos `drops_sensor`/`overflow` dizem exatamente entre quais capturas o
+    sensor ou o anel de aquisição perderam quadros, e `ts_sensor` (ou `ts_host` na falta dele)
+    marca intervalos acima de `gap_factor` × a mediana. Retorna None sem telemetria de quadro.
+    """
+    rows = [tracking_data[k] for k in sorted(tracking_data) if tracking_data[k].get("ts_host") is not None]
+    if len(rows) < 2:
+        return None
+
+    clock = "ts_sensor" if all(r.get("ts_sensor") is not None for r in rows) else "ts_host"
+    times = np.array([float(r[clock]) for r in rows])
+    intervals = np.diff(times)
+    median = float(np.median(intervals))
+
+    time_gaps = []
+    if median > 0:
+        for i in np.flatnonzero(intervals > gap_factor * median):
+            time_gaps.append({
+                "frame": rows[i + 1]["frame"],
+                "gap_ms": round(float(intervals[i]) * 1000.0, 3),
+                "expected_ms": round(median * 1000.0, 3),
+            })
+
+    drop_events = []
+    for previous, current in zip(rows, rows[1:]):
+        dropped = int(current.get("drops_sensor") or 0) - int(previous.get("drops_sensor") or 0)
+        if dropped > 0:
+            drop_events.append({"frame": current["frame"], "dropped": dropped})
+
+    seqs = [r.get("seq") for r in rows]
+    seq_steps = [b - a for a, b in zip(seqs, seqs[1:]) if a is not None and b is not None]
+    return {
+        "frames_with_metadata": len(rows),
+        "clock": clock,
+        "median_interval_ms": round(median * 1000.0, 3),
+        "time_gaps": time_gaps,
+        "sensor_drop_events": drop_events,
+        "sensor_drops_total": int(rows[-1].get("drops_sensor") or 0) - int(rows[0].get("drops_sensor") or 0),
+        "ring_overflow_total": int(rows[-1].get("overflow") or 0) - int(rows[0].get("overflow") or 0),
+        "sensor_frames_per_capture_median": float(np.median(seq_steps)) if seq_steps else None,
+    }
+
+
 def build_concat_manifest(frames: list[Path], fps: float, manifest_path: Path) -> None:
     frame_duration = 1.0 / fps
     lines: list[str] = []
@@ -437,7 +587,12 @@ def build_ffmpeg_mux_command(
     ]
 
 
-def probe_first_frame(path: Path) -> tuple[int, int]:
+def probe_first_frame(path: Frame) -> tuple[int, int]:
+    if isinstance(path, SegmentFrame):
+        img = path.decode(cv2.IMREAD_UNCHANGED)
+        if img is None:
+            raise RuntimeError(f"Não foi possível decodificar o primeiro frame do segmento: {path}")
+        return img.shape[1], img.shape[0]
     try:
         # Abertura extremamente rápida sem decodificar a bagagem do JPEG no O(N) de tempo.
         with Image.open(path) as img:
@@ -446,31 +601,81 @@ def probe_first_frame(path: Path) -> tuple[int, int]:
         raise RuntimeError(f"Não foi possível ler as dimensões do primeiro frame: {path}") from e
 
 
+def anchor_transform(track: dict | None, cx: float, img_shape: tuple, crop_w: int, crop_h: int,
+                     pitch_padrao: float, disable_rs_comp: bool) -> tuple[np.ndarray, int, int]:
+    """
+    Matriz afim (translação X, escala + translação Y) que leva o furo rastreado ao centro do crop.
+
+    (cx, cy) estão em coordenadas do sensor e a imagem gravada começa em (rx, ry) do sensor
+    (crop + margem de overscan); capturas de quadro inteiro não têm rx/ry e ancoram com origem 0.
+    """
+    scale_y = 1.0
+    if track:
+        cy, ox = track["cy"], track["ox"]
+        oy = track.get("oy", 0) # Fallback para vídeos gravados antes do Crop Dinâmico
+        cw, ch = track.get("cw", crop_w), track.get("ch", crop_h)
+        # Origem da região gravada (crop + margem) no sensor; 0 em capturas de frame inteiro
+        rx, ry = track.get("rx", 0), track.get("ry", 0)
+
+        # Para sensores Rolling Shutter (ex: Raspberry Pi V3), usamos o stretch vertical.
+        # Para sensores Global Shutter (ex: XIMEA), desativamos para evitar "vertical breathing".
+        pitch_inst = track.get("pitch_inst", -1.0)
+        if pitch_padrao > 0 and pitch_inst > 0 and not disable_rs_comp:
+            scale_y = pitch_padrao / pitch_inst
+    else:
+        # Fallback no centro se faltar tracking
+        cy, ox, oy = img_shape[0] / 2, 0, 0
+        cx = img_shape[1] / 2
+        cw, ch = crop_w, crop_h
+        rx, ry = 0, 0
+
+    center_x, center_y = cx + ox - rx, cy + oy - ry
+
+    # Matriz Afim: Translação X, e (Escala Y + Translação Y)
+    # Para que o center_y original caia exatamente no meio do crop_h após o redimensionamento.
+    tx = cw / 2.0 - center_x
+    ty = ch / 2.0 - (scale_y * center_y)
+    return np.float32([[1.0, 0.0, tx], [0.0, scale_y, ty]]), cw, ch
+
+
 def render_stabilized_video_stream(
     ffmpeg_path: str,
-    frames: list[Path],
+    frames: list[Frame],
     tracking_data: dict[int, dict],
     fps: float,
     disable_rs_comp: bool,
     outputs: list[tuple[Path, str]],
+    session_meta: dict | None = None,
+    workers: int | None = None,
 ):
-    """Lê frames, recorta e alinha perfeitamente usando sub-pixel warpAffine, e envia pro ffmpeg via pipe."""
+    """
+    Lê frames, recorta e alinha perfeitamente usando sub-pixel warpAffine, e envia pro ffmpeg via pipe.
+
+    Em sessões RAW (`session_meta`), o debayer e a LUT acontecem aqui, junto com o warp, num pool de
+    threads (o OpenCV libera o GIL). A janela de futures é limitada e consumida em ordem.
+    """
+    timeline = build_color_timeline(session_meta)
+
     # Descobre tamanho final do crop com base no primeiro frame rastreado
     ref_track = None
     for f in frames:
-        idx = int(f.stem.split('_')[-1])
+        idx = frame_index_of(f)
         if idx in tracking_data:
             ref_track = tracking_data[idx]
             break
             
     if not ref_track:
-        raise RuntimeError("Nenhum dado de tracking casou com os frames encontrados.")
+        if tracking_data:
+            raise RuntimeError("Nenhum dado de tracking casou com os frames encontrados.")
+        # Sem telemetria (sessão RAW ou segmentos .mseg): quadro inteiro, sem ancoragem
+        full_w, full_h = probe_first_frame(frames[0])
+        ref_track = {"cx": full_w / 2.0, "cw": full_w, "ch": full_h}
 
     crop_w, crop_h = ref_track["cw"], ref_track["ch"]
     
     valid_pitches = []
     for f in frames:
-        idx = int(f.stem.split('_')[-1])
+        idx = frame_index_of(f)
         if idx in tracking_data:
             p = tracking_data[idx].get("pitch_inst", -1.0)
             if p > 0:
@@ -484,7 +689,7 @@ def render_stabilized_video_stream(
     raw_cx_array = []
     last_valid_cx = ref_track["cx"]
     for f in frames:
-        idx = int(f.stem.split('_')[-1])
+        idx = frame_index_of(f)
         if idx in tracking_data:
             last_valid_cx = tracking_data[idx]["cx"]
         raw_cx_array.append(last_valid_cx)
@@ -516,50 +721,37 @@ def render_stabilized_video_stream(
         elif out_type == "prores":
             cmd.extend(["-c:v", "prores_ks", "-profile:v", "3", "-pix_fmt", "yuv422p10le", str(out_path)])
 
+    def preparar_frame(i: int, frame_path: Frame) -> bytes | None:
+        img = read_frame_for_render(frame_path, timeline)
+        if img is None: return None
+            
+        f_idx = frame_index_of(frame_path)
+        M, cw, ch = anchor_transform(tracking_data.get(f_idx), smoothed_cx[i], img.shape, crop_w, crop_h,
+                                     pitch_padrao, disable_rs_comp)
+        # warpAffine aplica shift sub-pixel e correção de stretch do rolling shutter ao mesmo tempo!
+        dst = cv2.warpAffine(img, M, (cw, ch), flags=cv2.INTER_LINEAR)
+        return dst.tobytes()
+
+    n_workers = max(1, workers or (os.cpu_count() or 2))
+    if timeline:
+        print(f"[RAW] Sessão RAW: revelação adiada (Bayer {session_meta.get('bayer')}) em {n_workers} thread(s).")
+
     proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
     
     try:
-        for i, frame_path in enumerate(frames):
-            if i % 100 == 0:
-                print(f"[ESTABILIZAÇÃO] Processando frame {i+1}/{len(frames)}...")
-                
-            img = cv2.imread(str(frame_path))
-            if img is None: continue
-                
-            f_idx = int(frame_path.stem.split('_')[-1])
-            track = tracking_data.get(f_idx)
-            
-            scale_y = 1.0
-            cx = smoothed_cx[i]
-            
-            if track:
-                cy, ox = track["cy"], track["ox"]
-                oy = track.get("oy", 0) # Fallback para vídeos gravados antes do Crop Dinâmico
-                cw, ch = track.get("cw", crop_w), track.get("ch", crop_h)
-                
-                # Para sensores Rolling Shutter (ex: Raspberry Pi V3), usamos o stretch vertical.
-                # Para sensores Global Shutter (ex: XIMEA), desativamos para evitar "vertical breathing".
-                pitch_inst = track.get("pitch_inst", -1.0)
-                if pitch_padrao > 0 and pitch_inst > 0 and not disable_rs_comp:
-                    scale_y = pitch_padrao / pitch_inst
-            else:
-                # Fallback no centro se faltar tracking
-                cy, ox, oy = img.shape[0] / 2, 0, 0
-                cx = img.shape[1] / 2
-                cw, ch = crop_w, crop_h
-                
-            center_x, center_y = cx + ox, cy + oy
-            
-            # Matriz Afim: Translação X, e (Escala Y + Translação Y)
-            # Para que o center_y original caia exatamente no meio do crop_h após o redimensionamento.
-            tx = cw / 2.0 - center_x
-            ty = ch / 2.0 - (scale_y * center_y)
-            
-            # warpAffine aplica shift sub-pixel e correção de stretch do rolling shutter ao mesmo tempo!
-            M = np.float32([[1.0, 0.0, tx], [0.0, scale_y, ty]])
-            dst = cv2.warpAffine(img, M, (cw, ch), flags=cv2.INTER_LINEAR)
-            
-            proc.stdin.write(dst.tobytes())
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            # Janela deslizante: no máximo 2 quadros por thread em voo, gravados na ordem original
+            pendentes: deque = deque()
+            for i, frame_path in enumerate(frames):
+                if i % 100 == 0:
+                    print(f"[ESTABILIZAÇÃO] Processando frame {i+1}/{len(frames)}...")
+                pendentes.append(executor.submit(preparar_frame, i, frame_path))
+                if len(pendentes) >= 2 * n_workers:
+                    dados = pendentes.popleft().result()
+                    if dados is not None: proc.stdin.write(dados)
+            while pendentes:
+                dados = pendentes.popleft().result()
+                if dados is not None: proc.stdin.write(dados)
     finally:
         if proc.stdin: proc.stdin.close()
         proc.wait()
@@ -631,6 +823,12 @@ def parse_args() -> argparse.Namespace:
             f"(padrão: {FILM_35MM_AUDIO_ADVANCE_FRAMES} para 35mm)."
         ),
     )
+    parser.add_argument(
+        "--render-workers",
+        type=int,
+        default=None,
+        help="Threads do estágio de render (revelação RAW + warp). Padrão: todos os núcleos.",
+    )
     return parser.parse_args()
 
 
@@ -662,11 +860,11 @@ def main() -> int:
 
     if args.verify_frames:
         print("[INFO] Verificação minuciosa multi-thread ativada (isso examina o miolo dos JPEGs)...")
-        valid_frames: list[Path] = []
+        valid_frames: list[Frame] = []
         dropped = 0
         
-        def is_valid_frame(p: Path) -> bool:
-            return cv2.imread(str(p)) is not None
+        def is_valid_frame(p: Frame) -> bool:
+            return imread_frame(p) is not None
 
         with ThreadPoolExecutor() as executor:
             results = list(executor.map(is_valid_frame, frames))
@@ -717,24 +915,48 @@ def main() -> int:
     if missing_indices:
         print(f"[WARN] Detectados {len(missing_indices)} índices ausentes na sequência numérica.")
 
+    # Quadros dentro de segmentos não existem como arquivos: o concat do ffmpeg não se aplica
+    from_segments = isinstance(frames[0], SegmentFrame)
     manifest_path = output_dir / f".{args.name}_{timestamp}.frames.txt"
-    build_concat_manifest(frames, args.fps, manifest_path)
+    if not from_segments:
+        build_concat_manifest(frames, args.fps, manifest_path)
 
     tracking_data = load_tracking_data(input_dir)
+    frame_timing = analyze_frame_timing(tracking_data)
+    if frame_timing:
+        if frame_timing["sensor_drops_total"] or frame_timing["ring_overflow_total"]:
+            print(
+                f"[WARN] Telemetria do sensor: {frame_timing['sensor_drops_total']} quadros perdidos no sensor/USB "
+                f"em {len(frame_timing['sensor_drop_events'])} eventos, {frame_timing['ring_overflow_total']} no anel de aquisição."
+            )
+        if frame_timing["time_gaps"]:
+            print(
+                f"[WARN] {len(frame_timing['time_gaps'])} intervalos acima de 1.5x a mediana "
+                f"({frame_timing['median_interval_ms']:.1f} ms) entre capturas."
+            )
+    session_meta = load_session_meta(input_dir)
+    if session_meta and session_meta.get("rec_format") == "raw":
+        print(f"[INFO] Sessão RAW detectada ({Path(session_meta['meta_path']).name}): debayer e LUT no render.")
+    else:
+        session_meta = None
     outputs: list[Path] = []
     output_types = ("mp4", "prores") if args.format == "both" else (args.format,)
     extension_map = {"mp4": "mp4", "prores": "mov"}
 
     try:
-        if tracking_data:
-            print("[INFO] Telemetria (Registro Óptico) detectada! Usando ancoragem sub-pixel.")
+        if tracking_data or session_meta or from_segments:
+            if tracking_data:
+                print("[INFO] Telemetria (Registro Óptico) detectada! Usando ancoragem sub-pixel.")
             plan_outputs = []
             for output_type in output_types:
                 output_path = output_dir / f"{args.name}_{timestamp}.{extension_map[output_type]}"
                 plan_outputs.append((output_path, output_type))
                 outputs.append(output_path)
         
-            render_stabilized_video_stream(ffmpeg, frames, tracking_data, args.fps, args.disable_rs_comp, plan_outputs)
+            render_stabilized_video_stream(
+                ffmpeg, frames, tracking_data, args.fps, args.disable_rs_comp, plan_outputs,
+                session_meta=session_meta, workers=args.render_workers,
+            )
         else:
             print("[INFO] Sem telemetria detectada. Processando concatenação nativa rápida.")
             for output_type in output_types:
@@ -782,6 +1004,15 @@ def main() -> int:
         "outputs": [str(path) for path in outputs],
         "muxed_outputs": [str(path) for path in muxed_outputs],
     }
+    if frame_timing:
+        report["frame_timing"] = frame_timing
+    if session_meta:
+        report["raw_session"] = {
+            "meta_path": session_meta["meta_path"],
+            "bayer": session_meta.get("bayer"),
+            "color_params": session_meta.get("color_params"),
+            "changes": len(session_meta.get("changes", [])),
+        }
     if audio_output_path:
         report["audio"] = {
             "wav_path": str(audio_output_path),
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Conversor entre o layout legado (um arquivo por quadro, `miniola_XXXXXX.jpg`) e os
+segmentos append-only `.mseg` gravados pelo Miniola.
+
+Uso:
+    python3 scripts/convert_segments.py pack   --input-dir capturas --output-dir capturas_seg
+    python3 scripts/convert_segments.py unpack --input-dir capturas_seg --output-dir capturas_jpg
+
+Os bytes codificados são copiados como estão (sem recompressão), nos dois sentidos.
+"""
+
+import argparse
+import re
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.segment_container import SegmentArchive, SegmentRecorder
+
+PADRAO_QUADRO = re.compile(r"^miniola_(\d+)\.(jpg|jpeg|png)$", re.IGNORECASE)
+
+
+def pack(input_dir: Path, output_dir: Path, session_id: str, frames_por_segmento: int, remover: bool) -> int:
+    quadros = []
+    for p in input_dir.iterdir():
+        m = PADRAO_QUADRO.match(p.name)
+        if m and p.is_file():
+            quadros.append((int(m.group(1)), p))
+    quadros.sort()
+    if not quadros:
+        print(f"[ERRO] Nenhum quadro miniola_XXXXXX.jpg/png em: {input_dir}")
+        return 1
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    gravador = SegmentRecorder(output_dir, session_id, frames_por_segmento)
+    try:
+        for i, (idx, p) in enumerate(quadros):
+            gravador.append(idx, p.read_bytes(), p.suffix.lstrip(".").lower().replace("jpeg", "jpg"))
+            if i % 1000 == 0:
+                print(f"[PACK] {i + 1}/{len(quadros)} quadros...")
+    finally:
+        gravador.close()
+
+    if remover:
+        for _, p in quadros:
+            p.unlink()
+    print(f"[SUCESSO] {gravador.total} quadros empacotados em {output_dir} (sessão {session_id}).")
+    return 0
+
+
+def unpack(input_dir: Path, output_dir: Path) -> int:
+    with SegmentArchive(input_dir) as archive:
+        archive.refresh()
+        if archive.count() == 0:
+            print(f"[ERRO] Nenhum segmento .mseg em: {input_dir}")
+            return 1
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for i, frame in enumerate(archive.frames()):
+            (output_dir / frame.name).write_bytes(frame.read())
+            if i % 1000 == 0:
+                print(f"[UNPACK] {i + 1}/{archive.count()} quadros...")
+        print(f"[SUCESSO] {archive.count()} quadros extraídos para {output_dir}.")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Converte capturas do Miniola entre arquivos por quadro e segmentos .mseg.")
+    parser.add_argument("modo", choices=("pack", "unpack"))
+    parser.add_argument("--input-dir", required=True)
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--session-id", default=None, help="pack: id da sessão no nome dos segmentos (padrão: timestamp UTC).")
+    parser.add_argument("--seg-frames", type=int, default=2000, help="pack: quadros por segmento.")
+    parser.add_argument("--remove", action="store_true", help="pack: apaga os arquivos originais após empacotar.")
+    args = parser.parse_args()
+
+    input_dir = Path(args.input_dir).expanduser().resolve()
+    output_dir = Path(args.output_dir).expanduser().resolve()
+    if not input_dir.exists():
+        print(f"[ERRO] Diretório de entrada não existe: {input_dir}")
+        return 1
+
+    if args.modo == "pack":
+        sid = args.session_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        return pack(input_dir, output_dir, sid, args.seg_frames, args.remove)
+    return unpack(input_dir, output_dir)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
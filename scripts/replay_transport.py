@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+from collections import Counter
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.serial_session import ler_sessao, replay_sessao, NOMES
+
+
+def _ajustes(pares):
+    ajustes = {}
+    for par in pares or []:
+        nome, _, valor = par.partition("=")
+        ajustes[nome.strip()] = float(valor)
+    return ajustes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay de sessões do transporte gravadas com --motor-log (SPEC-010, seção 7.8)")
+    parser.add_argument('logs', nargs='+', help='Arquivos .mslog')
+    parser.add_argument('--set', action='append', metavar='ATRIBUTO=VALOR', help='Muda um atributo do FilmTransportPID no replay (ex.: --set Ki=2.0 --set tau_saida=0.3)')
+    parser.add_argument('--dump', action='store_true', help='Lista os comandos que o replay produziu')
+    args = parser.parse_args()
+
+    ajustes = _ajustes(args.set)
+    falhas = 0
+    for caminho in args.logs:
+        tipos = Counter(NOMES.get(tipo, tipo) for _, tipo, _ in ler_sessao(caminho))
+        r = replay_sessao(caminho, ajustes=ajustes)
+        print(f"[REPLAY] {caminho}: {r['duracao_s']}s gravados em {r['ticks']} ticks ({r['aceleracao']}x o tempo real) | {dict(tipos)}")
+        print(f"[REPLAY]   F/U: {r['comandos_gravados']} gravados, {r['comandos_replay']} no replay | diferença máx {r['diferenca_max_hz']} Hz | E-STOP gravado {r['estop_gravado']}, replay {r['estop_replay']}")
+        if r["ticks_inconsistentes"]:
+            print(f"[REPLAY]   {r['ticks_inconsistentes']} ticks com contadores do encoder diferentes do gravado (log truncado?)")
+        if r["identico"]:
+            print("[REPLAY]   Saída do PID idêntica à gravada.")
+        else:
+            d = r["primeira_divergencia"]
+            print(f"[REPLAY]   Diverge no comando {d['indice']}: gravado {d['gravado']} | replay {d['replay']}")
+            if not ajustes: falhas += 1
+        if args.dump:
+            for t, cmd in r["comandos"]:
+                print(f"  {t:10.3f}  {cmd}")
+    # Sem ajustes o replay é um teste de regressão: a lei de controle atual tem de reproduzir o log
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.skr_simulator import SkrPicoSimulator, SimTransportSpec
+from core.motor_controller import FilmTransportPID
+
+
+def _percentil(valores, q):
+    if not valores: return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+def rodar(spec, fps, duracao, amostra_s=0.1, pid_hz=50.0, verboso=False, calibrar=False, rastrear=True):
+    """
+    Roda o `FilmTransportPID` contra a SKR Pico simulada e mede a resposta pela velocidade real do
+    filme no modelo (não pelo encoder, que é o que o PID enxerga). `calibrar` faz a varredura do
+    feed-forward antes da partida; `rastrear=False` congela o raio do carretel (feed-forward fixo).
+    """
+    sim = SkrPicoSimulator(spec).start()
+    motor = FilmTransportPID(port=sim.porta, pid_hz=pid_hz, relogio=sim.relogio, dormir=sim.relogio.dormir)
+    if not motor.connect():
+        sim.stop()
+        raise RuntimeError(f"Não abriu a porta simulada {sim.porta}")
+
+    motor.ff.rastrear = rastrear
+
+    saida = contextlib.nullcontext() if verboso else contextlib.redirect_stdout(io.StringIO())
+    amostras = []
+    with saida:
+        calibracao = motor.calibrate_feed_forward() if calibrar else None
+        t0 = sim.relogio()
+        motor.start_pid(target_fps=fps)
+        while sim.relogio() - t0 < duracao and (motor.is_running_pid or spec.stall_at is not None):
+            sim.relogio.dormir(amostra_s)
+            amostras.append((sim.relogio() - t0, sim.modelo.velocidade_filme(), motor.target_mm_s))
+        parou_sozinho = not motor.is_running_pid
+        motor.disconnect()
+    sim.stop()
+
+    alvo = motor.target_mm_s
+    chegou = next((t for t, v, _ in amostras if v >= 0.98 * alvo), None)
+    regime = [abs(v - a) / a for t, v, a in amostras if t >= 4.0 and a > 0]
+    return {
+        "alvo_mm_s": round(alvo, 1),
+        "chegada_98pct_s": round(chegou, 2) if chegou is not None else None,
+        "sobressinal_pct": round(100.0 * (max(v for _, v, _ in amostras) / alvo - 1.0), 2) if amostras else 0.0,
+        "erro_medio_pct": round(100.0 * sum(regime) / len(regime), 2) if regime else None,
+        "erro_p99_pct": round(100.0 * _percentil(regime, 0.99), 2) if regime else None,
+        "parou_sozinho": parou_sozinho,
+        "pid": motor.pid_stats(),
+        "feed_forward": motor.ff_stats(),
+        "calibracao": calibracao,
+        "simulador": sim.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bancada do transporte sem a SKR Pico: PID contra o simulador em pseudo-terminal")
+    parser.add_argument('--sim', type=str, default='', help='Parâmetros do simulador (mesmo formato do --motor-sim do miniola.py)')
+    parser.add_argument('--fps', type=float, default=18.0, help='Meta do PID (fotogramas/s)')
+    parser.add_argument('--duration', type=float, default=20.0, help='Duração simulada (s)')
+    parser.add_argument('--scale', type=float, default=None, help='Velocidade do relógio simulado (sobrepõe scale= do --sim)')
+    parser.add_argument('--pid-hz', type=float, default=50.0, help='Taxa do loop PID (Hz)')
+    parser.add_argument('--calibrate', action='store_true', help='Calibra o feed-forward (varredura Hz -> mm/s) antes da partida')
+    parser.add_argument('--ff-track', choices=['on', 'off'], default='on', help='Rastreio online do raio do carretel')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Mostra a telemetria [PID]')
+    args = parser.parse_args()
+
+    spec = SimTransportSpec.parse(args.sim)
+    if args.scale is not None: spec.scale = args.scale
+    print(f"[SIM] {spec.as_dict()} | meta {args.fps} fps por {args.duration}s simulados")
+    r = rodar(spec, args.fps, args.duration, pid_hz=args.pid_hz, verboso=args.verbose,
+              calibrar=args.calibrate, rastrear=args.ff_track == 'on')
+    if r["calibracao"] is not None:
+        c = r["calibracao"]
+        print(f"[SIM] Calibração: raio {c['raio_mm']} mm | k {c['k']} mm/s por Hz | desvio da reta {c['desvio_linear_pct']}%")
+    print(f"[SIM] Alvo {r['alvo_mm_s']} mm/s | 98% em {r['chegada_98pct_s']}s | sobressinal {r['sobressinal_pct']}%")
+    print(f"[SIM] Erro de velocidade em regime (>4s): médio {r['erro_medio_pct']}% | p99 {r['erro_p99_pct']}%")
+    print(f"[SIM] PID {r['pid']['hz']:.0f} Hz | jitter médio {r['pid']['jitter_medio_ms']} ms | estouros {r['pid']['estouros']} | parada própria: {r['parou_sozinho']}")
+    ff = r["feed_forward"]
+    print(f"[SIM] Feed-forward: raio {ff['raio_mm']} mm | {ff['correcoes']} correções, {ff['rejeitadas']} rejeitadas")
+    s = r["simulador"]
+    print(f"[SIM] Carretel {s['raio_recolhimento_mm']} mm com {s['enrolado_m']} m | Y a {s['hz_y']} Hz | {s['comandos']} comandos")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,90 @@
 #include <vector>
 #include <algorithm>
 #include <cmath>
+#include <cstring>
+#include <mutex>
+#include <chrono>
+#include <utility>
 
 namespace py = pybind11;
 
+// Retângulo de depuração de um furo detectado (convertido em dict Python só no final)
+struct DebugRect {
+    int x, y, w, h;
+    bool acionou;
+};
+
+// Furo detectado na projeção 1D (coordenadas na ROI e globais)
+struct Furo {
+    double cy_roi;
+    double cx_g;
+    double cy_g;
+    bool acionou;
+    cv::Rect rect;
+};
+
+// Registro escalar da API `process_frame_into`: espelhado como dtype estruturado numpy
+// (`miniola_cv.result_dtype()`), preenchido no lugar sem alocar objetos Python.
+struct VisionRecord {
+    bool valido;
+    bool capturar;
+    bool perfuracao_na_linha;
+    bool achou_furo;
+    int32_t contador_perfs_ciclo;
+    int64_t cx_a;
+    int64_t cy_a;
+    double encolhimento_atual_pct;
+    double ultimo_pitch_medio;
+    double pitch_instantaneo;
+    int32_t n_rects;          // Furos detectados (podem exceder a capacidade do array de rects)
+    int32_t audio_len;        // Amostras válidas escritas no buffer de áudio
+    int32_t audio_descartado; // Amostras que não couberam no buffer de áudio
+    int32_t binary_h;         // Shape esperado do preview binário (para o chamador realocar)
+    int32_t binary_w;
+    bool varredura_incremental; // Quadro resolvido só com as faixas previstas (sem varredura completa)
+    int32_t linhas_varridas;    // Linhas da ROI binarizadas e projetadas neste quadro
+};
+
+// Contadores do rastreamento incremental (expostos por `get_tracking_stats`)
+struct RastreioStats {
+    long quadros = 0;
+    long incrementais = 0;          // Quadros resolvidos só com as faixas previstas
+    long fallback_sem_fase = 0;     // Sem fase anterior (início, reset, furos perdidos, ROI alterada)
+    long fallback_confianca = 0;    // Tentativa incremental rejeitada (furo cortado/ausente, faixas sem ganho)
+    long varreduras_periodicas = 0; // Varredura completa forçada a cada `intervalo_varredura_total` quadros
+    long n_completas = 0;
+    double tempo_completo_ms = 0.0;    // Soma do tempo das varreduras completas
+    double tempo_incremental_ms = 0.0; // Soma do tempo dos quadros incrementais bem-sucedidos
+    double tempo_real_ms = 0.0;        // Soma do tempo gasto em todos os quadros (inclui tentativas descartadas)
+    long linhas_incrementais = 0;
+};
+
+// Resultado puro C++ de um quadro: preenchido SEM o GIL e convertido para py::dict depois
+struct FrameResult {
+    bool valido = false;
+    bool capturar = false;
+    long cx_a = -1;
+    long cy_a = -1;
+    bool perfuracao_na_linha = false;
+    bool achou_furo = false;
+    int contador_perfs_ciclo = 0;
+    double encolhimento_atual_pct = 0.0;
+    double ultimo_pitch_medio = -1.0;
+    double pitch_instantaneo = -1.0;
+    std::vector<DebugRect> debug_rects;
+    cv::Mat binary_small;
+    int binary_h = 0;
+    int binary_w = 0;
+    bool varredura_incremental = false;
+    int linhas_varridas = 0;
+    std::vector<float> audio_samples;
+};
+
 class ScannerVision {
 private:
+    // Protege o estado do PLL/áudio: o trabalho roda sem o GIL, então o GIL não serializa mais as chamadas
+    std::mutex mutex_estado;
+
     int contador_perfs_ciclo = 0;
     bool perfuracao_na_linha = false;
     std::vector<double> buffer_pitches;
@@ -26,81 +105,259 @@ private:
     
     // Tracking de Autocorrelação (Auto-Stitching)
     std::vector<float> audio_tail;
+    
+    // Rascunhos reutilizados entre quadros (sem malloc em regime, RNF-02)
+    FrameResult scratch;
+    std::vector<Furo> furos_validos;
+    std::vector<float> current_chunk;
+    cv::Mat roi_gray_buf, roi_small, binary_full;
+    
+    // Rastreamento incremental: com a fase do quadro anterior e o avanço medido por quadro,
+    // só as faixas em volta das perfurações previstas são binarizadas e projetadas.
+    bool rastreio_habilitado = true;
+    int intervalo_varredura_total = 30;   // Varredura completa periódica (pega o que a previsão não cobre)
+    bool rastreio_valido = false;
+    double fase_anterior = -1.0;
+    double avanco_px = 0.0;               // Avanço do filme por quadro (px, suavizado)
+    double residuo_avanco_px = 0.0;       // Diferença entre o avanço medido e o previsto no último quadro
+    int altura_furo_px = 0;
+    int quadros_desde_total = 0;
+    cv::Rect roi_anterior;
+    std::vector<double> centros_anteriores; // cy_roi dos furos do quadro anterior
+    std::vector<double> centros_previstos;
+    std::vector<std::pair<int, int>> faixas;
+    RastreioStats stats;
 
 public:
     ScannerVision() {}
 
-    py::dict process_frame(py::array_t<uint8_t> input_array,
+    py::dict process_frame(py::array_t<uint8_t, py::array::c_style | py::array::forcecast> input_array,
                            int roi_x, int roi_y, int roi_w, int roi_h,
                            int thresh_val, int linha_gatilho_y, int margem_gatilho,
                            double pitch_padrao,
                            bool audio_enabled, int audio_x, int audio_w, int audio_slit_y) {
         
+        // Com o GIL: apenas inspeção do buffer numpy (c_style garante memória contígua)
         py::buffer_info buf = input_array.request();
-        int rows = buf.shape[0];
-        int cols = buf.shape[1];
-        
-        cv::Mat frame;
-        if (buf.ndim == 2) {
-            frame = cv::Mat(rows, cols, CV_8UC1, buf.ptr);
-        } else if (buf.ndim == 3) {
-            frame = cv::Mat(rows, cols, CV_8UC3, buf.ptr);
-        } else {
+        if (buf.ndim != 2 && !(buf.ndim == 3 && buf.shape[2] == 3)) {
             py::dict err; err["capturar"] = false; return err;
         }
+        const int rows = (int)buf.shape[0];
+        const int cols = (int)buf.shape[1];
+        const int channels = (buf.ndim == 3) ? 3 : 1;
+        uint8_t* data = static_cast<uint8_t*>(buf.ptr);
         
-        cv::Rect roi_rect(
-            std::max(0, roi_x),
-            std::max(0, roi_y),
-            std::max(0, std::min(roi_w, cols - std::max(0, roi_x))),
-            std::max(0, std::min(roi_h, rows - std::max(0, roi_y)))
-        );
-                          
-        if (roi_rect.width <= 0 || roi_rect.height <= 0) {
-            py::dict err; err["capturar"] = false; return err;
+        FrameResult r;
+        {
+            // Sem o GIL: threshold, scanline, momentos e SAD de áudio operam só sobre o buffer cru
+            // e membros C++. As threads do Flask, do PID e do gamepad seguem rodando em paralelo.
+            // `input_array` continua vivo neste escopo, então o buffer não pode ser liberado.
+            py::gil_scoped_release sem_gil;
+            std::lock_guard<std::mutex> trava(mutex_estado);
+            process_core(r, data, rows, cols, channels,
+                         roi_x, roi_y, roi_w, roi_h,
+                         thresh_val, linha_gatilho_y, margem_gatilho, pitch_padrao,
+                         audio_enabled, audio_x, audio_w, audio_slit_y,
+                         true, true, nullptr);
         }
+        
+        return build_result(r);
+    }
 
-        cv::Mat roi_color = frame(roi_rect);
-        cv::Mat roi_gray, binary_small;
+    // API sem alocação: escreve os resultados em buffers preparados pelo chamador.
+    //   resultado  : array estruturado (1,) com dtype `result_dtype()`
+    //   rects      : int32 (N, 5) [x, y, w, h, acionou] ou None (sem debug)
+    //   audio      : float32 (M,) reutilizável ou None; `audio_len` indica quantas amostras valem
+    //   binario    : uint8 (binary_h, binary_w) ou None (sem preview)
+    void process_frame_into(py::array_t<uint8_t, py::array::c_style | py::array::forcecast> input_array,
+                            int roi_x, int roi_y, int roi_w, int roi_h,
+                            int thresh_val, int linha_gatilho_y, int margem_gatilho,
+                            double pitch_padrao,
+                            bool audio_enabled, int audio_x, int audio_w, int audio_slit_y,
+                            py::array_t<VisionRecord, py::array::c_style> resultado,
+                            py::object rects, py::object audio, py::object binario) {
         
-        // Se a imagem já for monocromática (RAW8), pulamos a conversão para cinza (economia gigante de CPU!)
-        if (frame.channels() == 3) {
-            cv::cvtColor(roi_color, roi_gray, cv::COLOR_RGB2GRAY);
-        } else {
-            roi_gray = roi_color;
+        if (resultado.size() < 1) throw py::value_error("resultado deve ter ao menos 1 registro");
+        VisionRecord* rec = resultado.mutable_data();
+        
+        py::ssize_t cap_rects = 0, cap_audio = 0, bin_h = 0, bin_w = 0;
+        int32_t* rects_ptr = buffer_saida<int32_t>(rects, "rects", 2, cap_rects, nullptr);
+        float* audio_ptr = buffer_saida<float>(audio, "audio", 1, cap_audio, nullptr);
+        uint8_t* bin_ptr = buffer_saida<uint8_t>(binario, "binario", 2, bin_h, &bin_w);
+        if (rects_ptr != nullptr && py::array(rects).shape(1) != 5)
+            throw py::value_error("rects deve ter shape (N, 5)");
+        
+        py::buffer_info buf = input_array.request();
+        if (buf.ndim != 2 && !(buf.ndim == 3 && buf.shape[2] == 3)) {
+            std::memset(rec, 0, sizeof(VisionRecord));
+            return;
         }
+        const int rows = (int)buf.shape[0];
+        const int cols = (int)buf.shape[1];
+        const int channels = (buf.ndim == 3) ? 3 : 1;
+        uint8_t* data = static_cast<uint8_t*>(buf.ptr);
         
-        // --- INÍCIO DA PROJEÇÃO 1D HÍBRIDA ---
+        py::gil_scoped_release sem_gil;
+        std::lock_guard<std::mutex> trava(mutex_estado);
         
-        // Mantemos a imagem pequena apenas para preview no painel UI (reduz uso de banda de vídeo)
-        cv::Mat roi_small;
-        cv::resize(roi_gray, roi_small, cv::Size(), 0.5, 0.5, cv::INTER_NEAREST);
-        cv::threshold(roi_small, binary_small, thresh_val, 255, cv::THRESH_BINARY);
+        cv::Mat destino_binario;
+        if (bin_ptr != nullptr) destino_binario = cv::Mat((int)bin_h, (int)bin_w, CV_8UC1, bin_ptr);
+        FrameResult& r = scratch;
+        process_core(r, data, rows, cols, channels,
+                     roi_x, roi_y, roi_w, roi_h,
+                     thresh_val, linha_gatilho_y, margem_gatilho, pitch_padrao,
+                     audio_enabled, audio_x, audio_w, audio_slit_y,
+                     rects_ptr != nullptr, bin_ptr != nullptr, bin_ptr != nullptr ? &destino_binario : nullptr);
         
-        int limite_superior = linha_gatilho_y - margem_gatilho;
-        int limite_inferior = linha_gatilho_y + margem_gatilho;
+        rec->valido = r.valido;
+        rec->capturar = r.capturar;
+        rec->perfuracao_na_linha = r.perfuracao_na_linha;
+        rec->achou_furo = r.achou_furo;
+        rec->contador_perfs_ciclo = r.contador_perfs_ciclo;
+        rec->cx_a = r.cx_a;
+        rec->cy_a = r.cy_a;
+        rec->encolhimento_atual_pct = r.encolhimento_atual_pct;
+        rec->ultimo_pitch_medio = r.ultimo_pitch_medio;
+        rec->pitch_instantaneo = r.pitch_instantaneo;
+        rec->n_rects = (int32_t)r.debug_rects.size();
+        rec->binary_h = r.binary_h;
+        rec->binary_w = r.binary_w;
+        rec->varredura_incremental = r.varredura_incremental;
+        rec->linhas_varridas = r.linhas_varridas;
         
-        struct Furo {
-            double cy_roi;
-            double cx_g;
-            double cy_g;
-            bool acionou;
-            cv::Rect rect;
-        };
+        if (rects_ptr != nullptr) {
+            const size_t n = std::min((size_t)cap_rects, r.debug_rects.size());
+            for (size_t i = 0; i < n; ++i) {
+                const DebugRect& d = r.debug_rects[i];
+                int32_t* linha = rects_ptr + i * 5;
+                linha[0] = d.x; linha[1] = d.y; linha[2] = d.w; linha[3] = d.h; linha[4] = d.acionou ? 1 : 0;
+            }
+        }
+        
+        const size_t n_audio = std::min((size_t)cap_audio, r.audio_samples.size());
+        if (audio_ptr != nullptr && n_audio > 0) {
+            std::memcpy(audio_ptr, r.audio_samples.data(), n_audio * sizeof(float));
+        }
+        rec->audio_len = (int32_t)(audio_ptr != nullptr ? n_audio : 0);
+        rec->audio_descartado = (int32_t)(r.audio_samples.size() - (size_t)rec->audio_len);
+    }
+
+    void reset_ciclo() {
+        std::lock_guard<std::mutex> trava(mutex_estado);
+        contador_perfs_ciclo = 0;
+        last_perf_y = -1.0;
+        gatilho_fase_armado = false;
+        last_erro_fase = 0.0;
+        audio_tail.clear();
+        rastreio_valido = false;
+        fase_anterior = -1.0;
+    }
+
+    // Liga/desliga o rastreamento incremental e define o intervalo da varredura completa periódica
+    void set_tracking(bool habilitado, int varredura_total_a_cada) {
+        std::lock_guard<std::mutex> trava(mutex_estado);
+        rastreio_habilitado = habilitado;
+        intervalo_varredura_total = std::max(1, varredura_total_a_cada);
+        rastreio_valido = false;
+    }
+
+    py::dict get_tracking_stats() {
+        RastreioStats s;
+        bool habilitado;
+        {
+            std::lock_guard<std::mutex> trava(mutex_estado);
+            s = stats;
+            habilitado = rastreio_habilitado;
+        }
+        const double q = (double)std::max(1L, s.quadros);
+        const double medio_completo = s.n_completas > 0 ? s.tempo_completo_ms / s.n_completas : 0.0;
+        const double medio_incremental = s.incrementais > 0 ? s.tempo_incremental_ms / s.incrementais : 0.0;
+        py::dict d;
+        d["habilitado"] = habilitado;
+        d["quadros"] = s.quadros;
+        d["incrementais"] = s.incrementais;
+        d["fallback_sem_fase"] = s.fallback_sem_fase;
+        d["fallback_confianca"] = s.fallback_confianca;
+        d["varreduras_periodicas"] = s.varreduras_periodicas;
+        d["taxa_fallback"] = (s.fallback_sem_fase + s.fallback_confianca) / q;
+        d["ms_varredura_completa"] = medio_completo;
+        d["ms_varredura_incremental"] = medio_incremental;
+        d["linhas_por_quadro_incremental"] = s.incrementais > 0 ? (double)s.linhas_incrementais / s.incrementais : 0.0;
+        // Economia frente a varrer a ROI inteira em todo quadro (tentativas descartadas contam contra)
+        d["economia_ms_por_quadro"] = s.n_completas > 0 ? medio_completo - s.tempo_real_ms / q : 0.0;
+        return d;
+    }
+
+    void reset_tracking_stats() {
+        std::lock_guard<std::mutex> trava(mutex_estado);
+        stats = RastreioStats();
+    }
+
+private:
+    // Valida um buffer de saída opcional (None = não solicitado). Não há conversão nem cópia
+    // implícita: dtype, contiguidade e permissão de escrita precisam bater exatamente.
+    template <typename T>
+    static T* buffer_saida(const py::object& obj, const char* nome, int ndim,
+                           py::ssize_t& dim0, py::ssize_t* dim1) {
+        if (obj.is_none()) return nullptr;
+        if (!py::array_t<T, py::array::c_style>::check_(obj))
+            throw py::type_error(std::string(nome) + ": esperado array numpy C-contíguo do dtype correto");
+        auto arr = py::reinterpret_borrow<py::array_t<T, py::array::c_style>>(obj);
+        if (arr.ndim() != ndim) throw py::value_error(std::string(nome) + ": número de dimensões inválido");
+        dim0 = arr.shape(0);
+        if (dim1 != nullptr) *dim1 = arr.shape(1);
+        return arr.mutable_data();
+    }
+
+    // Converte o resultado C++ em objetos Python (chamado com o GIL, uma única vez por quadro)
+    static py::dict build_result(const FrameResult& r) {
+        if (!r.valido) {
+            py::dict err; err["capturar"] = false; return err;
+        }
         
-        std::vector<Furo> furos_validos;
         py::list debug_visual;
+        for (const auto& d : r.debug_rects) {
+            py::dict debug_item;
+            debug_item["rect"] = py::make_tuple(d.x, d.y, d.w, d.h);
+            debug_item["color"] = d.acionou ? py::make_tuple(0, 0, 255) : py::make_tuple(0, 255, 0);
+            debug_visual.append(debug_item);
+        }
         
-        // 1. Binarização na resolução total para máxima precisão na projeção
-        cv::Mat binary_full;
-        cv::threshold(roi_gray, binary_full, thresh_val, 255, cv::THRESH_BINARY);
+        py::array_t<uint8_t> result_array({r.binary_small.rows, r.binary_small.cols});
+        py::buffer_info buf_res = result_array.request();
+        std::memcpy(buf_res.ptr, r.binary_small.data, r.binary_small.total() * r.binary_small.elemSize());
         
-        // 2. Scanline Profiling: Conta pixels brancos por linha
+        // Converte o std::vector de audio para numpy array
+        py::array_t<float> audio_numpy(r.audio_samples.size(), r.audio_samples.data());
+        
+        py::dict result;
+        result["capturar"] = r.capturar;
+        result["cx_a"] = r.cx_a;
+        result["cy_a"] = r.cy_a;
+        result["debug_visual"] = debug_visual;
+        result["binary_small"] = result_array;
+        result["perfuracao_na_linha"] = r.perfuracao_na_linha;
+        result["contador_perfs_ciclo"] = r.contador_perfs_ciclo;
+        result["encolhimento_atual_pct"] = r.encolhimento_atual_pct;
+        result["ultimo_pitch_medio"] = r.ultimo_pitch_medio;
+        result["pitch_instantaneo"] = r.pitch_instantaneo;
+        result["achou_furo"] = r.achou_furo;
+        result["varredura_incremental"] = r.varredura_incremental;
+        result["linhas_varridas"] = r.linhas_varridas;
+        result["audio_chunk"] = audio_numpy; 
+        return result;
+    }
+
+    // 2. Scanline Profiling nas linhas [y0, y1) de binary_full: conta pixels brancos por linha e
+    // mede cada furo com momentos dentro da "gaiola" 1D. Retorna false se um furo encostou numa borda
+    // da faixa que não é borda da ROI (furo cortado: a previsão errou e a faixa não serve).
+    bool varrer_linhas(FrameResult& r, int y0, int y1, const cv::Rect& roi_rect,
+                       int limite_superior, int limite_inferior, bool gerar_debug) {
         int min_width_px = std::max(2, binary_full.cols / 10); // Tolerância a sujeira (ex: mín 8px para ROI de 80px)
         bool in_hole = false;
-        int start_y = 0;
+        int start_y = y0;
         
-        for (int y = 0; y < binary_full.rows; ++y) {
+        for (int y = y0; y < y1; ++y) {
             int count_white = 0;
             const uint8_t* ptr = binary_full.ptr<uint8_t>(y);
             for (int x = 0; x < binary_full.cols; ++x) {
@@ -109,6 +366,10 @@ public:
             
             bool is_bright = count_white >= min_width_px;
             
+            if (is_bright && ((y == y0 && y0 > 0) || (y == y1 - 1 && y1 < binary_full.rows))) {
+                return false;
+            }
+            
             // Força fechamento se o furo encostar no rodapé do ROI
             if (y == binary_full.rows - 1 && in_hole && is_bright) {
                 is_bright = false;
@@ -140,13 +401,227 @@ public:
                     bool acionou = (cy_roi >= limite_superior && cy_roi <= limite_inferior);
                     furos_validos.push_back({cy_roi, cx_global, cy_global, acionou, rect});
                     
-                    py::dict debug_item;
-                    debug_item["rect"] = py::make_tuple(rect.x + roi_rect.x, rect.y + roi_rect.y, rect.width, rect.height);
-                    debug_item["color"] = acionou ? py::make_tuple(0, 0, 255) : py::make_tuple(0, 255, 0); 
-                    debug_visual.append(debug_item);
+                    if (gerar_debug) {
+                        r.debug_rects.push_back({rect.x + roi_rect.x, rect.y + roi_rect.y, rect.width, rect.height, acionou});
+                    }
                 }
             }
         }
+        return true;
+    }
+
+    // Margem (px) em volta de cada furo previsto: base proporcional ao pitch mais a surpresa do último quadro
+    double margem_previsao() const {
+        const double pitch = (ultimo_pitch_medio > 0) ? ultimo_pitch_medio : 0.0;
+        return std::max(6.0, 0.08 * pitch) + 2.0 * std::abs(residuo_avanco_px);
+    }
+
+    // Faixas [y0, y1) da ROI onde os furos devem estar neste quadro: furos do quadro anterior deslocados
+    // pelo avanço medido, mais um pitch antes do primeiro e depois do último (furos entrando na ROI).
+    // Retorna false se as faixas cobririam quase toda a ROI (sem ganho sobre a varredura completa).
+    bool montar_faixas(int linhas_roi) {
+        faixas.clear();
+        centros_previstos.clear();
+        if (centros_anteriores.empty() || altura_furo_px <= 0) return false;
+        
+        double pitch = 0.0;
+        if (centros_anteriores.size() > 1) {
+            pitch = (centros_anteriores.back() - centros_anteriores.front()) / (centros_anteriores.size() - 1);
+        } else if (ultimo_pitch_medio > 0) {
+            pitch = ultimo_pitch_medio;
+        }
+        const double meia = altura_furo_px * 0.5 + margem_previsao();
+        
+        for (double c : centros_anteriores) centros_previstos.push_back(c + avanco_px);
+        if (pitch > meia) {
+            centros_previstos.insert(centros_previstos.begin(), centros_anteriores.front() + avanco_px - pitch);
+            centros_previstos.push_back(centros_anteriores.back() + avanco_px + pitch);
+        }
+        
+        for (double p : centros_previstos) {
+            int y0 = std::max(0, (int)std::floor(p - meia));
+            int y1 = std::min(linhas_roi, (int)std::ceil(p + meia) + 1);
+            if (y1 <= y0) continue;
+            if (!faixas.empty() && y0 <= faixas.back().second) {
+                faixas.back().second = std::max(faixas.back().second, y1);
+            } else {
+                faixas.push_back({y0, y1});
+            }
+        }
+        
+        int cobertas = 0;
+        for (const auto& f : faixas) cobertas += f.second - f.first;
+        return !faixas.empty() && cobertas < (int)(linhas_roi * 0.75);
+    }
+
+    // Varredura incremental: binariza e projeta só as faixas previstas. Confiança exigida: nenhum furo
+    // cortado por borda de faixa e cada furo previsto inteiramente dentro da ROI reencontrado perto da previsão.
+    bool varrer_faixas(FrameResult& r, const cv::Mat& roi_gray, const cv::Rect& roi_rect, int thresh_val,
+                       int limite_superior, int limite_inferior, bool gerar_debug) {
+        furos_validos.clear();
+        r.debug_rects.clear();
+        r.linhas_varridas = 0;
+        binary_full.create(roi_gray.rows, roi_gray.cols, CV_8UC1);
+        
+        for (const auto& f : faixas) {
+            cv::Mat destino = binary_full.rowRange(f.first, f.second);
+            cv::threshold(roi_gray.rowRange(f.first, f.second), destino, thresh_val, 255, cv::THRESH_BINARY);
+            if (!varrer_linhas(r, f.first, f.second, roi_rect, limite_superior, limite_inferior, gerar_debug)) {
+                return false;
+            }
+            r.linhas_varridas += f.second - f.first;
+        }
+        if (furos_validos.empty()) return false;
+        
+        const double tolerancia = margem_previsao();
+        const double meia_altura = altura_furo_px * 0.5;
+        for (double p : centros_previstos) {
+            if (p - meia_altura < 0 || p + meia_altura > roi_gray.rows - 1) continue; // Parcial na borda: opcional
+            bool achou = false;
+            for (const auto& furo : furos_validos) {
+                if (std::abs(furo.cy_roi - p) <= tolerancia) { achou = true; break; }
+            }
+            if (!achou) return false;
+        }
+        return true;
+    }
+
+    // Atualiza a previsão do próximo quadro com a fase deste (avanço = variação da fase, caminho mais curto)
+    void atualizar_rastreio(double fase_filme, double pitch_padrao) {
+        if (fase_filme < 0 || furos_validos.empty() || pitch_padrao <= 0) {
+            rastreio_valido = false;
+            fase_anterior = -1.0;
+            centros_anteriores.clear();
+            return;
+        }
+        
+        if (fase_anterior >= 0) {
+            double avanco = fase_filme - fase_anterior;
+            while (avanco < -(pitch_padrao * 0.5)) avanco += pitch_padrao;
+            while (avanco >= (pitch_padrao * 0.5)) avanco -= pitch_padrao;
+            residuo_avanco_px = rastreio_valido ? (avanco - avanco_px) : 0.0;
+            avanco_px = rastreio_valido ? (0.5 * avanco_px + 0.5 * avanco) : avanco;
+            rastreio_valido = true;
+        }
+        fase_anterior = fase_filme;
+        
+        centros_anteriores.clear();
+        altura_furo_px = 0;
+        for (const auto& f : furos_validos) {
+            centros_anteriores.push_back(f.cy_roi);
+            altura_furo_px = std::max(altura_furo_px, f.rect.height);
+        }
+    }
+
+    // Núcleo nativo do quadro: NÃO toca em objetos Python (roda com o GIL liberado).
+    // `gerar_debug` controla os rects de depuração e `gerar_preview` o binário reduzido do painel,
+    // escrito em `destino_binario` (buffer do chamador) ou, se nulo, em r.binary_small.
+    void process_core(FrameResult& r, uint8_t* data, int rows, int cols, int channels,
+                      int roi_x, int roi_y, int roi_w, int roi_h,
+                      int thresh_val, int linha_gatilho_y, int margem_gatilho,
+                      double pitch_padrao,
+                      bool audio_enabled, int audio_x, int audio_w, int audio_slit_y,
+                      bool gerar_debug, bool gerar_preview, cv::Mat* destino_binario) {
+        r.valido = false;
+        r.capturar = false;
+        r.varredura_incremental = false;
+        r.linhas_varridas = 0;
+        r.cx_a = -1;
+        r.cy_a = -1;
+        r.debug_rects.clear();
+        r.audio_samples.clear();
+        r.binary_h = 0;
+        r.binary_w = 0;
+        
+        cv::Mat frame(rows, cols, channels == 3 ? CV_8UC3 : CV_8UC1, data);
+        
+        cv::Rect roi_rect(
+            std::max(0, roi_x),
+            std::max(0, roi_y),
+            std::max(0, std::min(roi_w, cols - std::max(0, roi_x))),
+            std::max(0, std::min(roi_h, rows - std::max(0, roi_y)))
+        );
+                          
+        if (roi_rect.width <= 0 || roi_rect.height <= 0) {
+            return;
+        }
+
+        cv::Mat roi_color = frame(roi_rect);
+        cv::Mat roi_gray;
+        
+        // Se a imagem já for monocromática (RAW8), pulamos a conversão para cinza (economia gigante de CPU!)
+        if (frame.channels() == 3) {
+            cv::cvtColor(roi_color, roi_gray_buf, cv::COLOR_RGB2GRAY);
+            roi_gray = roi_gray_buf;
+        } else {
+            roi_gray = roi_color;
+        }
+        
+        // --- INÍCIO DA PROJEÇÃO 1D HÍBRIDA ---
+        
+        // Mantemos a imagem pequena apenas para preview no painel UI (reduz uso de banda de vídeo).
+        // Mesmo arredondamento (cvRound, meio para o par) do cv::resize com fx = fy = 0.5.
+        r.binary_h = (int)std::lrint(roi_gray.rows * 0.5);
+        r.binary_w = (int)std::lrint(roi_gray.cols * 0.5);
+        if (gerar_preview && destino_binario == nullptr) {
+            cv::resize(roi_gray, roi_small, cv::Size(), 0.5, 0.5, cv::INTER_NEAREST);
+            cv::threshold(roi_small, r.binary_small, thresh_val, 255, cv::THRESH_BINARY);
+        } else if (gerar_preview &&
+                   destino_binario->rows == r.binary_h && destino_binario->cols == r.binary_w) {
+            // Escreve direto no buffer do chamador (threshold não realoca com shape/tipo iguais)
+            cv::resize(roi_gray, roi_small, cv::Size(r.binary_w, r.binary_h), 0, 0, cv::INTER_NEAREST);
+            cv::threshold(roi_small, *destino_binario, thresh_val, 255, cv::THRESH_BINARY);
+        }
+        
+        int limite_superior = linha_gatilho_y - margem_gatilho;
+        int limite_inferior = linha_gatilho_y + margem_gatilho;
+        const int linhas_roi = roi_gray.rows;
+        
+        // Rastreamento perdido se a ROI mudou (comandos w/a/s/d, rx/ry/rw/rh)
+        if (roi_rect != roi_anterior) rastreio_valido = false;
+        roi_anterior = roi_rect;
+        
+        auto t0 = std::chrono::steady_clock::now();
+        auto ms_desde = [](std::chrono::steady_clock::time_point t) {
+            return std::chrono::duration<double, std::milli>(std::chrono::steady_clock::now() - t).count();
+        };
+        stats.quadros++;
+        quadros_desde_total++;
+        
+        bool incremental_ok = false;
+        if (rastreio_habilitado) {
+            if (!rastreio_valido) {
+                stats.fallback_sem_fase++;
+            } else if (quadros_desde_total >= intervalo_varredura_total) {
+                stats.varreduras_periodicas++;
+            } else if (montar_faixas(linhas_roi) &&
+                       varrer_faixas(r, roi_gray, roi_rect, thresh_val, limite_superior, limite_inferior, gerar_debug)) {
+                incremental_ok = true;
+                const double t = ms_desde(t0);
+                stats.incrementais++;
+                stats.tempo_incremental_ms += t;
+                stats.linhas_incrementais += r.linhas_varridas;
+            } else {
+                stats.fallback_confianca++;
+            }
+        }
+        
+        if (!incremental_ok) {
+            // Varredura completa: início, fase perdida, confiança baixa ou refresco periódico
+            auto t_completo = std::chrono::steady_clock::now();
+            furos_validos.clear();
+            r.debug_rects.clear();
+            
+            // 1. Binarização na resolução total para máxima precisão na projeção
+            cv::threshold(roi_gray, binary_full, thresh_val, 255, cv::THRESH_BINARY);
+            varrer_linhas(r, 0, linhas_roi, roi_rect, limite_superior, limite_inferior, gerar_debug);
+            r.linhas_varridas = linhas_roi;
+            quadros_desde_total = 0;
+            stats.n_completas++;
+            stats.tempo_completo_ms += ms_desde(t_completo);
+        }
+        r.varredura_incremental = incremental_ok;
+        stats.tempo_real_ms += ms_desde(t0);
         // --- FIM DA PROJEÇÃO 1D HÍBRIDA ---
         
         std::sort(furos_validos.begin(), furos_validos.end(), [](const Furo& a, const Furo& b) {
@@ -154,7 +629,7 @@ public:
         });
         
         // --- INÍCIO DO AUDIO LINE-SCANNER ---
-        std::vector<float> audio_samples;
+        std::vector<float>& audio_samples = r.audio_samples;
         
         double real_pitch = (ultimo_pitch_medio > 0) ? ultimo_pitch_medio : pitch_padrao;
         
@@ -196,7 +671,7 @@ public:
                             slice_gray = slice_color;
                         }
                         
-                        std::vector<float> current_chunk;
+                        current_chunk.clear();
                         current_chunk.reserve(read_h);
                         
                         // Varredura da área alargada
@@ -279,6 +754,7 @@ public:
             // Converte de volta para pixels na régua da Fase
             fase_filme = (angulo_medio / (2.0 * M_PI)) * pitch_padrao;
         }
+        atualizar_rastreio(fase_filme, pitch_padrao);
         
         long cx_a = -1, cy_a = -1;
         bool capturar = false;
@@ -353,41 +829,27 @@ public:
             perfuracao_na_linha = false;
         }
         
-        py::array_t<uint8_t> result_array({binary_small.rows, binary_small.cols});
-        py::buffer_info buf_res = result_array.request();
-        std::memcpy(buf_res.ptr, binary_small.data, binary_small.total() * binary_small.elemSize());
-        
-        // Converte o std::vector de audio para numpy array
-        py::array_t<float> audio_numpy(audio_samples.size(), audio_samples.data());
-        
-        py::dict result;
-        result["capturar"] = capturar;
-        result["cx_a"] = cx_a;
-        result["cy_a"] = cy_a;
-        result["debug_visual"] = debug_visual;
-        result["binary_small"] = result_array;
-        result["perfuracao_na_linha"] = perfuracao_na_linha;
-        result["contador_perfs_ciclo"] = contador_perfs_ciclo;
-        result["encolhimento_atual_pct"] = encolhimento_atual_pct;
-        result["ultimo_pitch_medio"] = ultimo_pitch_medio;
-        result["pitch_instantaneo"] = ultimo_pitch_instantaneo;
-        result["achou_furo"] = furo_na_zona_agora;
-        result["audio_chunk"] = audio_numpy; 
-        
-        return result;
-    }
-
-    void reset_ciclo() {
-        contador_perfs_ciclo = 0;
-        last_perf_y = -1.0;
-        gatilho_fase_armado = false;
-        last_erro_fase = 0.0;
-        audio_tail.clear();
+        r.valido = true;
+        r.capturar = capturar;
+        r.cx_a = cx_a;
+        r.cy_a = cy_a;
+        r.perfuracao_na_linha = perfuracao_na_linha;
+        r.contador_perfs_ciclo = contador_perfs_ciclo;
+        r.encolhimento_atual_pct = encolhimento_atual_pct;
+        r.ultimo_pitch_medio = ultimo_pitch_medio;
+        r.pitch_instantaneo = ultimo_pitch_instantaneo;
+        r.achou_furo = furo_na_zona_agora;
     }
 };
 
 PYBIND11_MODULE(miniola_cv, m) {
     m.doc() = "Miniola CV Extension using OpenCV and Pybind11";
+    PYBIND11_NUMPY_DTYPE(VisionRecord, valido, capturar, perfuracao_na_linha, achou_furo, contador_perfs_ciclo,
+                         cx_a, cy_a, encolhimento_atual_pct, ultimo_pitch_medio, pitch_instantaneo,
+                         n_rects, audio_len, audio_descartado, binary_h, binary_w,
+                         varredura_incremental, linhas_varridas);
+    m.def("result_dtype", []() { return py::dtype::of<VisionRecord>(); },
+          "dtype estruturado do registro escalar usado por process_frame_into");
     py::class_<ScannerVision>(m, "ScannerVision")
         .def(py::init<>())
         .def("process_frame", &ScannerVision::process_frame,
@@ -396,5 +858,17 @@ PYBIND11_MODULE(miniola_cv, m) {
              py::arg("thresh_val"), py::arg("linha_gatilho_y"), py::arg("margem_gatilho"),
              py::arg("pitch_padrao"),
              py::arg("audio_enabled") = false, py::arg("audio_x") = 0, py::arg("audio_w") = 0, py::arg("audio_slit_y") = 0)
-        .def("reset_ciclo", &ScannerVision::reset_ciclo);
+        .def("process_frame_into", &ScannerVision::process_frame_into,
+             py::arg("input_array"),
+             py::arg("roi_x"), py::arg("roi_y"), py::arg("roi_w"), py::arg("roi_h"),
+             py::arg("thresh_val"), py::arg("linha_gatilho_y"), py::arg("margem_gatilho"),
+             py::arg("pitch_padrao"),
+             py::arg("audio_enabled"), py::arg("audio_x"), py::arg("audio_w"), py::arg("audio_slit_y"),
+             py::arg("resultado").noconvert(),
+             py::arg("rects") = py::none(), py::arg("audio") = py::none(), py::arg("binario") = py::none())
+        .def("reset_ciclo", &ScannerVision::reset_ciclo, py::call_guard<py::gil_scoped_release>())
+        .def("set_tracking", &ScannerVision::set_tracking,
+             py::arg("enabled"), py::arg("full_scan_every") = 30, py::call_guard<py::gil_scoped_release>())
+        .def("get_tracking_stats", &ScannerVision::get_tracking_stats)
+        .def("reset_tracking_stats", &ScannerVision::reset_tracking_stats, py::call_guard<py::gil_scoped_release>());
 }
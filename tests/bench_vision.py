@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Bancada de paridade e vazão dos motores de visão (SPEC-001).
+
+Roda o motor C++ (`miniola_cv.ScannerVision`, se compilado) e o motor NumPy
+(`core.vision_numpy.ScannerVisionNumpy`) sobre sequências sintéticas com ground truth
+(resoluções, ROIs, encolhimento e ruído variados) e, opcionalmente, sobre sequências
+gravadas/amostras, usando a mesma API do caminho quente (`process_frame_into` + `VisionBuffers`).
+
+Métricas por cenário: quadros/s, latência p50/p99, capturas disparadas vs esperadas e
+dois erros da âncora de gatilho (`cy_a`):
+  - `erro_fase_p99_px`: contra a âncora ideal do estimador, a fase circular média (no pitch
+    nominal) dos furos realmente visíveis na ROI, recortados na borda como o motor os vê.
+    Mede o motor (momentos + PLL) e fica em meio pixel em todos os cenários;
+  - `erro_p99_px`: contra o centro real do furo mais próximo da linha. Inclui o viés do
+    próprio estimador: com encolhimento a fase média dos n furos visíveis se afasta
+    ~(n-1)/2 * (pitch_nominal - pitch_real) do furo da linha (~9 px com 3% e 4 furos), e um
+    furo cortado pelo rodapé da ROI puxa a média (~6 px no sensor 2064x1544). Por isso vai
+    a 9.5-23.5 px nos cenários `enc3`/2064: a baseline trava esse viés (regressão), não é meta.
+
+Uso:
+    python3 tests/bench_vision.py                      # tabela + comparação com as baselines
+    python3 tests/bench_vision.py --update             # regrava tests/bench_baselines.json
+    python3 tests/bench_vision.py --frames 600         # tabela; recusa comparar/regravar (n_quadros != baselines)
+    python3 tests/bench_vision.py --recorded capturas  # inclui uma sessão gravada (só vazão)
+    python3 tests/bench_vision.py --mock-film shrink=3,weave=2,torn=0.05   # inclui a película do mock
+
+Variáveis de ambiente:
+    MINIOLA_BENCH_UPDATE=1      regrava as baselines (também vale para test_vision_benchmark.py)
+    MINIOLA_BENCH_MACHINE=nome  também grava/compara vazão absoluta sob essa chave (ex.: bancada do Pi)
+    MINIOLA_BENCH_TOLERANCE=0.5 queda de vazão tolerada contra a baseline da máquina (fração)
+
+Vazão independente de máquina (sempre comparada): todo motor, em todo cenário, precisa
+de `PISO_FPS` quadros/s, o requisito de tempo real (120 FPS, SPEC-001 RF-10) com o motor
+usando no máximo metade do orçamento do quadro; abaixo disso a máquina não serve ao scanner,
+seja qual for. Com os dois motores presentes, `RAZAO_CPP_NUMPY_MIN` exige que o C++ não fique
+atrás do NumPy na mesma execução. A precisão do C++ usa a entrada `precisao.cpp`; sem ela (árvore sem o
+módulo compilado ao gravar), vale a do NumPy, que é o contrato de paridade.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from cameras.mock import MockCameraProvider
+from core.segment_container import SegmentArchive
+from core.vision_buffers import VisionBuffers
+from core.vision_numpy import ScannerVisionNumpy, result_dtype as result_dtype_numpy
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baselines.json")
+AMOSTRAS_DIR = os.path.join(PROJECT_ROOT, "amostras", "fotogramas")
+
+# Parâmetros de visão comuns (mesmos padrões do miniola.py / sidecar de amostras)
+THRESH_VAL = 239
+LINHA_GATILHO_Y = 110
+MARGEM_GATILHO = 23
+AUDIO_X_OFFSET = 10
+AUDIO_READ_W = 96
+
+# Tolerâncias de precisão (independentes da máquina)
+FOLGA_ERRO_PX = 0.5
+FOLGA_CAPTURAS = 0
+N_QUADROS_BASELINE = 240    # Quadros por cenário das baselines (as capturas contadas dependem disso)
+
+# Vazão independente de máquina
+FPS_TEMPO_REAL = 120        # Taxa da câmera que o motor precisa acompanhar (SPEC-001 RF-10)
+FOLGA_TEMPO_REAL = 2        # O motor usa no máximo 1/2 do orçamento do quadro (resto: leitura, gravação, UI)
+PISO_FPS = FPS_TEMPO_REAL * FOLGA_TEMPO_REAL
+RAZAO_CPP_NUMPY_MIN = 0.8   # C++ / NumPy na mesma execução (folga para o ruído do relógio)
+
+
+class Cenario:
+    """Sequência de quadros para a bancada. `furos_y(i)` devolve os centros reais (ground truth) no quadro i."""
+
+    def __init__(self, nome, quadros, roi, pitch_padrao, furos_y=None, altura_furo=None):
+        self.nome = nome
+        self.quadros = quadros
+        self.roi = roi
+        self.pitch_padrao = pitch_padrao
+        self.furos_y = furos_y
+        self.altura_furo = altura_furo
+
+
+def cenario_sintetico(nome, res=(1420, 880), roi=(200, 10, 80, 840), pitch_padrao=195.0,
+                      encolhimento_pct=0.0, ruido=0.0, n_quadros=240, avanco_px=13, seed=7):
+    """
+    Tira de filme sintética descendo `avanco_px` por quadro: furos com 40% do pitch de altura
+    (KS 35mm), pitch real encolhido e trilha de áudio em densidade variável. A tira é desenhada
+    uma vez e cada quadro é uma fatia dela (sem custo de geração durante a medição).
+    """
+    largura, altura = res
+    rx, ry, rw, rh = roi
+    pitch = pitch_padrao * (1.0 - encolhimento_pct / 100.0)
+    altura_furo = int(round(pitch * 0.4))
+    topo = n_quadros * avanco_px + int(pitch) * 2  # Linha da tira exibida no topo do quadro 0
+    tira = np.full((topo + altura, largura, 3), 40, dtype=np.uint8)
+
+    gerador = np.random.default_rng(seed)
+    audio_x = rx + rw + AUDIO_X_OFFSET
+    linhas = np.arange(tira.shape[0])
+    trilha = 127 + 90 * np.sin(linhas / 6.0) + 25 * np.sin(linhas / 2.3)
+    tira[:, audio_x:audio_x + AUDIO_READ_W] = np.clip(trilha, 0, 255).astype(np.uint8)[:, None, None]
+
+    centros = []
+    k = 0
+    while True:
+        y0 = int(round(k * pitch + pitch * 0.5))
+        if y0 + altura_furo > tira.shape[0]: break
+        tira[y0:y0 + altura_furo, rx + 10:rx + rw - 10] = 250
+        centros.append(y0 + (altura_furo - 1) / 2.0)
+        k += 1
+    centros = np.array(centros)
+
+    if ruido > 0:
+        x0, x1 = max(0, rx - 20), min(largura, audio_x + AUDIO_READ_W + 20)
+        faixa = tira[:, x0:x1].astype(np.float32)
+        faixa += gerador.normal(0.0, ruido, faixa.shape[:2])[:, :, None]
+        tira[:, x0:x1] = np.clip(faixa, 0, 255).astype(np.uint8)
+
+    inicios = [topo - i * avanco_px for i in range(n_quadros)]
+    quadros = [tira[y:y + altura] for y in inicios]
+
+    def furos_y(i):
+        return centros - inicios[i]
+
+    return Cenario(nome, quadros, roi, pitch_padrao, furos_y, altura_furo)
+
+
+def ancora_ideal(centros, altura_furo, roi, linha_global, pitch_padrao):
+    """
+    `cy_a` que um detector perfeito daria: fase circular média (pitch nominal) dos furos
+    visíveis, cada um recortado na ROI (a última linha da ROI nunca conta como furo) e
+    descartado abaixo de 10 linhas, como no motor.
+    """
+    _, ry, _, rh = roi
+    topo = np.maximum(centros - (altura_furo - 1) / 2.0, ry)
+    base = np.minimum(centros + (altura_furo - 1) / 2.0, ry + rh - 2)
+    visiveis = (base - topo + 1) >= 10
+    if not visiveis.any(): return None
+    angulos = (topo[visiveis] + base[visiveis]) / 2.0 * (2.0 * np.pi / pitch_padrao)
+    fase = (np.arctan2(np.sin(angulos).sum(), np.cos(angulos).sum()) % (2.0 * np.pi)) / (2.0 * np.pi) * pitch_padrao
+    erro_fase = (np.fmod(linha_global, pitch_padrao) - fase + pitch_padrao * 0.5) % pitch_padrao - pitch_padrao * 0.5
+    return linha_global - erro_fase
+
+
+def cenarios_sinteticos(n_quadros=240):
+    base = dict(n_quadros=n_quadros)
+    sensor = dict(res=(2064, 1544), roi=(300, 20, 120, 1500), pitch_padrao=340.0, avanco_px=23)
+    return [
+        cenario_sintetico("1420x880_roi80x840", **base),
+        cenario_sintetico("1420x880_roi80x840_enc3", encolhimento_pct=3.0, **base),
+        cenario_sintetico("1420x880_roi80x840_ruido12", ruido=12.0, **base),
+        cenario_sintetico("1420x880_roi48x600", roi=(200, 10, 48, 600), **base),
+        cenario_sintetico("1420x880_roi48x600_enc3_ruido12", roi=(200, 10, 48, 600),
+                          encolhimento_pct=3.0, ruido=12.0, **base),
+        cenario_sintetico("2064x1544_roi120x1500", **sensor, **base),
+        cenario_sintetico("2064x1544_roi120x1500_enc3_ruido12", encolhimento_pct=3.0, ruido=12.0, **sensor, **base),
+    ]
+
+
+def cenarios_amostras(n_quadros=240):
+    """Fotogramas de `amostras/fotogramas` com sidecar `.json`: o quadro rola verticalmente (sem ground truth por furo)."""
+    cenarios = []
+    for img_path in sorted(glob.glob(os.path.join(AMOSTRAS_DIR, "*.png")) + glob.glob(os.path.join(AMOSTRAS_DIR, "*.jpg"))):
+        meta_path = os.path.splitext(img_path)[0] + ".json"
+        if not os.path.exists(meta_path): continue
+        with open(meta_path, "r", encoding="utf-8") as f:
+            gt = json.load(f).get("cv_ground_truth", {})
+        img = cv2.imread(img_path, cv2.IMREAD_COLOR)
+        if img is None: continue
+        pitch = float(gt.get("pitch_px_esperado") or 195.0)
+        roi = tuple(gt.get("caixa_delimitadora_roi_recomendada") or (200, 10, 80, 840))
+        tira = np.vstack([img, img])
+        passo = max(1, int(pitch * 0.07))
+        quadros = [tira[(i * passo) % img.shape[0]:][:img.shape[0]] for i in range(n_quadros)]
+        cenarios.append(Cenario("amostra_" + os.path.basename(img_path), quadros, roi, pitch))
+    return cenarios
+
+
+def cenario_mock(film, n_quadros=240, res=(1420, 880), pitch_padrao=None):
+    """
+    Película do `MockCameraProvider` sem limite de FPS (`--mock-film`): encolhimento, oscilação
+    lateral, furos rasgados/ausentes e rajadas de quadros perdidos reproduzíveis pela semente. A ROI
+    cobre a coluna de furos da esquerda do mock e o gabarito vem da geometria da tira.
+    """
+    cam = MockCameraProvider(film=film, unthrottled=True)
+    largura, altura = res
+    cam.start(largura, altura, 120, 1000, 1.0, 0)
+    quadros, avancos = [], []
+    for _ in range(n_quadros):
+        quadros.append(cam.read_frame().data)  # Views da tira pré-renderizada
+        avancos.append(cam.ultimo_film_px)
+    cam.stop()
+    roi = (cam.perf_x_left - 10, 10, cam.perf_width + 20, altura - 40)
+    pitch = pitch_padrao or cam.film.pitch
+    passo = cam.tira_px / cam.film.perfs
+    primeiro = int(np.floor(-(avancos[-1] + cam.perf_height) / passo)) - 1
+    ultimo = int(np.ceil(altura / passo)) + 1
+
+    def furos_y(i):
+        return cam.furos_y(avancos[i], primeiro, ultimo)
+
+    return Cenario("mock_" + (film or "padrao").replace(",", "_").replace("=", ""), quadros, roi, pitch, furos_y)
+
+
+def cenario_gravado(diretorio, n_quadros=240, roi=(200, 10, 80, 840), pitch_padrao=195.0):
+    """Sessão gravada (segmentos .mseg ou miniola_XXXXXX.jpg/png): só vazão e contagem de capturas."""
+    quadros = []
+    if SegmentArchive.has_segments(diretorio):
+        with SegmentArchive(diretorio) as archive:
+            for frame in archive.refresh().frames()[:n_quadros]:
+                quadros.append(frame.decode())
+    else:
+        for p in sorted(glob.glob(os.path.join(diretorio, "miniola_*.*")))[:n_quadros]:
+            img = cv2.imread(p, cv2.IMREAD_COLOR)
+            if img is not None: quadros.append(img)
+    if not quadros: return None
+    return Cenario("gravado_" + os.path.basename(os.path.normpath(diretorio)), quadros, roi, pitch_padrao)
+
+
+def motores_disponiveis():
+    """{nome: (fábrica, dtype do registro)} dos motores presentes neste ambiente."""
+    motores = {"numpy": (ScannerVisionNumpy, result_dtype_numpy())}
+    try:
+        import miniola_cv  # type: ignore
+        if hasattr(miniola_cv.ScannerVision, "process_frame_into"):
+            motores["cpp"] = (miniola_cv.ScannerVision, miniola_cv.result_dtype())
+    except ImportError:
+        pass
+    return motores
+
+
+def medir(fabrica, dtype, cenario):
+    motor = fabrica()
+    buffers = VisionBuffers(dtype)
+    rx, ry, rw, rh = cenario.roi
+    slit_y = ry + rh // 2
+    audio_x = rx + rw + AUDIO_X_OFFSET
+    linha_global = LINHA_GATILHO_Y + ry
+    relogio = time.perf_counter
+
+    latencias = np.empty(len(cenario.quadros))
+    erros = []
+    erros_fase = []
+    capturas = 0
+    for i, quadro in enumerate(cenario.quadros):
+        t0 = relogio()
+        motor.process_frame_into(quadro, rx, ry, rw, rh, THRESH_VAL, LINHA_GATILHO_Y, MARGEM_GATILHO,
+                                 cenario.pitch_padrao, True, audio_x, AUDIO_READ_W, slit_y,
+                                 buffers.resultado, None, buffers.audio, None)
+        latencias[i] = relogio() - t0
+        rec = buffers.resultado[0]
+        if rec["capturar"]:
+            capturas += 1
+            if cenario.furos_y is not None:
+                centros = cenario.furos_y(i)
+                gt = centros[np.argmin(np.abs(centros - linha_global))]
+                erros.append(abs(float(rec["cy_a"]) - gt))
+                if cenario.altura_furo is not None:
+                    ideal = ancora_ideal(centros, cenario.altura_furo, cenario.roi, linha_global, cenario.pitch_padrao)
+                    if ideal is not None: erros_fase.append(abs(float(rec["cy_a"]) - ideal))
+
+    esperadas = None
+    if cenario.furos_y is not None:
+        # Furos que cruzaram a linha de gatilho descendo; o motor dispara a cada 4
+        cruzamentos = 0
+        for i in range(1, len(cenario.quadros)):
+            antes, agora = cenario.furos_y(i - 1), cenario.furos_y(i)
+            cruzamentos += int(np.count_nonzero((antes < linha_global) & (agora >= linha_global)))
+        esperadas = cruzamentos // 4
+
+    ms = latencias * 1000.0
+    return {
+        "quadros": len(cenario.quadros),
+        "fps": round(len(cenario.quadros) / float(latencias.sum()), 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "capturas": capturas,
+        "capturas_esperadas": esperadas,
+        "erro_medio_px": round(float(np.mean(erros)), 3) if erros else None,
+        "erro_p99_px": round(float(np.percentile(erros, 99)), 3) if erros else None,
+        "erro_fase_p99_px": round(float(np.percentile(erros_fase, 99)), 3) if erros_fase else None,
+    }
+
+
+def executar(cenarios, motores=None):
+    """{motor: {cenário: métricas}}"""
+    motores = motores or motores_disponiveis()
+    resultados = {}
+    for nome_motor, (fabrica, dtype) in motores.items():
+        resultados[nome_motor] = {c.nome: medir(fabrica, dtype, c) for c in cenarios}
+    return resultados
+
+
+def maquina_atual():
+    """Chave da vazão absoluta: só com MINIOLA_BENCH_MACHINE (hostname não serve em CI)."""
+    return os.environ.get("MINIOLA_BENCH_MACHINE") or None
+
+
+def carregar_baselines(path=BASELINES_PATH):
+    if not os.path.exists(path):
+        return {"precisao": {}, "vazao": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def quadros_baseline(baselines):
+    return int(baselines.get("n_quadros", N_QUADROS_BASELINE))
+
+
+def _conferir_quadros(resultados, baselines):
+    """Capturas e erros só são comparáveis com o mesmo número de quadros por cenário com ground truth."""
+    n = quadros_baseline(baselines)
+    for motor, por_cenario in resultados.items():
+        for cenario, m in por_cenario.items():
+            if m["capturas_esperadas"] is not None and m["quadros"] != n:
+                raise ValueError(f"{motor}/{cenario} rodou com {m['quadros']} quadros; as baselines são de {n} "
+                                 f"(use --frames {n} ou apague {os.path.basename(BASELINES_PATH)} para regravar)")
+
+
+def atualizar_baselines(resultados, path=BASELINES_PATH, maquina=None):
+    """
+    Precisão (determinística) vale para qualquer máquina; a vazão absoluta só é gravada sob
+    MINIOLA_BENCH_MACHINE (o piso de vazão vem do requisito, `PISO_FPS`, não da medição).
+    """
+    baselines = carregar_baselines(path)
+    if baselines.get("precisao"):
+        _conferir_quadros(resultados, baselines)
+    baselines.setdefault("n_quadros", N_QUADROS_BASELINE)
+    maquina = maquina or maquina_atual()
+    for motor, por_cenario in resultados.items():
+        precisao = baselines.setdefault("precisao", {}).setdefault(motor, {})
+        for cenario, m in por_cenario.items():
+            if m["capturas_esperadas"] is not None:
+                precisao[cenario] = {"capturas": m["capturas"], "erro_p99_px": m["erro_p99_px"],
+                                     "erro_fase_p99_px": m["erro_fase_p99_px"]}
+            if maquina:
+                baselines.setdefault("vazao", {}).setdefault(maquina, {}).setdefault(motor, {})[cenario] = {
+                    "fps": m["fps"], "p99_ms": m["p99_ms"]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return baselines
+
+
+def comparar(resultados, baselines, maquina=None, tolerancia=None):
+    """
+    Lista de regressões (strings); vazia se todos os motores estão dentro das baselines.
+    ValueError se os cenários com ground truth não rodaram com o número de quadros das baselines.
+    """
+    _conferir_quadros(resultados, baselines)
+    if tolerancia is None:
+        tolerancia = float(os.environ.get("MINIOLA_BENCH_TOLERANCE", "0.5"))
+    maquina = maquina or maquina_atual()
+    vazao = baselines.get("vazao", {}).get(maquina, {}) if maquina else {}
+    precisao = baselines.get("precisao", {})
+    regressoes = []
+    for motor, por_cenario in resultados.items():
+        for cenario, m in por_cenario.items():
+            ref = precisao.get(motor, {}).get(cenario) or precisao.get("numpy", {}).get(cenario)
+            if ref is not None:
+                if abs(m["capturas"] - ref["capturas"]) > FOLGA_CAPTURAS:
+                    regressoes.append(f"{motor}/{cenario}: {m['capturas']} capturas (baseline {ref['capturas']})")
+                for chave in ("erro_p99_px", "erro_fase_p99_px"):
+                    if ref.get(chave) is not None and (m[chave] is None or m[chave] > ref[chave] + FOLGA_ERRO_PX):
+                        regressoes.append(f"{motor}/{cenario}: {chave} {m[chave]} px (baseline {ref[chave]} px)")
+            if m["fps"] < PISO_FPS:
+                regressoes.append(f"{motor}/{cenario}: {m['fps']:.0f} FPS (piso {PISO_FPS} FPS = "
+                                  f"{FOLGA_TEMPO_REAL}x {FPS_TEMPO_REAL} FPS)")
+            ref = vazao.get(motor, {}).get(cenario)
+            if ref is not None and m["fps"] < ref["fps"] * (1.0 - tolerancia):
+                regressoes.append(f"{motor}/{cenario}: {m['fps']:.0f} FPS (baseline {maquina} {ref['fps']:.0f} FPS)")
+    if "cpp" in resultados and "numpy" in resultados:
+        for cenario, m in resultados["cpp"].items():
+            ref = resultados["numpy"].get(cenario)
+            if ref is not None and m["fps"] < ref["fps"] * RAZAO_CPP_NUMPY_MIN:
+                regressoes.append(f"cpp/{cenario}: {m['fps']:.0f} FPS, {m['fps'] / ref['fps']:.2f}x do NumPy "
+                                  f"(mínimo {RAZAO_CPP_NUMPY_MIN}x)")
+    return regressoes
+
+
+def imprimir(resultados):
+    print(f"{'MOTOR':6} {'CENÁRIO':40} {'FPS':>9} {'p50 ms':>8} {'p99 ms':>8} {'CAPT':>9} {'ERRO':>7} {'p99':>7} {'FASE':>7}")
+    for motor, por_cenario in resultados.items():
+        for cenario, m in por_cenario.items():
+            capt = f"{m['capturas']}/{m['capturas_esperadas']}" if m["capturas_esperadas"] is not None else str(m["capturas"])
+            erro = f"{m['erro_medio_px']:.2f}" if m["erro_medio_px"] is not None else "-"
+            p99 = f"{m['erro_p99_px']:.2f}" if m["erro_p99_px"] is not None else "-"
+            fase = f"{m['erro_fase_p99_px']:.2f}" if m["erro_fase_p99_px"] is not None else "-"
+            print(f"{motor:6} {cenario:40} {m['fps']:9.1f} {m['p50_ms']:8.3f} {m['p99_ms']:8.3f} {capt:>9} {erro:>7} {p99:>7} {fase:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bancada de paridade e vazão dos motores de visão do Miniola.")
+    parser.add_argument("--frames", type=int, default=None, help="Quadros por cenário (padrão: o das baselines)")
+    parser.add_argument("--engine", choices=("all", "cpp", "numpy"), default="all")
+    parser.add_argument("--recorded", action="append", default=[], help="Diretório de captura (segmentos ou JPG/PNG) para incluir")
+    parser.add_argument("--mock-film", action="append", default=[], help="Especificação de película do mock (ex.: 'shrink=3,weave=2,torn=0.05,drops=0.01') para incluir")
+    parser.add_argument("--update", action="store_true", help="Regrava as baselines com os resultados desta execução")
+    args = parser.parse_args()
+
+    baselines = carregar_baselines()
+    if args.frames is None: args.frames = quadros_baseline(baselines)
+
+    motores = motores_disponiveis()
+    if args.engine != "all":
+        if args.engine not in motores:
+            print(f"[BENCH] Motor '{args.engine}' indisponível neste ambiente.")
+            return 1
+        motores = {args.engine: motores[args.engine]}
+
+    cenarios = cenarios_sinteticos(args.frames) + cenarios_amostras(args.frames)
+    cenarios += [cenario_mock(film, args.frames) for film in args.mock_film]
+    for d in args.recorded:
+        c = cenario_gravado(d, args.frames)
+        if c is None: print(f"[BENCH] Nenhum quadro em {d}")
+        else: cenarios.append(c)
+
+    resultados = executar(cenarios, motores)
+    imprimir(resultados)
+
+    try:
+        if args.update or os.environ.get("MINIOLA_BENCH_UPDATE") == "1":
+            atualizar_baselines(resultados)
+            print(f"[BENCH] Baselines atualizadas em {BASELINES_PATH} (vazão absoluta: {maquina_atual() or 'não gravada'})")
+            return 0
+        regressoes = comparar(resultados, baselines)
+    except ValueError as e:
+        print(f"[BENCH] {e}")
+        return 2
+    for r in regressoes: print(f"[REGRESSÃO] {r}")
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import unittest
+import numpy as np
+import sys
+import os
+import threading
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from cameras.base import CameraProvider
+from cameras.buffer_pool import BufferPool, Lease
+from cameras.capture_thread import CaptureThread
+from cameras.frame import Frame
+
+
+class SensorComPool(CameraProvider):
+    """Provedor de bancada no molde da Ximea em XI_BP_SAFE: cada quadro é escrito num buffer emprestado."""
+
+    reuses_buffers = True
+
+    def __init__(self, n_buffers=6):
+        self.buffer_pool = BufferPool(n_buffers, 16)
+        self.n = 0
+
+    def read_frame(self):
+        time.sleep(0.0005)
+        self.n += 1
+        lease = self.buffer_pool.acquire()
+        lease.array[:] = self.n % 256
+        return Frame(lease.array.reshape(4, 4), seq=self.n, lease=lease)
+
+
+class TestBufferPool(unittest.TestCase):
+    """
+    Empréstimo de buffers do driver com contagem de referências (SPEC-002).
+    """
+
+    def test_01_buffer_so_volta_sem_donos(self):
+        pool = BufferPool(2, 8)
+        a = pool.acquire()
+        self.assertTrue(a.retain())  # Painel segura o mesmo quadro
+        a.release()                  # Visão terminou
+        self.assertEqual(pool.livres(), 1)
+        a.release()                  # Painel terminou
+        self.assertEqual(pool.livres(), 2)
+        self.assertFalse(a.retain())  # Reciclado: ninguém pode voltar a ler
+        a.release()                   # Release extra é inofensivo
+        self.assertEqual(pool.livres(), 2)
+
+    def test_02_reciclagem_fifo_e_esgotamento(self):
+        pool = BufferPool(2, 8)
+        a, b = pool.acquire(), pool.acquire()
+        extra = pool.acquire()  # Tudo emprestado: buffer avulso, fora do pool
+        self.assertIsNone(extra.indice)
+        extra.release()
+        a.release()
+        b.release()
+        self.assertEqual(pool.acquire().indice, a.indice)  # O mais antigo solto é o primeiro reusado
+        st = pool.stats()
+        self.assertEqual((st["buffers"], st["esgotamentos"], st["em_uso_max"]), (2, 1, 2))
+
+    def test_03_anel_sem_copias_e_overflow_solta_emprestimos(self):
+        sensor = SensorComPool(n_buffers=6)
+        captura = CaptureThread(sensor, slots=4).start()
+        time.sleep(0.05)  # Consumidor parado: o anel transborda e devolve os buffers descartados
+        quadros = [captura.read() for _ in range(3)]
+        self.assertEqual([int(q.data[0, 0]) for q in quadros], [q.seq % 256 for q in quadros])
+        for q in quadros: q.release()
+        captura.stop()
+
+        st = captura.stats()
+        self.assertGreater(st["overflow_anel"], 0)
+        self.assertEqual(st["copias"], 0)
+        self.assertEqual(st["bytes_economizados"], st["capturados"] * 16)
+        self.assertEqual(st["pool"]["esgotamentos"], 0)
+        self.assertEqual(st["pool"]["livres"], 6)
+
+    def test_04_stream_principal_sob_demanda(self):
+        # Molde do Pi com stream duplo: a visão recebe o luma e o main só é materializado se pedido
+        class RequestFalso(Lease):
+            liberados = 0
+
+            def _liberar(self):
+                RequestFalso.liberados += 1
+
+        chamadas = []
+        lease = RequestFalso(threading.Lock())
+        luma = np.zeros((4, 6), dtype=np.uint8)
+        quadro = Frame(luma, lease=lease, main=lambda: chamadas.append(1) or np.ones((4, 6, 3), dtype=np.uint8))
+        self.assertIs(quadro.data, luma)
+        self.assertEqual(chamadas, [])
+        self.assertEqual(quadro.main().shape, (4, 6, 3))
+        quadro.main()
+        self.assertEqual(chamadas, [1])
+        self.assertTrue(quadro.retain())
+        quadro.release()
+        quadro.release()
+        self.assertEqual(RequestFalso.liberados, 1)
+        self.assertIs(Frame(luma).main(), luma)
+
+
+if __name__ == "__main__":
+    unittest.main()
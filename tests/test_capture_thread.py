@@ -0,0 +1,138 @@
+import unittest
+import numpy as np
+import sys
+import os
+import threading
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from cameras.base import CameraProvider
+from cameras.capture_thread import CaptureThread
+from cameras.frame import Frame
+from cameras.mock import MockCameraProvider
+
+
+class SensorSintetico(CameraProvider):
+    """Provedor de bancada: contador de sensor com saltos programados e buffer reutilizado (como a Ximea)."""
+
+    reuses_buffers = True
+
+    def __init__(self, saltos=(), periodo_s=0.0005):
+        self.buf = np.zeros((4, 4), dtype=np.uint8)
+        self.n = 0
+        self.nframe = 0
+        self.saltos = set(saltos)
+        self.periodo_s = periodo_s
+
+    def get_frame(self):
+        return self.read_frame().data
+
+    def read_frame(self):
+        time.sleep(self.periodo_s)
+        self.n += 1
+        self.nframe += 3 if self.n in self.saltos else 1  # Salto = 2 quadros perdidos na USB
+        self.buf[:] = self.n % 256
+        return Frame(self.buf, seq=self.nframe, timestamp=self.nframe / 120.0, exposure=2000.0, gain=3.0)
+
+
+class TestCaptureThread(unittest.TestCase):
+    """
+    Thread de aquisição com anel de `Frame`s (pixels + metadados do sensor) (SPEC-002).
+    """
+
+    def test_01_entradas_em_ordem_com_copia_e_drops_do_sensor(self):
+        sensor = SensorSintetico(saltos=(5, 9))
+        captura = CaptureThread(sensor, slots=64).start()
+        entradas = []
+        while len(entradas) < 12:
+            e = captura.read(timeout=1.0)
+            self.assertIsNotNone(e)
+            entradas.append(e)
+        captura.stop()
+
+        seqs = [q.seq for q in entradas]
+        self.assertEqual(seqs[:6], [1, 2, 3, 4, 7, 8])
+        self.assertEqual(captura.stats()["drops_sensor"], 4)
+        # Cada entrada guarda uma cópia, não a view do buffer que o driver reescreve
+        self.assertEqual([int(q.data[0, 0]) for q in entradas], list(range(1, 13)))
+        tss = [q.host_ts for q in entradas]
+        self.assertEqual(tss, sorted(tss))
+        meta = entradas[4].metadata()
+        self.assertEqual((meta["seq"], meta["exposure"], meta["gain"]), (7, 2000.0, 3.0))
+        self.assertAlmostEqual(meta["ts_sensor"], 7 / 120.0)
+
+    def test_02_consumidor_lento_gera_overflow_do_anel(self):
+        sensor = SensorSintetico()
+        captura = CaptureThread(sensor, slots=4).start()
+        time.sleep(0.1)  # Visão "travada": o sensor continua sendo drenado
+        st = captura.stats()
+        self.assertGreater(st["overflow_anel"], 0)
+        self.assertEqual(st["ocupacao_max"], 4)
+        self.assertEqual(st["drops_sensor"], 0)
+
+        # Depois da pausa o consumidor recebe os quadros mais recentes, ainda em ordem
+        a, b = captura.read(), captura.read()
+        captura.stop()
+        self.assertEqual(b.seq, a.seq + 1)
+        self.assertGreater(a.seq, 4)
+
+    def test_03_leitura_vazia_expira(self):
+        class Parada(CameraProvider):
+            def get_frame(self):
+                return None
+
+        captura = CaptureThread(Parada(), slots=2).start()
+        self.assertIsNone(captura.get_frame(timeout=0.05))
+        captura.stop()
+        self.assertGreater(captura.stats()["leituras_vazias"], 0)
+
+    def test_04_provedor_sem_metadados_recebe_sequencia_local(self):
+        class SoPixels(CameraProvider):
+            def get_frame(self):
+                time.sleep(0.0005)
+                return np.zeros((2, 2), dtype=np.uint8)
+
+        captura = CaptureThread(SoPixels(), slots=64).start()
+        quadros = [captura.read() for _ in range(3)]
+        captura.stop()
+        self.assertEqual([q.seq for q in quadros], [0, 1, 2])
+        self.assertIsNone(quadros[0].timestamp)
+        self.assertEqual(captura.stats()["drops_sensor"], 0)
+
+    def test_05_mock_preenche_metadados(self):
+        cam = MockCameraProvider()
+        cam.start(320, 240, 1000, 1500, 2.0, 0)
+        cam.set_gain(4.0)
+        a, b = cam.read_frame(), cam.read_frame()
+        cam.stop()
+        self.assertEqual((a.seq, b.seq), (0, 1))
+        self.assertLessEqual(a.timestamp, b.timestamp)
+        self.assertEqual((b.exposure, b.gain), (1500, 4.0))
+        self.assertEqual(b.data.shape[:2], (240, 320))
+
+    def test_06_pedidos_concorrentes_rodam_todos_na_thread(self):
+        captura = CaptureThread(SensorSintetico(periodo_s=0.002), slots=4).start()
+        self.addCleanup(captura.stop)
+        resultados, threads = {}, []
+
+        def pedir(nome):
+            def funcao():
+                threads.append(threading.current_thread().name)
+                time.sleep(0.01)  # Reconfiguração lenta: o próximo pedido chega enquanto esta roda
+                return nome
+            resultados[nome] = captura.executar(funcao, timeout=2.0)
+
+        chamadores = [threading.Thread(target=pedir, args=(f"p{i}",)) for i in range(4)]
+        t0 = time.monotonic()
+        for t in chamadores: t.start()
+        for t in chamadores: t.join()
+        self.assertEqual(resultados, {f"p{i}": f"p{i}" for i in range(4)})
+        self.assertEqual(threads, ["miniola-captura"] * 4)
+        self.assertLess(time.monotonic() - t0, 1.0)  # Nenhum chamador esperou o timeout
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import unittest
+import numpy as np
+import sys
+import os
+import threading
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from cameras.base import CameraProvider
+from cameras.capabilities import CameraCapabilities
+from cameras.capture_thread import CaptureThread
+from cameras.frame import Frame
+from cameras.ximea import XimeaAdapter
+from core.color_pipeline import ColorPipeline, build_color_lut, lut_identidade
+
+
+class SensorBayerComLut(CameraProvider):
+    """Mosaico cru com LUT 1D no sensor (como a Ximea em RAW8)."""
+
+    def __init__(self):
+        self.luts = []
+        self.threads = []
+
+    def capabilities(self):
+        return CameraCapabilities(hardware_lut=True, roi=True, timestamps=True, sequence=True)
+
+    def read_frame(self):
+        time.sleep(0.001)
+        return Frame(np.zeros((4, 4), dtype=np.uint8))
+
+    def load_hardware_lut(self, lut_array):
+        self.luts.append(lut_array)
+        self.threads.append(threading.current_thread().name)
+        return True
+
+
+class SensorComIsp(CameraProvider):
+    """Quadro já colorido com WB e contraste no ISP, sem gamma (como o Pi)."""
+
+    def __init__(self):
+        self.chamadas = []
+
+    def capabilities(self):
+        return CameraCapabilities(debayer=True, white_balance=True, contrast=True)
+
+    def set_white_balance(self, kr, kg, kb):
+        self.chamadas.append(("wb", kr, kg, kb))
+
+    def set_contrast(self, value):
+        self.chamadas.append(("contrast", value))
+
+
+class XiApiFalso:
+    """Só o que `load_hardware_lut` usa do `xiapi.Camera`: parâmetros gravados e o domínio da LUT."""
+
+    def __init__(self, dominio=(4095, 4095)):
+        self.dominio = dominio
+        self.lut = {}
+        self.indice = None
+        self.enable = []
+
+    def get_param(self, nome):
+        if self.dominio is None: raise RuntimeError("xiAPI: parâmetro não suportado")
+        return {"LUTIndex:max": self.dominio[0], "LUTValue:max": self.dominio[1]}[nome]
+
+    def set_param(self, nome, valor):
+        if nome == "LUTIndex": self.indice = valor
+        elif nome == "LUTValue": self.lut[self.indice] = valor
+        elif nome == "LUTEnable": self.enable.append(valor)
+
+    def stop_acquisition(self): pass
+
+    def start_acquisition(self): pass
+
+
+class TestColorPipeline(unittest.TestCase):
+    """
+    Negociação de capacidades: estágios de cor no hardware sempre que o provedor suporta (SPEC-002).
+    """
+
+    def test_01_capacidades(self):
+        self.assertFalse(any(CameraProvider().capabilities().as_dict().values()))
+        caps = CameraCapabilities(debayer=True, roi=True)
+        self.assertEqual([k for k, v in caps.as_dict().items() if v], ["debayer", "roi"])
+        with self.assertRaises(ValueError):
+            CameraCapabilities(debayer=True, lut_3d=True)
+        self.assertTrue(lut_identidade(build_color_lut(1.0, 1.0, 1.0, 1.0, 1.0, 0.0)))
+
+    def test_02_bayer_curva_unica_vai_para_o_sensor(self):
+        cam = SensorBayerComLut()
+        pipeline = ColorPipeline(cam, curva_no_sensor=True)
+        self.assertIsNone(pipeline.aplicar((1.0, 1.0, 1.0), (1.0, 1.0), 0))  # Neutro: nada a fazer
+        self.assertEqual(cam.luts, [])
+        self.assertEqual(pipeline.estagios["debayer"], "software")
+
+        self.assertIsNone(pipeline.aplicar((1.0, 1.0, 1.0), (2.2, 2.2), 20))
+        self.assertEqual(len(cam.luts), 1)
+        self.assertEqual((pipeline.estagios["gamma"], pipeline.estagios["contrast"]), ("hardware", "hardware"))
+        self.assertEqual(pipeline.estagios["lut"], "hardware")
+
+        # WB por canal não cabe numa curva única: volta tudo para o software e desliga a LUT do sensor
+        lut = pipeline.aplicar((1.4, 1.0, 1.2), (2.2, 2.2), 20)
+        np.testing.assert_array_equal(lut, build_color_lut(1.4, 1.0, 1.2, 2.2, 2.2, 20))
+        self.assertIsNone(cam.luts[-1])
+        self.assertFalse(pipeline.lut_hardware)
+        self.assertEqual(pipeline.estagios["white_balance"], "software")
+        self.assertEqual(pipeline.estagios["lut"], "software")
+
+    def test_03_isp_faz_o_que_suporta_e_a_lut_so_o_resto(self):
+        cam = SensorComIsp()
+        pipeline = ColorPipeline(cam)
+        self.assertIsNone(pipeline.aplicar((1.5, 1.0, 1.2), (1.0, 1.0), 30))
+        self.assertEqual(cam.chamadas, [("wb", 1.5, 1.0, 1.2), ("contrast", 30)])
+        self.assertEqual(pipeline.estagios, {"debayer": "hardware", "white_balance": "hardware", "gamma": "neutro",
+                                             "contrast": "hardware", "lut": "neutro"})
+
+        lut = pipeline.aplicar((1.5, 1.0, 1.2), (2.0, 2.0), 30)
+        np.testing.assert_array_equal(lut, build_color_lut(1.0, 1.0, 1.0, 2.0, 2.0, 0.0))
+        self.assertEqual(pipeline.estagios["gamma"], "software")
+
+        # WB neutro de volta: o ISP que já foi tocado recebe o neutro
+        pipeline.aplicar((1.0, 1.0, 1.0), (2.0, 2.0), 30)
+        self.assertEqual(cam.chamadas[-2], ("wb", 1.0, 1.0, 1.0))
+
+    def test_04_carga_da_lut_roda_na_thread_de_captura(self):
+        cam = SensorBayerComLut()
+        captura = CaptureThread(cam, slots=4).start()
+        self.addCleanup(captura.stop)
+        pipeline = ColorPipeline(cam, executar=captura.executar, curva_no_sensor=True)
+        pipeline.aplicar((1.0, 1.0, 1.0), (1.8, 1.8), 0)
+        self.assertEqual(cam.threads, ["miniola-captura"])
+        self.assertTrue(pipeline.lut_hardware)
+
+    def test_05_sem_liberacao_a_curva_fica_no_software(self):
+        # Padrão: visão, áudio e RAW leem o mosaico do sensor, então a curva não pode ir para ele
+        cam = SensorBayerComLut()
+        pipeline = ColorPipeline(cam)
+        lut = pipeline.aplicar((1.0, 1.0, 1.0), (2.2, 2.2), 20)
+        np.testing.assert_array_equal(lut, build_color_lut(1.0, 1.0, 1.0, 2.2, 2.2, 20))
+        self.assertEqual(cam.luts, [])
+        self.assertFalse(pipeline.lut_hardware)
+        self.assertEqual((pipeline.estagios["gamma"], pipeline.estagios["lut"]), ("software", "software"))
+        self.assertFalse(pipeline.stats()["curva_no_sensor"])
+
+    def test_06_lut_da_ximea_cobre_o_dominio_do_sensor(self):
+        ximea = XimeaAdapter.__new__(XimeaAdapter)
+        ximea.cam = XiApiFalso((4095, 4095))
+        curva = build_color_lut(1.0, 1.0, 1.0, 2.2, 2.2, 0)
+        self.assertTrue(ximea.load_hardware_lut(curva))
+        # 12 bits: 4096 entradas, com o código 8 bits i caindo no índice i * 4095 / 255
+        self.assertEqual(sorted(ximea.cam.lut), list(range(4096)))
+        for i in (0, 64, 128, 255):
+            self.assertAlmostEqual(ximea.cam.lut[i * 4095 // 255], int(curva[0, i, 1]) * 4095 / 255, delta=1.0)
+        self.assertEqual(ximea.cam.enable[-1], 1)
+
+        # Domínio ilegível: não mexe na LUT do sensor e devolve False (o pipeline fica no software)
+        ximea.cam = XiApiFalso(None)
+        self.assertFalse(ximea.load_hardware_lut(curva))
+        self.assertEqual((ximea.cam.lut, ximea.cam.enable), ({}, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
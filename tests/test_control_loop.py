@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.control_loop import VelocityRing, DeadlineScheduler, alfa_ema
+from core.motor_controller import FilmTransportPID
+
+
+class RelogioFalso:
+    """Relógio monotônico de mentira: `dormir()` avança o tempo, `atraso` simula o SO acordando tarde."""
+
+    def __init__(self):
+        self.agora = 100.0
+        self.atraso = 0.0
+        self.sonos = []
+
+    def __call__(self):
+        return self.agora
+
+    def dormir(self, s):
+        self.sonos.append(s)
+        self.agora += s + self.atraso
+
+
+class TestControlLoop(unittest.TestCase):
+    """
+    Estimador de velocidade em anel e cadência por prazo do loop PID (SPEC-010).
+    """
+
+    def test_01_anel_igual_a_janela_em_lista(self):
+        anel = VelocityRing(capacidade=64, janela_s=0.5)
+        lista = []
+        for k in range(200):
+            t = k * 0.05 + (0.013 if k % 7 == 0 else 0.0)  # Jitter da USB
+            p = int(k * k * 0.8)
+            anel.adicionar(t, p)
+            lista.append((t, p))
+            while len(lista) > 1 and t - lista[0][0] > 0.5:
+                lista.pop(0)
+            self.assertEqual(len(anel), len(lista))
+            dt = t - lista[0][0]
+            esperado = (p - lista[0][1]) / dt if len(lista) >= 2 and dt >= 0.1 else None
+            if esperado is None:
+                self.assertIsNone(anel.pulsos_por_s())
+            else:
+                self.assertAlmostEqual(anel.pulsos_por_s(), esperado)
+
+    def test_02_anel_cheio_sobrescreve_e_lacuna_zera(self):
+        anel = VelocityRing(capacidade=4, janela_s=10.0)
+        for k in range(10):
+            anel.adicionar(k * 0.1, k * 100)
+        self.assertEqual(len(anel), 4)
+        self.assertAlmostEqual(anel.pulsos_por_s(), 1000.0)  # Amostras 6..9
+        anel = VelocityRing(janela_s=0.5)
+        anel.adicionar(0.0, 0)
+        anel.adicionar(2.0, 500)  # Lacuna maior que a janela: só a amostra nova fica
+        self.assertEqual(len(anel), 1)
+        self.assertIsNone(anel.pulsos_por_s())
+
+    def test_03_prazos_sem_deriva_e_estouros(self):
+        relogio = RelogioFalso()
+        agenda = DeadlineScheduler(50.0, relogio=relogio, dormir=relogio.dormir)
+        inicio = relogio.agora
+        for _ in range(10):
+            relogio.agora += 0.004  # Corpo do loop
+            self.assertAlmostEqual(agenda.esperar(), 0.02)
+        self.assertAlmostEqual(relogio.agora - inicio, 0.2)  # O corpo não empurra a fase
+        self.assertEqual(agenda.estouros, 0)
+
+        relogio.atraso = 0.002
+        agenda.esperar()
+        self.assertAlmostEqual(agenda.jitter_ultimo_ms, 2.0)
+        relogio.atraso = 0.0
+        relogio.agora += 0.065  # Corpo travou: acorda 47 ms depois do prazo, dois prazos da grade perdidos
+        agenda.esperar()
+        self.assertEqual((agenda.estouros, agenda.perdidos), (1, 2))
+        antes = relogio.agora
+        agenda.esperar()  # Realinhado: dorme até o próximo prazo da grade, sem rajada
+        self.assertGreater(relogio.agora, antes)
+        self.assertAlmostEqual(relogio.agora - inicio, 0.30)  # Próximo prazo da grade de 20 ms
+        st = agenda.stats()
+        self.assertEqual(st["ticks"], 13)
+        self.assertAlmostEqual(st["jitter_max_ms"], 47.0)
+
+    def test_04_filtros_independem_da_taxa(self):
+        self.assertAlmostEqual(alfa_ema(0.05, 0.4745), 0.1, places=4)
+        self.assertAlmostEqual(alfa_ema(0.05, 0.1402), 0.3, places=3)
+        # Um segundo de filtro a 20 Hz ou a 100 Hz chega ao mesmo ponto
+        pid = FilmTransportPID()
+        for hz in (20.0, 100.0):
+            y = 0.0
+            for _ in range(int(hz)):
+                y += alfa_ema(1.0 / hz, pid.tau_saida) * (1.0 - y)
+            self.assertAlmostEqual(y, 1.0 - 0.9 ** 20, places=3)
+        pid.set_pid_rate(100)
+        self.assertEqual(pid.pid_stats()["hz"], 100.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import sys
+import os
+import io
+import contextlib
+import math
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.feed_forward import FeedForwardModel
+from core.skr_simulator import SkrPicoSimulator, SimTransportSpec
+from core.motor_controller import FilmTransportPID
+
+
+def _erro_em_regime(rastrear, calibrar, enrolado_m=0.0):
+    """Erro médio da velocidade real do filme entre 4 s e 20 s de PID a 18 fps (simulador a 10x)."""
+    sim = SkrPicoSimulator(SimTransportSpec(scale=10.0, wound=enrolado_m)).start()
+    motor = FilmTransportPID(port=sim.porta, relogio=sim.relogio, dormir=sim.relogio.dormir)
+    motor.ff.rastrear = rastrear
+    if not motor.connect():
+        sim.stop()
+        raise RuntimeError("porta simulada não abriu")
+    erros = []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            calibracao = motor.calibrate_feed_forward() if calibrar else None
+            motor.start_pid(target_fps=18.0)
+            sim.relogio.dormir(4.0)
+            for _ in range(32):
+                sim.relogio.dormir(0.5)
+                erros.append(abs(sim.modelo.velocidade_filme() / motor.target_mm_s - 1.0))
+            raio_sim, ff = sim.modelo.raio_recolhimento(), motor.ff_stats()
+    finally:
+        motor.disconnect()
+        sim.stop()
+    return sum(erros) / len(erros), calibracao, raio_sim, ff
+
+
+class TestFeedForward(unittest.TestCase):
+    """
+    Feed-forward pelo raio do carretel: previsão, correção em regime, calibração e ganho contra o simulador (SPEC-010, seção 7.9).
+    """
+
+    def test_01_previsao_e_correcao_do_raio(self):
+        ff = FeedForwardModel()
+        self.assertAlmostEqual(ff.hz_para(100.0), 2000.0)  # Padrão igual ao antigo `meta * 20.0`
+        r0 = ff.raio_mm
+        ff.avancar(10000.0)  # 10 m enrolados
+        self.assertAlmostEqual(ff.raio_mm, math.sqrt(r0 ** 2 + 0.14 * 10000.0 / math.pi))
+        # Semente da aquisição no próprio raio previsto; em regime a razão medida puxa o raio
+        self.assertTrue(ff.adquirir(1600 * ff.k(), 1600.0))
+        alvo_mm = ff.raio_mm * 1.1
+        k_alvo = 2 * math.pi * alvo_mm / 3200
+        for _ in range(600):
+            self.assertTrue(ff.observar(0.05, 5000.0, 5000.0 * k_alvo))
+        self.assertAlmostEqual(ff.raio_mm, alvo_mm, delta=0.01)
+        # Medida 50% fora da previsão (patinação) é descartada
+        antes = ff.raio_mm
+        self.assertFalse(ff.observar(0.05, 5000.0, 0.5 * 5000.0 * k_alvo))
+        self.assertEqual(ff.raio_mm, antes)
+        self.assertEqual(ff.stats()["rejeitadas"], 1)
+        # Sem rastreio o raio fica parado
+        fixo = FeedForwardModel(rastrear=False)
+        fixo.avancar(10000.0)
+        self.assertFalse(fixo.observar(0.05, 5000.0, 300.0))
+        self.assertAlmostEqual(fixo.k(), 0.05)
+
+    def test_02_calibracao_pela_reta(self):
+        ff = FeedForwardModel()
+        self.assertIsNone(ff.calibrar([(2000, 0.0)]))
+        k = 2 * math.pi * 30.0 / 3200
+        cal = ff.calibrar([(2000, 2000 * k * 1.01), (4000, 4000 * k), (6000, 6000 * k * 0.995)])
+        self.assertTrue(ff.calibrado)
+        self.assertAlmostEqual(cal["raio_mm"], 30.0, delta=0.1)
+        self.assertAlmostEqual(cal["desvio_linear_pct"], 1.0, delta=0.5)  # Desvio contra a reta ajustada
+
+    def test_03_aquisicao_sem_calibracao(self):
+        ff = FeedForwardModel()  # Palpite de 25.5 mm; o carretel real tem 90 mm
+        k_real = 2 * math.pi * 90.0 / 3200
+        # Medida em regime antes da aquisição não é rejeitada nem usada: a previsão ainda é palpite
+        self.assertFalse(ff.observar(0.05, 2000.0, 2000.0 * k_real))
+        self.assertEqual(ff.rejeitadas, 0)
+        # Rampa: 40 passos por tick, o encoder vê o filme dos passos de um tick antes
+        adquiriu = False
+        for i in range(60):
+            adquiriu = ff.adquirir(40 * k_real if i else 0.0, 40.0, passos_sem_leitura=40.0)
+            if adquiriu: break
+        self.assertTrue(adquiriu)
+        self.assertTrue(ff.adquirido)
+        self.assertAlmostEqual(ff.raio_mm, 90.0, delta=0.5)
+        self.assertFalse(ff.adquirir(40 * k_real, 40.0))  # Uma vez por partida
+        # A primeira razão em regime depois da semente substitui o raio; depois volta a EMA e a rejeição
+        self.assertTrue(ff.observar(0.05, 2000.0, 2000.0 * k_real * 1.05))
+        self.assertAlmostEqual(ff.raio_mm, 94.5, delta=0.1)
+        self.assertFalse(ff.observar(0.05, 2000.0, 2000.0 * k_real * 0.5))
+        self.assertEqual(ff.rejeitadas, 1)
+        # Nova partida sem calibração readquire (o carretel pode ter sido trocado); calibrado não
+        ff.reiniciar_aquisicao()
+        self.assertFalse(ff.adquirido)
+        ff.calibrar([(2000, 2000 * k_real)])
+        ff.reiniciar_aquisicao()
+        self.assertTrue(ff.adquirido)
+
+    @unittest.skipIf(os.name != "posix", "O simulador da SKR Pico usa pseudo-terminal (POSIX)")
+    def test_04_calibrado_e_rastreado_contra_o_simulador(self):
+        erro_fixo, _, _, _ = _erro_em_regime(rastrear=False, calibrar=False)
+        erro, calibracao, raio_sim, ff = _erro_em_regime(rastrear=True, calibrar=True)
+        self.assertIsNotNone(calibracao)
+        self.assertLess(calibracao["desvio_linear_pct"], 5.0)
+        self.assertAlmostEqual(calibracao["raio_mm"], 26.0, delta=1.0)  # Núcleo de 25 mm + filme da varredura
+        # O modelo acompanha o carretel do simulador e o erro de regime cai bem abaixo do feed-forward fixo
+        self.assertAlmostEqual(ff["raio_mm"], raio_sim, delta=0.5)
+        self.assertGreater(erro_fixo, 0.05)
+        self.assertLess(erro, 0.03)
+        self.assertLess(erro, erro_fixo / 3)
+
+    @unittest.skipIf(os.name != "posix", "O simulador da SKR Pico usa pseudo-terminal (POSIX)")
+    def test_05_carretel_ja_enrolado_sem_calibracao(self):
+        # 150 m já no recolhimento (~86 mm de raio), longe do palpite de 25.5 mm: o rastreio tem de travar
+        erro_fixo, _, _, _ = _erro_em_regime(rastrear=False, calibrar=False, enrolado_m=150.0)
+        erro, _, raio_sim, ff = _erro_em_regime(rastrear=True, calibrar=False, enrolado_m=150.0)
+        self.assertTrue(ff["adquirido"])
+        self.assertAlmostEqual(ff["raio_mm"], raio_sim, delta=1.5)
+        self.assertGreater(ff["correcoes"], 100)
+        self.assertLess(ff["rejeitadas"], 5)
+        self.assertGreater(erro_fixo, 0.1)
+        self.assertLess(erro, 0.03)
+
+
+if __name__ == "__main__":
+    unittest.main()
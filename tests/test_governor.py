@@ -0,0 +1,106 @@
+import unittest
+import sys
+import os
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.governor import CaptureGovernor, PERFS_POR_QUADRO
+
+
+class CameraAnotada:
+    def __init__(self):
+        self.chamadas = []
+
+    def set_fps(self, value): self.chamadas.append(("fps", value))
+    def set_exposure(self, value): self.chamadas.append(("exp", value))
+    def set_gain(self, value): self.chamadas.append(("gain", value))
+
+
+class MotorAnotado:
+    def __init__(self):
+        self.metas = []
+
+    def set_target_fps(self, value): self.metas.append(value)
+
+
+class TestCaptureGovernor(unittest.TestCase):
+    """
+    Governador de captura: amostragem do gatilho, borrão e tetos do motor/sensor (SPEC-010).
+    """
+
+    def _governador(self, exposicao=1000, ganho=1.0, **kw):
+        g = CaptureGovernor(**kw)
+        g.definir_referencia(exposicao, ganho)
+        return g
+
+    def _confere_limites(self, g, plano, pitch):
+        self.assertLessEqual(plano.avanco_px, g.amostragem * pitch + 1e-9)
+        self.assertLessEqual(plano.blur_px, g.blur_max_px + 1e-9)
+        self.assertLessEqual(plano.fps_cam, g.fps_cam_max)
+        self.assertLessEqual(plano.fps_motor, g.fps_motor_max)
+        self.assertLess(plano.exposicao_us, 1e6 / plano.fps_cam)
+
+    def test_01_limitado_pelo_borrao(self):
+        g = self._governador()
+        plano = g.envelope(195.0, 195.0)
+        # Ganho extra 4x: exposição mínima de 250 us -> 4000 px/s, com 10% de folga
+        self.assertEqual(plano.limitante, "blur")
+        self.assertAlmostEqual(plano.velocidade_px_s, 3600.0)
+        self.assertAlmostEqual(plano.fps_motor, 3600.0 / (PERFS_POR_QUADRO * 195.0))
+        self.assertEqual(plano.exposicao_us, 250.0)
+        self.assertAlmostEqual(plano.ganho, 4.0)
+        self._confere_limites(g, plano, 195.0)
+
+    def test_02_limitado_pela_amostragem_do_gatilho(self):
+        g = self._governador(exposicao=100, fps_cam_max=60)
+        plano = g.envelope(195.0, 195.0)
+        # Só a fração do pitch limita o avanço entre quadros (a margem do gatilho é só do painel)
+        self.assertEqual(plano.limitante, "amostragem")
+        self.assertAlmostEqual(plano.avanco_max_px, 58.5)
+        self.assertAlmostEqual(plano.velocidade_px_s, 0.9 * 60 * 58.5)
+        self.assertEqual(plano.fps_cam, 60.0)
+        self.assertEqual(plano.ganho, 1.0)  # Exposição do operador já basta para o borrão
+        self._confere_limites(g, plano, 195.0)
+
+    def test_03_limitado_pelo_motor_usa_o_menor_fps_que_amostra(self):
+        g = self._governador(exposicao=50, fps_motor_max=2.0, fps_cam_max=200)
+        plano = g.envelope(195.0, 195.0)
+        self.assertEqual(plano.limitante, "motor")
+        self.assertAlmostEqual(plano.fps_motor, 1.8)
+        self.assertLess(plano.fps_cam, 200)
+        self._confere_limites(g, plano, 195.0)
+
+    def test_04_pitch_encolhido_aperta_a_amostragem(self):
+        g = self._governador(exposicao=50, fps_cam_max=60, amostragem=0.2)
+        nominal = g.envelope(195.0, 195.0)
+        encolhido = g.envelope(185.0, 195.0)
+        self.assertLess(encolhido.fps_motor, nominal.fps_motor)
+        self._confere_limites(g, encolhido, 185.0)
+
+    def test_05_unidades_de_ganho(self):
+        db = self._governador(ganho=6.0, unidade_ganho="db").envelope(195.0, 195.0)
+        self.assertAlmostEqual(db.ganho, 6.0 + 20 * 0.60206, places=3)
+        raw = self._governador(ganho=32, unidade_ganho="raw").envelope(195.0, 195.0)
+        # Sem compensação a exposição do operador é o piso: o borrão limita mais a velocidade
+        self.assertEqual((raw.ganho, raw.exposicao_us), (32, 1000.0))
+        self.assertAlmostEqual(raw.velocidade_px_s, 900.0)
+
+    def test_06_atualizar_com_histerese(self):
+        g = self._governador()
+        cam, motor = CameraAnotada(), MotorAnotado()
+        self.assertIsNone(CaptureGovernor().atualizar(cam, motor, 195.0, 195.0))  # Sem referência
+        plano = g.atualizar(cam, motor, 195.0, 195.0)
+        self.assertEqual(cam.chamadas, [("fps", plano.fps_cam), ("exp", 250), ("gain", plano.ganho)])
+        self.assertEqual(motor.metas, [plano.fps_motor])
+        g.atualizar(cam, motor, 194.0, 195.0)  # Muda menos que a histerese
+        self.assertEqual(g.aplicacoes, 1)
+        g.definir_referencia(4000, 1.0)
+        g.atualizar(cam, motor, 194.0, 195.0)
+        self.assertEqual(g.aplicacoes, 2)
+        self.assertLess(motor.metas[-1], motor.metas[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
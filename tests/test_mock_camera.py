@@ -0,0 +1,107 @@
+import unittest
+import numpy as np
+import sys
+import os
+import time
+import platform
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+from cameras.capture_thread import CaptureThread
+from cameras.mock import FilmStripSpec, MockCameraProvider
+
+ARM = any(a in platform.machine().lower() for a in ("arm", "aarch64"))
+
+
+@unittest.skipIf(ARM, "O provedor mock é isolado de sistemas ARM64")
+class TestMockCamera(unittest.TestCase):
+    """
+    Mock determinístico de alta velocidade: ciclo pré-renderizado e defeitos por semente (SPEC-002).
+    """
+
+    def _camera(self, film=None, w=640, h=480, fps=120):
+        cam = MockCameraProvider(film=film, unthrottled=True)
+        cam.start(w, h, fps, 1000, 1.0, 0)
+        self.addCleanup(cam.stop)
+        return cam
+
+    def test_01_ciclo_periodico_em_views_sem_copia(self):
+        cam = self._camera()
+        self.assertEqual(cam.ciclo_quadros, 40)  # perf_gap / 5
+        quadros = [cam.read_frame() for _ in range(41)]
+        self.assertTrue(all(np.shares_memory(q.data, cam.tira) for q in quadros))
+        self.assertFalse(quadros[0].data.flags.writeable)
+        np.testing.assert_array_equal(quadros[0].data, quadros[40].data)
+        # O filme desce 5 px por quadro
+        np.testing.assert_array_equal(quadros[1].data[5:], quadros[0].data[:-5])
+
+    def test_02_mesma_semente_mesma_pelicula(self):
+        spec = "shrink=2.5,weave=3,torn=0.2,missing=0.1,drops=0.05,burst=4,seed=11"
+        a, b = self._camera(spec), self._camera(spec)
+        for _ in range(300):
+            qa, qb = a.read_frame(), b.read_frame()
+            self.assertEqual((qa.seq, qa.timestamp), (qb.seq, qb.timestamp))
+            np.testing.assert_array_equal(qa.data, qb.data)
+        c = self._camera(spec.replace("seed=11", "seed=12"))
+        self.assertNotEqual(a.perf_estados, c.perf_estados)
+
+    def test_03_defeitos_na_geometria_da_tira(self):
+        cam = self._camera("pitch=200,shrink=3,torn=0.3,missing=0.3,perfs=16,seed=4")
+        self.assertEqual(cam.tira_px, 16 * 194)
+        meio = cam.perf_x_left + cam.perf_width // 2
+        borda = cam.film_x_start + 2
+        for k, (esquerda, _) in enumerate(cam.perf_estados):
+            y = int(round(k * 194)) + cam.perf_height // 2
+            self.assertEqual(int(cam.tira[y, meio, 0]), 10 if esquerda == 2 else 255)
+            self.assertEqual(int(cam.tira[y, borda, 0]), 255 if esquerda == 1 else 10)
+        self.assertIn(1, [e for e, _ in cam.perf_estados])
+        self.assertIn(2, [e for e, _ in cam.perf_estados])
+
+        centros = cam.furos_y(0, 0, 16)
+        self.assertEqual(int(np.isinf(centros).sum()), sum(e == 2 for e, _ in cam.perf_estados))
+
+    def test_04_oscilacao_lateral(self):
+        cam = self._camera("weave=4,weave_period=4,perfs=8")
+        linha = lambda y: int(np.argmax(cam.tira[y, :, 0] > 128))
+        xs = [linha(int(round(k * 200)) + 40) for k in range(8)]
+        self.assertGreater(max(xs) - min(xs), 4)
+        self.assertLessEqual(max(abs(x - cam.perf_x_left) for x in xs), 5)
+
+    def test_05_rajadas_de_drops_aparecem_na_captura_e_sem_limite_de_fps(self):
+        cam = self._camera("drops=0.02,burst=5,seed=3", fps=100)
+        captura = CaptureThread(cam, slots=4096).start()
+        t0 = time.perf_counter()
+        quadros = [captura.read(timeout=1.0) for _ in range(2000)]
+        decorrido = time.perf_counter() - t0
+        captura.stop()
+        self.assertLess(decorrido, 2000 / 100.0 / 4)  # Bem acima do tempo real
+        self.assertGreater(cam.drop_bursts, 0)
+
+        saltos = sum(b.seq - a.seq - 1 for a, b in zip(quadros, quadros[1:]))
+        self.assertEqual(captura.stats()["drops_sensor"], cam.dropped_total)
+        self.assertLessEqual(saltos, cam.dropped_total)
+        self.assertAlmostEqual(quadros[-1].timestamp, quadros[-1].seq / 100.0 + 0.01)
+
+    def test_06_especificacao_invalida(self):
+        with self.assertRaises(ValueError):
+            FilmStripSpec.parse("pitch=200,encolhimento=3")
+        self.assertEqual(FilmStripSpec.parse("torn=0.1").perfs, 32)
+        self.assertEqual(FilmStripSpec.parse("").perfs, 1)
+
+    def test_07_visao_ponta_a_ponta_contra_o_gabarito(self):
+        import bench_vision
+        motor = bench_vision.motores_disponiveis()["numpy"]
+        cenario = bench_vision.cenario_mock("shrink=1,weave=1,seed=2", n_quadros=400)
+        m = bench_vision.medir(*motor, cenario)
+        self.assertEqual(m["capturas"], m["capturas_esperadas"])
+        self.assertGreater(m["capturas"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import numpy as np
+import sys
+import os
+import tempfile
+import platform
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from cameras.base import CameraProvider
+from cameras.capture_thread import CaptureThread
+from cameras.frame import Frame
+from cameras.mock import MockCameraProvider
+from cameras.readout import ReadoutWindow
+from cameras.stream_tap import StreamTap, StreamTapReader
+from core.readout import ReadoutProfiles, regiao_gravacao
+
+ARM = any(a in platform.machine().lower() for a in ("arm", "aarch64"))
+
+
+class SensorFixo(CameraProvider):
+    """Provedor sem janela configurável (como o UVC): só o FPS acompanha o perfil."""
+
+    def __init__(self):
+        self.fps = None
+
+    def read_frame(self):
+        return Frame(np.zeros((8, 8), dtype=np.uint8))
+
+    def set_fps(self, value):
+        self.fps = value
+
+
+class TestReadout(unittest.TestCase):
+    """
+    Perfis de leitura do sensor por modo de operação (SPEC-002).
+    """
+
+    def _perfis(self, cam, captura=None):
+        return ReadoutProfiles(cam, 640, 480, offset_x=272, offset_y=224, captura=captura, playback_decimation=2)
+
+    def test_01_conversao_entre_base_e_quadro(self):
+        janela = ReadoutWindow("playback", 100, 40, 400, 300, 2)
+        self.assertEqual(janela.frame_size, (200, 150))
+        self.assertEqual(janela.para_quadro(300, 240), (100.0, 100.0))
+        self.assertEqual(janela.para_base(100, 100), (300, 240))
+        self.assertFalse(janela.identidade())
+        self.assertTrue(ReadoutWindow("base", 0, 0, 640, 480).identidade())
+        self.assertEqual(janela.copia(decimation=1).frame_size, (400, 300))
+
+    def test_02_janela_de_gravacao_cobre_roi_audio_e_crop(self):
+        perfis = self._perfis(SensorFixo())
+        roi = (200, 10, 80, 400)
+        janela = perfis.ajustar_gravacao(roi, audio_x=330, audio_w=40, linha_gatilho=110, margem_gatilho=20,
+                                         offset_crop_x=20, offset_crop_y=0, crop_w=200, crop_h=120, overscan=10)
+        # Crop centrado em x = 260 (+/- 110) e em y = 120 +/- 20 (+/- 70)
+        self.assertEqual((janela.x, janela.y), (144, 10))
+        self.assertEqual((janela.x + janela.width, janela.y + janela.height), (384, 410))
+        self.assertEqual(janela.x % 16, 0)
+        self.assertEqual(janela.width % 16, 0)
+        # Nunca sai da janela base
+        janela = perfis.ajustar_gravacao((0, 0, 640, 480), 600, 96, 110, 20, 0, 0, 600, 400, 48)
+        self.assertEqual((janela.x, janela.y, janela.width, janela.height), (0, 0, 640, 480))
+
+    def test_03_provedor_sem_janela_so_troca_o_fps(self):
+        cam = SensorFixo()
+        perfis = self._perfis(cam)
+        aplicada = perfis.aplicar("playback", fps=24.0)
+        self.assertEqual(cam.fps, 24.0)
+        self.assertTrue(aplicada.identidade())
+        self.assertEqual(perfis.stats()["banda_relativa"], 1.0)
+
+    @unittest.skipIf(ARM, "O provedor mock é isolado de sistemas ARM64")
+    def test_04_troca_com_a_captura_rodando(self):
+        cam = MockCameraProvider(unthrottled=True)
+        cam.start(640, 480, 120, 1000, 1.0, 0, offset_x=272, offset_y=224)
+        self.addCleanup(cam.stop)
+        captura = CaptureThread(cam, slots=8).start()
+        self.addCleanup(captura.stop)
+        perfis = self._perfis(cam, captura)
+
+        perfis.definir("record", x=160, y=32, width=320, height=400)
+        aplicada = perfis.aplicar("record")
+        self.assertEqual((aplicada.x, aplicada.y, aplicada.decimation), (160, 32, 1))
+        for _ in range(10): captura.read(timeout=1.0)  # Esvazia o anel com quadros da janela anterior
+        q = captura.read(timeout=1.0)
+        self.assertEqual(q.data.shape[:2], (400, 320))
+        self.assertIs(q.readout, aplicada)
+        self.assertTrue(np.shares_memory(q.data, cam.tira))
+
+        aplicada = perfis.aplicar("playback", fps=24.0)
+        for _ in range(10): captura.read(timeout=1.0)
+        q = captura.read(timeout=1.0)
+        self.assertEqual(q.data.shape[:2], (240, 320))
+        self.assertEqual(q.readout.decimation, 2)
+        self.assertEqual(perfis.stats()["banda_relativa"], 0.25)
+
+        perfis.aplicar("base")
+        for _ in range(10): captura.read(timeout=1.0)
+        q = captura.read(timeout=1.0)
+        self.assertEqual(q.data.shape[:2], (480, 640))
+        self.assertTrue(q.readout.identidade())
+        self.assertEqual(captura.stats()["drops_sensor"], 0)
+
+    def test_05_janela_viaja_no_tap(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            path = os.path.join(pasta, "janela.mtap")
+            tap = StreamTap(path, bloco_mb=1)
+            q = Frame(np.zeros((150, 200), dtype=np.uint8), seq=1)
+            q.readout = ReadoutWindow("playback", 100, 40, 400, 300, 2)
+            tap.write(q)
+            tap.write(Frame(np.zeros((480, 640), dtype=np.uint8), seq=2))
+            tap.close()
+            with StreamTapReader(path) as leitor:
+                janela = leitor.frame(0).readout
+                self.assertEqual((janela.x, janela.y, janela.width, janela.height, janela.decimation), (100, 40, 400, 300, 2))
+                self.assertIsNone(leitor.frame(1).readout)
+
+    def test_06_regiao_gravada_par_e_recortada_na_borda(self):
+        # Crop 200x120 centrado em (301.7, 151.3) + 48 px de overscan: origem ímpar desce para par
+        self.assertEqual(regiao_gravacao(301.7, 151.3, 640, 480, 200, 120, 48), (152, 42, 448, 258))
+        self.assertEqual(regiao_gravacao(301.7, 151.3, 640, 480, 200, 120, 0), (200, 90, 400, 210))
+        for fx, fy in ((301.7, 151.3), (303.2, 155.9), (9.0, 7.0), (633.0, 477.0)):
+            x1, y1, x2, y2 = regiao_gravacao(fx, fy, 640, 480, 200, 120, 48)
+            self.assertEqual((x1 % 2, y1 % 2), (0, 0))
+            self.assertTrue(0 <= x1 < x2 <= 640 and 0 <= y1 < y2 <= 480)
+        # Canto superior esquerdo: origem presa em 0, tamanho cheio
+        self.assertEqual(regiao_gravacao(50.0, 30.0, 640, 480, 200, 120, 48), (0, 0, 296, 216))
+        # Canto inferior direito: a região é cortada na borda do quadro
+        self.assertEqual(regiao_gravacao(620.0, 470.0, 640, 480, 200, 120, 48), (472, 362, 640, 480))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,296 @@
+import unittest
+import multiprocessing as mp
+import numpy as np
+import sys
+import os
+import tempfile
+import threading
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import cv2
+
+from core.encoder_pool import montar_job, processo_codificador, thread_anexador_segmentos
+from core.frame_ring import SharedFrameRing
+from core.segment_container import SegmentArchive
+
+try:
+    import process
+except ImportError:
+    process = None  # Pillow ausente no ambiente de teste
+
+
+def _consumidor_soma(anel, fila_in, fila_out):
+    """Processo filho: lê o slot direto da memória compartilhada e devolve a soma dos pixels."""
+    msg = fila_in.get()
+    img = anel.view(msg["slot"], msg["shape"], msg["dtype"])
+    fila_out.put(int(img.sum(dtype=np.int64)))
+    anel.release(msg["slot"])
+
+
+class TestSharedFrameRing(unittest.TestCase):
+    """
+    Testes do anel de memória compartilhada da gravação assíncrona (SPEC-004).
+    """
+
+    def setUp(self):
+        self.anel = SharedFrameRing(3, 64 * 48 * 3)
+
+    def tearDown(self):
+        self.anel.close()
+
+    def test_01_frame_chega_intacto_no_processo_filho(self):
+        frame = np.random.randint(0, 255, (48, 64, 3), dtype=np.uint8)
+        slot = self.anel.put_frame(frame)
+        self.assertIsNotNone(slot)
+
+        fila_in, fila_out = mp.Queue(), mp.Queue()
+        proc = mp.Process(target=_consumidor_soma, args=(self.anel, fila_in, fila_out))
+        proc.start()
+        fila_in.put({"slot": slot, "shape": frame.shape, "dtype": frame.dtype.str})
+        soma = fila_out.get(timeout=10)
+        proc.join(timeout=10)
+
+        self.assertEqual(soma, int(frame.sum(dtype=np.int64)))
+        self.assertEqual(self.anel.ocupados(), 0)
+
+    def test_02_anel_cheio_descarta_sem_bloquear(self):
+        frame = np.zeros((48, 64), dtype=np.uint8)
+        slots = [self.anel.put_frame(frame) for _ in range(3)]
+        self.assertEqual(sorted(slots), [0, 1, 2])
+        self.assertIsNone(self.anel.put_frame(frame))
+
+        stats = self.anel.stats()
+        self.assertEqual(stats["ocupados"], 3)
+        self.assertEqual(stats["pico"], 3)
+        self.assertEqual(stats["descartes"], 1)
+
+        self.anel.release(slots[0])
+        self.assertIsNotNone(self.anel.put_frame(frame))
+
+    def test_03_frame_maior_que_slot_e_descartado(self):
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        self.assertIsNone(self.anel.put_frame(frame))
+        self.assertEqual(self.anel.stats()["descartes"], 1)
+
+
+def _mosaico(i):
+    """Mosaico Bayer 32x32 próprio do quadro i: sítios R/B/G com níveis distintos."""
+    base = 20 + 5 * i
+    img = np.full((32, 32), base + 40, dtype=np.uint8)
+    img[0::2, 0::2] = base
+    img[1::2, 1::2] = base + 90
+    return img
+
+
+class TestEncoderPool(unittest.TestCase):
+    """
+    Pool de codificadores da gravação (SPEC-004): vários processos `processo_codificador` pegam os
+    jobs em qualquer ordem, e cada quadro sai com o seu índice e com o Bayer/LUT vigentes quando o
+    sequenciador o despachou, mesmo com `set_bayer`/`set_lut` chegando no meio da sequência.
+    """
+
+    N_QUADROS = 24
+    N_CODIFICADORES = 3
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.anel = SharedFrameRing(4, 32 * 32)
+        self.lut_inversa = np.ascontiguousarray(np.repeat((255 - np.arange(256, dtype=np.uint8))[:, None], 3, axis=1).reshape(256, 1, 3))
+        self.lut_clara = np.ascontiguousarray(np.repeat(np.clip(np.arange(256) + 60, 0, 255).astype(np.uint8)[:, None], 3, axis=1).reshape(256, 1, 3))
+
+    def tearDown(self):
+        self.anel.close()
+        self.tmp.cleanup()
+
+    def _mensagens(self):
+        """Fila de gravação com mudanças de cor no meio: troca de Bayer, duas LUTs e volta a None."""
+        mudancas = {8: {"type": "set_bayer", "mode": cv2.COLOR_BayerRG2BGR},
+                    12: {"type": "set_lut", "lut": self.lut_inversa},
+                    17: {"type": "set_lut", "lut": self.lut_clara},
+                    21: {"type": "set_lut", "lut": None}}
+        for i in range(self.N_QUADROS):
+            if i in mudancas: yield mudancas[i]
+            yield {"type": "frame", "img": _mosaico(i), "frame_index": i,
+                   "filename": os.path.join(self.dir, f"miniola_{i:06d}.jpg")}
+
+    def _esperados(self):
+        bayer, lut, esperados = cv2.COLOR_BayerBG2BGR, None, {}
+        for msg in self._mensagens():
+            if msg["type"] == "set_bayer": bayer = msg["mode"]
+            elif msg["type"] == "set_lut": lut = msg["lut"]
+            else:
+                img = cv2.cvtColor(msg["img"], bayer)
+                esperados[msg["frame_index"]] = cv2.LUT(img, lut) if lut is not None else img
+        return esperados
+
+    def _gravar(self, segmento=None):
+        """Faz o papel do `processo_escrita_disco`: aplica o controle em ordem e despacha com `montar_job`."""
+        fila_jobs = mp.Queue()
+        fila_resultados = mp.Queue() if segmento else None
+        codificadores = [mp.Process(target=processo_codificador, args=(fila_jobs, self.anel, wid, fila_resultados))
+                         for wid in range(self.N_CODIFICADORES)]
+        for c in codificadores: c.start()
+        anexador = None
+        if segmento:
+            anexador = threading.Thread(target=thread_anexador_segmentos, args=(fila_resultados, 10, self.dir))
+            anexador.start()
+
+        bayer, lut, despachados = cv2.COLOR_BayerBG2BGR, None, 0
+        for msg in self._mensagens():
+            if msg["type"] == "set_bayer":
+                bayer = msg["mode"]
+                continue
+            if msg["type"] == "set_lut":
+                lut = msg["lut"]
+                continue
+            slot = self.anel.put_frame(msg["img"])
+            while slot is None:  # Anel de 4 slots: espera o pool devolver um
+                time.sleep(0.002)
+                slot = self.anel.put_frame(msg["img"])
+            item = {"type": "frame", "slot": slot, "shape": msg["img"].shape, "dtype": msg["img"].dtype.str,
+                    "filename": msg["filename"], "frame_index": msg["frame_index"]}
+            job = montar_job(item, self.anel, bayer, lut, segmento)
+            if "segmento" in job: despachados += 1
+            fila_jobs.put(job)
+
+        for _ in codificadores: fila_jobs.put(None)
+        for c in codificadores: c.join(timeout=20)
+        if anexador is not None:
+            fila_resultados.put(("close", segmento, despachados))
+            fila_resultados.put(None)
+            anexador.join(timeout=20)
+        self.assertEqual(self.anel.ocupados(), 0)
+
+    def _confere(self, decodificar):
+        for i, esperado in self._esperados().items():
+            img = decodificar(i)
+            self.assertIsNotNone(img, i)
+            # Compara o miolo (as bordas do debayer e do JPEG são as menos estáveis)
+            erro = np.abs(img[4:-4, 4:-4].astype(np.int16) - esperado[4:-4, 4:-4].astype(np.int16)).mean()
+            self.assertLess(erro, 3.0, f"quadro {i}")
+
+    def test_01_arquivos_saem_com_o_estado_de_cor_do_despacho(self):
+        self._gravar()
+        self._confere(lambda i: cv2.imread(os.path.join(self.dir, f"miniola_{i:06d}.jpg"), cv2.IMREAD_COLOR))
+
+    def test_02_segmentos_em_ordem_com_varios_codificadores(self):
+        self._gravar(segmento="pool")
+        with SegmentArchive(self.dir) as archive:
+            archive.refresh()
+            self.assertEqual(archive.frame_indices(), list(range(self.N_QUADROS)))
+            self._confere(lambda i: archive.decode(i))
+
+    def test_03_job_sem_pixels_libera_o_slot(self):
+        slot = self.anel.put_frame(_mosaico(0))
+        self.assertIsNone(montar_job({"slot": slot, "shape": (32, 32), "filename": None}, self.anel, None, None))
+        self.assertEqual(self.anel.ocupados(), 0)
+        job = montar_job({"slot": None, "img_bgr": _mosaico(1), "filename": "x.jpg"}, self.anel,
+                         cv2.COLOR_BayerGR2BGR, self.lut_inversa, segmento="s")
+        self.assertEqual(job["bayer"], cv2.COLOR_BayerGR2BGR)
+        self.assertIs(job["lut"], self.lut_inversa)
+        self.assertNotIn("segmento", job)  # Sem frame_index não entra no segmento
+
+
+@unittest.skipIf(process is None, "process.py requer Pillow")
+class TestRawSessionDevelop(unittest.TestCase):
+    """
+    Revelação adiada da gravação RAW: o sidecar da sessão define Bayer/LUT por faixa de quadros.
+    """
+
+    def setUp(self):
+        lut_inv = [[255 - i] * 3 for i in range(256)]
+        self.meta = {
+            "rec_format": "raw",
+            "bayer": "BayerBG2BGR",
+            "lut": None,
+            "changes": [{"from_frame": 5, "lut": lut_inv}],
+        }
+
+    def test_01_mudanca_vale_a_partir_do_quadro_registrado(self):
+        timeline = process.build_color_timeline(self.meta)
+        _, lut_antes = process.color_state_for_frame(timeline, 4)
+        bayer, lut_depois = process.color_state_for_frame(timeline, 5)
+        self.assertIsNone(lut_antes)
+        self.assertIsNotNone(lut_depois)
+        self.assertEqual(bayer, process.cv2.COLOR_BayerBG2BGR)
+
+    def test_02_revela_mosaico_para_bgr_com_lut(self):
+        raw = np.full((16, 16), 100, dtype=np.uint8)
+        timeline = process.build_color_timeline(self.meta)
+        bayer, lut = process.color_state_for_frame(timeline, 10)
+        bgr = process.develop_raw_frame(raw, bayer, lut)
+        self.assertEqual(bgr.shape, (16, 16, 3))
+        self.assertEqual(int(bgr[8, 8, 0]), 155)
+
+
+@unittest.skipIf(process is None, "process.py requer Pillow")
+class TestFrameTiming(unittest.TestCase):
+    """
+    Perdas e buracos de tempo pelos metadados do sensor gravados no JSONL (SPEC-002).
+    """
+
+    def _linha(self, frame, seq, drops=0, overflow=0):
+        return {"frame": frame, "seq": seq, "ts_sensor": seq / 120.0, "ts_host": 100.0 + seq / 120.0,
+                "exposure": 2000.0, "gain": 0.0, "drops_sensor": drops, "overflow": overflow}
+
+    def test_01_drop_do_sensor_vira_evento_e_buraco_de_tempo(self):
+        # Uma captura a cada 5 quadros do sensor; entre as capturas 3 e 4 a USB perdeu 5 quadros
+        dados = {i: self._linha(i, 5 * i + (5 if i >= 4 else 0), drops=5 if i >= 4 else 0) for i in range(10)}
+        timing = process.analyze_frame_timing(dados)
+        self.assertEqual(timing["clock"], "ts_sensor")
+        self.assertEqual(timing["sensor_drop_events"], [{"frame": 4, "dropped": 5}])
+        self.assertEqual(timing["sensor_drops_total"], 5)
+        self.assertEqual([g["frame"] for g in timing["time_gaps"]], [4])
+        self.assertAlmostEqual(timing["time_gaps"][0]["gap_ms"], 10 * 1000 / 120.0, places=2)
+        self.assertEqual(timing["sensor_frames_per_capture_median"], 5.0)
+
+    def test_02_sem_metadados_nao_ha_analise(self):
+        self.assertIsNone(process.analyze_frame_timing({0: {"frame": 0, "cy": 1.0}, 1: {"frame": 1, "cy": 2.0}}))
+
+
+@unittest.skipIf(process is None, "process.py requer Pillow")
+class TestAnchorTransform(unittest.TestCase):
+    """
+    Ancoragem do process.py: o furo rastreado (coordenadas do sensor) cai no centro do crop
+    tanto na região gravada (crop + overscan, origem rx/ry) quanto no quadro inteiro sem rx/ry.
+    """
+
+    def setUp(self):
+        # Sensor 640x480 com um marcador 2x2 no alvo do crop: furo (300.5, 150.5) + offset (40, -20)
+        self.sensor = np.zeros((480, 640), dtype=np.uint8)
+        self.sensor[130:132, 340:342] = 255
+        self.track = {"frame": 7, "cx": 300.5, "cy": 150.5, "ox": 40, "oy": -20, "cw": 160, "ch": 100}
+
+    def _centro_do_marcador(self, img, track):
+        M, cw, ch = process.anchor_transform(track, track["cx"], img.shape, 0, 0, 0.0, True)
+        dst = process.cv2.warpAffine(img.astype(np.float32), M, (cw, ch), flags=process.cv2.INTER_LINEAR)
+        ys, xs = np.nonzero(dst > 1e-3)
+        w = dst[ys, xs]
+        return (cw, ch), (float((xs * w).sum() / w.sum()), float((ys * w).sum() / w.sum()))
+
+    def test_01_regiao_com_rx_ry_ancora_no_centro(self):
+        x1, y1, x2, y2 = 290, 62, 482, 214  # Região par gravada ao redor do crop
+        track = dict(self.track, rx=x1, ry=y1)
+        tamanho, centro = self._centro_do_marcador(self.sensor[y1:y2, x1:x2], track)
+        self.assertEqual(tamanho, (160, 100))
+        self.assertAlmostEqual(centro[0], 80.0, places=3)
+        self.assertAlmostEqual(centro[1], 50.0, places=3)
+
+    def test_02_quadro_inteiro_sem_rx_ry_ancora_igual(self):
+        _, centro_inteiro = self._centro_do_marcador(self.sensor, self.track)
+        _, centro_regiao = self._centro_do_marcador(self.sensor[62:214, 290:482], dict(self.track, rx=290, ry=62))
+        self.assertAlmostEqual(centro_inteiro[0], centro_regiao[0], places=3)
+        self.assertAlmostEqual(centro_inteiro[1], centro_regiao[1], places=3)
+        # Sem rx/ry a translação é a do quadro inteiro: a região gravada sairia deslocada pela origem
+        M_regiao, _, _ = process.anchor_transform(dict(self.track, rx=290, ry=62), 300.5, (152, 192), 0, 0, 0.0, True)
+        M_inteiro, _, _ = process.anchor_transform(self.track, 300.5, (480, 640), 0, 0, 0.0, True)
+        np.testing.assert_allclose(M_regiao[:, 2] - M_inteiro[:, 2], [290.0, 62.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
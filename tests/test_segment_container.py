@@ -0,0 +1,81 @@
+import unittest
+import numpy as np
+import cv2
+import sys
+import os
+import tempfile
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.segment_container import SegmentArchive, SegmentReader, SegmentRecorder, SegmentWriter
+
+
+class TestSegmentContainer(unittest.TestCase):
+    """
+    Testes do contêiner de segmentos append-only `.mseg` (SPEC-004).
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_01_rodape_indexa_quadros_e_rotaciona_segmentos(self):
+        gravador = SegmentRecorder(self.dir, "sessao", frames_por_segmento=3)
+        # Chegada fora de ordem, como no pool de codificadores
+        for idx in (2, 0, 1, 4, 3):
+            gravador.append(idx, bytes([idx]) * (10 + idx))
+        gravador.close()
+
+        self.assertEqual(len([n for n in os.listdir(self.dir) if n.endswith(".mseg")]), 2)
+        with SegmentArchive(self.dir) as archive:
+            archive.refresh()
+            self.assertEqual(archive.frame_indices(), [0, 1, 2, 3, 4])
+            self.assertEqual(bytes(archive.read(4)), bytes([4]) * 14)
+
+    def test_02_segmento_sem_rodape_e_recuperado(self):
+        path = os.path.join(self.dir, "miniola_seg_crash_0000.mseg")
+        writer = SegmentWriter(path)
+        writer.append(7, b"abc")
+        writer.append(8, b"defgh")
+        writer._fp.write(b"FRM1" + b"\x00" * 4)  # Registro truncado pela queda do processo
+        writer._fp.flush()
+
+        leitor = SegmentReader(path)
+        self.assertFalse(leitor.finalizado)
+        self.assertEqual(leitor.frame_indices(), [7, 8])
+        self.assertEqual(bytes(leitor.read(8)), b"defgh")
+
+        # O mesmo leitor acompanha o segmento crescendo e depois recebendo o rodapé
+        writer._fp.seek(writer.bytes_escritos)
+        writer._fp.truncate()
+        writer.append(9, b"ij")
+        self.assertTrue(leitor.refresh())
+        self.assertEqual(leitor.frame_indices(), [7, 8, 9])
+        writer.close()
+        leitor.refresh()
+        self.assertTrue(leitor.finalizado)
+        self.assertEqual(len(leitor), 3)
+        leitor.close()
+
+    def test_03_decodifica_jpeg_direto_do_mmap(self):
+        img = np.full((32, 48, 3), (10, 120, 240), dtype=np.uint8)
+        ok, buf = cv2.imencode(".jpg", img)
+        self.assertTrue(ok)
+        gravador = SegmentRecorder(self.dir, "jpeg")
+        gravador.append(0, buf)
+        gravador.close()
+
+        with SegmentArchive(self.dir) as archive:
+            frame = archive.refresh().frames()[0]
+            self.assertEqual(frame.name, "miniola_000000.jpg")
+            decodificado = frame.decode()
+            self.assertEqual(decodificado.shape, img.shape)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.serial_link import SerialLink
+from core.motor_controller import FilmTransportPID
+
+
+class PortaFalsa:
+    """Porta serial em memória: `alimentar()` simula a SKR Pico, `write()` pode demorar como a USB."""
+
+    def __init__(self, atraso_escrita=0.0):
+        self.atraso_escrita = atraso_escrita
+        self.escritas = []
+        self.is_open = True
+        self._entrada = bytearray()
+        self._lock = threading.Lock()
+
+    def alimentar(self, dados):
+        with self._lock:
+            self._entrada += dados
+
+    @property
+    def in_waiting(self):
+        with self._lock:
+            return len(self._entrada)
+
+    def read(self, n):
+        with self._lock:
+            dados = bytes(self._entrada[:n])
+            del self._entrada[:n]
+            return dados
+
+    def write(self, dados):
+        time.sleep(self.atraso_escrita)
+        self.escritas.append(dados.decode('utf-8').strip())
+        return len(dados)
+
+    def close(self):
+        self.is_open = False
+
+
+def _espera(condicao, timeout=2.0):
+    limite = time.monotonic() + timeout
+    while not condicao() and time.monotonic() < limite:
+        time.sleep(0.002)
+    return condicao()
+
+
+class TestSerialLink(unittest.TestCase):
+    """
+    Thread única de I/O serial: último estado do encoder e fila de comandos coalescida (SPEC-010).
+    """
+
+    def test_01_linhas_viram_ultimo_estado(self):
+        porta = PortaFalsa()
+        link = SerialLink(porta).start()
+        self.addCleanup(link.stop)
+        porta.alimentar(b"E 100\nE 2")  # Linha partida ao meio entre duas leituras
+        self.assertTrue(_espera(lambda: link.estado.leituras == 1))
+        self.assertEqual(link.estado.pulsos, 100)
+        porta.alimentar(b"40\nok\nE x\n!STALL! X\n")
+        self.assertTrue(_espera(lambda: link.estado.stalls == 1))
+        estado = link.estado
+        self.assertEqual((estado.pulsos, estado.leituras, estado.ultima_linha_stall), (240, 2, "!STALL! X"))
+        self.assertEqual(link.stats()["linhas_ignoradas"], 2)
+
+    def test_02_coalescencia_da_fila(self):
+        link = SerialLink(PortaFalsa())  # Sem thread: a fila só anda em _escrever_pendentes
+        link.enviar("F 1000")
+        link.enviar("U 1100")
+        link.enviar("L 10")
+        link.enviar("U 1200")  # Substitui o U 1100 (nenhum movimento entre os dois)
+        link.enviar("L 20")
+        self.assertEqual([c for c, _ in link._fila], ["F 1000", "U 1200", "L 20"])
+        link.enviar("S")  # Parada descarta o U pendente, mas nunca o F
+        link.enviar("U 900")
+        self.assertEqual([c for c, _ in link._fila], ["F 1000", "L 20", "S", "U 900"])
+        stats = link.stats()
+        self.assertEqual((stats["fila"], stats["coalescidos"], stats["fila_max"]), (4, 3, 4))
+
+    def test_03_enviar_nao_bloqueia_e_mede_latencia(self):
+        porta = PortaFalsa(atraso_escrita=0.02)
+        link = SerialLink(porta).start()
+        self.addCleanup(link.stop)
+        t0 = time.monotonic()
+        for v in range(1000, 1010):
+            link.enviar(f"U {v}")
+        self.assertLess(time.monotonic() - t0, 0.015)
+        self.assertTrue(_espera(lambda: link.escritos + link.coalescidos == 10))
+        self.assertEqual(porta.escritas[-1], "U 1009")
+        self.assertLess(len(porta.escritas), 10)  # Os U intermediários nunca chegaram à placa
+        stats = link.stats()
+        self.assertEqual(stats["fila"], 0)
+        self.assertGreaterEqual(stats["latencia_escrita_max_ms"], 15.0)
+
+    def test_04_pid_consome_o_estado_sem_ler_a_porta(self):
+        porta = PortaFalsa(atraso_escrita=0.01)
+        motor = FilmTransportPID()
+        motor.serial = porta
+        motor.link = SerialLink(porta).start()
+        motor.connected = True
+        self.addCleanup(motor.disconnect)
+        motor.start_pid(target_fps=10.0)
+        for p in range(0, 2400, 120):
+            porta.alimentar(f"E {p}\n".encode())
+            time.sleep(0.01)
+        self.assertTrue(_espera(lambda: motor.get_accumulated_distance() > 0))
+        self.assertTrue(porta.escritas and porta.escritas[0].startswith("F "))
+        porta.alimentar(b"!STALL!\n")
+        self.assertTrue(_espera(lambda: not motor.is_running_pid))
+        motor.stop()
+        self.assertTrue(_espera(lambda: porta.escritas[-1] == "S"))
+        self.assertEqual(motor.serial_stats()["stalls"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
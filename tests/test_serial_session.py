@@ -0,0 +1,85 @@
+import unittest
+import sys
+import os
+import io
+import contextlib
+import tempfile
+from collections import Counter
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.serial_session import SessionRecorder, ler_sessao, replay_sessao, NOMES, RX, TX, TICK, MAGIC
+from core.skr_simulator import SkrPicoSimulator, SimTransportSpec
+from core.motor_controller import FilmTransportPID
+
+
+@unittest.skipIf(os.name != "posix", "O simulador da SKR Pico usa pseudo-terminal (POSIX)")
+class TestSerialSession(unittest.TestCase):
+    """
+    Log binário das sessões do transporte e replay determinístico da malha (SPEC-010).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Uma sessão real contra a SKR Pico simulada (10x): fase, sincronia, meta nova e filme arrebentado
+        cls.diretorio = tempfile.TemporaryDirectory()
+        sim = SkrPicoSimulator(SimTransportSpec(scale=10.0, slip=1.0, slip_at=5.0)).start()
+        motor = FilmTransportPID(port=sim.porta, relogio=sim.relogio, dormir=sim.relogio.dormir, log_dir=cls.diretorio.name)
+        motor.connect()
+        with contextlib.redirect_stdout(io.StringIO()):
+            sim.relogio.dormir(0.3)
+            motor.start_pid(target_fps=18.0)
+            for i in range(40):
+                sim.relogio.dormir(0.2)
+                motor.update_phase_error((i % 7) - 3, 40.0)
+                if i == 10: motor.sync_optical_phase()
+                if i == 15: motor.set_target_fps(16.0)
+                motor.set_led_brightness(i)  # Comando de fora do PID: gravado, fora da comparação
+        motor.disconnect()
+        sim.stop()
+        cls.logs = [os.path.join(cls.diretorio.name, f) for f in os.listdir(cls.diretorio.name)]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.diretorio.cleanup()
+
+    def test_01_formato(self):
+        with tempfile.TemporaryDirectory() as d:
+            gravador = SessionRecorder(os.path.join(d, "s.mslog"))
+            gravador.registrar(RX, 1.5, b"E 120")
+            gravador.registrar(TX, 1.6, b"U 3000")
+            gravador.fechar()
+            with open(gravador.caminho, "ab") as f:
+                f.write(b"\x00\x01")  # Registro truncado no fim (queda de energia)
+            self.assertEqual(list(ler_sessao(gravador.caminho)), [(1.5, RX, b"E 120"), (1.6, TX, b"U 3000")])
+            self.assertEqual(os.path.getsize(gravador.caminho), len(MAGIC) + 2 * 11 + 5 + 6 + 2)
+
+    def test_02_sessao_gravada(self):
+        self.assertEqual(len(self.logs), 1)
+        tipos = Counter(NOMES[tipo] for _, tipo, _ in ler_sessao(self.logs[0]))
+        for nome in ("start", "tick", "rx", "tx", "phase", "sync", "target", "estop"):
+            self.assertGreater(tipos[nome], 0, nome)
+        tempos = [t for t, _, _ in ler_sessao(self.logs[0])]
+        self.assertEqual(tempos, sorted(tempos))
+
+    def test_03_replay_identico_e_mais_rapido(self):
+        r = replay_sessao(self.logs[0])
+        self.assertTrue(r["identico"], r["primeira_divergencia"])
+        self.assertEqual(r["ticks_inconsistentes"], 0)
+        self.assertEqual(r["comandos_replay"], r["comandos_gravados"])
+        self.assertTrue(r["estop_gravado"] and r["estop_replay"])
+        self.assertGreater(r["aceleracao"], 20.0)
+        self.assertEqual(replay_sessao(self.logs[0])["comandos"], r["comandos"])  # Determinístico
+
+    def test_04_lei_de_controle_nova_diverge(self):
+        r = replay_sessao(self.logs[0], ajustes={"Ki": 3.0})
+        self.assertFalse(r["identico"])
+        self.assertGreater(r["diferenca_max_hz"], 0)
+        with self.assertRaises(ValueError):
+            replay_sessao(self.logs[0], ajustes={"ganho_inexistente": 1.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
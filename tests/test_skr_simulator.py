@@ -0,0 +1,80 @@
+import unittest
+import sys
+import os
+import io
+import contextlib
+import math
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.skr_simulator import SkrPicoSimulator, SimTransportSpec, TransportModel
+from core.motor_controller import FilmTransportPID
+
+
+class TestSkrSimulator(unittest.TestCase):
+    """
+    SKR Pico simulada: modelo físico do firmware e do carretel, e o PID contra o pseudo-terminal (SPEC-010).
+    """
+
+    def test_01_rampa_do_firmware_e_raio_do_carretel(self):
+        modelo = TransportModel(SimTransportSpec(core=25.0, thickness=0.14))
+        modelo.comando("F 2000")
+        modelo.passo(0.25)
+        self.assertEqual(modelo.atual["Y"], 1000)  # Manual: 40 Hz a cada 10 ms
+        modelo.passo(1.0)
+        self.assertEqual(modelo.atual["Y"], 2000)
+        v0 = modelo.velocidade_filme()
+        self.assertAlmostEqual(v0, 2000 / 3200 * 2 * math.pi * modelo.raio_recolhimento())
+        modelo.passo(120.0)
+        # O carretel cresce: mesma frequência, filme mais rápido
+        self.assertGreater(modelo.raio_recolhimento(), 25.5)
+        self.assertGreater(modelo.velocidade_filme(), v0)
+        pulsos = modelo.pulsos()
+        self.assertIsInstance(pulsos, int)
+        self.assertAlmostEqual(pulsos, modelo.encoder_mm / (math.pi * 26.6) * 2400, delta=1.0)
+        self.assertEqual(modelo.comando("S"), ["Manobra: Parada Iniciada"])
+        modelo.passo(1.0)
+        self.assertEqual(modelo.velocidade_filme(), 0.0)
+        modelo.comando("R 1000")
+        modelo.passo(1.0)
+        self.assertLess(modelo.velocidade_filme(), 0.0)  # Rebobina pelo carretel de alimentação
+
+    def test_02_slip_e_stall(self):
+        modelo = TransportModel()
+        modelo.slip = 0.5  # O SkrPicoSimulator liga o slip do spec em `slip_at`
+        modelo.comando("F 3200")
+        modelo.passo(3.0)
+        self.assertAlmostEqual(modelo.encoder_mm, 0.5 * modelo.enrolado_mm)
+        self.assertTrue(modelo.injetar_stall().startswith("!STALL!"))
+        antes = modelo.enrolado_mm
+        modelo.comando("U 4000")  # Não tira a placa da parada de segurança
+        modelo.passo(1.0)
+        self.assertEqual(modelo.enrolado_mm, antes)
+        modelo.comando("F 1000")
+        modelo.passo(1.0)
+        self.assertGreater(modelo.enrolado_mm, antes)
+        with self.assertRaises(ValueError):
+            SimTransportSpec.parse("core=25,radius=3")
+
+    @unittest.skipIf(os.name != "posix", "Pseudo-terminal só existe em POSIX")
+    def test_03_pid_contra_o_pseudo_terminal(self):
+        sim = SkrPicoSimulator(SimTransportSpec(scale=5.0, stall_at=8.0)).start()
+        self.addCleanup(sim.stop)
+        motor = FilmTransportPID(port=sim.porta, relogio=sim.relogio, dormir=sim.relogio.dormir)
+        self.assertTrue(motor.connect())
+        self.addCleanup(motor.disconnect)
+        with contextlib.redirect_stdout(io.StringIO()):
+            motor.start_pid(target_fps=10.0)
+            sim.relogio.dormir(6.0)
+            # Depois da rampa de 3 s o filme anda perto da meta (190 mm/s)
+            self.assertAlmostEqual(sim.modelo.velocidade_filme(), motor.target_mm_s, delta=0.15 * motor.target_mm_s)
+            self.assertGreater(motor.get_accumulated_distance(), 500.0)
+            sim.relogio.dormir(3.0)
+        self.assertFalse(motor.is_running_pid)  # O !STALL! em 8 s desligou o PID
+        self.assertEqual(motor.serial_stats()["stalls"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
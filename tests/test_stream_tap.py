@@ -0,0 +1,156 @@
+import unittest
+import numpy as np
+import sys
+import os
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from cameras.base import CameraProvider
+from cameras.capture_thread import CaptureThread
+from cameras.frame import Frame
+from cameras.replay import ReplayCameraProvider
+from cameras.stream_tap import StreamTap, StreamTapReader
+
+
+class SensorBayer(CameraProvider):
+    """Provedor de bancada: mosaico 8 bits com padding de linha (view com stride, como a Ximea) e um salto de seq."""
+
+    reuses_buffers = True
+
+    def __init__(self, n=20, periodo_s=0.002):
+        self.buf = np.zeros((6, 12), dtype=np.uint8)
+        self.i = 0
+        self.n = n
+        self.periodo_s = periodo_s
+
+    def read_frame(self):
+        if self.i >= self.n:
+            time.sleep(0.001)
+            return None
+        time.sleep(self.periodo_s)
+        self.i += 1
+        self.buf[:] = np.arange(72, dtype=np.uint8).reshape(6, 12) + self.i
+        seq = self.i + (2 if self.i > 10 else 0)  # 2 quadros perdidos na USB depois do 10º
+        return Frame(self.buf[:, :10], seq=seq, timestamp=seq / 500.0, exposure=800.0, gain=1.5)
+
+
+class TestStreamTap(unittest.TestCase):
+    """
+    Tap de quadros crus do sensor e provedor de replay (SPEC-002).
+    """
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "sessao.mtap")
+
+    def _gravar(self, n=20, periodo_s=0.002):
+        tap = StreamTap(self.path, meta={"camera": "ximea", "frame_format": None, "bayer_code": 46, "res": [10, 6]}, bloco_mb=0.0005)
+        captura = CaptureThread(SensorBayer(n, periodo_s), slots=64, tap=tap).start()
+        quadros = []
+        while len(quadros) < n:
+            q = captura.read(timeout=1.0)
+            self.assertIsNotNone(q)
+            quadros.append(q)
+        captura.stop()
+        st = captura.stats()["tap"]
+        tap.close()
+        self.assertEqual((st["gravados"], st["descartados"]), (n, 0))
+        return quadros
+
+    def test_01_bytes_e_metadados_identicos(self):
+        originais = self._gravar()
+        with StreamTapReader(self.path) as leitor:
+            self.assertEqual(len(leitor), 20)
+            self.assertEqual(leitor.meta["bayer_code"], 46)
+            for original, i in zip(originais, range(len(leitor))):
+                q = leitor.frame(i)
+                np.testing.assert_array_equal(q.data, original.data)
+                self.assertEqual((q.seq, q.timestamp, q.exposure, q.gain), (original.seq, original.timestamp, 800.0, 1.5))
+                self.assertEqual(q.host_ts, original.host_ts)
+            self.assertFalse(leitor.frame(0).data.flags.writeable)
+        # close() trunca a reserva esparsa no tamanho exato
+        self.assertLess(os.path.getsize(self.path), 20 * (64 + 64) + 256)
+
+    def test_02_processo_que_caiu_deixa_arquivo_legivel(self):
+        tap = StreamTap(self.path, bloco_mb=1)
+        for i in range(5):
+            tap.write(Frame(np.full((4, 4, 3), i, dtype=np.uint8), seq=i))
+        tap._mm.flush()  # Sem close(): cauda de zeros pré-alocada
+        with StreamTapReader(self.path) as leitor:
+            self.assertEqual(len(leitor), 5)
+            self.assertEqual(int(leitor.frame(4).data[0, 0, 0]), 4)
+            self.assertIsNone(leitor.frame(4).timestamp)
+        tap.close()
+
+    def test_03_limite_de_tamanho_descarta(self):
+        tap = StreamTap(self.path, max_mb=0.001)
+        resultados = [tap.write(Frame(np.zeros((10, 10), dtype=np.uint8), seq=i)) for i in range(20)]
+        tap.close()
+        self.assertIn(False, resultados)
+        self.assertEqual(tap.gravados + tap.descartados, 20)
+        with StreamTapReader(self.path) as leitor:
+            self.assertEqual(len(leitor), tap.gravados)
+
+    def test_04_replay_o_mais_rapido_possivel_reproduz_drops(self):
+        self._gravar()
+        cam = ReplayCameraProvider(self.path, speed=0)
+        cam.start(10, 6, 120, 800, 1.5, 0)
+        self.assertEqual(cam.bayer_code, 46)
+        captura = CaptureThread(cam, slots=64).start()
+        quadros = [captura.read(timeout=1.0) for _ in range(20)]
+        captura.stop()
+        cam.stop()
+        self.assertEqual(captura.stats()["drops_sensor"], 2)
+        self.assertEqual(quadros[-1].seq, 22)
+        self.assertIsNone(cam.read_frame())  # Fim da gravação sem loop
+
+    def test_05_replay_no_ritmo_original_e_em_loop(self):
+        self._gravar(n=10, periodo_s=0.01)
+        cam = ReplayCameraProvider(self.path, speed=1.0, loop=True)
+        cam.start(10, 6, 120, 800, 1.5, 0)
+        t0 = time.monotonic()
+        quadros = [cam.read_frame() for _ in range(10)]
+        decorrido = time.monotonic() - t0
+        self.assertGreater(decorrido, 0.06)  # ~9 intervalos de 10 ms gravados
+
+        seguintes = [cam.read_frame() for _ in range(3)]
+        cam.stop()
+        self.assertEqual(cam.voltas, 1)
+        seqs = [q.seq for q in quadros + seguintes]
+        self.assertEqual(seqs, sorted(seqs))
+        self.assertEqual(seguintes[0].seq, quadros[-1].seq + 1)
+        self.assertGreater(seguintes[0].timestamp, quadros[-1].timestamp)
+        np.testing.assert_array_equal(seguintes[0].data, quadros[0].data)
+
+    def test_06_replay_de_luma_nao_vira_mosaico(self):
+        # Stream duplo do Pi / UVC YUYV: o tap guarda só o plano Y da visão
+        tap = StreamTap(self.path, meta={"camera": "uvc", "frame_format": "luma", "res": [8, 4]})
+        luma = np.arange(32, dtype=np.uint8).reshape(4, 8)
+        tap.write(Frame(luma, seq=0))
+        tap.close()
+        cam = ReplayCameraProvider(self.path, speed=0)
+        cam.start(8, 4, 30, 800, 1.0, 0)
+        self.assertEqual(cam.frame_format, "luma")
+        quadro = cam.read_frame()
+        cam.stop()
+        np.testing.assert_array_equal(quadro.data, luma)  # Visão recebe o mesmo luma
+        principal = quadro.main()  # Gravação: BGR cinza, nunca o 2-D que o codificador trataria como Bayer
+        self.assertEqual(principal.shape, (4, 8, 3))
+        for canal in range(3):
+            np.testing.assert_array_equal(principal[:, :, canal], luma)
+        # Tap de mosaico continua servindo o próprio data em main()
+        self._gravar(n=2)
+        cam = ReplayCameraProvider(self.path, speed=0)
+        cam.start(10, 6, 120, 800, 1.5, 0)
+        quadro = cam.read_frame()
+        cam.stop()
+        self.assertIs(quadro.main(), quadro.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
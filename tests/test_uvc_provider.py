@@ -0,0 +1,102 @@
+import unittest
+import ctypes
+import numpy as np
+import cv2
+import sys
+import os
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+try:
+    from cameras import uvc
+except ImportError:
+    uvc = None  # fcntl/mmap só existem em POSIX
+
+
+@unittest.skipIf(uvc is None or not sys.platform.startswith("linux"), "V4L2 exige Linux")
+class TestUVCProvider(unittest.TestCase):
+    """
+    Provedor UVC em V4L2 puro (SPEC-002): ABI das estruturas e decodificação dos formatos sem dispositivo.
+    """
+
+    @unittest.skipIf(ctypes.sizeof(ctypes.c_void_p) != 8, "Valores de referência do kernel 64 bits")
+    def test_01_abi_bate_com_videodev2(self):
+        self.assertEqual(ctypes.sizeof(uvc.v4l2_format), 208)
+        self.assertEqual(ctypes.sizeof(uvc.v4l2_buffer), 88)
+        self.assertEqual(uvc.VIDIOC_QUERYCAP, 0x80685600)
+        self.assertEqual(uvc.VIDIOC_S_FMT, 0xC0D05605)
+        self.assertEqual(uvc.VIDIOC_REQBUFS, 0xC0145608)
+        self.assertEqual(uvc.VIDIOC_QBUF, 0xC058560F)
+        self.assertEqual(uvc.VIDIOC_DQBUF, 0xC0585611)
+        self.assertEqual(uvc.VIDIOC_STREAMON, 0x40045612)
+        self.assertEqual(uvc.VIDIOC_S_PARM, 0xC0CC5616)
+        self.assertEqual(uvc.VIDIOC_ENUM_FRAMEINTERVALS, 0xC034564B)
+        self.assertEqual(uvc.fourcc_str(uvc.fourcc("YUYV")), "YUYV")
+
+    def _camera(self, formato, w=8, h=4, passo=None):
+        cam = uvc.UVCCameraAdapter(device="/dev/null")
+        cam.formato, cam.width, cam.height = formato, w, h
+        cam.bytesperline = passo or w * {"YUYV": 2, "BGR3": 3}.get(formato, 1)
+        return cam
+
+    def test_02_bayer_e_grey_sao_views_do_buffer_mmap(self):
+        bruto = np.arange(4 * 10, dtype=np.uint8)
+        cam = self._camera("GRBG", passo=10)  # Linhas com padding do driver
+        dados, principal = cam._decodificar(bruto, bruto.size)
+        self.assertEqual(dados.shape, (4, 8))
+        self.assertTrue(np.shares_memory(dados, bruto))
+        self.assertEqual(int(dados[1, 0]), 10)
+        self.assertIsNone(principal)
+
+        dados, principal = self._camera("GREY")._decodificar(bruto, bruto.size)
+        self.assertTrue(np.shares_memory(dados, bruto))
+        self.assertEqual(principal().shape, (4, 8, 3))
+
+    def test_03_yuyv_entrega_luma_e_bgr_sob_demanda(self):
+        bgr = np.full((4, 8, 3), (40, 120, 200), dtype=np.uint8)
+        yuv = cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV)
+        yuyv = np.empty((4, 8, 2), dtype=np.uint8)
+        yuyv[:, :, 0] = yuv[:, :, 0]
+        yuyv[:, 0::2, 1] = yuv[:, 0::2, 1]
+        yuyv[:, 1::2, 1] = yuv[:, 1::2, 2]
+        bruto = yuyv.reshape(-1)
+
+        dados, principal = self._camera("YUYV")._decodificar(bruto, bruto.size)
+        self.assertEqual(dados.shape, (4, 8))
+        self.assertTrue(dados.flags["C_CONTIGUOUS"])
+        np.testing.assert_array_equal(dados, yuv[:, :, 0])
+        cor = principal()
+        np.testing.assert_array_equal(cor, cv2.cvtColor(yuyv, cv2.COLOR_YUV2BGR_YUYV))
+        b, g, r = (int(c) for c in cor[2, 5])
+        self.assertTrue(b < g < r)  # Crominância intercalada lida na ordem certa
+
+    def test_04_mjpeg_decodificado_e_contado(self):
+        img = np.full((4, 8, 3), 128, dtype=np.uint8)
+        jpeg = np.frombuffer(cv2.imencode(".jpg", img)[1].tobytes(), dtype=np.uint8)
+        bruto = np.zeros(4096, dtype=np.uint8)
+        bruto[:jpeg.size] = jpeg
+        cam = self._camera("MJPG")
+        dados, _ = cam._decodificar(bruto, jpeg.size)
+        self.assertEqual(dados.shape, (4, 8, 3))
+        self.assertEqual(cam.decodificacoes_mjpeg, 1)
+
+    def test_05_buffer_volta_para_a_fila_sem_donos(self):
+        class Driver:
+            fila = []
+
+            def _reenfileirar(self, indice):
+                self.fila.append(indice)
+
+        driver = Driver()
+        lease = uvc.V4L2BufferLease(driver, 3)
+        self.assertTrue(lease.retain())
+        lease.release()
+        self.assertEqual(driver.fila, [])
+        lease.release()
+        self.assertEqual(driver.fila, [3])
+
+
+if __name__ == "__main__":
+    unittest.main()
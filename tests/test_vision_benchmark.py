@@ -0,0 +1,93 @@
+import unittest
+import sys
+import os
+import tempfile
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if TESTS_DIR not in sys.path:
+    sys.path.insert(0, TESTS_DIR)
+
+import bench_vision
+
+
+class TestVisionBenchmark(unittest.TestCase):
+    """
+    Bancada de paridade e vazão (SPEC-001): os dois motores rodam os cenários sintéticos e
+    não podem regredir em relação a `tests/bench_baselines.json` (precisão e piso de vazão
+    do requisito de tempo real, ambos independentes da máquina). Com MINIOLA_BENCH_UPDATE=1
+    as baselines são regravadas em vez de comparadas.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.motores = bench_vision.motores_disponiveis()
+        n_quadros = bench_vision.quadros_baseline(bench_vision.carregar_baselines())
+        cls.resultados = bench_vision.executar(bench_vision.cenarios_sinteticos(n_quadros), cls.motores)
+        if os.environ.get("MINIOLA_BENCH_UPDATE") == "1":
+            bench_vision.atualizar_baselines(cls.resultados)
+
+    def test_01_sem_regressao_contra_baselines(self):
+        if os.environ.get("MINIOLA_BENCH_UPDATE") == "1":
+            self.skipTest("Baselines regravadas nesta execução")
+        regressoes = bench_vision.comparar(self.resultados, bench_vision.carregar_baselines())
+        self.assertEqual(regressoes, [], "\n".join(regressoes))
+
+    def test_02_gatilhos_batem_com_ground_truth(self):
+        for motor, por_cenario in self.resultados.items():
+            for cenario, m in por_cenario.items():
+                self.assertLessEqual(abs(m["capturas"] - m["capturas_esperadas"]), 1, f"{motor}/{cenario}")
+                # Contra a âncora ideal do estimador o erro é sub-pixel em todos os cenários
+                self.assertLessEqual(m["erro_fase_p99_px"], 1.0, f"{motor}/{cenario}")
+                # Contra o furo da linha só sem encolhimento e sem furo cortado pela ROI (ver bench_vision)
+                if "enc" not in cenario and "2064" not in cenario:
+                    self.assertLessEqual(m["erro_p99_px"], 1.0, f"{motor}/{cenario}")
+
+    def test_03_motor_numpy_em_tempo_real(self):
+        for cenario, m in self.resultados["numpy"].items():
+            self.assertGreater(m["fps"], 120.0, cenario)
+
+    def test_04_paridade_entre_motores(self):
+        if "cpp" not in self.resultados:
+            self.skipTest("Módulo C++ ausente")
+        for cenario, m in self.resultados["cpp"].items():
+            ref = self.resultados["numpy"][cenario]
+            self.assertEqual(m["capturas"], ref["capturas"], cenario)
+            self.assertAlmostEqual(m["erro_p99_px"], ref["erro_p99_px"], delta=0.5, msg=cenario)
+
+    def test_05_pisos_independentes_de_maquina(self):
+        # O piso vem do requisito de tempo real, não de uma medição: vale igual para qualquer cenário
+        self.assertEqual(bench_vision.PISO_FPS, 240)
+        self.assertNotIn("vazao_minima", bench_vision.carregar_baselines())
+        medido = {"quadros": 240, "fps": 200.0, "capturas": 4, "capturas_esperadas": 4,
+                  "erro_p99_px": 0.5, "erro_fase_p99_px": 0.2}
+        base = {"precisao": {"numpy": {"x": {"capturas": 4, "erro_p99_px": 0.5, "erro_fase_p99_px": 0.0}}}}
+        regressoes = bench_vision.comparar({"numpy": {"x": medido}}, base, maquina="")
+        self.assertEqual(len(regressoes), 1)
+        self.assertIn("piso 240 FPS", regressoes[0])
+        # Sem entrada própria o C++ responde pela precisão do NumPy e não pode ficar atrás dele
+        cpp = dict(medido, fps=240.0, erro_fase_p99_px=1.2)
+        regressoes = bench_vision.comparar({"numpy": {"x": dict(medido, fps=1000.0)}, "cpp": {"x": cpp}}, base, maquina="")
+        self.assertEqual(len(regressoes), 2, regressoes)
+        self.assertTrue(any("erro_fase_p99_px 1.2" in r for r in regressoes))
+        self.assertTrue(any("0.24x do NumPy" in r for r in regressoes))
+
+    def test_06_recusa_comparar_com_outro_numero_de_quadros(self):
+        baselines = bench_vision.carregar_baselines()
+        n = bench_vision.quadros_baseline(baselines)
+        cenario = next(iter(self.resultados["numpy"]))
+        outro = {"numpy": {cenario: dict(self.resultados["numpy"][cenario], quadros=n + 360, capturas=10)}}
+        with self.assertRaises(ValueError):
+            bench_vision.comparar(outro, baselines)
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "baselines.json")
+            bench_vision.atualizar_baselines(self.resultados, path=path)
+            with self.assertRaises(ValueError):
+                bench_vision.atualizar_baselines(outro, path=path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,8 @@ import numpy as np
 import cv2
 import sys
 import os
+import threading
+import time
 
 # Adiciona o diretório raiz ao path para importar módulos do projeto e o binário compiled C++
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -108,5 +110,217 @@ class TestVisionEngine(unittest.TestCase):
         self.assertEqual(capturas_disparadas, 1, "O motor de visão deve disparar exatamente 1 captura ao completar o ciclo de 4 perfurações")
 
 
+class TestVisionGilRelease(unittest.TestCase):
+    """
+    O process_frame libera o GIL durante o trabalho nativo: com o loop de visão saturado,
+    o gerador do dashboard e o laço do PID (threads Python) devem manter sua cadência.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            import miniola_cv
+            cls.miniola_cv = miniola_cv
+        except ImportError:
+            cls.miniola_cv = None
+
+    def _atrasos_em_cadencia(self, periodo_s, parar, trabalho):
+        """Laço periódico com deadline absoluto (como o _pid_loop); devolve os atrasos de cada tick."""
+        atrasos = []
+        proximo = time.perf_counter() + periodo_s
+        while not parar.is_set():
+            trabalho()
+            espera = proximo - time.perf_counter()
+            if espera > 0: time.sleep(espera)
+            atrasos.append(max(0.0, time.perf_counter() - proximo))
+            proximo += periodo_s
+        return atrasos
+
+    def test_01_dashboard_e_pid_mantem_cadencia(self):
+        if self.miniola_cv is None:
+            self.skipTest("Módulo C++ ausente")
+
+        scanner = self.miniola_cv.ScannerVision()
+        # Quadro grande e ROI cobrindo o sensor inteiro: cada chamada leva vários milissegundos
+        frame = np.random.randint(0, 255, (3000, 4000, 3), dtype=np.uint8)
+        args_cv = (0, 0, 4000, 3000, 239, 110, 23, 195.0, True, 280, 96, 430)
+
+        t0 = time.perf_counter()
+        scanner.process_frame(frame, *args_cv)
+        duracao_chamada = time.perf_counter() - t0
+
+        parar = threading.Event()
+        chamadas = [0]
+
+        def loop_visao():
+            while not parar.is_set():
+                scanner.process_frame(frame, *args_cv)
+                chamadas[0] += 1
+
+        def trabalho_pid():
+            # Aritmética Python equivalente a um tick do PID
+            sum(i * 0.5 for i in range(200))
+
+        def trabalho_dashboard():
+            cv2.imencode('.jpg', frame[:240, :320], [int(cv2.IMWRITE_JPEG_QUALITY), 70])
+
+        resultados = {}
+        def medir(nome, periodo, trabalho):
+            resultados[nome] = self._atrasos_em_cadencia(periodo, parar, trabalho)
+
+        threads = [
+            threading.Thread(target=loop_visao),
+            threading.Thread(target=medir, args=("pid", 0.05, trabalho_pid)),
+            threading.Thread(target=medir, args=("dashboard", 1 / 30, trabalho_dashboard)),
+        ]
+        for t in threads: t.start()
+        time.sleep(max(1.5, duracao_chamada * 20))
+        parar.set()
+        for t in threads: t.join(timeout=10)
+
+        self.assertGreater(chamadas[0], 0)
+        tolerancia = max(0.010, duracao_chamada / 2)
+        for nome, atrasos in resultados.items():
+            atrasos = sorted(atrasos)
+            p95 = atrasos[int(len(atrasos) * 0.95) - 1]
+            self.assertLess(p95, tolerancia, f"{nome}: atraso p95 {p95 * 1000:.1f} ms com o loop de visão saturado "
+                                             f"(chamada nativa leva {duracao_chamada * 1000:.1f} ms)")
+
+
+class TestProcessFrameInto(unittest.TestCase):
+    """
+    API sem alocação `process_frame_into` (SPEC-001): mesmos resultados do `process_frame`
+    legado, escritos em buffers preparados pelo chamador (`core/vision_buffers.py`).
+    """
+
+    ARGS = (200, 10, 80, 840, 239, 110, 23, 195.0, False, 280, 96, 430)
+
+    def _frame(self, perf_y):
+        frame = np.zeros((880, 1420, 3), dtype=np.uint8)
+        cv2.rectangle(frame, (210, 10 + perf_y - 15), (270, 10 + perf_y + 15), (255, 255, 255), -1)
+        return frame
+
+    def test_01_buffers_reutilizados_e_conversoes(self):
+        from core.vision_buffers import VisionBuffers
+        buffers = VisionBuffers(np.dtype([("n_rects", "i4")]), max_rects=4, max_audio=16)
+        a = buffers.binario_para(81, 840)
+        b = buffers.binario_para(81, 840)
+        self.assertEqual(a.shape, (420, 40))
+        self.assertIsNot(a, b)
+        self.assertIs(buffers.binario_para(81, 840), a)
+
+        buffers.rects[0] = (1, 2, 3, 4, 1)
+        self.assertEqual(buffers.debug_visual(9), [{'rect': (1, 2, 3, 4), 'color': (0, 0, 255)}] + [
+            {'rect': (0, 0, 0, 0), 'color': (0, 255, 0)}] * 3)
+        self.assertIsNone(buffers.audio_chunk(0))
+        self.assertEqual(buffers.audio_chunk(5).shape, (5,))
+
+    def test_02_paridade_com_process_frame(self):
+        try:
+            import miniola_cv
+        except ImportError:
+            self.skipTest("Módulo C++ ausente")
+        from core.vision_buffers import VisionBuffers
+
+        legado, novo = miniola_cv.ScannerVision(), miniola_cv.ScannerVision()
+        buffers = VisionBuffers(miniola_cv.result_dtype())
+        quadros = [self._frame(y) for y in (75, 112)] * 4
+
+        for frame in quadros:
+            ret = legado.process_frame(frame, *self.ARGS)
+            binario = buffers.binario_para(80, 840)
+            novo.process_frame_into(frame, *self.ARGS, buffers.resultado, buffers.rects, buffers.audio, binario)
+            rec = buffers.resultado[0]
+            self.assertEqual(bool(rec["capturar"]), ret["capturar"])
+            self.assertEqual(int(rec["contador_perfs_ciclo"]), ret["contador_perfs_ciclo"])
+            self.assertEqual(int(rec["cy_a"]), ret["cy_a"])
+            self.assertEqual(buffers.debug_visual(int(rec["n_rects"])), [
+                {'rect': tuple(d['rect']), 'color': tuple(d['color'])} for d in ret["debug_visual"]])
+            np.testing.assert_array_equal(binario, ret["binary_small"])
+
+    def test_03_sem_preview_nao_escreve_buffers_opcionais(self):
+        try:
+            import miniola_cv
+        except ImportError:
+            self.skipTest("Módulo C++ ausente")
+        from core.vision_buffers import VisionBuffers
+
+        scanner = miniola_cv.ScannerVision()
+        buffers = VisionBuffers(miniola_cv.result_dtype())
+        buffers.rects.fill(-7)
+        scanner.process_frame_into(self._frame(112), *self.ARGS, buffers.resultado)
+        self.assertTrue(buffers.resultado[0]["achou_furo"])
+        self.assertTrue((buffers.rects == -7).all())
+        # Buffer com dtype errado é rejeitado em vez de convertido (cópia silenciosa)
+        with self.assertRaises(TypeError):
+            scanner.process_frame_into(self._frame(112), *self.ARGS, buffers.resultado, buffers.rects.astype(np.int64))
+
+
+class TestVisionTracking(unittest.TestCase):
+    """
+    Rastreamento incremental (SPEC-001): com fase válida, só as faixas previstas são varridas;
+    o resultado deve ser idêntico à varredura completa e as quedas para varredura completa contabilizadas.
+    """
+
+    ARGS = (200, 10, 80, 840, 239, 110, 23, 195.0, False, 280, 96, 430)
+
+    def setUp(self):
+        try:
+            import miniola_cv
+        except ImportError:
+            self.skipTest("Módulo C++ ausente")
+        self.rastreado = miniola_cv.ScannerVision()
+        self.completo = miniola_cv.ScannerVision()
+        self.rastreado.set_tracking(True, 1000)
+        self.completo.set_tracking(False)
+
+    def _filme(self, deslocamento, pitch=195.0):
+        # Tira de perfurações periódicas atravessando a ROI (y global = deslocamento + k * pitch)
+        frame = np.zeros((880, 1420, 3), dtype=np.uint8)
+        y = deslocamento % pitch - pitch
+        while y < 880:
+            cy = int(round(10 + y))
+            cv2.rectangle(frame, (210, cy - 15), (270, cy + 15), (255, 255, 255), -1)
+            y += pitch
+        return frame
+
+    def _comparar(self, posicoes):
+        for pos in posicoes:
+            frame = self._filme(pos)
+            a = self.rastreado.process_frame(frame, *self.ARGS)
+            b = self.completo.process_frame(frame, *self.ARGS)
+            for chave in ("capturar", "cy_a", "cx_a", "contador_perfs_ciclo", "achou_furo"):
+                self.assertEqual(a[chave], b[chave], f"{chave} divergiu na posição {pos}")
+            self.assertEqual(len(a["debug_visual"]), len(b["debug_visual"]))
+
+    def test_01_avanco_constante_usa_faixas(self):
+        self._comparar([12.0 * i for i in range(80)])
+        st = self.rastreado.get_tracking_stats()
+        self.assertEqual(st["quadros"], 80)
+        self.assertGreater(st["incrementais"], 60)
+        self.assertGreater(st["linhas_por_quadro_incremental"], 0)
+        self.assertLess(st["linhas_por_quadro_incremental"], 840)
+        self.assertEqual(self.completo.get_tracking_stats()["incrementais"], 0)
+
+    def test_02_salto_cai_para_varredura_completa(self):
+        # Avanço de 12 px/quadro e, de repente, um salto de 60 px (quadros perdidos na USB)
+        posicoes = [12.0 * i for i in range(20)] + [12.0 * 19 + 60 + 12.0 * i for i in range(20)]
+        self._comparar(posicoes)
+        st = self.rastreado.get_tracking_stats()
+        self.assertGreaterEqual(st["fallback_confianca"], 1)
+        self.assertGreater(st["taxa_fallback"], 0)
+
+    def test_03_fase_perdida_e_reset(self):
+        vazio = np.zeros((880, 1420, 3), dtype=np.uint8)
+        self._comparar([0.0, 12.0, 24.0])
+        self.rastreado.process_frame(vazio, *self.ARGS)
+        self.completo.process_frame(vazio, *self.ARGS)
+        antes = self.rastreado.get_tracking_stats()["fallback_sem_fase"]
+        self._comparar([36.0, 48.0])
+        self.assertGreater(self.rastreado.get_tracking_stats()["fallback_sem_fase"], antes)
+        self.rastreado.reset_tracking_stats()
+        self.assertEqual(self.rastreado.get_tracking_stats()["quadros"], 0)
+
+
 if __name__ == "__main__":
     unittest.main()
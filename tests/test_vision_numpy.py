@@ -0,0 +1,123 @@
+import unittest
+import numpy as np
+import cv2
+import sys
+import os
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.vision_buffers import VisionBuffers
+from core.vision_numpy import ScannerVisionNumpy, result_dtype
+
+
+class TestVisionNumpy(unittest.TestCase):
+    """
+    Motor de visão NumPy (SPEC-001): mesmo algoritmo de projeção 1D + PLL de fase do motor C++,
+    usado quando a extensão não está compilada (MiniPCs x86 sem toolchain).
+    """
+
+    ARGS = (200, 10, 80, 840, 239, 110, 23, 195.0, False, 280, 96, 430)
+
+    def _furo(self, perf_y):
+        frame = np.zeros((880, 1420, 3), dtype=np.uint8)
+        cv2.rectangle(frame, (210, 10 + perf_y - 15), (270, 10 + perf_y + 15), (255, 255, 255), -1)
+        return frame
+
+    def _filme(self, deslocamento, pitch=195.0):
+        # Tira de perfurações periódicas subindo pela ROI, com trilha de áudio variando ao longo do filme
+        frame = np.zeros((880, 1420, 3), dtype=np.uint8)
+        linhas = np.arange(880) + deslocamento
+        frame[:, 290:380] = (127 + 100 * np.sin(linhas / 7.0)).astype(np.uint8)[:, None, None]
+        y = -deslocamento % pitch - pitch
+        while y < 880:
+            cy = int(round(10 + y))
+            cv2.rectangle(frame, (210, cy - 15), (270, cy + 15), (255, 255, 255), -1)
+            y += pitch
+        return frame
+
+    def test_01_gatilho_no_quarto_furo(self):
+        scanner = ScannerVisionNumpy()
+        vazio = np.zeros((880, 1420, 3), dtype=np.uint8)
+        self.assertFalse(scanner.process_frame(vazio, *self.ARGS)["capturar"])
+
+        capturas = []
+        for _ in range(4):
+            scanner.process_frame(self._furo(75), *self.ARGS)
+            res = scanner.process_frame(self._furo(112), *self.ARGS)
+            capturas.append(res)
+            scanner.process_frame(vazio, *self.ARGS)
+
+        self.assertEqual([r["capturar"] for r in capturas], [False, False, False, True])
+        self.assertEqual(capturas[-1]["cy_a"], 122)
+        self.assertEqual(capturas[-1]["cx_a"], 240)
+        self.assertEqual(capturas[-1]["debug_visual"], [{'rect': (200, 107, 80, 31), 'color': (0, 0, 255)}])
+        self.assertEqual(capturas[-1]["binary_small"].shape, (420, 40))
+
+    def test_02_buffers_do_chamador(self):
+        scanner = ScannerVisionNumpy()
+        buffers = VisionBuffers(result_dtype())
+        args = self.ARGS[:8] + (True,) + self.ARGS[9:]
+        amostras = 0
+        for i in range(40):
+            binario = buffers.binario_para(80, 840)
+            scanner.process_frame_into(self._filme(9.0 * i), *args,
+                                       buffers.resultado, buffers.rects, buffers.audio, binario)
+            rec = buffers.resultado[0]
+            self.assertTrue(rec["valido"])
+            self.assertGreaterEqual(rec["n_rects"], 4)
+            self.assertEqual(binario[:, 1].max(), 0)
+            self.assertEqual(binario.max(), 255)
+            amostras += int(rec["audio_len"])
+        # A costura por SAD remove a sobreposição: ~9 amostras novas por quadro
+        self.assertGreater(amostras, 9 * 30)
+        self.assertLess(amostras, 9 * 39 + 60)
+
+        with self.assertRaises(TypeError):
+            scanner.process_frame_into(self._filme(0), *self.ARGS, buffers.resultado, buffers.rects.astype(np.int64))
+
+    def test_03_tempo_real_120fps(self):
+        scanner = ScannerVisionNumpy()
+        buffers = VisionBuffers(result_dtype())
+        quadros = [self._filme(12.0 * i) for i in range(16)]
+        inicio = time.perf_counter()
+        for i in range(240):
+            scanner.process_frame_into(quadros[i % 16], *self.ARGS, buffers.resultado, buffers.rects, buffers.audio)
+        por_quadro = (time.perf_counter() - inicio) / 240
+        self.assertLess(por_quadro, 1.0 / 120, f"{por_quadro * 1000:.2f} ms por quadro")
+
+    def test_04_paridade_com_motor_cpp(self):
+        try:
+            import miniola_cv
+        except ImportError:
+            self.skipTest("Módulo C++ ausente")
+        cpp, numpy_ = miniola_cv.ScannerVision(), ScannerVisionNumpy()
+        args = self.ARGS[:8] + (True,) + self.ARGS[9:]
+        for i in range(120):
+            frame = self._filme(11.0 * i, pitch=192.5)
+            a = cpp.process_frame(frame, *args)
+            b = numpy_.process_frame(frame, *args)
+            for chave in ("capturar", "cx_a", "cy_a", "contador_perfs_ciclo", "perfuracao_na_linha", "achou_furo"):
+                self.assertEqual(a[chave], b[chave], f"{chave} divergiu no quadro {i}")
+            self.assertAlmostEqual(a["pitch_instantaneo"], b["pitch_instantaneo"], places=6)
+            self.assertEqual(a["debug_visual"], b["debug_visual"])
+            np.testing.assert_array_equal(a["binary_small"], b["binary_small"])
+            np.testing.assert_allclose(a["audio_chunk"], b["audio_chunk"] if b["audio_chunk"] is not None else [], atol=1e-5)
+
+    def test_05_preview_da_roi_que_passa_da_borda(self):
+        # ROI de 840 linhas a partir de y = 500 num quadro de 880: o motor usa só as 380 linhas visíveis
+        scanner = ScannerVisionNumpy()
+        buffers = VisionBuffers(result_dtype())
+        binario = buffers.binario_para(80, 840, (880, 1420, 3), 200, 500)
+        self.assertEqual(binario.shape, (190, 40))
+        scanner.process_frame_into(self._filme(0.0), 200, 500, 80, 840, *self.ARGS[4:],
+                                   buffers.resultado, buffers.rects, buffers.audio, binario)
+        rec = buffers.resultado[0]
+        self.assertEqual((rec["binary_h"], rec["binary_w"]), binario.shape)
+        self.assertEqual(binario.max(), 255)  # O preview foi de fato escrito
+
+
+if __name__ == "__main__":
+    unittest.main()